@@ -16,6 +16,8 @@ from rest_framework.exceptions import APIException
 
 from apps.core.models import Organization, OrgMember, Store, OnboardingProgress
 from apps.stores.services.user_uuid import upsert_user_id_map
+from apps.stores.services.user_orgs import invalidate_user_org_ids
+from backend.utils import shared_cache
 
 logger = logging.getLogger(__name__)
 _org_fallback_used = ContextVar("org_fallback_used", default=False)
@@ -123,6 +125,8 @@ def _recover_org_memberships_by_owner_email(user_uuid: str, email: str) -> list[
                 user_id=user_uuid,
                 defaults={"role": "owner", "created_at": timezone.now()},
             )
+            if _created:
+                invalidate_user_org_ids(user_uuid)
             recovered_org_ids.append(org_id)
         except Exception:
             logger.exception(
@@ -208,7 +212,7 @@ def _fetch_supabase_user(token: str) -> dict:
     if cache_seconds > 0:
         token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
         cache_key = f"supabase:auth_user:{token_hash}"
-        cached = cache.get(cache_key)
+        cached = shared_cache.get("supabase.auth_user", cache_key)
         if isinstance(cached, dict) and cached:
             return cached
 
@@ -322,6 +326,7 @@ def ensure_org_membership(user: User, *, user_uuid: Optional[str] = None) -> Non
         role="owner",
         created_at=timezone.now(),
     )
+    invalidate_user_org_ids(user_uuid)
     _ensure_no_store_onboarding_progress(str(org.id))
     logger.info("[SUPABASE] org created org_id=%s user_uuid=%s", str(org.id), str(user_uuid))
 
@@ -0,0 +1,230 @@
+"""
+Outbox durável para o webhook do n8n.
+
+Handlers só gravam em webhook_outbox (enqueue); o worker n8n_outbox_dispatch
+reivindica lotes vencidos com lease (SELECT ... FOR UPDATE SKIP LOCKED), envia
+com uma sessão HTTP compartilhada e concorrência limitada, e conclui cada
+entrada: NotificationLog e event_receipts são atualizados na entrega (ou na
+desistência, após N8N_OUTBOX_MAX_ATTEMPTS com backoff exponencial).
+"""
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from apps.core.models import NotificationLog
+from apps.edge.models import WebhookOutbox
+
+from .services import _get_webhook, delivery_info, post_to_n8n
+
+logger = logging.getLogger(__name__)
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "N8N_OUTBOX_ENABLED", False))
+
+
+def enqueue(
+    payload: Dict[str, Any],
+    *,
+    notification_log_ids: Optional[Iterable] = None,
+    receipt_event_id: Optional[str] = None,
+) -> WebhookOutbox:
+    """
+    Grava o envelope no outbox. event_id repetido reaproveita a entrada
+    existente (mesma idempotência do n8n).
+    """
+    event_id = payload.get("event_id") or None
+    entry = WebhookOutbox(
+        event_id=str(event_id) if event_id else None,
+        event_name=str(payload.get("event_name") or "")[:128],
+        payload=payload,
+        notification_log_ids=[str(log_id) for log_id in (notification_log_ids or [])],
+        receipt_event_id=str(receipt_event_id) if receipt_event_id else None,
+    )
+    try:
+        with transaction.atomic():
+            entry.save(force_insert=True)
+    except IntegrityError:
+        existing = WebhookOutbox.objects.filter(event_id=entry.event_id).first()
+        if existing is None:
+            raise
+        logger.info("[N8N] outbox dedupe event_id=%s outbox_id=%s", entry.event_id, existing.id)
+        return existing
+    return entry
+
+
+def backoff_seconds(attempts: int) -> float:
+    base = float(getattr(settings, "N8N_OUTBOX_BACKOFF_BASE_SECONDS", 5))
+    cap = float(getattr(settings, "N8N_OUTBOX_BACKOFF_MAX_SECONDS", 1800))
+    delay = min(cap, base * (2 ** max(0, attempts - 1)))
+    # Jitter evita que um n8n que voltou receba todas as retentativas juntas.
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_due(*, limit: int, lease_seconds: float) -> List[WebhookOutbox]:
+    now = timezone.now()
+    with transaction.atomic():
+        entries = list(
+            WebhookOutbox.objects.select_for_update(skip_locked=True)
+            .filter(
+                status__in=[WebhookOutbox.STATUS_PENDING, WebhookOutbox.STATUS_SENDING],
+                next_attempt_at__lte=now,
+            )
+            # "sending" com lease vencido: worker anterior morreu no meio do envio.
+            .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+            .order_by("next_attempt_at", "id")[:limit]
+        )
+        if entries:
+            WebhookOutbox.objects.filter(id__in=[entry.id for entry in entries]).update(
+                status=WebhookOutbox.STATUS_SENDING,
+                locked_until=now + timedelta(seconds=lease_seconds),
+            )
+    return entries
+
+
+def build_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _split_batch_result(result: Dict[str, Any], size: int) -> List[Dict[str, Any]]:
+    """Resposta de lote: {"results": [...]} alinhado com os eventos, ou a mesma para todos."""
+    data = result.get("data") if isinstance(result.get("data"), dict) else {}
+    items = data.get("results") if isinstance(data, dict) else None
+    if result.get("ok") and isinstance(items, list) and len(items) == size:
+        return [{**result, "data": item if isinstance(item, dict) else {"result": item}} for item in items]
+    return [result] * size
+
+
+def _send_group(session, webhook: str, entries: List[WebhookOutbox], timeout: float) -> List[Dict[str, Any]]:
+    if len(entries) == 1:
+        return [post_to_n8n(entries[0].payload, webhook=webhook, timeout=timeout, session=session)]
+    body = {"batch": True, "events": [entry.payload for entry in entries]}
+    return _split_batch_result(post_to_n8n(body, webhook=webhook, timeout=timeout, session=session), len(entries))
+
+
+def _update_notification_logs(entry: WebhookOutbox, result: Dict[str, Any], *, final_error: Optional[str]) -> None:
+    if not entry.notification_log_ids:
+        return
+    now = timezone.now()
+    for log in NotificationLog.objects.filter(id__in=entry.notification_log_ids):
+        if final_error is None:
+            ok, provider_message_id = delivery_info(result, log.channel)
+        else:
+            ok, provider_message_id = False, None
+        log.status = "sent" if ok else "failed"
+        log.provider_message_id = provider_message_id
+        log.error = None if ok else (final_error or str(result))[:1000]
+        log.sent_at = now
+        log.save(update_fields=["status", "provider_message_id", "error", "sent_at"])
+
+
+def _update_receipt(entry: WebhookOutbox, *, error: Optional[str]) -> None:
+    if not entry.receipt_event_id:
+        return
+    from apps.edge.vision_metrics import mark_event_receipt_failed, mark_event_receipt_processed
+
+    if error is None:
+        mark_event_receipt_processed(event_id=entry.receipt_event_id)
+    else:
+        mark_event_receipt_failed(event_id=entry.receipt_event_id, error_message=error)
+
+
+def _complete(entry: WebhookOutbox, result: Dict[str, Any], max_attempts: int) -> str:
+    now = timezone.now()
+    entry.attempts += 1
+    entry.locked_until = None
+    if result.get("ok"):
+        entry.status = WebhookOutbox.STATUS_DELIVERED
+        entry.delivered_at = now
+        entry.response = result
+        entry.last_error = None
+        entry.save(update_fields=["status", "attempts", "locked_until", "delivered_at", "response", "last_error"])
+        _update_notification_logs(entry, result, final_error=None)
+        _update_receipt(entry, error=None)
+        return entry.status
+
+    error = str(result.get("error") or f"http_{result.get('status')}")[:1000]
+    entry.last_error = f"status={result.get('status')} {error}" if result.get("status") else error
+    entry.response = result
+    # 4xx (exceto 408/429) não melhora com retentativa.
+    status_code = result.get("status")
+    permanent = isinstance(status_code, int) and 400 <= status_code < 500 and status_code not in (408, 429)
+    if permanent or entry.attempts >= max_attempts:
+        entry.status = WebhookOutbox.STATUS_DEAD
+        entry.save(update_fields=["status", "attempts", "locked_until", "last_error", "response"])
+        logger.warning(
+            "[N8N] outbox dead outbox_id=%s event_name=%s attempts=%s error=%s",
+            entry.id,
+            entry.event_name,
+            entry.attempts,
+            entry.last_error,
+        )
+        _update_notification_logs(entry, result, final_error=entry.last_error)
+        _update_receipt(entry, error=f"n8n_outbox_dead:{entry.last_error}"[:500])
+        return entry.status
+
+    entry.status = WebhookOutbox.STATUS_PENDING
+    entry.next_attempt_at = now + timedelta(seconds=backoff_seconds(entry.attempts))
+    entry.save(update_fields=["status", "attempts", "locked_until", "last_error", "response", "next_attempt_at"])
+    return "retry"
+
+
+def dispatch_once(
+    *,
+    session: Optional[requests.Session] = None,
+    limit: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> Dict[str, int]:
+    """Reivindica um lote vencido, envia e conclui. Retorna contadores."""
+    limit = int(limit or getattr(settings, "N8N_OUTBOX_CLAIM_LIMIT", 100))
+    concurrency = max(1, int(concurrency or getattr(settings, "N8N_OUTBOX_CONCURRENCY", 4)))
+    batch_size = max(1, int(batch_size or getattr(settings, "N8N_OUTBOX_BATCH_SIZE", 1)))
+    timeout = float(getattr(settings, "N8N_OUTBOX_TIMEOUT_SECONDS", 8))
+    max_attempts = int(getattr(settings, "N8N_OUTBOX_MAX_ATTEMPTS", 8))
+    stats = {"claimed": 0, "delivered": 0, "retry": 0, "dead": 0}
+
+    webhook = _get_webhook()
+    if not webhook:
+        return stats
+    # Lease cobre o pior caso do lote: grupos em ondas de `concurrency`.
+    waves = -(-limit // (batch_size * concurrency))
+    entries = claim_due(limit=limit, lease_seconds=max(60.0, timeout * (waves + 1)))
+    stats["claimed"] = len(entries)
+    if not entries:
+        return stats
+
+    session = session or build_session(concurrency)
+    groups = [entries[idx:idx + batch_size] for idx in range(0, len(entries), batch_size)]
+    # Só o HTTP roda nas threads; as escritas no banco ficam nesta thread.
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(groups))) as executor:
+        results = list(executor.map(lambda group: _send_group(session, webhook, group, timeout), groups))
+
+    for group, group_results in zip(groups, results):
+        for entry, result in zip(group, group_results):
+            try:
+                outcome = _complete(entry, result, max_attempts)
+            except Exception:
+                logger.exception("[N8N] outbox completion failed outbox_id=%s", entry.id)
+                continue
+            stats[outcome] += 1
+    return stats
+
+
+def pending_count() -> int:
+    return WebhookOutbox.objects.filter(
+        status__in=[WebhookOutbox.STATUS_PENDING, WebhookOutbox.STATUS_SENDING]
+    ).count()
@@ -1,6 +1,6 @@
 # apps/alerts/services.py
 import requests
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from django.conf import settings
 from django.utils import timezone
 
@@ -15,7 +15,7 @@ def _get_webhook() -> Optional[str]:
     return getattr(settings, "N8N_EVENTS_WEBHOOK", None)
 
 
-def send_event_to_n8n(
+def build_n8n_envelope(
     *,
     event_name: str,
     data: Dict[str, Any],
@@ -25,21 +25,8 @@ def send_event_to_n8n(
     source: str = "backend",
     event_version: int = 1,
     meta: Optional[Dict[str, Any]] = None,
-    timeout: int = DEFAULT_TIMEOUT,
 ) -> Dict[str, Any]:
-    """
-    Envia um evento padronizado para o n8n.
-    - event_name: "lead_created", "alert_triggered", "invoice_overdue", etc.
-    - data: payload específico do evento
-    - event_id: idealmente o UUID do JourneyEvent (idempotência)
-    - lead_id/org_id: usados para roteamento e auditoria
-    - meta: extras úteis (ip, user_agent, request_id, etc.)
-    """
-    webhook = _get_webhook()
-    if not webhook:
-        return {"ok": False, "error": "N8N_EVENTS_WEBHOOK not configured"}
-
-    payload = {
+    return {
         "event_id": str(event_id) if event_id else None,
         "event_name": event_name,
         "event_version": event_version,
@@ -51,8 +38,23 @@ def send_event_to_n8n(
         "meta": meta or {},
     }
 
+
+def post_to_n8n(
+    body: Any,
+    *,
+    webhook: Optional[str] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    session: Optional[requests.Session] = None,
+) -> Dict[str, Any]:
+    """
+    POST síncrono no webhook. Usado pelo dispatcher do outbox (com sessão
+    compartilhada) e como fallback quando o outbox está desligado.
+    """
+    webhook = webhook or _get_webhook()
+    if not webhook:
+        return {"ok": False, "error": "N8N_EVENTS_WEBHOOK not configured"}
     try:
-        r = requests.post(webhook, json=payload, timeout=timeout)
+        r = (session or requests).post(webhook, json=body, timeout=timeout)
         if r.ok:
             try:
                 return {"ok": True, "status": r.status_code, "data": r.json()}
@@ -61,3 +63,84 @@ def send_event_to_n8n(
         return {"ok": False, "status": r.status_code, "error": r.text}
     except Exception as e:
         return {"ok": False, "error": str(e)}
+
+
+def delivery_info(n8n_result: dict, channel: str):
+    """
+    Espera resposta padrão do n8n:
+    {
+      ok: true,
+      deliveries: {
+        whatsapp: { ok: true, id: "..." },
+        email: { ok: true, id: "..." }
+      }
+    }
+    """
+    try:
+        deliveries = (n8n_result or {}).get("data", {}).get("deliveries") or (n8n_result or {}).get("deliveries")
+        if isinstance(deliveries, dict) and channel in deliveries and isinstance(deliveries[channel], dict):
+            ch = deliveries[channel]
+            return (bool(ch.get("ok")), ch.get("id"))
+    except Exception:
+        pass
+    # fallback antigo
+    provider_id = None
+    try:
+        d = (n8n_result or {}).get("data")
+        if isinstance(d, dict):
+            provider_id = d.get("id")
+    except Exception:
+        provider_id = None
+    return (bool(n8n_result and n8n_result.get("ok")), provider_id)
+
+
+def send_event_to_n8n(
+    *,
+    event_name: str,
+    data: Dict[str, Any],
+    event_id: Optional[str] = None,
+    lead_id: Optional[str] = None,
+    org_id: Optional[str] = None,
+    source: str = "backend",
+    event_version: int = 1,
+    meta: Optional[Dict[str, Any]] = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    notification_log_ids: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Envia um evento padronizado para o n8n.
+    - event_name: "lead_created", "alert_triggered", "invoice_overdue", etc.
+    - data: payload específico do evento
+    - event_id: idealmente o UUID do JourneyEvent (idempotência)
+    - lead_id/org_id: usados para roteamento e auditoria
+    - meta: extras úteis (ip, user_agent, request_id, etc.)
+    - notification_log_ids: NotificationLogs atualizados quando a entrega concluir
+
+    Com N8N_OUTBOX_ENABLED o evento só é gravado no outbox e a resposta é
+    {"ok": True, "queued": True, ...}; o envio fica com n8n_outbox_dispatch.
+    """
+    webhook = _get_webhook()
+    if not webhook:
+        return {"ok": False, "error": "N8N_EVENTS_WEBHOOK not configured"}
+
+    payload = build_n8n_envelope(
+        event_name=event_name,
+        data=data,
+        event_id=event_id,
+        lead_id=lead_id,
+        org_id=org_id,
+        source=source,
+        event_version=event_version,
+        meta=meta,
+    )
+
+    from apps.alerts import outbox
+
+    if outbox.enabled():
+        try:
+            entry = outbox.enqueue(payload, notification_log_ids=notification_log_ids)
+        except Exception as e:
+            return {"ok": False, "error": f"outbox_enqueue_failed: {e}"}
+        return {"ok": True, "queued": True, "outbox_id": entry.id, "event_id": payload["event_id"]}
+
+    return post_to_n8n(payload, webhook=webhook, timeout=timeout)
@@ -67,3 +67,68 @@ class ActionDispatchViewTests(SimpleTestCase):
 
         self.assertEqual(response.status_code, 400)
         self.assertIn("store_id", response.data)
+
+
+class DelegateWhatsappViewTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = MagicMock(is_authenticated=True, is_staff=False, is_superuser=False, id=123, email="ops@dalevision.com")
+
+    def _call(self):
+        from apps.alerts.views import DetectionEventViewSet
+
+        event = MagicMock(
+            id="33333333-3333-3333-3333-333333333333",
+            org_id="22222222-2222-2222-2222-222222222222",
+            store_id="11111111-1111-1111-1111-111111111111",
+            occurred_at=None,
+            metadata={},
+        )
+        employee = SimpleNamespace(id="emp-1", full_name="Ana")
+        view = DetectionEventViewSet.as_view({"post": "delegate_whatsapp"})
+        request = self.factory.post("/api/v1/alerts/events/x/delegate-whatsapp/", {}, format="json")
+        force_authenticate(request, user=self.user)
+        with patch.object(DetectionEventViewSet, "get_object", return_value=event), patch(
+            "apps.alerts.views._require_subscription_for_org"
+        ), patch(
+            "apps.alerts.views._resolve_employee_for_whatsapp", return_value=(employee, "+5511999999999")
+        ), patch("apps.alerts.views.EventMedia"), patch(
+            "apps.alerts.views.EventMediaSerializer", return_value=MagicMock(data=[])
+        ), patch("apps.alerts.views.JourneyEvent") as journey_model, patch(
+            "apps.alerts.views._create_action_outcome_from_dispatch", return_value=None
+        ):
+            journey_model.objects.create.return_value = SimpleNamespace(id="evt-1")
+            return view(request, pk=event.id)
+
+    @patch("apps.alerts.views.transaction.atomic")
+    @patch("apps.alerts.views.NotificationLog")
+    @patch("apps.alerts.views.send_event_to_n8n")
+    def test_notification_log_id_is_sent_to_outbox(self, send_mock, log_model, atomic_mock):
+        send_mock.return_value = {"ok": True, "queued": True, "outbox_id": 1}
+        log_model.objects.create.side_effect = lambda **kwargs: SimpleNamespace(**kwargs)
+
+        with self.settings(N8N_OUTBOX_ENABLED=True):
+            response = self._call()
+
+        self.assertEqual(response.status_code, 202)
+        created = log_model.objects.create.call_args.kwargs
+        self.assertEqual(created["status"], "queued")
+        delegate_call = send_mock.call_args_list[0].kwargs
+        self.assertEqual(delegate_call["event_name"], "alert_delegate_whatsapp_requested")
+        self.assertEqual(delegate_call["notification_log_ids"], [str(created["id"])])
+        self.assertEqual(response.data["notification_log_id"], str(created["id"]))
+        atomic_mock.assert_called_once()
+
+    @patch("apps.alerts.views.transaction.atomic")
+    @patch("apps.alerts.views.NotificationLog")
+    @patch("apps.alerts.views.send_event_to_n8n")
+    def test_sync_post_runs_outside_atomic_without_outbox(self, send_mock, log_model, atomic_mock):
+        send_mock.return_value = {"ok": True, "data": {"id": "n8n-1"}}
+        log_model.objects.create.side_effect = lambda **kwargs: SimpleNamespace(**kwargs)
+
+        with self.settings(N8N_OUTBOX_ENABLED=False):
+            response = self._call()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(log_model.objects.create.call_args.kwargs["provider_message_id"], "n8n-1")
+        atomic_mock.assert_not_called()
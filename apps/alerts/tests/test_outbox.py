@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.alerts import outbox
+from apps.alerts.services import send_event_to_n8n
+from apps.edge.models import WebhookOutbox
+
+WEBHOOK = "https://n8n.example.com/webhook/events"
+
+
+def _response(status_code=200, body=None):
+    resp = MagicMock(ok=status_code < 400, status_code=status_code, text="err")
+    resp.json.return_value = body or {}
+    return resp
+
+
+@override_settings(N8N_EVENTS_WEBHOOK=WEBHOOK, N8N_OUTBOX_ENABLED=True, N8N_OUTBOX_MAX_ATTEMPTS=3)
+class N8nOutboxTests(TestCase):
+    def _enqueue(self, event_id="je-1", **kwargs):
+        return send_event_to_n8n(event_name="alert_triggered", event_id=event_id, data={"x": 1}, **kwargs)
+
+    @patch("apps.alerts.services.requests.post")
+    def test_send_only_enqueues_and_dedupes_by_event_id(self, post_mock):
+        first = self._enqueue(notification_log_ids=["log-1"])
+        again = self._enqueue()
+
+        post_mock.assert_not_called()
+        self.assertTrue(first["ok"])
+        self.assertTrue(first["queued"])
+        self.assertEqual(first["outbox_id"], again["outbox_id"])
+        entry = WebhookOutbox.objects.get()
+        self.assertEqual(entry.status, WebhookOutbox.STATUS_PENDING)
+        self.assertEqual(entry.notification_log_ids, ["log-1"])
+        self.assertEqual(entry.payload["event_name"], "alert_triggered")
+
+    @patch("apps.alerts.outbox._update_receipt")
+    @patch("apps.alerts.outbox.NotificationLog")
+    def test_delivery_updates_notification_logs(self, log_model, update_receipt):
+        self._enqueue(notification_log_ids=["log-1"])
+        log = SimpleNamespace(channel="whatsapp", save=MagicMock())
+        log_model.objects.filter.return_value = [log]
+        session = MagicMock()
+        session.post.return_value = _response(200, {"deliveries": {"whatsapp": {"ok": True, "id": "wa-1"}}})
+
+        stats = outbox.dispatch_once(session=session)
+
+        self.assertEqual(stats, {"claimed": 1, "delivered": 1, "retry": 0, "dead": 0})
+        entry = WebhookOutbox.objects.get()
+        self.assertEqual(entry.status, WebhookOutbox.STATUS_DELIVERED)
+        self.assertEqual(entry.attempts, 1)
+        self.assertEqual(log.status, "sent")
+        self.assertEqual(log.provider_message_id, "wa-1")
+        log.save.assert_called_once()
+        update_receipt.assert_called_once()
+
+    @patch("apps.alerts.outbox._update_receipt")
+    @patch("apps.alerts.outbox.NotificationLog")
+    def test_retries_with_backoff_then_gives_up(self, log_model, update_receipt):
+        self._enqueue(notification_log_ids=["log-1"])
+        log = SimpleNamespace(channel="email", save=MagicMock())
+        log_model.objects.filter.return_value = [log]
+        session = MagicMock()
+        session.post.return_value = _response(503)
+
+        stats = outbox.dispatch_once(session=session)
+        entry = WebhookOutbox.objects.get()
+        self.assertEqual(stats["retry"], 1)
+        self.assertEqual(entry.status, WebhookOutbox.STATUS_PENDING)
+        self.assertGreater(entry.next_attempt_at, timezone.now())
+        # Não vencido: nada a reivindicar.
+        self.assertEqual(outbox.dispatch_once(session=session)["claimed"], 0)
+
+        WebhookOutbox.objects.update(next_attempt_at=timezone.now(), attempts=2)
+        stats = outbox.dispatch_once(session=session)
+        entry.refresh_from_db()
+        self.assertEqual(stats["dead"], 1)
+        self.assertEqual(entry.status, WebhookOutbox.STATUS_DEAD)
+        self.assertEqual(log.status, "failed")
+        update_receipt.assert_called_once()
+
+    def test_client_error_is_not_retried(self):
+        self._enqueue()
+        session = MagicMock()
+        session.post.return_value = _response(400)
+
+        stats = outbox.dispatch_once(session=session)
+
+        self.assertEqual(stats["dead"], 1)
+        self.assertEqual(WebhookOutbox.objects.get().attempts, 1)
+
+    def test_batches_multiple_events_per_post(self):
+        self._enqueue("je-1")
+        self._enqueue("je-2")
+        self._enqueue("je-3")
+        session = MagicMock()
+        session.post.return_value = _response(200, {"results": [{"id": 1}, {"id": 2}]})
+
+        stats = outbox.dispatch_once(session=session, batch_size=2, concurrency=1)
+
+        self.assertEqual(stats["delivered"], 3)
+        self.assertEqual(session.post.call_count, 2)
+        bodies = [call.kwargs["json"] for call in session.post.call_args_list]
+        batch = next(body for body in bodies if body.get("batch"))
+        self.assertEqual([event["event_id"] for event in batch["events"]], ["je-1", "je-2"])
+        first = WebhookOutbox.objects.get(event_id="je-1")
+        self.assertEqual(first.response["data"], {"id": 1})
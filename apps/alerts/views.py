@@ -1,5 +1,6 @@
 # apps/alerts/views.py
 import logging
+from contextlib import nullcontext
 from datetime import timedelta
 from uuid import UUID, uuid4
 from django.conf import settings
@@ -33,6 +34,7 @@ from backend.utils.entitlements import require_trial_active
 from apps.stores.services.user_uuid import ensure_user_uuid
 from apps.stores.services.user_orgs import get_user_org_ids
 from apps.core.services.journey_events import log_journey_event
+from apps.edge.live_feed import publish_detection_event
 
 from .serializers import (
     AlertRuleSerializer,
@@ -43,7 +45,8 @@ from .serializers import (
     ActionDispatchSerializer,
 )
 
-from .services import send_event_to_n8n
+from . import outbox
+from .services import delivery_info, send_event_to_n8n
 
 logger = logging.getLogger(__name__)
 
@@ -197,6 +200,13 @@ def is_uuid(value: str) -> bool:
     except Exception:
         return False
 
+def _outbox_atomic():
+    """
+    Com outbox, a linha do outbox e os NotificationLogs commitam juntos.
+    Sem outbox o POST síncrono ao n8n não segura transação aberta.
+    """
+    return transaction.atomic() if outbox.enabled() else nullcontext()
+
 def _dest_to_text(dest):
     """
     notification_logs.destination é TEXT.
@@ -684,6 +694,7 @@ class ActionDispatchView(APIView):
             payload=payload,
             source="app",
             meta={"path": request.path},
+            buffered=False,
         )
         if not journey_event:
             journey_event = JourneyEvent.objects.create(
@@ -916,6 +927,8 @@ class AlertRuleViewSet(viewsets.ModelViewSet):
             suppressed_reason=suppressed_reason,
             created_at=now,
         )
+        if not suppressed_by_rule_id:
+            publish_detection_event(event)
 
         # event_media
         if clip_url:
@@ -938,35 +951,6 @@ class AlertRuleViewSet(viewsets.ModelViewSet):
         if receipt_id:
             edge_meta["receipt_id"] = receipt_id
 
-        # helper pra extrair delivery id/status do n8n
-        def _delivery_info(n8n_result: dict, channel: str):
-            """
-            Espera resposta padrão do n8n:
-            {
-              ok: true,
-              deliveries: {
-                whatsapp: { ok: true, id: "..." },
-                email: { ok: true, id: "..." }
-              }
-            }
-            """
-            try:
-                deliveries = (n8n_result or {}).get("data", {}).get("deliveries") or (n8n_result or {}).get("deliveries")
-                if isinstance(deliveries, dict) and channel in deliveries and isinstance(deliveries[channel], dict):
-                    ch = deliveries[channel]
-                    return (bool(ch.get("ok")), ch.get("id"))
-            except Exception:
-                pass
-            # fallback antigo
-            provider_id = None
-            try:
-                d = (n8n_result or {}).get("data")
-                if isinstance(d, dict):
-                    provider_id = d.get("id")
-            except Exception:
-                provider_id = None
-            return (bool(n8n_result and n8n_result.get("ok")), provider_id)
-
         # notification logs + n8n
         n8n_result = None
 
@@ -1079,20 +1063,26 @@ class AlertRuleViewSet(viewsets.ModelViewSet):
                     created_at=now,
                 )
 
-                n8n_result = send_event_to_n8n(
-                    event_name="alert_triggered",
-                    event_id=str(journey_event.id),
-                    lead_id=None,
-                    org_id=org_id,
-                    data=payload,
-                    meta=edge_meta,
-                )
-
-                # logs por canal (email/whatsapp)
-                for ch in ["email", "whatsapp"]:
-                    if channels.get(ch):
-                        ok, provider_message_id = _delivery_info(n8n_result, ch)
+                # logs por canal (email/whatsapp); com outbox ficam "queued" até a entrega
+                channel_log_ids = {ch: uuid4() for ch in ["email", "whatsapp"] if channels.get(ch)}
+                with _outbox_atomic():
+                    n8n_result = send_event_to_n8n(
+                        event_name="alert_triggered",
+                        event_id=str(journey_event.id),
+                        lead_id=None,
+                        org_id=org_id,
+                        data=payload,
+                        meta=edge_meta,
+                        notification_log_ids=[str(log_id) for log_id in channel_log_ids.values()],
+                    )
+                    queued = bool(n8n_result.get("queued"))
+                    for ch, log_id in channel_log_ids.items():
+                        if queued:
+                            ok, provider_message_id = None, None
+                        else:
+                            ok, provider_message_id = delivery_info(n8n_result, ch)
                         NotificationLog.objects.create(
+                            id=log_id,
                             org_id=event.org_id,
                             store_id=store_id,
                             event_id=event.id,
@@ -1100,9 +1090,9 @@ class AlertRuleViewSet(viewsets.ModelViewSet):
                             channel=ch,
                             destination=_dest_to_text(destinations.get(ch)),
                             provider="n8n",
-                            status="sent" if ok else "failed",
+                            status="queued" if queued else ("sent" if ok else "failed"),
                             provider_message_id=provider_message_id,
-                            error=None if ok else str(n8n_result),
+                            error=None if queued or ok else str(n8n_result),
                             sent_at=now,
                         )
 
@@ -1287,17 +1277,48 @@ class DetectionEventViewSet(viewsets.ModelViewSet):
             created_at=now,
         )
 
-        n8n_result = send_event_to_n8n(
-            event_name="alert_delegate_whatsapp_requested",
-            event_id=str(journey_event.id),
-            lead_id=None,
-            org_id=event.org_id,
-            data=payload,
-            meta={
-                "source": "alerts_delegate",
-                "request_user": getattr(request.user, "email", None),
-            },
-        )
+        # NotificationLog com id prévio: com outbox o dispatcher finaliza o "queued".
+        log_id = uuid4()
+        with _outbox_atomic():
+            n8n_result = send_event_to_n8n(
+                event_name="alert_delegate_whatsapp_requested",
+                event_id=str(journey_event.id),
+                lead_id=None,
+                org_id=event.org_id,
+                data=payload,
+                meta={
+                    "source": "alerts_delegate",
+                    "request_user": getattr(request.user, "email", None),
+                },
+                notification_log_ids=[str(log_id)],
+            )
+
+            log_status = "queued" if n8n_result.get("ok") else "failed"
+            provider_message_id = None
+            try:
+                provider_message_id = (
+                    n8n_result.get("data", {}).get("id")
+                    if isinstance(n8n_result.get("data"), dict)
+                    else None
+                )
+            except Exception:
+                provider_message_id = None
+
+            notification_log = NotificationLog.objects.create(
+                id=log_id,
+                org_id=event.org_id,
+                store_id=event.store_id,
+                event_id=event.id,
+                rule_id=None,
+                channel="whatsapp",
+                destination=destination,
+                provider="n8n",
+                status=log_status,
+                provider_message_id=provider_message_id,
+                error=None if n8n_result.get("ok") else str(n8n_result),
+                sent_at=now,
+            )
+
         action_dispatched_event = JourneyEvent.objects.create(
             lead_id=None,
             org_id=event.org_id,
@@ -1336,31 +1357,6 @@ class DetectionEventViewSet(viewsets.ModelViewSet):
             now=now,
         )
 
-        log_status = "queued" if n8n_result.get("ok") else "failed"
-        provider_message_id = None
-        try:
-            provider_message_id = (
-                n8n_result.get("data", {}).get("id")
-                if isinstance(n8n_result.get("data"), dict)
-                else None
-            )
-        except Exception:
-            provider_message_id = None
-
-        notification_log = NotificationLog.objects.create(
-            org_id=event.org_id,
-            store_id=event.store_id,
-            event_id=event.id,
-            rule_id=None,
-            channel="whatsapp",
-            destination=destination,
-            provider="n8n",
-            status=log_status,
-            provider_message_id=provider_message_id,
-            error=None if n8n_result.get("ok") else str(n8n_result),
-            sent_at=now,
-        )
-
         status_code = status.HTTP_202_ACCEPTED if n8n_result.get("ok") else status.HTTP_502_BAD_GATEWAY
         return Response(
             {
@@ -1488,6 +1484,7 @@ class JourneyEventViewSet(viewsets.ModelViewSet):
             payload=payload,
             source=source,
             meta={"path": request.path},
+            buffered=False,
         )
         if not journey_event:
             journey_event = serializer.save(created_at=timezone.now())
@@ -0,0 +1,252 @@
+"""
+Pool de processos para probe RTSP (CAMERA_RTSP_PROBE_POOL_SIZE > 0).
+
+Antes cada probe criava um processo `spawn` novo, que importava OpenCV do zero
+(centenas de ms) antes de qualquer I/O de rede. Aqui os workers são processos
+de vida longa que importam cv2 ao subir e atendem probes por um Pipe. Cada
+probe tem hard timeout: worker que não responde a tempo é terminado e trocado
+por um novo. A espera por worker livre conta no mesmo timeout e a fila de
+espera é limitada (CAMERA_RTSP_PROBE_POOL_MAX_QUEUE).
+
+Um pool por pid: após fork (gunicorn --preload) o processo filho cria o seu.
+"""
+import atexit
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+POOL_BUSY_REASON = "rtsp_probe_pool_busy"
+
+
+def _timeout_result(elapsed_ms: int, hard_timeout_sec: float, *, reason: str = "rtsp_timeout") -> dict:
+    return {
+        "ok": False,
+        "status": "timeout",
+        "elapsed_ms": elapsed_ms,
+        "detail": "rtsp_probe_timeout",
+        "latency_ms": None,
+        "fps_est": None,
+        "frames_read": None,
+        "error_msg": "rtsp_timeout",
+        "extra": {"reason": reason, "hard_timeout_sec": hard_timeout_sec},
+    }
+
+
+def is_pool_busy(result: dict) -> bool:
+    """Probe não chegou a rodar (fila cheia / sem worker livre): não diz nada sobre a câmera."""
+    return ((result or {}).get("extra") or {}).get("reason") == POOL_BUSY_REASON
+
+
+def _error_result(elapsed_ms: int, detail: str, error_msg: str) -> dict:
+    return {
+        "ok": False,
+        "status": "error",
+        "elapsed_ms": elapsed_ms,
+        "detail": detail,
+        "latency_ms": None,
+        "fps_est": None,
+        "frames_read": None,
+        "error_msg": error_msg,
+    }
+
+
+def _probe_worker_main(conn) -> None:
+    # Pré-aquece: o import do OpenCV acontece uma vez por worker, fora do request.
+    try:
+        import cv2  # noqa: F401  optional dependency
+    except Exception:
+        pass
+    from apps.cameras.services import rtsp_probe
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        rtsp_url, timeout_sec = task
+        start = time.monotonic()
+        try:
+            result = rtsp_probe(rtsp_url, timeout_sec)
+        except Exception as exc:
+            result = {
+                "ok": False,
+                "latency_ms": None,
+                "fps_est": None,
+                "frames_read": None,
+                "error_msg": f"rtsp_probe_failed:{exc}",
+            }
+        result.setdefault("elapsed_ms", int((time.monotonic() - start) * 1000))
+        try:
+            conn.send(result)
+        except (EOFError, OSError):
+            return
+
+
+class _Worker:
+    __slots__ = ("conn", "proc", "tasks")
+
+    def __init__(self, ctx):
+        parent_conn, child_conn = ctx.Pipe()
+        self.conn = parent_conn
+        self.proc = ctx.Process(target=_probe_worker_main, args=(child_conn,), name="rtsp_probe_pool_worker")
+        self.proc.daemon = True
+        self.proc.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def alive(self) -> bool:
+        return self.proc.is_alive()
+
+    def stop(self, *, graceful: bool = False) -> None:
+        if graceful:
+            try:
+                self.conn.send(None)
+            except Exception:
+                graceful = False
+        if not graceful and self.proc.is_alive():
+            self.proc.terminate()
+            self.proc.join(timeout=1)
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class RtspProbePool:
+    def __init__(self, *, size: int = 2, max_queue: int = 16, max_tasks_per_worker: int = 200):
+        self._ctx = mp.get_context("spawn")
+        self.size = max(1, int(size))
+        self.max_queue = max(0, int(max_queue))
+        self.max_tasks_per_worker = max(0, int(max_tasks_per_worker or 0))
+        self._lock = threading.Lock()
+        # LIFO: o worker usado por último segue quente (caches do FFmpeg/DNS).
+        self._idle: "queue.LifoQueue[_Worker]" = queue.LifoQueue()
+        self._workers = []
+        self._waiting = 0
+        self._closed = False
+        self._stats = {"probes": 0, "timeouts": 0, "rejected": 0, "recycled": 0}
+        for _ in range(self.size):
+            worker = _Worker(self._ctx)
+            self._workers.append(worker)
+            self._idle.put(worker)
+
+    def _replace(self, worker: _Worker, *, graceful: bool = False) -> _Worker:
+        worker.stop(graceful=graceful)
+        fresh = _Worker(self._ctx)
+        with self._lock:
+            self._workers = [fresh if w is worker else w for w in self._workers]
+            self._stats["recycled"] += 1
+        return fresh
+
+    def probe(self, rtsp_url: str, *, timeout_sec: float = 4, hard_timeout_sec: float = 6) -> dict:
+        start = time.monotonic()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("rtsp_probe_pool_closed")
+            if self._waiting - self._idle.qsize() >= self.max_queue:
+                self._stats["rejected"] += 1
+                return _timeout_result(0, hard_timeout_sec, reason=POOL_BUSY_REASON)
+            self._waiting += 1
+            self._stats["probes"] += 1
+        try:
+            try:
+                worker = self._idle.get(timeout=hard_timeout_sec)
+            except queue.Empty:
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                elapsed_ms = int((time.monotonic() - start) * 1000)
+                return _timeout_result(elapsed_ms, hard_timeout_sec, reason=POOL_BUSY_REASON)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        try:
+            if not worker.alive():
+                worker = self._replace(worker)
+            remaining = max(0.0, hard_timeout_sec - (time.monotonic() - start))
+            try:
+                worker.conn.send((rtsp_url, timeout_sec))
+                if not worker.conn.poll(remaining):
+                    # Worker travado no OpenCV/FFmpeg: descarta e sobe outro.
+                    worker = self._replace(worker)
+                    with self._lock:
+                        self._stats["timeouts"] += 1
+                    elapsed_ms = int((time.monotonic() - start) * 1000)
+                    return _timeout_result(elapsed_ms, hard_timeout_sec)
+                result = worker.conn.recv()
+            except (EOFError, OSError) as exc:
+                worker = self._replace(worker)
+                elapsed_ms = int((time.monotonic() - start) * 1000)
+                return _error_result(elapsed_ms, "rtsp_probe_no_result", f"rtsp_probe_no_result:{exc}")
+
+            worker.tasks += 1
+            if self.max_tasks_per_worker and worker.tasks >= self.max_tasks_per_worker:
+                worker = self._replace(worker, graceful=True)
+            result["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+            result.setdefault("status", "ok" if result.get("ok") else "error")
+            return result
+        finally:
+            self._idle.put(worker)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "size": self.size,
+                "waiting": self._waiting,
+                "idle": self._idle.qsize(),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+        for worker in workers:
+            worker.stop(graceful=True)
+
+
+_pool: Optional[RtspProbePool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[RtspProbePool]:
+    """Pool do processo atual; None quando desabilitado (CAMERA_RTSP_PROBE_POOL_SIZE=0)."""
+    global _pool, _pool_pid
+    size = int(getattr(settings, "CAMERA_RTSP_PROBE_POOL_SIZE", 2) or 0)
+    if size <= 0:
+        return None
+    pid = os.getpid()
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = RtspProbePool(
+                size=size,
+                max_queue=getattr(settings, "CAMERA_RTSP_PROBE_POOL_MAX_QUEUE", 16),
+                max_tasks_per_worker=getattr(settings, "CAMERA_RTSP_PROBE_WORKER_MAX_TASKS", 200),
+            )
+            _pool_pid = pid
+            logger.info("[CAMERA] rtsp probe pool started pid=%s size=%s", pid, size)
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool, _pool_pid
+    with _pool_lock:
+        pool, pid = _pool, _pool_pid
+        _pool, _pool_pid = None, None
+    # Só o processo que subiu os workers os encerra (filhos de fork só descartam).
+    if pool is not None and pid == os.getpid():
+        pool.close()
+
+
+atexit.register(shutdown_pool)
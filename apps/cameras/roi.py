@@ -1,8 +1,15 @@
-from typing import Optional
+import logging
+from typing import Dict, Iterable, Optional
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 
+from backend.utils import shared_cache
+
 from .models import CameraROIConfig
 
+logger = logging.getLogger(__name__)
+
 
 def get_latest_roi_config(camera_id: str) -> Optional[CameraROIConfig]:
     return (
@@ -12,8 +19,37 @@ def get_latest_roi_config(camera_id: str) -> Optional[CameraROIConfig]:
     )
 
 
+def _published_cache_key(camera_id) -> str:
+    return f"roi:published:{camera_id}"
+
+
+def _published_cache_ttl() -> int:
+    return int(getattr(settings, "ROI_PUBLISHED_CACHE_SECONDS", 300) or 0)
+
+
+def invalidate_published_roi_cache(camera_id) -> None:
+    cache.delete(_published_cache_key(camera_id))
+
+
+def _cache_published(entries: Dict[str, Optional[CameraROIConfig]], ttl: int) -> None:
+    try:
+        cache.set_many(
+            {_published_cache_key(camera_id): {"config": config} for camera_id, config in entries.items()},
+            ttl,
+        )
+    except Exception:
+        logger.warning("[CAMERA] published roi cache write failed cameras=%s", len(entries))
+
+
 def get_latest_published_roi_config(camera_id: str) -> Optional[CameraROIConfig]:
-    return (
+    ttl = _published_cache_ttl()
+    key = _published_cache_key(camera_id)
+    if ttl > 0:
+        cached = shared_cache.get("cameras.roi_published", key)
+        # Envelope distingue "sem ROI publicado" (None) de cache miss.
+        if isinstance(cached, dict) and "config" in cached:
+            return cached["config"]
+    published = (
         CameraROIConfig.objects.filter(
             camera_id=camera_id,
             config_json__status="published",
@@ -21,6 +57,47 @@ def get_latest_published_roi_config(camera_id: str) -> Optional[CameraROIConfig]
         .order_by("-version")
         .first()
     )
+    if ttl > 0:
+        _cache_published({str(camera_id): published}, ttl)
+    return published
+
+
+def get_latest_published_roi_configs(camera_ids: Iterable) -> Dict[str, Optional[CameraROIConfig]]:
+    """
+    Último ROI publicado por câmera ({camera_id: config|None}) com uma única
+    query DISTINCT ON (camera_id) para as câmeras fora do cache.
+    """
+    ids = list(dict.fromkeys(str(camera_id) for camera_id in camera_ids if camera_id))
+    if not ids:
+        return {}
+    ttl = _published_cache_ttl()
+    result: Dict[str, Optional[CameraROIConfig]] = {}
+    missing = ids
+    if ttl > 0:
+        cached = shared_cache.get_many("cameras.roi_published", [_published_cache_key(camera_id) for camera_id in ids])
+        missing = []
+        for camera_id in ids:
+            entry = cached.get(_published_cache_key(camera_id))
+            if isinstance(entry, dict) and "config" in entry:
+                result[camera_id] = entry["config"]
+            else:
+                missing.append(camera_id)
+    if missing:
+        fetched = {camera_id: None for camera_id in missing}
+        rows = (
+            CameraROIConfig.objects.filter(
+                camera_id__in=missing,
+                config_json__status="published",
+            )
+            .order_by("camera_id", "-version")
+            .distinct("camera_id")
+        )
+        for row in rows:
+            fetched[str(row.camera_id)] = row
+        result.update(fetched)
+        if ttl > 0:
+            _cache_published(fetched, ttl)
+    return {camera_id: result.get(camera_id) for camera_id in ids}
 
 
 def create_roi_config(
@@ -31,10 +108,12 @@ def create_roi_config(
 ) -> CameraROIConfig:
     latest = get_latest_roi_config(camera_id)
     next_version = int(latest.version) + 1 if latest else 1
-    return CameraROIConfig.objects.create(
+    created = CameraROIConfig.objects.create(
         camera_id=camera_id,
         version=next_version,
         config_json=config_json,
         updated_at=timezone.now(),
         updated_by=updated_by,
     )
+    invalidate_published_roi_cache(camera_id)
+    return created
@@ -1,11 +1,21 @@
 import time
 import tempfile
 import socket
+import hashlib
+import logging
 import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
+from django.core.cache import cache
 from django.utils import timezone
 from django.conf import settings
 
+from backend.utils import shared_cache
+
+logger = logging.getLogger(__name__)
+
+PROBE_CACHE_NAMESPACE = "cameras.rtsp_probe"
+
 def rtsp_snapshot(rtsp_url: str, timeout_sec: int = 6) -> dict:
     """
     Tenta capturar 1 frame do RTSP.
@@ -86,12 +96,79 @@ def rtsp_probe(rtsp_url: str, timeout_sec: int = 4) -> dict:
     }
 
 
+def _probe_cache_key(rtsp_url: str) -> str:
+    # A URL RTSP carrega credenciais: só o hash entra na chave.
+    return shared_cache.key(PROBE_CACHE_NAMESPACE, hashlib.sha256(rtsp_url.encode("utf-8")).hexdigest())
+
+
 def rtsp_probe_with_hard_timeout(
     rtsp_url: str,
     *,
     timeout_sec: int = 4,
     hard_timeout_sec: int = 6,
+    refresh: bool = False,
 ) -> dict:
+    """
+    Probe RTSP com hard timeout. Só probes bem-sucedidos ficam em cache por
+    CAMERA_RTSP_PROBE_CACHE_SECONDS por URL (erro e timeout sempre refazem o
+    probe); `refresh=True` ignora o cache na leitura (teste manual) e grava o
+    resultado novo. Falha no cache vira probe sem cache.
+    """
+    ttl = int(getattr(settings, "CAMERA_RTSP_PROBE_CACHE_SECONDS", 0) or 0)
+    cache_key = _probe_cache_key(rtsp_url) if ttl > 0 else None
+    if cache_key and not refresh:
+        try:
+            cached = shared_cache.get(PROBE_CACHE_NAMESPACE, cache_key)
+        except Exception:
+            logger.warning("[CAMERA] rtsp probe cache get failed")
+            cached = None
+        if isinstance(cached, dict):
+            return {**cached, "cached": True}
+
+    result = _rtsp_probe_uncached(rtsp_url, timeout_sec=timeout_sec, hard_timeout_sec=hard_timeout_sec)
+
+    if cache_key and result.get("ok") is True:
+        try:
+            cache.set(cache_key, result, ttl)
+        except Exception:
+            logger.warning("[CAMERA] rtsp probe cache set failed")
+    return result
+
+
+def rtsp_probe_many(
+    rtsp_urls,
+    *,
+    timeout_sec: int = 4,
+    hard_timeout_sec: int = 6,
+    concurrency: int = None,
+) -> dict:
+    """Probe concorrente de várias URLs (repetidas são testadas uma vez); retorna {url: resultado}."""
+    urls = list(dict.fromkeys(url for url in rtsp_urls if url))
+    if not urls:
+        return {}
+    if concurrency is None:
+        concurrency = int(getattr(settings, "CAMERA_RTSP_PROBE_POOL_SIZE", 2) or 0) or 4
+    workers = max(1, min(int(concurrency), len(urls)))
+
+    def _probe(url):
+        try:
+            return rtsp_probe_with_hard_timeout(url, timeout_sec=timeout_sec, hard_timeout_sec=hard_timeout_sec)
+        except Exception as exc:
+            return {
+                "ok": False,
+                "status": "error",
+                "detail": "rtsp_probe_failed",
+                "latency_ms": None,
+                "fps_est": None,
+                "frames_read": None,
+                "error_msg": f"rtsp_probe_failed:{exc}",
+            }
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rtsp-probe") as executor:
+        return dict(zip(urls, executor.map(_probe, urls)))
+
+
+def _rtsp_probe_uncached(rtsp_url: str, *, timeout_sec: int, hard_timeout_sec: int) -> dict:
     # Use a separate process by default to avoid OpenCV/FFmpeg blocking the GIL.
     use_process = getattr(settings, "CAMERA_RTSP_PROBE_USE_PROCESS", True)
     if not use_process:
@@ -101,6 +178,20 @@ def rtsp_probe_with_hard_timeout(
             hard_timeout_sec=hard_timeout_sec,
         )
 
+    # Workers pré-aquecidos (apps.cameras.probe_pool); sem pool, um processo por probe.
+    from .probe_pool import get_pool
+
+    try:
+        pool = get_pool()
+    except Exception:
+        logger.exception("[CAMERA] rtsp probe pool unavailable; using one-off process")
+        pool = None
+    if pool is not None:
+        return pool.probe(rtsp_url, timeout_sec=timeout_sec, hard_timeout_sec=hard_timeout_sec)
+    return _rtsp_probe_in_new_process(rtsp_url, timeout_sec=timeout_sec, hard_timeout_sec=hard_timeout_sec)
+
+
+def _rtsp_probe_in_new_process(rtsp_url: str, *, timeout_sec: int, hard_timeout_sec: int) -> dict:
     start = time.monotonic()
     ctx = mp.get_context("spawn")
     result_queue = ctx.Queue(maxsize=1)
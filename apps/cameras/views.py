@@ -1,7 +1,7 @@
-import hashlib
 import logging
 import time
 from uuid import uuid4
+from django.conf import settings
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets, permissions, status
@@ -15,11 +15,13 @@ from knox.auth import TokenAuthentication
 from django.db import transaction
 from django.db.models import Q
 from apps.core.models import AuditLog, Camera, CameraHealthLog, OrgMember, Store, StoreManager
-from apps.edge.models import EdgeToken
 from apps.edge.auth import (
     EdgeAwareJWTAuthentication,
     authenticate_edge_token,
+    validate_edge_token_for_store,
 )
+from apps.edge.camera_directory import invalidate_camera_directory
+from apps.edge.status_state import invalidate_store_edge_state
 from .serializers import (
     CameraSerializer,
     CameraHealthLogSerializer,
@@ -27,9 +29,15 @@ from .serializers import (
 )
 from .models import CameraSnapshot, CameraHealth, CameraROIConfig
 from apps.core.integrations import supabase_storage
-from .services import rtsp_snapshot, rtsp_probe_with_hard_timeout
+from .probe_pool import is_pool_busy
+from .services import rtsp_snapshot, rtsp_probe_many, rtsp_probe_with_hard_timeout
 from .limits import enforce_trial_camera_limit
-from .roi import get_latest_roi_config, get_latest_published_roi_config, create_roi_config
+from .roi import (
+    get_latest_roi_config,
+    get_latest_published_roi_config,
+    create_roi_config,
+    invalidate_published_roi_cache,
+)
 from .permissions import (
     require_store_role,
     filter_cameras_for_user,
@@ -126,18 +134,7 @@ def _log_staff_action(request, *, action: str, org_id=None, store_id=None, paylo
 
 
 def _validate_edge_token_for_store(store_id: str, provided: str) -> bool:
-    if not provided or not store_id:
-        return False
-    token_hash = hashlib.sha256(provided.encode("utf-8")).hexdigest()
-    edge_token = EdgeToken.objects.filter(
-        store_id=store_id,
-        token_hash=token_hash,
-        active=True,
-    ).first()
-    if edge_token:
-        EdgeToken.objects.filter(id=edge_token.id).update(last_used_at=timezone.now())
-        return True
-    return False
+    return validate_edge_token_for_store(store_id, provided)
 
 
 def _build_snapshot_path(org_id: str, store_id: str, camera_id: str, ext: str) -> str:
@@ -159,6 +156,87 @@ def _guess_ext(content_type: str, filename: str) -> str:
     return "jpg"
 
 
+def _probe_retry_after() -> str:
+    return str(int(getattr(settings, "CAMERA_RTSP_PROBE_BUSY_RETRY_AFTER_SECONDS", 5) or 5))
+
+
+def _apply_probe_result(cam, result: dict, *, started: float) -> dict:
+    """Atualiza status/health log da câmera com o resultado do probe e monta o payload da resposta."""
+    now = timezone.now()
+    ok = bool(result.get("ok"))
+    latency_ms = result.get("latency_ms")
+    frames_read = result.get("frames_read")
+    fps_est = result.get("fps_est")
+    error_msg = result.get("error_msg")
+    extra = result.get("extra")
+    status_value = result.get("status")
+    detail = result.get("detail")
+    elapsed_ms = result.get("elapsed_ms")
+    if elapsed_ms is None:
+        elapsed_ms = int((time.monotonic() - started) * 1000)
+    reason = "rtsp_timeout" if error_msg == "rtsp_timeout" else None
+
+    if ok:
+        cam.status = "online"
+        cam.last_seen_at = now
+        cam.last_error = None
+        cam.updated_at = now
+        cam.save(update_fields=["status", "last_seen_at", "last_error", "updated_at"])
+        CameraHealthLog.objects.create(
+            camera_id=cam.id,
+            checked_at=now,
+            status="online",
+            latency_ms=latency_ms,
+            snapshot_url=None,
+            error=None,
+        )
+    else:
+        cam.status = "error"
+        cam.last_error = error_msg or "Falha ao testar RTSP."
+        cam.updated_at = now
+        cam.save(update_fields=["status", "last_error", "updated_at"])
+        CameraHealthLog.objects.create(
+            camera_id=cam.id,
+            checked_at=now,
+            status="error",
+            latency_ms=latency_ms,
+            snapshot_url=None,
+            error=error_msg,
+        )
+
+    try:
+        logger.info(
+            "[CAMERA] test_connection camera_id=%s ok=%s status=%s elapsed_ms=%s reason=%s",
+            str(cam.id),
+            ok,
+            status_value or ("ok" if ok else "error"),
+            elapsed_ms,
+            reason,
+        )
+    except Exception:
+        pass
+
+    payload = {
+        "ok": ok,
+        "latency_ms": latency_ms,
+        "fps_est": fps_est,
+        "frames_read": frames_read,
+        "reason": reason,
+        "error_msg": "" if ok else (error_msg or "Falha ao testar RTSP."),
+        "extra": extra,
+        "elapsed_ms": elapsed_ms,
+        "status": status_value or ("ok" if ok else "error"),
+    }
+    if reason == "rtsp_timeout":
+        payload.update(
+            {
+                "status": "timeout",
+                "detail": detail or "rtsp_probe_timeout",
+            }
+        )
+    return payload
+
+
 class CameraViewSet(viewsets.ModelViewSet):
     serializer_class = CameraSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -340,6 +418,8 @@ class CameraViewSet(viewsets.ModelViewSet):
                 raise exc
         now = timezone.now()
         instance = serializer.save(store=store, created_at=now, updated_at=now)
+        invalidate_camera_directory(getattr(instance, "store_id", None))
+        invalidate_store_edge_state(getattr(instance, "store_id", None))
         _log_staff_action(
             self.request,
             action="staff_camera_create",
@@ -387,6 +467,8 @@ class CameraViewSet(viewsets.ModelViewSet):
                 user=self.request.user,
             )
         instance = serializer.save(updated_at=timezone.now())
+        invalidate_camera_directory(getattr(instance, "store_id", None))
+        invalidate_store_edge_state(getattr(instance, "store_id", None))
         _log_staff_action(
             self.request,
             action="staff_camera_update",
@@ -423,6 +505,9 @@ class CameraViewSet(viewsets.ModelViewSet):
                 CameraHealthLog.objects.filter(camera_id=instance.id).delete()
                 CameraROIConfig.objects.filter(camera_id=instance.id).delete()
                 instance.delete()
+            invalidate_camera_directory(instance.store_id)
+            invalidate_store_edge_state(instance.store_id)
+            invalidate_published_roi_cache(instance.id)
             for storage_key in snapshot_keys:
                 try:
                     supabase_storage.delete_file(storage_key)
@@ -886,90 +971,121 @@ class CameraViewSet(viewsets.ModelViewSet):
                 cam.rtsp_url,
                 timeout_sec=4,
                 hard_timeout_sec=6,
+                refresh=True,
             )
         except Exception as exc:
             logger.exception("[CAMERA] test_connection probe failed camera_id=%s error=%s", str(cam.id), exc)
             result = {"ok": False, "error_msg": "Falha ao testar RTSP."}
 
-        now = timezone.now()
-        ok = bool(result.get("ok"))
-        latency_ms = result.get("latency_ms")
-        frames_read = result.get("frames_read")
-        fps_est = result.get("fps_est")
-        error_msg = result.get("error_msg")
-        extra = result.get("extra")
-        status_value = result.get("status")
-        detail = result.get("detail")
-        elapsed_ms = result.get("elapsed_ms")
-        if elapsed_ms is None:
-            elapsed_ms = int((time.monotonic() - started) * 1000)
-        reason = "rtsp_timeout" if error_msg == "rtsp_timeout" else None
-
-        if ok:
-            cam.status = "online"
-            cam.last_seen_at = now
-            cam.last_error = None
-            cam.updated_at = now
-            cam.save(update_fields=["status", "last_seen_at", "last_error", "updated_at"])
-            CameraHealthLog.objects.create(
-                camera_id=cam.id,
-                checked_at=now,
-                status="online",
-                latency_ms=latency_ms,
-                snapshot_url=None,
-                error=None,
-            )
-        else:
-            cam.status = "error"
-            cam.last_error = error_msg or "Falha ao testar RTSP."
-            cam.updated_at = now
-            cam.save(update_fields=["status", "last_error", "updated_at"])
-            CameraHealthLog.objects.create(
-                camera_id=cam.id,
-                checked_at=now,
-                status="error",
-                latency_ms=latency_ms,
-                snapshot_url=None,
-                error=error_msg,
-            )
-
-        try:
-            logger.info(
-                "[CAMERA] test_connection camera_id=%s ok=%s status=%s elapsed_ms=%s reason=%s",
-                str(cam.id),
-                ok,
-                status_value or ("ok" if ok else "error"),
-                elapsed_ms,
-                reason,
-            )
-        except Exception:
-            pass
-
-        payload = {
-            "ok": ok,
-            "latency_ms": latency_ms,
-            "fps_est": fps_est,
-            "frames_read": frames_read,
-            "reason": reason,
-            "error_msg": "" if ok else (error_msg or "Falha ao testar RTSP."),
-            "extra": extra,
-            "elapsed_ms": elapsed_ms,
-            "status": status_value or ("ok" if ok else "error"),
-        }
-        if reason == "rtsp_timeout":
-            payload.update(
-                {
-                    "status": "timeout",
-                    "detail": detail or "rtsp_probe_timeout",
-                }
+        if is_pool_busy(result):
+            # O probe nem rodou: não marca a câmera como erro nem grava health log.
+            response = _error_response(
+                "CAMERA_PROBE_BUSY",
+                "Teste de conexão ocupado. Tente novamente em instantes.",
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                deprecated_detail="Teste de conexão ocupado. Tente novamente em instantes.",
             )
+            response["Retry-After"] = _probe_retry_after()
+            return response
 
+        payload = _apply_probe_result(cam, result, started=started)
         return Response(payload, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"], url_path="test-connection")
     def test_connection_legacy(self, request, pk=None):
         return self.test_connection(request, pk=pk)
 
+    @action(detail=False, methods=["post"], url_path="test_connection_bulk")
+    def test_connection_bulk(self, request):
+        """
+        Testa as câmeras da loja em paralelo (pool de probe + cache curto por URL
+        RTSP). Síncrono: no máximo CAMERA_RTSP_PROBE_BULK_MAX câmeras com RTSP por
+        request (lojas maiores enviam `camera_ids` em lotes) para caber no
+        timeout do gunicorn. Câmera sem vaga no pool volta `busy`, sem update.
+        """
+        started = time.monotonic()
+        store_id = request.data.get("store_id") or request.query_params.get("store_id")
+        if not store_id:
+            return _error_response(
+                "STORE_ID_REQUIRED",
+                "Informe store_id.",
+                status.HTTP_400_BAD_REQUEST,
+                deprecated_detail="Informe store_id.",
+            )
+        try:
+            require_store_role(request.user, str(store_id), ALLOWED_MANAGE_ROLES)
+        except (PermissionDenied, DjangoPermissionDenied) as exc:
+            return _error_response(
+                "PERMISSION_DENIED",
+                str(exc) or "Sem permissão.",
+                status.HTTP_403_FORBIDDEN,
+                deprecated_detail=str(exc) or "Sem permissão.",
+            )
+
+        cameras = list(self.get_queryset().filter(store_id=store_id))
+        camera_ids = request.data.get("camera_ids")
+        if isinstance(camera_ids, list) and camera_ids:
+            wanted = {str(camera_id) for camera_id in camera_ids}
+            cameras = [cam for cam in cameras if str(cam.id) in wanted]
+        max_cameras = int(getattr(settings, "CAMERA_RTSP_PROBE_BULK_MAX", 16) or 16)
+        with_rtsp = [cam for cam in cameras if cam.rtsp_url]
+        if len(with_rtsp) > max_cameras:
+            return _error_response(
+                "CAMERA_BULK_LIMIT",
+                f"Máximo de {max_cameras} câmeras por teste; envie camera_ids em lotes.",
+                status.HTTP_400_BAD_REQUEST,
+                details={"max_cameras": max_cameras, "cameras_total": len(with_rtsp)},
+                deprecated_detail=f"Máximo de {max_cameras} câmeras por teste.",
+            )
+        probes = rtsp_probe_many(
+            [cam.rtsp_url for cam in with_rtsp],
+            timeout_sec=4,
+            hard_timeout_sec=6,
+        )
+        results = []
+        busy = False
+        for cam in cameras:
+            if not cam.rtsp_url:
+                results.append(
+                    {
+                        "camera_id": str(cam.id),
+                        "ok": False,
+                        "status": "error",
+                        "code": "CAMERA_RTSP_MISSING",
+                        "error_msg": "RTSP não informado para esta câmera.",
+                    }
+                )
+                continue
+            result = probes.get(cam.rtsp_url) or {}
+            if is_pool_busy(result):
+                busy = True
+                results.append(
+                    {
+                        "camera_id": str(cam.id),
+                        "ok": False,
+                        "status": "busy",
+                        "code": "CAMERA_PROBE_BUSY",
+                        "error_msg": "Teste de conexão ocupado. Tente novamente em instantes.",
+                    }
+                )
+                continue
+            payload = _apply_probe_result(cam, result, started=started)
+            results.append({"camera_id": str(cam.id), **payload})
+
+        response = Response(
+            {
+                "store_id": str(store_id),
+                "cameras_total": len(cameras),
+                "cameras_ok": sum(1 for item in results if item.get("ok")),
+                "elapsed_ms": int((time.monotonic() - started) * 1000),
+                "results": results,
+            },
+            status=status.HTTP_200_OK,
+        )
+        if busy:
+            response["Retry-After"] = _probe_retry_after()
+        return response
+
     @action(
         detail=True,
         methods=["post"],
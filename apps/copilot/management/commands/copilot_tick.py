@@ -1,6 +1,13 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
 from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
 
 from apps.core.models import Store
+from apps.copilot import tick
 from apps.copilot.services import (
     materialize_dashboard_context,
     materialize_operational_window,
@@ -13,7 +20,7 @@ class Command(BaseCommand):
     help = "Materializa contexto e insights operacionais do Copiloto por loja."
 
     def add_arguments(self, parser):
-        parser.add_argument("--store-id", type=str, default=None, help="UUID da loja para processamento único.")
+        parser.add_argument("--store-id", type=str, default=None, help="UUID da loja para processamento único (implica --force).")
         parser.add_argument("--max-stores", type=int, default=100, help="Limite de lojas quando processamento em lote.")
         parser.add_argument("--window-hours", type=int, default=24, help="Janela em horas para geração de insights.")
         parser.add_argument("--window-minutes", type=int, default=5, help="Janela operacional (5 ou 10 min).")
@@ -21,21 +28,132 @@ class Command(BaseCommand):
         parser.add_argument("--skip-context", action="store_true", help="Não gerar snapshot de contexto.")
         parser.add_argument("--skip-insights", action="store_true", help="Não gerar insights.")
         parser.add_argument("--skip-report", action="store_true", help="Não gerar/materializar relatório 72h.")
+        parser.add_argument("--workers", type=int, default=1, help="Lojas processadas em paralelo neste processo.")
+        parser.add_argument("--lease-seconds", type=int, default=600, help="Duração do lease por loja (outros ticks não a processam).")
+        parser.add_argument(
+            "--refresh-minutes",
+            type=int,
+            default=60,
+            help="Rematerializa mesmo sem dado novo após este intervalo.",
+        )
+        parser.add_argument("--force", action="store_true", help="Não pular lojas sem dado novo.")
+
+    def _run_stages(self, store, options, timings):
+        lines = []
+        counts = {"op_windows": 0, "insights": 0, "report": None}
+        if not options["skip_operational_window"]:
+            with timings.measure("op_window"):
+                op_window = materialize_operational_window(store.id, window_minutes=options["window_minutes"])
+            if op_window:
+                counts["op_windows"] += 1
+                lines.append(
+                    self.style.SUCCESS(
+                        f"[op_window] {store.id} bucket={op_window.ts_bucket.isoformat()} window={op_window.window_minutes}m confidence={op_window.confidence_score}"
+                    )
+                )
+            else:
+                lines.append(self.style.WARNING(f"[op_window] {store.id} skip"))
+        if not options["skip_context"]:
+            with timings.measure("context"):
+                snapshot = materialize_dashboard_context(store.id)
+            if snapshot:
+                lines.append(self.style.SUCCESS(f"[context] {store.id} ok"))
+            else:
+                lines.append(self.style.WARNING(f"[context] {store.id} skip"))
+        if not options["skip_insights"]:
+            with timings.measure("insights"):
+                created = materialize_operational_insights(store.id, window_hours=options["window_hours"])
+            counts["insights"] += created
+            lines.append(self.style.SUCCESS(f"[insights] {store.id} +{created}"))
+        if not options["skip_report"]:
+            with timings.measure("report72h"):
+                report = materialize_report_72h(store.id)
+            counts["report"] = getattr(report, "status", "failed")
+            lines.append(self.style.SUCCESS(f"[report72h] {store.id} status={counts['report']}"))
+        return lines, counts
+
+    def _process_store(self, store, *, owner, options, watermarks, timings, threaded):
+        result = {"outcome": "processed", "lines": [], "counts": None}
+        try:
+            lease = tick.claim_store(store.id, owner, options["lease_seconds"])
+            if lease is None:
+                result["outcome"] = "leased"
+                result["lines"].append(self.style.WARNING(f"[lease] {store.id} em processamento por outro tick"))
+                return result
+            watermark = watermarks.get(str(store.id)) if watermarks is not None else None
+            skip_allowed = not options["force"] and watermarks is not None
+            if skip_allowed and tick.should_skip(lease, watermark, max_age=options["refresh_age"]):
+                tick.release_store(store.id, owner)
+                result["outcome"] = "unchanged"
+                return result
+
+            started = time.monotonic()
+            try:
+                result["lines"], result["counts"] = self._run_stages(store, options, timings)
+            except Exception as exc:
+                tick.release_store(store.id, owner, error=str(exc))
+                result["outcome"] = "error"
+                result["lines"].append(self.style.ERROR(f"[error] {store.id} {exc}"))
+                return result
+            tick.release_store(
+                store.id,
+                owner,
+                materialized=True,
+                watermark=watermark,
+                duration_ms=(time.monotonic() - started) * 1000,
+            )
+            return result
+        finally:
+            if threaded:
+                # Conexão do Django é por thread; fecha a desta worker.
+                connection.close()
 
     def handle(self, *args, **options):
         store_id = options["store_id"]
         max_stores = max(int(options["max_stores"] or 1), 1)
         window_hours = max(int(options["window_hours"] or 24), 1)
-        window_minutes = int(options["window_minutes"] or 5)
-        skip_operational_window = bool(options["skip_operational_window"])
-        skip_context = bool(options["skip_context"])
-        skip_insights = bool(options["skip_insights"])
-        skip_report = bool(options["skip_report"])
+        workers = max(int(options.get("workers") or 1), 1)
+        stage_options = {
+            "window_hours": window_hours,
+            "window_minutes": int(options["window_minutes"] or 5),
+            "skip_operational_window": bool(options["skip_operational_window"]),
+            "skip_context": bool(options["skip_context"]),
+            "skip_insights": bool(options["skip_insights"]),
+            "skip_report": bool(options["skip_report"]),
+            "lease_seconds": max(int(options.get("lease_seconds") or 600), 30),
+            "refresh_age": timedelta(minutes=max(int(options.get("refresh_minutes") or 60), 1)),
+            "force": bool(options.get("force")) or bool(store_id),
+        }
 
         if store_id:
-            stores = Store.objects.filter(id=store_id)[:1]
+            stores = list(Store.objects.filter(id=store_id)[:1])
         else:
-            stores = Store.objects.order_by("-updated_at")[:max_stores]
+            stores = list(Store.objects.order_by("-updated_at")[:max_stores])
+
+        owner = tick.worker_id()
+        timings = tick.StageTimings()
+        tick.ensure_leases([store.id for store in stores])
+        watermarks = tick.data_watermarks(
+            [store.id for store in stores],
+            since=timezone.now() - timedelta(hours=window_hours),
+        )
+
+        def run(store, threaded=False):
+            return self._process_store(
+                store,
+                owner=owner,
+                options=stage_options,
+                watermarks=watermarks,
+                timings=timings,
+                threaded=threaded,
+            )
+
+        started = time.monotonic()
+        if workers > 1 and len(stores) > 1:
+            with ThreadPoolExecutor(max_workers=min(workers, len(stores))) as executor:
+                results = list(executor.map(lambda store: run(store, threaded=True), stores))
+        else:
+            results = [run(store) for store in stores]
 
         processed = 0
         insights_count = 0
@@ -43,40 +161,27 @@ class Command(BaseCommand):
         reports_pending = 0
         reports_failed = 0
         op_windows = 0
-        for store in stores:
+        outcomes = {"unchanged": 0, "leased": 0, "error": 0}
+        for result in results:
+            for line in result["lines"]:
+                self.stdout.write(line)
+            if result["outcome"] != "processed":
+                outcomes[result["outcome"]] += 1
+                continue
             processed += 1
-            if not skip_operational_window:
-                op_window = materialize_operational_window(store.id, window_minutes=window_minutes)
-                if op_window:
-                    op_windows += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"[op_window] {store.id} bucket={op_window.ts_bucket.isoformat()} window={op_window.window_minutes}m confidence={op_window.confidence_score}"
-                        )
-                    )
-                else:
-                    self.stdout.write(self.style.WARNING(f"[op_window] {store.id} skip"))
-            if not skip_context:
-                snapshot = materialize_dashboard_context(store.id)
-                if snapshot:
-                    self.stdout.write(self.style.SUCCESS(f"[context] {store.id} ok"))
-                else:
-                    self.stdout.write(self.style.WARNING(f"[context] {store.id} skip"))
-            if not skip_insights:
-                created = materialize_operational_insights(store.id, window_hours=window_hours)
-                insights_count += created
-                self.stdout.write(self.style.SUCCESS(f"[insights] {store.id} +{created}"))
-            if not skip_report:
-                report = materialize_report_72h(store.id)
-                status_value = getattr(report, "status", "failed")
-                if status_value == "ready":
-                    reports_ready += 1
-                elif status_value == "pending":
-                    reports_pending += 1
-                else:
-                    reports_failed += 1
-                self.stdout.write(self.style.SUCCESS(f"[report72h] {store.id} status={status_value}"))
+            counts = result["counts"]
+            op_windows += counts["op_windows"]
+            insights_count += counts["insights"]
+            if counts["report"] is None:
+                continue
+            if counts["report"] == "ready":
+                reports_ready += 1
+            elif counts["report"] == "pending":
+                reports_pending += 1
+            else:
+                reports_failed += 1
 
+        self.stdout.write(f"[timings] {timings.summary()}")
         self.stdout.write(
             self.style.SUCCESS(
                 "copilot_tick concluído: "
@@ -85,6 +190,11 @@ class Command(BaseCommand):
                 f"insights_criados={insights_count} "
                 f"reports_ready={reports_ready} "
                 f"reports_pending={reports_pending} "
-                f"reports_failed={reports_failed}"
+                f"reports_failed={reports_failed} "
+                f"sem_dado_novo={outcomes['unchanged']} "
+                f"lease_ocupado={outcomes['leased']} "
+                f"erros={outcomes['error']} "
+                f"workers={workers} "
+                f"elapsed_ms={(time.monotonic() - started) * 1000:.0f}"
             )
         )
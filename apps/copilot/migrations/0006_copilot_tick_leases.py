@@ -0,0 +1,31 @@
+# Generated by Django 4.2.11 on 2026-10-18 00:21
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('copilot', '0005_actionoutcome_feedback_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CopilotTickLease',
+            fields=[
+                ('store_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('locked_by', models.CharField(blank=True, max_length=128, null=True)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('last_materialized_at', models.DateTimeField(blank=True, null=True)),
+                ('data_watermark', models.DateTimeField(blank=True, null=True)),
+                ('last_duration_ms', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'copilot_tick_leases',
+                'indexes': [models.Index(fields=['locked_until'], name='copilot_tick_lease_until_idx')],
+            },
+        ),
+    ]
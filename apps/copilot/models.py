@@ -260,3 +260,22 @@ class ValueLedgerDaily(models.Model):
             models.Index(fields=["store_id", "-ledger_date"], name="value_ledger_store_dt_idx"),
             models.Index(fields=["org_id", "-ledger_date"], name="value_ledger_org_dt_idx"),
         ]
+
+
+class CopilotTickLease(models.Model):
+    # Lease por loja do copilot_tick: processos em nós diferentes não repetem a
+    # mesma loja, e o watermark permite pular lojas sem dado novo.
+    store_id = models.UUIDField(primary_key=True)
+    locked_by = models.CharField(max_length=128, blank=True, null=True)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_materialized_at = models.DateTimeField(blank=True, null=True)
+    data_watermark = models.DateTimeField(blank=True, null=True)
+    last_duration_ms = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "copilot_tick_leases"
+        indexes = [
+            models.Index(fields=["locked_until"], name="copilot_tick_lease_until_idx"),
+        ]
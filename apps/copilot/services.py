@@ -8,6 +8,7 @@ from django.db.utils import DataError
 from django.utils import timezone
 
 from apps.core.models import Camera, Store, Subscription
+from apps.edge.metrics_rollups import SCOPE_ALL, aggregate_metrics, average, merge_aggregates
 
 from .models import (
     CopilotDashboardContextSnapshot,
@@ -185,34 +186,24 @@ def _safe_scalar(sql: str, params: list) -> float | int | None:
     return row[0]
 
 
+def _safe_metrics_aggregate(store_id, start, end=None) -> dict | None:
+    # Sem filtros de papel/ownership (escopo "all"), como as consultas brutas anteriores.
+    try:
+        with connection.cursor() as cursor:
+            aggregates = aggregate_metrics(cursor, store_ids=[store_id], start=start, end=end, scope=SCOPE_ALL)
+    except Exception:
+        return None
+    return merge_aggregates(aggregates.values())
+
+
 def get_metrics_window(store_id, window_hours: int = 24) -> dict:
     now = timezone.now()
     start = now - timedelta(hours=window_hours)
 
-    footfall_24h = _safe_scalar(
-        """
-        SELECT COALESCE(SUM(footfall), 0)
-        FROM public.traffic_metrics
-        WHERE store_id = %s AND ts_bucket >= %s
-        """,
-        [str(store_id), start],
-    )
-    conversion_avg = _safe_scalar(
-        """
-        SELECT AVG(NULLIF(conversion_rate, 0))
-        FROM public.conversion_metrics
-        WHERE store_id = %s AND ts_bucket >= %s
-        """,
-        [str(store_id), start],
-    )
-    queue_avg_seconds = _safe_scalar(
-        """
-        SELECT AVG(NULLIF(queue_avg_seconds, 0))
-        FROM public.conversion_metrics
-        WHERE store_id = %s AND ts_bucket >= %s
-        """,
-        [str(store_id), start],
-    )
+    window_agg = _safe_metrics_aggregate(store_id, start)
+    footfall_24h = window_agg["footfall"] if window_agg is not None else None
+    conversion_avg = average(window_agg, "conversion_rate_nz_sum", "conversion_rate_nz_count", default=None)
+    queue_avg_seconds = average(window_agg, "queue_nz_sum", "queue_nz_count", default=None)
     vision_events_count = _safe_scalar(
         """
         SELECT COUNT(*)
@@ -232,22 +223,10 @@ def get_metrics_window(store_id, window_hours: int = 24) -> dict:
 
     last_6h_start = now - timedelta(hours=6)
     prev_6h_start = now - timedelta(hours=12)
-    footfall_last_6h = _safe_scalar(
-        """
-        SELECT COALESCE(SUM(footfall), 0)
-        FROM public.traffic_metrics
-        WHERE store_id = %s AND ts_bucket >= %s
-        """,
-        [str(store_id), last_6h_start],
-    )
-    footfall_prev_6h = _safe_scalar(
-        """
-        SELECT COALESCE(SUM(footfall), 0)
-        FROM public.traffic_metrics
-        WHERE store_id = %s AND ts_bucket >= %s AND ts_bucket < %s
-        """,
-        [str(store_id), prev_6h_start, last_6h_start],
-    )
+    last_6h_agg = _safe_metrics_aggregate(store_id, last_6h_start)
+    prev_6h_agg = _safe_metrics_aggregate(store_id, prev_6h_start, last_6h_start)
+    footfall_last_6h = last_6h_agg["footfall"] if last_6h_agg is not None else None
+    footfall_prev_6h = prev_6h_agg["footfall"] if prev_6h_agg is not None else None
 
     return {
         "footfall_24h": int(footfall_24h or 0),
@@ -0,0 +1,104 @@
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+from uuid import uuid4
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.copilot import tick
+from apps.copilot.management.commands.copilot_tick import Command
+from apps.copilot.models import CopilotTickLease
+
+COMMAND = "apps.copilot.management.commands.copilot_tick"
+
+
+def _options(**overrides):
+    options = {
+        "store_id": None,
+        "max_stores": 10,
+        "window_hours": 24,
+        "window_minutes": 5,
+        "skip_operational_window": True,
+        "skip_context": False,
+        "skip_insights": True,
+        "skip_report": True,
+        "workers": 1,
+        "lease_seconds": 600,
+        "refresh_minutes": 60,
+        "force": False,
+    }
+    options.update(overrides)
+    return options
+
+
+@patch(f"{COMMAND}.materialize_dashboard_context", return_value=SimpleNamespace(id=1))
+@patch(f"{COMMAND}.Store.objects.order_by")
+class CopilotTickCommandTests(TestCase):
+    def setUp(self):
+        self.stores = [SimpleNamespace(id=uuid4()), SimpleNamespace(id=uuid4())]
+        self.watermark = timezone.now() - timedelta(minutes=3)
+
+    def _run(self, mock_order_by, watermarks, **overrides):
+        mock_order_by.return_value.__getitem__.return_value = self.stores
+        out = StringIO()
+        cmd = Command()
+        cmd.stdout = out
+        with patch(f"{COMMAND}.tick.data_watermarks", return_value=watermarks):
+            cmd.handle(**_options(**overrides))
+        return out.getvalue()
+
+    def test_skips_stores_without_new_data_and_reports_timings(self, mock_order_by, mock_context):
+        watermarks = {str(store.id): self.watermark for store in self.stores}
+        output = self._run(mock_order_by, watermarks)
+
+        self.assertIn("stores=2", output)
+        self.assertIn("[timings] context: n=2", output)
+        lease = CopilotTickLease.objects.get(store_id=self.stores[0].id)
+        self.assertIsNone(lease.locked_until)
+        self.assertEqual(lease.data_watermark, self.watermark)
+
+        output = self._run(mock_order_by, watermarks)
+        self.assertIn("stores=0", output)
+        self.assertIn("sem_dado_novo=2", output)
+        self.assertEqual(mock_context.call_count, 2)
+
+        watermarks[str(self.stores[1].id)] = timezone.now()
+        output = self._run(mock_order_by, watermarks)
+        self.assertIn("stores=1", output)
+        self.assertEqual(mock_context.call_args.args[0], self.stores[1].id)
+
+    def test_watermark_failure_or_force_never_skips(self, mock_order_by, mock_context):
+        watermarks = {str(store.id): self.watermark for store in self.stores}
+        self._run(mock_order_by, watermarks)
+
+        self.assertIn("stores=2", self._run(mock_order_by, None))
+        self.assertIn("stores=2", self._run(mock_order_by, watermarks, force=True))
+
+    def test_store_leased_by_another_tick_is_not_processed(self, mock_order_by, mock_context):
+        CopilotTickLease.objects.create(
+            store_id=self.stores[0].id,
+            locked_by="other-node",
+            locked_until=timezone.now() + timedelta(minutes=5),
+        )
+
+        output = self._run(mock_order_by, {})
+
+        self.assertIn("stores=1", output)
+        self.assertIn("lease_ocupado=1", output)
+        mock_context.assert_called_once_with(self.stores[1].id)
+        self.assertEqual(CopilotTickLease.objects.get(store_id=self.stores[0].id).locked_by, "other-node")
+
+    def test_expired_lease_is_reclaimed(self, mock_order_by, mock_context):
+        CopilotTickLease.objects.create(
+            store_id=self.stores[0].id,
+            locked_by="dead-node",
+            locked_until=timezone.now() - timedelta(seconds=1),
+        )
+
+        lease = tick.claim_store(self.stores[0].id, "me", 60)
+
+        self.assertIsNotNone(lease)
+        self.assertEqual(lease.locked_by, "me")
+        self.assertIsNone(tick.claim_store(self.stores[0].id, "other", 60))
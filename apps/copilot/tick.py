@@ -0,0 +1,161 @@
+"""
+Coordenação do copilot_tick entre processos.
+
+Cada loja é reivindicada com um UPDATE condicional em copilot_tick_leases
+(só vence quem encontra o lease livre ou vencido), então vários ticks em nós
+diferentes dividem as lojas sem repetir trabalho. O watermark guardado na
+última materialização permite pular lojas sem dado novo.
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import CopilotTickLease
+
+STAGES = ("op_window", "context", "insights", "report72h")
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def ensure_leases(store_ids: Iterable) -> None:
+    CopilotTickLease.objects.bulk_create(
+        [CopilotTickLease(store_id=store_id) for store_id in store_ids],
+        ignore_conflicts=True,
+    )
+
+
+def claim_store(store_id, owner: str, lease_seconds: float) -> Optional[CopilotTickLease]:
+    now = timezone.now()
+    claimed = (
+        CopilotTickLease.objects.filter(store_id=store_id)
+        .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+        .update(locked_by=owner, locked_until=now + timedelta(seconds=lease_seconds), updated_at=now)
+    )
+    if not claimed:
+        return None
+    return CopilotTickLease.objects.filter(store_id=store_id, locked_by=owner).first()
+
+
+def release_store(
+    store_id,
+    owner: str,
+    *,
+    materialized: bool = False,
+    watermark: Optional[datetime] = None,
+    duration_ms: int = 0,
+    error: Optional[str] = None,
+) -> None:
+    now = timezone.now()
+    fields = {
+        "locked_by": None,
+        "locked_until": None,
+        "updated_at": now,
+        "last_error": error[:1000] if error else None,
+    }
+    if materialized:
+        fields.update(last_materialized_at=now, data_watermark=watermark, last_duration_ms=max(0, int(duration_ms)))
+    CopilotTickLease.objects.filter(store_id=store_id, locked_by=owner).update(**fields)
+
+
+def data_watermarks(store_ids: Iterable, since: datetime) -> Optional[Dict[str, datetime]]:
+    """
+    Último timestamp de dado por loja nas fontes que o Copiloto agrega,
+    em uma consulta para o lote. Falha retorna None (nenhuma loja é pulada).
+    """
+    ids = [str(store_id) for store_id in store_ids]
+    if not ids:
+        return {}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT store_id::text, MAX(last_ts)
+                FROM (
+                    SELECT store_id, MAX(ts_bucket) AS last_ts
+                    FROM public.traffic_metrics
+                    WHERE store_id = ANY(%s::uuid[]) AND ts_bucket >= %s
+                    GROUP BY store_id
+                    UNION ALL
+                    SELECT store_id, MAX(ts_bucket)
+                    FROM public.conversion_metrics
+                    WHERE store_id = ANY(%s::uuid[]) AND ts_bucket >= %s
+                    GROUP BY store_id
+                    UNION ALL
+                    SELECT store_id, MAX(ts)
+                    FROM public.vision_atomic_events
+                    WHERE store_id = ANY(%s::uuid[]) AND ts >= %s
+                    GROUP BY store_id
+                    UNION ALL
+                    SELECT store_id, MAX(occurred_at)
+                    FROM public.detection_events
+                    WHERE store_id = ANY(%s::uuid[]) AND occurred_at >= %s
+                    GROUP BY store_id
+                ) AS sources
+                GROUP BY store_id
+                """,
+                [ids, since] * 4,
+            )
+            rows = cursor.fetchall()
+    except Exception:
+        return None
+    return {str(row[0]): row[1] for row in rows if row[1] is not None}
+
+
+def should_skip(lease: CopilotTickLease, watermark: Optional[datetime], *, max_age: timedelta) -> bool:
+    """
+    Pula quando já houve materialização recente e nenhum dado chegou depois
+    dela. max_age força refresh periódico (janelas e cobertura mudam com o tempo).
+    """
+    if lease.last_materialized_at is None:
+        return False
+    if timezone.now() - lease.last_materialized_at >= max_age:
+        return False
+    if watermark is None:
+        return True
+    return lease.data_watermark is not None and watermark <= lease.data_watermark
+
+
+class StageTimings:
+    """Acumula tempo por etapa; seguro para uso entre threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = defaultdict(int)
+        self.total_ms = defaultdict(float)
+        self.max_ms = defaultdict(float)
+
+    @contextmanager
+    def measure(self, stage: str):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.monotonic() - started) * 1000
+            with self._lock:
+                self.count[stage] += 1
+                self.total_ms[stage] += elapsed_ms
+                self.max_ms[stage] = max(self.max_ms[stage], elapsed_ms)
+
+    def summary(self) -> str:
+        parts = []
+        for stage in STAGES:
+            count = self.count.get(stage, 0)
+            if not count:
+                continue
+            total = self.total_ms[stage]
+            parts.append(
+                f"{stage}: n={count} total={total:.0f}ms avg={total / count:.0f}ms max={self.max_ms[stage]:.0f}ms"
+            )
+        return " | ".join(parts) or "nenhuma etapa executada"
@@ -40,6 +40,7 @@ class Command(BaseCommand):
                     "source": "backfill_first_metrics_received",
                 },
                 source="app",
+                buffered=False,
             )
             if event:
                 inserted += 1
@@ -86,6 +86,7 @@ class Command(BaseCommand):
                     "window_hours": window_hours,
                 },
                 source="app",
+                buffered=False,
             )
             if event:
                 inserted += 1
@@ -1,24 +1,35 @@
 from __future__ import annotations
 
 import csv
+import gzip
+import io
 import json
 import os
+import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Iterable, Tuple
+from typing import List, Tuple
 from zoneinfo import ZoneInfo
 
 from django.core.management.base import BaseCommand
 from django.db import connection
 
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-
 
 DEFAULT_TZ = "America/Sao_Paulo"
 SCOPES = ["https://www.googleapis.com/auth/drive.file"]
 
+EXPORT_FORMATS = ("csv.gz", "parquet")
+DEFAULT_CHUNK_ROWS = 5000
+# Upload resumable do Drive exige chunks múltiplos de 256 KiB.
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+UPLOAD_NUM_RETRIES = 5
+MIMETYPES = {
+    "csv.gz": "application/gzip",
+    "parquet": "application/vnd.apache.parquet",
+}
+
 
 TABLE_CONFIG = {
     "traffic_metrics": {
@@ -30,9 +41,22 @@ TABLE_CONFIG = {
     "event_receipts": {
         "ts_column": "received_at",
     },
+    "vision_atomic_events": {
+        "ts_column": "ts",
+    },
 }
 
 
+@dataclass
+class ExportResult:
+    table: str
+    filename: str
+    rows: int = 0
+    size_bytes: int = 0
+    drive_id: str | None = None
+    error: str | None = None
+
+
 def _env(name: str, default: str | None = None) -> str | None:
     return os.getenv(name, default)
 
@@ -54,47 +78,168 @@ def _default_window(tz_name: str) -> Tuple[datetime, datetime, str]:
     return start, end, start.strftime("%Y-%m-%d")
 
 
-def _query_table(table: str, ts_column: str, start: datetime, end: datetime) -> Tuple[Iterable[str], Iterable[tuple]]:
-    with connection.cursor() as cursor:
-        cursor.execute(
-            f"""
-            SELECT *
-            FROM public.{table}
-            WHERE {ts_column} >= %s AND {ts_column} < %s
-            ORDER BY {ts_column} ASC
-            """,
-            [start, end],
-        )
-        rows = cursor.fetchall()
-        headers = [col.name for col in cursor.description]
-    return headers, rows
+def _select_sql(table: str, ts_column: str) -> str:
+    return f"""
+        SELECT *
+        FROM public.{table}
+        WHERE {ts_column} >= %s AND {ts_column} < %s
+        ORDER BY {ts_column} ASC
+    """
 
 
-def _write_csv(path: str, headers: Iterable[str], rows: Iterable[tuple]) -> None:
-    with open(path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        for row in rows:
-            writer.writerow(row)
+def _copy_csv(sql: str, params: list, fh) -> int:
+    """
+    COPY ... TO STDOUT: o Postgres formata o CSV e o psycopg2 escreve direto
+    no arquivo, sem materializar linhas no Python.
+    """
+    with connection.cursor() as cursor:
+        query = cursor.mogrify(sql, params)
+        if isinstance(query, bytes):
+            query = query.decode("utf-8")
+        cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)", fh)
+        return max(cursor.rowcount or 0, 0)
+
+
+def _write_csv_rows(cursor, fh, chunk_rows: int) -> int:
+    text = io.TextIOWrapper(fh, encoding="utf-8", newline="")
+    try:
+        writer = csv.writer(text)
+        writer.writerow([col[0] for col in cursor.description])
+        total = 0
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            writer.writerows(rows)
+            total += len(rows)
+        return total
+    finally:
+        text.flush()
+        text.detach()
+
+
+def _fetch_csv(sql: str, params: list, fh, chunk_rows: int) -> int:
+    # chunked_cursor() é server-side (cursor nomeado) no Postgres.
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        return _write_csv_rows(cursor, fh, chunk_rows)
+
+
+def _stream_csv(sql: str, params: list, fh, chunk_rows: int) -> int:
+    if connection.vendor == "postgresql":
+        return _copy_csv(sql, params, fh)
+    return _fetch_csv(sql, params, fh, chunk_rows)
+
+
+def _csv_to_parquet(csv_path: str, parquet_path: str) -> None:
+    try:
+        import polars as pl
+    except ImportError as exc:
+        raise RuntimeError("Formato parquet requer polars instalado.") from exc
+    # scan + sink usa o engine de streaming: memória limitada ao batch.
+    pl.scan_csv(csv_path, infer_schema_length=10000).sink_parquet(parquet_path, compression="zstd")
+
+
+def _export_table(
+    table: str,
+    ts_column: str,
+    start: datetime,
+    end: datetime,
+    *,
+    tmpdir: str,
+    date_label: str,
+    fmt: str,
+    chunk_rows: int,
+) -> Tuple[str, str, int]:
+    """Grava o dia da tabela em disco (csv.gz ou parquet). Retorna (path, filename, rows)."""
+    sql = _select_sql(table, ts_column)
+    params = [start, end]
+    filename = f"{table}_{date_label}.{fmt}"
+    path = os.path.join(tmpdir, filename)
+    if fmt == "parquet":
+        csv_path = os.path.join(tmpdir, f"{table}_{date_label}.csv")
+        try:
+            with open(csv_path, "wb") as fh:
+                rows = _stream_csv(sql, params, fh, chunk_rows)
+            _csv_to_parquet(csv_path, path)
+        finally:
+            if os.path.exists(csv_path):
+                os.remove(csv_path)
+    else:
+        with gzip.open(path, "wb", compresslevel=6) as fh:
+            rows = _stream_csv(sql, params, fh, chunk_rows)
+    return path, filename, rows
 
 
 def _build_drive_service(sa_json_path: str):
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+
     creds = service_account.Credentials.from_service_account_file(
         sa_json_path, scopes=SCOPES
     )
     return build("drive", "v3", credentials=creds, cache_discovery=False)
 
 
-def _upload_file(service, folder_id: str, file_path: str, filename: str) -> str:
+def _upload_file(service, folder_id: str, file_path: str, filename: str, mimetype: str) -> str:
+    from googleapiclient.http import MediaFileUpload
+
     file_metadata = {
         "name": filename,
         "parents": [folder_id],
     }
-    media = MediaFileUpload(file_path, mimetype="text/csv", resumable=False)
-    uploaded = service.files().create(
-        body=file_metadata, media_body=media, fields="id"
-    ).execute()
-    return uploaded.get("id")
+    media = MediaFileUpload(file_path, mimetype=mimetype, resumable=True, chunksize=UPLOAD_CHUNK_BYTES)
+    request = service.files().create(body=file_metadata, media_body=media, fields="id")
+    response = None
+    # next_chunk retoma do último byte confirmado em erros transitórios (5xx/rede).
+    while response is None:
+        _status, response = request.next_chunk(num_retries=UPLOAD_NUM_RETRIES)
+    return response.get("id")
+
+
+def _export_and_upload(
+    table: str,
+    start: datetime,
+    end: datetime,
+    *,
+    sa_json: str,
+    folder_id: str,
+    tmpdir: str,
+    date_label: str,
+    fmt: str,
+    chunk_rows: int,
+) -> ExportResult:
+    result = ExportResult(table=table, filename=f"{table}_{date_label}.{fmt}")
+    path = None
+    try:
+        path, result.filename, result.rows = _export_table(
+            table,
+            TABLE_CONFIG[table]["ts_column"],
+            start,
+            end,
+            tmpdir=tmpdir,
+            date_label=date_label,
+            fmt=fmt,
+            chunk_rows=chunk_rows,
+        )
+        result.size_bytes = os.path.getsize(path)
+        # Cliente do Drive (httplib2) não é thread-safe: um por tabela.
+        service = _build_drive_service(sa_json)
+        result.drive_id = _upload_file(service, folder_id, path, result.filename, MIMETYPES[fmt])
+    except Exception as exc:
+        result.error = str(exc)[:500]
+    finally:
+        if path and os.path.exists(path):
+            os.remove(path)
+        # Conexão do Django é por thread; fecha a desta worker.
+        connection.close()
+    return result
+
+
+def _export_tables(tables: List[str], start: datetime, end: datetime, *, workers: int, **kwargs) -> List[ExportResult]:
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tables)))) as executor:
+        futures = [executor.submit(_export_and_upload, table, start, end, **kwargs) for table in tables]
+        return [future.result() for future in futures]
 
 
 def _cleanup_table(table: str, ts_column: str, ttl_days: int) -> int:
@@ -115,6 +260,9 @@ class Command(BaseCommand):
         parser.add_argument("--date", help="Data YYYY-MM-DD (default: ontem, TZ local)")
         parser.add_argument("--tz", help="Timezone (default America/Sao_Paulo)")
         parser.add_argument("--tables", help="Lista de tabelas separadas por vírgula")
+        parser.add_argument("--format", choices=EXPORT_FORMATS, help="csv.gz (default) ou parquet")
+        parser.add_argument("--workers", type=int, help="Tabelas exportadas em paralelo (default 2)")
+        parser.add_argument("--chunk-rows", type=int, help="Linhas por lote quando não há COPY (default 5000)")
         parser.add_argument("--no-cleanup", action="store_true", help="Não executar retenção")
 
     def handle(self, *args, **options):
@@ -130,6 +278,11 @@ class Command(BaseCommand):
             "traffic_metrics,conversion_metrics,event_receipts",
         )
         tables = [t.strip() for t in tables_raw.split(",") if t.strip()]
+        fmt = options.get("format") or _env("GOOGLE_DRIVE_EXPORT_FORMAT", "csv.gz")
+        if fmt not in EXPORT_FORMATS:
+            raise RuntimeError(f"Formato inválido: {fmt} (use {', '.join(EXPORT_FORMATS)})")
+        workers = int(options.get("workers") or _env("GOOGLE_DRIVE_EXPORT_WORKERS", "2") or 2)
+        chunk_rows = int(options.get("chunk_rows") or DEFAULT_CHUNK_ROWS)
 
         sa_json = _env("GOOGLE_DRIVE_SA_JSON")
         folder_id = _env("GOOGLE_DRIVE_FOLDER_ID")
@@ -138,23 +291,45 @@ class Command(BaseCommand):
         if not os.path.exists(sa_json):
             raise RuntimeError(f"Service account JSON não encontrado: {sa_json}")
 
-        service = _build_drive_service(sa_json)
-        tmpdir = tempfile.mkdtemp(prefix="dalevision-export-")
-
         self.stdout.write(f"[EXPORT] window={start.isoformat()} -> {end.isoformat()} tz={tz_name}")
-        self.stdout.write(f"[EXPORT] tables={tables}")
+        self.stdout.write(f"[EXPORT] tables={tables} format={fmt} workers={workers}")
 
+        known = []
         for table in tables:
-            cfg = TABLE_CONFIG.get(table)
-            if not cfg:
+            if table not in TABLE_CONFIG:
                 self.stdout.write(f"[WARN] tabela desconhecida: {table} (skip)")
                 continue
-            headers, rows = _query_table(table, cfg["ts_column"], start, end)
-            filename = f"{table}_{date_label}.csv"
-            path = os.path.join(tmpdir, filename)
-            _write_csv(path, headers, rows)
-            file_id = _upload_file(service, folder_id, path, filename)
-            self.stdout.write(f"[EXPORT] {table}: {len(rows)} rows -> {filename} (drive_id={file_id})")
+            known.append(table)
+
+        tmpdir = tempfile.mkdtemp(prefix="dalevision-export-")
+        try:
+            results = _export_tables(
+                known,
+                start,
+                end,
+                workers=workers,
+                sa_json=sa_json,
+                folder_id=folder_id,
+                tmpdir=tmpdir,
+                date_label=date_label,
+                fmt=fmt,
+                chunk_rows=chunk_rows,
+            ) if known else []
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        failed = [result for result in results if result.error]
+        for result in results:
+            if result.error:
+                self.stdout.write(f"[ERROR] {result.table}: {result.error}")
+            else:
+                self.stdout.write(
+                    f"[EXPORT] {result.table}: {result.rows} rows -> {result.filename} "
+                    f"({result.size_bytes} bytes, drive_id={result.drive_id})"
+                )
+        if failed:
+            # Sem backup confirmado não aplica retenção.
+            raise RuntimeError(f"Export falhou para: {', '.join(result.table for result in failed)}")
 
         if not options.get("no_cleanup"):
             traffic_ttl = int(_env("TRAFFIC_METRICS_TTL_DAYS", "90") or 90)
@@ -171,4 +346,3 @@ class Command(BaseCommand):
                 "event_receipts", TABLE_CONFIG["event_receipts"]["ts_column"], receipts_ttl
             )
             self.stdout.write(f"[CLEANUP] {json.dumps(deleted, ensure_ascii=False)}")
-
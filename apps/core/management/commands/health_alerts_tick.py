@@ -1,19 +1,15 @@
 import os
-from typing import List, Tuple
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.core.mail import send_mail
-from django.core.exceptions import FieldError
-from django.db.utils import ProgrammingError, OperationalError
+from django.db.models import Max
 from django.utils import timezone
 
-from apps.core.models import Store, Camera, NotificationLog
-from apps.stores.views_edge_status import (
-    classify_age,
-    _get_last_heartbeat,
-    _get_latest_camera_health,
-)
+from apps.core.models import Store, NotificationLog
+from apps.core.services.email_batch import OutgoingEmail, send_batch
+from apps.edge import fleet_status
 
 
 ALERT_THRESHOLD_SECONDS = 5 * 60
@@ -45,182 +41,142 @@ def _get_recipients() -> List[str]:
     return [r.strip() for r in raw.replace(";", ",").split(",") if r.strip()]
 
 
-def _send_email(subject: str, body: str, recipients: List[str]) -> Tuple[bool, str]:
-    if not recipients:
-        return False, "no_recipients"
-    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", None) or getattr(
-        settings, "EMAIL_HOST_USER", None
-    )
-    if not from_email:
-        from_email = "no-reply@localhost"
-    try:
-        send_mail(subject, body, from_email, recipients, fail_silently=False)
-        return True, ""
-    except Exception as exc:
-        return False, str(exc)
-
-
-def _cooldown_ok(store_id, alert_type: str) -> bool:
-    if not _notification_logs_available():
-        return True
+def _load_last_sent(store_ids: Iterable, *, now: datetime) -> Dict[Tuple[str, str], datetime]:
+    """Último envio por (loja, alert_type) dentro do cooldown, em uma consulta."""
+    ids = [str(store_id) for store_id in store_ids]
+    if not ids or not _notification_logs_available():
+        return {}
     try:
-        last = (
+        rows = (
             NotificationLog.objects.filter(
-                store_id=store_id,
+                store_id__in=ids,
                 provider="edge_status",
-                provider_message_id=alert_type,
+                sent_at__gte=now - timedelta(seconds=ALERT_COOLDOWN_SECONDS),
             )
-            .order_by("-sent_at")
-            .first()
+            .values("store_id", "provider_message_id")
+            .annotate(last_sent_at=Max("sent_at"))
         )
-        if not last or not last.sent_at:
-            return True
-        delta = (timezone.now() - last.sent_at).total_seconds()
-        return delta >= ALERT_COOLDOWN_SECONDS
+        return {(str(row["store_id"]), row["provider_message_id"]): row["last_sent_at"] for row in rows}
     except Exception:
+        return {}
+
+
+def _cooldown_ok(last_sent: Dict[Tuple[str, str], datetime], store_id, alert_type: str, *, now: datetime) -> bool:
+    sent_at = last_sent.get((str(store_id), alert_type))
+    if not sent_at:
         return True
+    return (now - sent_at).total_seconds() >= ALERT_COOLDOWN_SECONDS
 
 
-def _log_notification(store: Store, alert_type: str, recipients: List[str], ok: bool, error: str):
-    if not _notification_logs_available():
+def _log_notifications(entries: List[Tuple[Store, str, List[str], bool, str]]) -> None:
+    if not entries or not _notification_logs_available():
         return
+    now = timezone.now()
     try:
-        NotificationLog.objects.create(
-            org_id=store.org_id,
-            store_id=store.id,
-            channel="email",
-            destination=",".join(recipients) if recipients else None,
-            provider="edge_status",
-            status="sent" if ok else "failed",
-            provider_message_id=alert_type,
-            error=error or None,
-            sent_at=timezone.now(),
+        NotificationLog.objects.bulk_create(
+            [
+                NotificationLog(
+                    org_id=store.org_id,
+                    store_id=store.id,
+                    channel="email",
+                    destination=",".join(recipients) if recipients else None,
+                    provider="edge_status",
+                    status="sent" if ok else "failed",
+                    provider_message_id=alert_type,
+                    error=error or None,
+                    sent_at=now,
+                )
+                for store, alert_type, recipients, ok, error in entries
+            ]
         )
     except Exception:
         pass
 
 
-def _get_active_cameras(store_id) -> List[Camera]:
-    try:
-        return list(
-            Camera.objects.filter(store_id=store_id, active=True).order_by("name")
+def _build_alerts(store_status: fleet_status.StoreStatus) -> List[Tuple[str, str, str]]:
+    """(alert_type, subject, body) da loja, antes do cooldown."""
+    store = store_status.store
+    alerts = []
+    counts = {"online": 0, "degraded": 0, "offline": 0, "unknown": 0}
+    offline_cameras = []
+    for cam in store_status.cameras:
+        counts[cam.status if cam.status in counts else "unknown"] += 1
+        if cam.status == "offline" and cam.age_seconds is not None and cam.age_seconds >= ALERT_THRESHOLD_SECONDS:
+            offline_cameras.append(cam)
+
+    age_seconds = store_status.age_seconds
+    if (
+        store_status.status in ("degraded", "offline")
+        and age_seconds is not None
+        and age_seconds >= ALERT_THRESHOLD_SECONDS
+    ):
+        last_comm = store_status.last_comm_at
+        alerts.append(
+            (
+                f"store_{store_status.status}",
+                f"[Edge] Store {store.name} {store_status.status}",
+                (
+                    f"Store: {store.name} ({store.id})\n"
+                    f"Status: {store_status.status}\n"
+                    f"Reason: {store_status.reason}\n"
+                    f"Age (s): {age_seconds}\n"
+                    f"Last heartbeat: {last_comm.isoformat() if last_comm else None}\n"
+                    f"Cameras: total={len(store_status.cameras)} online={counts['online']} "
+                    f"degraded={counts['degraded']} offline={counts['offline']} unknown={counts['unknown']}\n"
+                ),
+            )
         )
-    except FieldError:
-        return list(Camera.objects.filter(store_id=store_id).order_by("name"))
+
+    if offline_cameras:
+        lines = [
+            f"- {cam.camera.name} ({cam.camera.id}) age_s={cam.age_seconds} reason={cam.reason}"
+            for cam in offline_cameras
+        ]
+        alerts.append(
+            (
+                "camera_offline",
+                f"[Edge] Cameras offline - {store.name}",
+                (
+                    f"Store: {store.name} ({store.id})\n"
+                    f"Offline cameras (>={ALERT_THRESHOLD_SECONDS}s):\n"
+                    + "\n".join(lines)
+                ),
+            )
+        )
+    return alerts
 
 
 class Command(BaseCommand):
     help = "Emite alertas de saúde do edge (tick único; agendar externamente)."
 
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=None, help="Conexões SMTP em paralelo (default EMAIL_BATCH_CONCURRENCY).")
+
     def handle(self, *args, **options):
         try:
-            stores = Store.objects.filter(status__in=["active", "trial"]).order_by("name")
+            stores = list(Store.objects.filter(status__in=["active", "trial"]).order_by("name"))
         except Exception:
-            stores = Store.objects.all().order_by("name")
+            stores = list(Store.objects.all().order_by("name"))
 
+        now = timezone.now()
         recipients = _get_recipients()
-
-        for store in stores:
-            cameras = _get_active_cameras(store.id)
-            cameras_total = 0
-            cameras_online = 0
-            cameras_degraded = 0
-            cameras_offline = 0
-            cameras_unknown = 0
-            camera_age_seconds = []
-            offline_cameras = []
-
-            for cam in cameras:
-                cameras_total += 1
-                last_log = _get_latest_camera_health(cam.id)
-                last_ts = None
-                if last_log is not None:
-                    last_ts = getattr(last_log, "checked_at", None) or getattr(
-                        last_log, "created_at", None
-                    )
-
-                cam_status, cam_age_seconds, cam_reason = classify_age(last_ts)
-
-                if cam_status == "online":
-                    cameras_online += 1
-                elif cam_status == "degraded":
-                    cameras_degraded += 1
-                elif cam_status == "offline":
-                    cameras_offline += 1
-                else:
-                    cameras_unknown += 1
-
-                if cam_age_seconds is not None:
-                    camera_age_seconds.append(cam_age_seconds)
-
-                if (
-                    cam_status == "offline"
-                    and cam_age_seconds is not None
-                    and cam_age_seconds >= ALERT_THRESHOLD_SECONDS
-                ):
-                    offline_cameras.append((cam, cam_age_seconds, cam_reason))
-
-            last_heartbeat = _get_last_heartbeat(store.id)
-            hb_status, hb_age_seconds, hb_reason = classify_age(last_heartbeat)
-
-            if cameras_total == 0:
-                store_status = "offline"
-                store_status_reason = "no_cameras"
-            elif cameras_online >= 1:
-                if cameras_online < cameras_total:
-                    store_status = "degraded"
-                    store_status_reason = "partial_camera_coverage"
-                else:
-                    store_status = "online"
-                    store_status_reason = "all_cameras_online"
-            else:
-                store_status = hb_status
-                store_status_reason = hb_reason
-
-            if last_heartbeat:
-                store_status_age_seconds = hb_age_seconds
-            else:
-                store_status_age_seconds = (
-                    min(camera_age_seconds) if camera_age_seconds else None
-                )
-
-            if (
-                store_status in ("degraded", "offline")
-                and store_status_age_seconds is not None
-                and store_status_age_seconds >= ALERT_THRESHOLD_SECONDS
-            ):
-                alert_type = f"store_{store_status}"
-                if _cooldown_ok(store.id, alert_type):
-                    subject = f"[Edge] Store {store.name} {store_status}"
-                    body = (
-                        f"Store: {store.name} ({store.id})\n"
-                        f"Status: {store_status}\n"
-                        f"Reason: {store_status_reason}\n"
-                        f"Age (s): {store_status_age_seconds}\n"
-                        f"Last heartbeat: {last_heartbeat.isoformat() if last_heartbeat else None}\n"
-                        f"Cameras: total={cameras_total} online={cameras_online} "
-                        f"degraded={cameras_degraded} offline={cameras_offline} unknown={cameras_unknown}\n"
-                    )
-                    ok, err = _send_email(subject, body, recipients)
-                    _log_notification(store, alert_type, recipients, ok, err)
-                    if not ok:
-                        self.stdout.write(f"[WARN] email failed for {alert_type}: {err}")
-
-            if offline_cameras:
-                alert_type = "camera_offline"
-                if _cooldown_ok(store.id, alert_type):
-                    subject = f"[Edge] Cameras offline - {store.name}"
-                    lines = []
-                    for cam, age_s, reason in offline_cameras:
-                        lines.append(
-                            f"- {cam.name} ({cam.id}) age_s={age_s} reason={reason}"
-                        )
-                    body = (
-                        f"Store: {store.name} ({store.id})\n"
-                        f"Offline cameras (>={ALERT_THRESHOLD_SECONDS}s):\n"
-                        + "\n".join(lines)
-                    )
-                    ok, err = _send_email(subject, body, recipients)
-                    _log_notification(store, alert_type, recipients, ok, err)
-                    if not ok:
-                        self.stdout.write(f"[WARN] email failed for {alert_type}: {err}")
+        # Mesmo avaliador do status_tick: cargas em lote para a frota inteira.
+        statuses = fleet_status.evaluate_fleet(stores=stores, now=now)
+        last_sent = _load_last_sent([store.id for store in stores], now=now)
+
+        pending = []
+        for store_status in statuses:
+            for alert_type, subject, body in _build_alerts(store_status):
+                if _cooldown_ok(last_sent, store_status.store.id, alert_type, now=now):
+                    pending.append((store_status.store, alert_type, subject, body))
+
+        results = send_batch(
+            [OutgoingEmail(subject, body, recipients) for _store, _type, subject, body in pending],
+            concurrency=options.get("concurrency"),
+        )
+        logs = []
+        for (store, alert_type, _subject, _body), (ok, err) in zip(pending, results):
+            logs.append((store, alert_type, recipients, ok, err))
+            if not ok:
+                self.stdout.write(f"[WARN] email failed for {alert_type}: {err}")
+        _log_notifications(logs)
@@ -1,14 +1,18 @@
 from __future__ import annotations
 
 import json
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, datetime, time, timedelta
 from zoneinfo import ZoneInfo
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.db import connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
 from django.utils import timezone
 
+from apps.core.services.report_cache import invalidate_report_cache
+
 
 METHOD_VERSION = "store_kpis_daily_v1_2026-03-19"
 
@@ -31,6 +35,350 @@ def _day_window_utc(business_date: date, tz_name: str) -> tuple[datetime, dateti
     return start_local.astimezone(timezone.utc), end_local.astimezone(timezone.utc)
 
 
+SOURCE_FLAGS = {
+    "flow_in_total": "official",
+    "flow_out_total": "official",
+    "transactions_total": "proxy",
+    "conversion_rate": "proxy",
+    "queue_wait_peak": "official",
+    "queue_loss_estimated": "derived",
+    "idle_cost_estimated": "derived",
+    "money_at_risk": "estimated",
+    "alerts_total": "official",
+    "useful_alert_rate": "proxy",
+}
+
+# Janelas (store, dia local) em UTC; cada fonte é agregada com um único GROUP BY sobre elas.
+_WINDOWS_CTE = """
+    WITH w AS (
+        SELECT *
+        FROM unnest(%s::uuid[], %s::date[], %s::timestamptz[], %s::timestamptz[])
+            AS w(store_id, business_date, start_utc, end_utc)
+    )
+"""
+
+_SOURCE_QUERIES = {
+    "flow_in": f"""
+        {_WINDOWS_CTE}
+        SELECT w.store_id, w.business_date, COALESCE(SUM(t.footfall), 0)
+        FROM w
+        JOIN public.traffic_metrics t
+          ON t.store_id = w.store_id
+         AND t.ts_bucket >= w.start_utc
+         AND t.ts_bucket < w.end_utc
+        WHERE (t.camera_role = 'entrada' OR t.camera_role IS NULL)
+          AND (t.ownership = 'primary' OR t.ownership IS NULL)
+        GROUP BY 1, 2
+    """,
+    "flow_out": f"""
+        {_WINDOWS_CTE}
+        SELECT w.store_id, w.business_date, COALESCE(SUM(v.count_value), 0)
+        FROM w
+        JOIN public.vision_atomic_events v
+          ON v.store_id = w.store_id
+         AND v.ts >= w.start_utc
+         AND v.ts < w.end_utc
+        WHERE v.event_type = 'vision.crossing.v1'
+          AND lower(COALESCE(v.direction, '')) = 'exit'
+          AND (v.ownership = 'primary' OR v.ownership IS NULL)
+        GROUP BY 1, 2
+    """,
+    "conversion": f"""
+        {_WINDOWS_CTE}
+        SELECT w.store_id, w.business_date,
+               COALESCE(SUM(c.checkout_events), 0),
+               COALESCE(MAX(c.queue_avg_seconds), 0)
+        FROM w
+        JOIN public.conversion_metrics c
+          ON c.store_id = w.store_id
+         AND c.ts_bucket >= w.start_utc
+         AND c.ts_bucket < w.end_utc
+        WHERE (c.camera_role = 'balcao' OR c.camera_role IS NULL)
+          AND (c.ownership = 'primary' OR c.ownership IS NULL)
+        GROUP BY 1, 2
+    """,
+    "idle": f"""
+        {_WINDOWS_CTE}
+        SELECT cm.store_id, cm.business_date,
+            COALESCE(SUM(
+                GREATEST(
+                    0,
+                    LEAST(
+                        1,
+                        CASE
+                            WHEN cm.staff_active_est IS NULL OR cm.staff_active_est <= 0 THEN 0
+                            WHEN tm.footfall IS NULL THEN 0
+                            ELSE 1 - (tm.footfall::float / NULLIF(cm.staff_active_est::float, 0))
+                        END
+                    )
+                ) * 3600
+            ), 0) AS idle_seconds_total,
+            COALESCE(SUM(
+                COALESCE(cm.queue_avg_seconds, 0) * GREATEST(COALESCE(tm.footfall, 0), 1)
+            ), 0) AS queue_wait_seconds_total
+        FROM (
+            SELECT w.store_id, w.business_date, c.ts_bucket,
+                   COALESCE(AVG(c.queue_avg_seconds), 0) AS queue_avg_seconds,
+                   COALESCE(AVG(c.staff_active_est), 0) AS staff_active_est
+            FROM w
+            JOIN public.conversion_metrics c
+              ON c.store_id = w.store_id
+             AND c.ts_bucket >= w.start_utc
+             AND c.ts_bucket < w.end_utc
+            WHERE (c.camera_role = 'balcao' OR c.camera_role IS NULL)
+              AND (c.ownership = 'primary' OR c.ownership IS NULL)
+            GROUP BY 1, 2, 3
+        ) cm
+        LEFT JOIN (
+            SELECT w.store_id, t.ts_bucket,
+                   COALESCE(SUM(t.footfall), 0) AS footfall
+            FROM w
+            JOIN public.traffic_metrics t
+              ON t.store_id = w.store_id
+             AND t.ts_bucket >= w.start_utc
+             AND t.ts_bucket < w.end_utc
+            WHERE (t.camera_role = 'entrada' OR t.camera_role IS NULL)
+              AND (t.ownership = 'primary' OR t.ownership IS NULL)
+            GROUP BY 1, 2
+        ) tm ON tm.store_id = cm.store_id AND tm.ts_bucket = cm.ts_bucket
+        GROUP BY 1, 2
+    """,
+    "alerts": f"""
+        {_WINDOWS_CTE}
+        SELECT w.store_id, w.business_date, COUNT(*)
+        FROM w
+        JOIN public.detection_events d
+          ON d.store_id = w.store_id
+         AND COALESCE(d.occurred_at, d.created_at) >= w.start_utc
+         AND COALESCE(d.occurred_at, d.created_at) < w.end_utc
+        GROUP BY 1, 2
+    """,
+    "actions": f"""
+        {_WINDOWS_CTE}
+        SELECT w.store_id, w.business_date,
+               COUNT(*) FILTER (WHERE a.status = 'completed') AS completed,
+               COUNT(*) AS dispatched
+        FROM w
+        JOIN public.action_outcome a
+          ON a.store_id = w.store_id
+         AND a.dispatched_at >= w.start_utc
+         AND a.dispatched_at < w.end_utc
+        GROUP BY 1, 2
+    """,
+}
+
+_UPSERT_COLUMNS = (
+    ("org_id", "uuid"),
+    ("store_id", "uuid"),
+    ("business_date", "date"),
+    ("flow_in_total", "integer"),
+    ("flow_out_total", "integer"),
+    ("transactions_total", "integer"),
+    ("conversion_rate", "numeric"),
+    ("avg_ticket", "numeric"),
+    ("queue_wait_peak", "numeric"),
+    ("queue_loss_estimated", "numeric"),
+    ("idle_cost_estimated", "numeric"),
+    ("money_at_risk", "numeric"),
+    ("alerts_total", "integer"),
+    ("useful_alert_rate", "numeric"),
+    ("inputs_json", "text"),
+)
+
+
+def _abandon_rate(segment: str) -> float:
+    rates = getattr(settings, "TRIAL_QUEUE_ABANDON_RATE_BY_SEGMENT", {})
+    return float(rates.get(segment, rates.get("default", 0.08)))
+
+
+def _load_store_rows(*, store_filter: str | None, shard: int = 0, shards: int = 1):
+    sql = """
+        SELECT s.id AS store_id,
+               s.org_id AS org_id,
+               s.avg_hourly_labor_cost,
+               s.business_type,
+               COALESCE(o.timezone, %s) AS timezone
+        FROM public.stores s
+        LEFT JOIN public.organizations o ON o.id = s.org_id
+        WHERE TRUE
+    """
+    params: list = [settings.TIME_ZONE]
+    if store_filter:
+        sql += " AND s.id = %s"
+        params.append(store_filter)
+    if shards > 1:
+        sql += " AND mod(abs(hashtext(s.id::text)), %s) = %s"
+        params.extend([shards, shard])
+    sql += " ORDER BY s.id"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _build_windows(store_rows: list[dict], start_date: date, end_date: date) -> list[dict]:
+    windows = []
+    for store_row in store_rows:
+        tz_name = str(store_row.get("timezone") or settings.TIME_ZONE)
+        segment = str(store_row.get("business_type") or "default").strip().lower()
+        for business_date in _iter_dates(start_date, end_date):
+            start_utc, end_utc = _day_window_utc(business_date, tz_name)
+            windows.append(
+                {
+                    "store_id": str(store_row["store_id"]),
+                    "org_id": str(store_row["org_id"]),
+                    "business_date": business_date,
+                    "start_utc": start_utc,
+                    "end_utc": end_utc,
+                    "timezone": tz_name,
+                    "segment": segment,
+                    "avg_hourly_labor_cost": float(store_row.get("avg_hourly_labor_cost") or 0.0),
+                    "abandon_rate": _abandon_rate(segment),
+                }
+            )
+    return windows
+
+
+def _fetch_sources(windows: list[dict]) -> dict[str, dict[tuple[str, date], tuple]]:
+    window_params = [
+        [w["store_id"] for w in windows],
+        [w["business_date"] for w in windows],
+        [w["start_utc"] for w in windows],
+        [w["end_utc"] for w in windows],
+    ]
+    sources: dict[str, dict[tuple[str, date], tuple]] = {}
+    with connection.cursor() as cursor:
+        for name, sql in _SOURCE_QUERIES.items():
+            cursor.execute(sql, window_params)
+            sources[name] = {(str(row[0]), row[1]): tuple(row[2:]) for row in cursor.fetchall()}
+    return sources
+
+
+def _derive_metrics(window: dict, sources: dict[str, dict[tuple[str, date], tuple]]) -> dict:
+    key = (window["store_id"], window["business_date"])
+    flow_in_total = int((sources["flow_in"].get(key) or (0,))[0] or 0)
+    flow_out_total = int((sources["flow_out"].get(key) or (0,))[0] or 0)
+    conversion_row = sources["conversion"].get(key) or (0, 0)
+    transactions_total = int(conversion_row[0] or 0)
+    queue_wait_peak = float(conversion_row[1] or 0)
+    idle_row = sources["idle"].get(key) or (0, 0)
+    idle_seconds_total = float(idle_row[0] or 0)
+    queue_wait_seconds_total = float(idle_row[1] or 0)
+    alerts_total = int((sources["alerts"].get(key) or (0,))[0] or 0)
+    action_row = sources["actions"].get(key) or (0, 0)
+    actions_completed = int(action_row[0] or 0)
+    actions_dispatched = int(action_row[1] or 0)
+
+    avg_hourly_labor_cost = window["avg_hourly_labor_cost"]
+    conversion_rate = float(transactions_total / flow_in_total) if flow_in_total > 0 else None
+    idle_cost_estimated = float((idle_seconds_total / 3600.0) * avg_hourly_labor_cost)
+    queue_loss_estimated = float(
+        (queue_wait_seconds_total / 3600.0) * avg_hourly_labor_cost * window["abandon_rate"]
+    )
+    money_at_risk = float(idle_cost_estimated + queue_loss_estimated)
+    useful_alert_rate = float(actions_completed / alerts_total) if alerts_total > 0 else None
+
+    return {
+        "flow_in_total": flow_in_total,
+        "flow_out_total": flow_out_total,
+        "transactions_total": transactions_total,
+        "conversion_rate": conversion_rate,
+        "avg_ticket": None,
+        "queue_wait_peak": queue_wait_peak,
+        "queue_loss_estimated": queue_loss_estimated,
+        "idle_cost_estimated": idle_cost_estimated,
+        "money_at_risk": money_at_risk,
+        "alerts_total": alerts_total,
+        "useful_alert_rate": useful_alert_rate,
+        "actions_dispatched": actions_dispatched,
+        "actions_completed": actions_completed,
+    }
+
+
+def _inputs_json(window: dict) -> dict:
+    return {
+        "window_utc": {
+            "start": window["start_utc"].isoformat(),
+            "end": window["end_utc"].isoformat(),
+        },
+        "timezone": window["timezone"],
+        "segment": window["segment"],
+        "avg_hourly_labor_cost": window["avg_hourly_labor_cost"],
+        "queue_abandon_rate": window["abandon_rate"],
+        "source_flags": SOURCE_FLAGS,
+    }
+
+
+def _bulk_upsert_store_kpis_daily(rows: list[dict]) -> None:
+    if not rows:
+        return
+    names = [name for name, _ in _UPSERT_COLUMNS]
+    unnest_args = ", ".join(f"%s::{sql_type}[]" for _, sql_type in _UPSERT_COLUMNS)
+    updates = ",\n            ".join(
+        f"{name} = EXCLUDED.{name}" for name in names if name not in ("store_id", "business_date")
+    )
+    select_columns = ", ".join("v.inputs_json::jsonb" if name == "inputs_json" else f"v.{name}" for name in names)
+    sql = f"""
+        INSERT INTO public.store_kpis_daily ({", ".join(names)}, method_version, updated_at)
+        SELECT {select_columns}, %s, now()
+        FROM unnest({unnest_args}) AS v({", ".join(names)})
+        ON CONFLICT (store_id, business_date)
+        DO UPDATE SET
+            {updates},
+            method_version = EXCLUDED.method_version,
+            updated_at = now()
+    """
+    params = [METHOD_VERSION] + [[row[name] for row in rows] for name in names]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def materialize_store_kpis(
+    *,
+    start_date: date,
+    end_date: date,
+    store_filter: str | None = None,
+    chunk_size: int = 50,
+    shard: int = 0,
+    shards: int = 1,
+) -> int:
+    """
+    Materializa store_kpis_daily em lotes de `chunk_size` lojas: uma query
+    agrupada por fonte para todas as (loja, dia) do lote e um único upsert.
+    """
+    store_rows = _load_store_rows(store_filter=store_filter, shard=shard, shards=shards)
+    upserted = 0
+    for offset in range(0, len(store_rows), max(1, chunk_size)):
+        windows = _build_windows(store_rows[offset : offset + chunk_size], start_date, end_date)
+        if not windows:
+            continue
+        sources = _fetch_sources(windows)
+        rows = []
+        for window in windows:
+            metrics = _derive_metrics(window, sources)
+            rows.append(
+                {
+                    "org_id": window["org_id"],
+                    "store_id": window["store_id"],
+                    "business_date": window["business_date"],
+                    **metrics,
+                    "inputs_json": json.dumps(_inputs_json(window), ensure_ascii=False),
+                }
+            )
+        _bulk_upsert_store_kpis_daily(rows)
+        invalidate_report_cache({row["store_id"] for row in rows})
+        upserted += len(rows)
+    return upserted
+
+
+def _materialize_shard(options: dict) -> int:
+    # Processo filho (fork): abre conexões próprias e as fecha ao terminar.
+    try:
+        return materialize_store_kpis(**options)
+    finally:
+        connections.close_all()
+
+
 class Command(BaseCommand):
     help = "Materializa KPIs diarios auditaveis por loja em public.store_kpis_daily."
 
@@ -39,6 +387,18 @@ class Command(BaseCommand):
         parser.add_argument("--start", help="Inicio YYYY-MM-DD (inclusive)")
         parser.add_argument("--end", help="Fim YYYY-MM-DD (inclusive)")
         parser.add_argument("--store-id", help="Filtrar por store_id")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=50,
+            help="Lojas por lote de queries agrupadas (default: 50).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processos paralelos; as lojas sao particionadas por hash do store_id (default: 1).",
+        )
 
     def handle(self, *args, **options):
         today_local = timezone.localdate()
@@ -55,312 +415,35 @@ class Command(BaseCommand):
             start_date, end_date = end_date, start_date
 
         store_filter = (options.get("store_id") or "").strip() or None
-        rows = self._load_store_rows(store_filter=store_filter)
-        if not rows:
-            self.stdout.write("Nenhuma loja encontrada para materializacao.")
-            return
+        chunk_size = max(1, int(options.get("chunk_size") or 50))
+        workers = int(options.get("workers") or 1)
+        if workers < 1:
+            raise CommandError("--workers deve ser >= 1.")
 
-        upserted = 0
-        for store_row in rows:
-            store_id = str(store_row["store_id"])
-            org_id = str(store_row["org_id"])
-            tz_name = str(store_row.get("timezone") or settings.TIME_ZONE)
-            avg_hourly_labor_cost = float(store_row.get("avg_hourly_labor_cost") or 0.0)
-            segment = str(store_row.get("business_type") or "default").strip().lower()
-            abandon_rate = float(
-                getattr(settings, "TRIAL_QUEUE_ABANDON_RATE_BY_SEGMENT", {}).get(
-                    segment,
-                    getattr(settings, "TRIAL_QUEUE_ABANDON_RATE_BY_SEGMENT", {}).get("default", 0.08),
-                )
-            )
+        base_options = {
+            "start_date": start_date,
+            "end_date": end_date,
+            "store_filter": store_filter,
+            "chunk_size": chunk_size,
+        }
+        if workers == 1:
+            upserted = materialize_store_kpis(**base_options)
+        else:
+            # Conexões não podem atravessar o fork.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("fork")) as pool:
+                futures = [
+                    pool.submit(_materialize_shard, {**base_options, "shard": shard, "shards": workers})
+                    for shard in range(workers)
+                ]
+                upserted = sum(future.result() for future in futures)
 
-            for business_date in _iter_dates(start_date, end_date):
-                start_utc, end_utc = _day_window_utc(business_date, tz_name)
-                metrics = self._compute_metrics_for_store_day(
-                    store_id=store_id,
-                    start_utc=start_utc,
-                    end_utc=end_utc,
-                    avg_hourly_labor_cost=avg_hourly_labor_cost,
-                    abandon_rate=abandon_rate,
-                )
-                inputs_json = {
-                    "window_utc": {
-                        "start": start_utc.isoformat(),
-                        "end": end_utc.isoformat(),
-                    },
-                    "timezone": tz_name,
-                    "segment": segment,
-                    "avg_hourly_labor_cost": avg_hourly_labor_cost,
-                    "queue_abandon_rate": abandon_rate,
-                    "source_flags": {
-                        "flow_in_total": "official",
-                        "flow_out_total": "official",
-                        "transactions_total": "proxy",
-                        "conversion_rate": "proxy",
-                        "queue_wait_peak": "official",
-                        "queue_loss_estimated": "derived",
-                        "idle_cost_estimated": "derived",
-                        "money_at_risk": "estimated",
-                        "alerts_total": "official",
-                        "useful_alert_rate": "proxy",
-                    },
-                }
-                self._upsert_store_kpi_daily(
-                    org_id=org_id,
-                    store_id=store_id,
-                    business_date=business_date,
-                    metrics=metrics,
-                    inputs_json=inputs_json,
-                )
-                upserted += 1
+        if not upserted:
+            self.stdout.write("Nenhuma loja encontrada para materializacao.")
+            return
 
         self.stdout.write(
             self.style.SUCCESS(
                 f"store_kpis_daily materializado: {upserted} linhas ({start_date} -> {end_date})."
             )
         )
-
-    def _load_store_rows(self, *, store_filter: str | None):
-        sql = """
-            SELECT s.id AS store_id,
-                   s.org_id AS org_id,
-                   s.avg_hourly_labor_cost,
-                   s.business_type,
-                   COALESCE(o.timezone, %s) AS timezone
-            FROM public.stores s
-            LEFT JOIN public.organizations o ON o.id = s.org_id
-        """
-        params = [settings.TIME_ZONE]
-        if store_filter:
-            sql += " WHERE s.id = %s"
-            params.append(store_filter)
-        with connection.cursor() as cursor:
-            cursor.execute(sql, params)
-            columns = [col[0] for col in cursor.description]
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-    def _compute_metrics_for_store_day(
-        self,
-        *,
-        store_id: str,
-        start_utc: datetime,
-        end_utc: datetime,
-        avg_hourly_labor_cost: float,
-        abandon_rate: float,
-    ) -> dict:
-        with connection.cursor() as cursor:
-            cursor.execute(
-                """
-                SELECT COALESCE(SUM(footfall), 0)
-                FROM public.traffic_metrics
-                WHERE store_id = %s
-                  AND ts_bucket >= %s
-                  AND ts_bucket < %s
-                  AND (camera_role = 'entrada' OR camera_role IS NULL)
-                  AND (ownership = 'primary' OR ownership IS NULL)
-                """,
-                [store_id, start_utc, end_utc],
-            )
-            flow_in_total = int(cursor.fetchone()[0] or 0)
-
-            cursor.execute(
-                """
-                SELECT COALESCE(SUM(count_value), 0)
-                FROM public.vision_atomic_events
-                WHERE store_id = %s
-                  AND ts >= %s
-                  AND ts < %s
-                  AND event_type = 'vision.crossing.v1'
-                  AND lower(COALESCE(direction, '')) = 'exit'
-                  AND (ownership = 'primary' OR ownership IS NULL)
-                """,
-                [store_id, start_utc, end_utc],
-            )
-            flow_out_total = int(cursor.fetchone()[0] or 0)
-
-            cursor.execute(
-                """
-                SELECT COALESCE(SUM(checkout_events), 0),
-                       COALESCE(MAX(queue_avg_seconds), 0)
-                FROM public.conversion_metrics
-                WHERE store_id = %s
-                  AND ts_bucket >= %s
-                  AND ts_bucket < %s
-                  AND (camera_role = 'balcao' OR camera_role IS NULL)
-                  AND (ownership = 'primary' OR ownership IS NULL)
-                """,
-                [store_id, start_utc, end_utc],
-            )
-            conversion_row = cursor.fetchone() or (0, 0)
-            transactions_total = int(conversion_row[0] or 0)
-            queue_wait_peak = float(conversion_row[1] or 0)
-
-            cursor.execute(
-                """
-                SELECT
-                    COALESCE(SUM(
-                        GREATEST(
-                            0,
-                            LEAST(
-                                1,
-                                CASE
-                                    WHEN cm.staff_active_est IS NULL OR cm.staff_active_est <= 0 THEN 0
-                                    WHEN tm.footfall IS NULL THEN 0
-                                    ELSE 1 - (tm.footfall::float / NULLIF(cm.staff_active_est::float, 0))
-                                END
-                            )
-                        ) * 3600
-                    ), 0) AS idle_seconds_total,
-                    COALESCE(SUM(
-                        COALESCE(cm.queue_avg_seconds, 0) * GREATEST(COALESCE(tm.footfall, 0), 1)
-                    ), 0) AS queue_wait_seconds_total
-                FROM (
-                    SELECT ts_bucket,
-                           COALESCE(AVG(queue_avg_seconds), 0) AS queue_avg_seconds,
-                           COALESCE(AVG(staff_active_est), 0) AS staff_active_est
-                    FROM public.conversion_metrics
-                    WHERE store_id = %s
-                      AND ts_bucket >= %s
-                      AND ts_bucket < %s
-                      AND (camera_role = 'balcao' OR camera_role IS NULL)
-                      AND (ownership = 'primary' OR ownership IS NULL)
-                    GROUP BY 1
-                ) cm
-                LEFT JOIN (
-                    SELECT ts_bucket,
-                           COALESCE(SUM(footfall), 0) AS footfall
-                    FROM public.traffic_metrics
-                    WHERE store_id = %s
-                      AND ts_bucket >= %s
-                      AND ts_bucket < %s
-                      AND (camera_role = 'entrada' OR camera_role IS NULL)
-                      AND (ownership = 'primary' OR ownership IS NULL)
-                    GROUP BY 1
-                ) tm ON tm.ts_bucket = cm.ts_bucket
-                """,
-                [store_id, start_utc, end_utc, store_id, start_utc, end_utc],
-            )
-            idle_row = cursor.fetchone() or (0, 0)
-            idle_seconds_total = float(idle_row[0] or 0)
-            queue_wait_seconds_total = float(idle_row[1] or 0)
-
-            cursor.execute(
-                """
-                SELECT COUNT(*)
-                FROM public.detection_events
-                WHERE store_id = %s
-                  AND COALESCE(occurred_at, created_at) >= %s
-                  AND COALESCE(occurred_at, created_at) < %s
-                """,
-                [store_id, start_utc, end_utc],
-            )
-            alerts_total = int(cursor.fetchone()[0] or 0)
-
-            cursor.execute(
-                """
-                SELECT COUNT(*) FILTER (WHERE status = 'completed') AS completed,
-                       COUNT(*) AS dispatched
-                FROM public.action_outcome
-                WHERE store_id = %s
-                  AND dispatched_at >= %s
-                  AND dispatched_at < %s
-                """,
-                [store_id, start_utc, end_utc],
-            )
-            action_row = cursor.fetchone() or (0, 0)
-            actions_completed = int(action_row[0] or 0)
-            actions_dispatched = int(action_row[1] or 0)
-
-        conversion_rate = float(transactions_total / flow_in_total) if flow_in_total > 0 else None
-        idle_cost_estimated = float((idle_seconds_total / 3600.0) * avg_hourly_labor_cost)
-        queue_loss_estimated = float((queue_wait_seconds_total / 3600.0) * avg_hourly_labor_cost * abandon_rate)
-        money_at_risk = float(idle_cost_estimated + queue_loss_estimated)
-        useful_alert_rate = float(actions_completed / alerts_total) if alerts_total > 0 else None
-
-        return {
-            "flow_in_total": flow_in_total,
-            "flow_out_total": flow_out_total,
-            "transactions_total": transactions_total,
-            "conversion_rate": conversion_rate,
-            "avg_ticket": None,
-            "queue_wait_peak": queue_wait_peak,
-            "queue_loss_estimated": queue_loss_estimated,
-            "idle_cost_estimated": idle_cost_estimated,
-            "money_at_risk": money_at_risk,
-            "alerts_total": alerts_total,
-            "useful_alert_rate": useful_alert_rate,
-            "actions_dispatched": actions_dispatched,
-            "actions_completed": actions_completed,
-        }
-
-    def _upsert_store_kpi_daily(
-        self,
-        *,
-        org_id: str,
-        store_id: str,
-        business_date: date,
-        metrics: dict,
-        inputs_json: dict,
-    ):
-        with connection.cursor() as cursor:
-            cursor.execute(
-                """
-                INSERT INTO public.store_kpis_daily (
-                    org_id,
-                    store_id,
-                    business_date,
-                    flow_in_total,
-                    flow_out_total,
-                    transactions_total,
-                    conversion_rate,
-                    avg_ticket,
-                    queue_wait_peak,
-                    queue_loss_estimated,
-                    idle_cost_estimated,
-                    money_at_risk,
-                    alerts_total,
-                    useful_alert_rate,
-                    method_version,
-                    inputs_json,
-                    updated_at
-                )
-                VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb, now()
-                )
-                ON CONFLICT (store_id, business_date)
-                DO UPDATE SET
-                    org_id = EXCLUDED.org_id,
-                    flow_in_total = EXCLUDED.flow_in_total,
-                    flow_out_total = EXCLUDED.flow_out_total,
-                    transactions_total = EXCLUDED.transactions_total,
-                    conversion_rate = EXCLUDED.conversion_rate,
-                    avg_ticket = EXCLUDED.avg_ticket,
-                    queue_wait_peak = EXCLUDED.queue_wait_peak,
-                    queue_loss_estimated = EXCLUDED.queue_loss_estimated,
-                    idle_cost_estimated = EXCLUDED.idle_cost_estimated,
-                    money_at_risk = EXCLUDED.money_at_risk,
-                    alerts_total = EXCLUDED.alerts_total,
-                    useful_alert_rate = EXCLUDED.useful_alert_rate,
-                    method_version = EXCLUDED.method_version,
-                    inputs_json = EXCLUDED.inputs_json,
-                    updated_at = now()
-                """,
-                [
-                    org_id,
-                    store_id,
-                    business_date,
-                    metrics["flow_in_total"],
-                    metrics["flow_out_total"],
-                    metrics["transactions_total"],
-                    metrics["conversion_rate"],
-                    metrics["avg_ticket"],
-                    metrics["queue_wait_peak"],
-                    metrics["queue_loss_estimated"],
-                    metrics["idle_cost_estimated"],
-                    metrics["money_at_risk"],
-                    metrics["alerts_total"],
-                    metrics["useful_alert_rate"],
-                    METHOD_VERSION,
-                    json.dumps(inputs_json, ensure_ascii=False),
-                ],
-            )
@@ -0,0 +1,83 @@
+"""
+Envio de e-mails em lote: as mensagens são divididas entre N threads e cada
+thread reaproveita uma única conexão SMTP para o seu lote.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutgoingEmail:
+    subject: str
+    body: str
+    recipients: List[str]
+
+
+def default_from_email() -> str:
+    return (
+        getattr(settings, "DEFAULT_FROM_EMAIL", None)
+        or getattr(settings, "EMAIL_HOST_USER", None)
+        or "no-reply@localhost"
+    )
+
+
+def _send_chunk(chunk: List[Tuple[int, OutgoingEmail]], from_email: str) -> List[Tuple[int, bool, str]]:
+    results = []
+    if not any(email.recipients for _idx, email in chunk):
+        return [(idx, False, "no_recipients") for idx, _email in chunk]
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        return [(idx, False, str(exc)) for idx, _email in chunk]
+    try:
+        for idx, email in chunk:
+            if not email.recipients:
+                results.append((idx, False, "no_recipients"))
+                continue
+            try:
+                EmailMessage(
+                    email.subject,
+                    email.body,
+                    from_email,
+                    email.recipients,
+                    connection=connection,
+                ).send(fail_silently=False)
+                results.append((idx, True, ""))
+            except Exception as exc:
+                results.append((idx, False, str(exc)))
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            logger.warning("[EMAIL] falha ao fechar conexão SMTP", exc_info=True)
+    return results
+
+
+def send_batch(
+    emails: List[OutgoingEmail],
+    *,
+    concurrency: Optional[int] = None,
+    from_email: Optional[str] = None,
+) -> List[Tuple[bool, str]]:
+    """Envia todas as mensagens; retorna (ok, erro) na mesma ordem de `emails`."""
+    if not emails:
+        return []
+    concurrency = max(1, int(concurrency or getattr(settings, "EMAIL_BATCH_CONCURRENCY", 4)))
+    from_email = from_email or default_from_email()
+    indexed = list(enumerate(emails))
+    chunks = [indexed[idx::concurrency] for idx in range(min(concurrency, len(indexed)))]
+
+    results: List[Tuple[bool, str]] = [(False, "not_sent")] * len(emails)
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        for chunk_results in executor.map(lambda chunk: _send_chunk(chunk, from_email), chunks):
+            for idx, ok, error in chunk_results:
+                results[idx] = (ok, error)
+    return results
@@ -1,7 +1,8 @@
 import json
 import uuid
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
+from django.conf import settings
 from django.db import connection
 from django.test.testcases import DatabaseOperationForbidden
 from django.utils import timezone
@@ -12,6 +13,60 @@ def build_pdv_receipt_id(*, store_id: str, source_system: str, transaction_id: s
     return str(uuid.uuid5(uuid.NAMESPACE_URL, base))
 
 
+RECEIPT_COLUMNS = ("event_id", "event_name", "event_version", "ts", "source", "raw", "meta")
+
+
+def receipts_partitioned() -> bool:
+    return bool(getattr(settings, "EVENT_RECEIPTS_PARTITIONED", False))
+
+
+def receipt_dedupe_table() -> str:
+    return "public.event_receipt_keys" if receipts_partitioned() else "public.event_receipts"
+
+
+def build_receipt_insert_sql(
+    values_sql: List[str],
+    *,
+    columns: Iterable[str] = RECEIPT_COLUMNS,
+    returning: bool = False,
+) -> str:
+    """
+    INSERT idempotente por event_id (rowcount/RETURNING só com os novos).
+
+    Com event_receipts particionada por received_at não existe UNIQUE global em
+    event_id (a chave de partição teria de fazer parte dele): o dedupe passa a
+    ser a reserva do event_id em event_receipt_keys, no mesmo statement. O
+    ON CONFLICT sem alvo cobre a transição, enquanto a tabela antiga (com
+    UNIQUE em event_id) ainda tem receipts sem key.
+    """
+    columns = list(columns)
+    column_sql = ", ".join(columns)
+    returning_sql = "\n            RETURNING event_id" if returning else ""
+    if not receipts_partitioned():
+        return f"""
+            INSERT INTO public.event_receipts ({column_sql})
+            VALUES {", ".join(values_sql)}
+            ON CONFLICT (event_id) DO NOTHING{returning_sql}
+            """
+    incoming_sql = ", ".join(f"incoming.{column}" for column in columns)
+    return f"""
+            WITH incoming ({column_sql}) AS (
+                VALUES {", ".join(values_sql)}
+            ),
+            claimed AS (
+                INSERT INTO public.event_receipt_keys (event_id)
+                SELECT DISTINCT event_id FROM incoming
+                ON CONFLICT (event_id) DO NOTHING
+                RETURNING event_id
+            )
+            INSERT INTO public.event_receipts ({column_sql})
+            SELECT DISTINCT ON (incoming.event_id) {incoming_sql}
+            FROM incoming
+            JOIN claimed ON claimed.event_id = incoming.event_id
+            ON CONFLICT DO NOTHING{returning_sql}
+            """
+
+
 def insert_event_receipt_if_new(
     *,
     event_id: str,
@@ -23,11 +78,7 @@ def insert_event_receipt_if_new(
     raw = json.dumps(payload or {}, ensure_ascii=False)
     with connection.cursor() as cursor:
         cursor.execute(
-            """
-            INSERT INTO public.event_receipts (event_id, event_name, event_version, ts, source, raw, meta)
-            VALUES (%s, %s, %s, %s, %s, %s::jsonb, %s::jsonb)
-            ON CONFLICT (event_id) DO NOTHING
-            """,
+            build_receipt_insert_sql(["(%s, %s, %s, %s, %s, %s::jsonb, %s::jsonb)"]),
             [
                 str(event_id),
                 str(event_name),
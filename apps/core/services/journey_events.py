@@ -1,12 +1,22 @@
+import atexit
+import glob
 import json
 import logging
+import os
+import threading
+import time
 import uuid
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-from django.db import connection
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connection, transaction
+from django.test.testcases import DatabaseOperationForbidden
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from apps.core.models import JourneyEvent
+from apps.core.services.event_receipts import RECEIPT_COLUMNS, build_receipt_insert_sql
 
 logger = logging.getLogger(__name__)
 
@@ -52,11 +62,10 @@ def _insert_event_receipt(
 ) -> None:
     with connection.cursor() as cursor:
         cursor.execute(
-            """
-            INSERT INTO public.event_receipts (event_id, event_name, event_version, ts, source, raw, meta, processed_at, attempt_count)
-            VALUES (%s, %s, %s, now(), %s, %s::jsonb, %s::jsonb, now(), 1)
-            ON CONFLICT (event_id) DO NOTHING
-            """,
+            build_receipt_insert_sql(
+                ["(%s, %s, %s, now(), %s, %s::jsonb, %s::jsonb, now(), 1)"],
+                columns=(*RECEIPT_COLUMNS, "processed_at", "attempt_count"),
+            ),
             [
                 str(event_id),
                 event_name,
@@ -133,7 +142,14 @@ def log_journey_event(
     source: str = "app",
     event_version: int = 1,
     meta: Optional[Dict[str, Any]] = None,
+    buffered: bool = True,
 ) -> Optional[JourneyEvent]:
+    """
+    Com `buffered=True` (padrão) o evento é validado agora e gravado no próximo
+    flush do JourneyEventBuffer: o retorno ainda não existe no banco. Quem usa
+    o id em seguida (resposta 201, event_id para o n8n, contagem de inseridos)
+    passa `buffered=False` e recebe a linha já gravada (ou None).
+    """
     payload = payload or {}
     missing_fields = _missing_required_fields(event_name=event_name, payload=payload)
     if missing_fields:
@@ -164,6 +180,75 @@ def log_journey_event(
         return None
 
     now = timezone.now()
+    if not buffered or journey_buffer.write_through:
+        return _persist_now(
+            org_id=org_id,
+            lead_id=lead_id,
+            event_name=event_name,
+            payload=payload,
+            source=source,
+            event_version=event_version,
+            meta=meta,
+            now=now,
+        )
+
+    # Validação e serialização no request; só o I/O vai para o próximo flush.
+    journey_event = JourneyEvent(
+        lead_id=lead_id,
+        org_id=org_id,
+        event_name=event_name,
+        payload=payload,
+        created_at=now,
+    )
+    try:
+        raw = json.dumps(
+            {
+                "event_name": event_name,
+                "org_id": org_id,
+                "lead_id": lead_id,
+                "payload": payload,
+            },
+            ensure_ascii=False,
+        )
+        meta_out = _build_meta(org_id=org_id, lead_id=lead_id, payload=payload, meta=meta)
+        json.dumps(meta_out)
+    except (TypeError, ValueError):
+        logger.exception(
+            "[JOURNEY] payload not serializable event_name=%s org_id=%s lead_id=%s",
+            event_name,
+            org_id,
+            lead_id,
+        )
+        return None
+
+    entry = {
+        "id": str(journey_event.id),
+        "org_id": str(org_id) if org_id else None,
+        "lead_id": str(lead_id) if lead_id else None,
+        "event_name": event_name,
+        "payload": dict(payload),
+        "created_at": now,
+        "event_version": int(event_version or 1),
+        "source": source or "app",
+        "raw": raw,
+        "meta_out": meta_out,
+    }
+    # Só entra no buffer se a transação do chamador confirmar (sem atomic: na hora).
+    transaction.on_commit(lambda: journey_buffer.add(entry))
+    return journey_event
+
+
+def _persist_now(
+    *,
+    org_id: Optional[str],
+    lead_id: Optional[str],
+    event_name: str,
+    payload: Dict[str, Any],
+    source: str,
+    event_version: int,
+    meta: Optional[Dict[str, Any]],
+    now,
+) -> Optional[JourneyEvent]:
     try:
         journey_event = JourneyEvent.objects.create(
             lead_id=lead_id,
@@ -208,3 +293,266 @@ def log_journey_event(
         )
 
     return journey_event
+
+
+def _write_batch(entries: List[Dict[str, Any]]) -> None:
+    """
+    Grava o lote com um bulk_create e um INSERT multi-linha em event_receipts.
+    Os ids já vêm atribuídos: regravar o mesmo lote (retry/spool) não duplica.
+    """
+    JourneyEvent.objects.bulk_create(
+        [
+            JourneyEvent(
+                id=entry["id"],
+                lead_id=entry["lead_id"],
+                org_id=entry["org_id"],
+                event_name=entry["event_name"],
+                payload=entry["payload"],
+                created_at=entry["created_at"],
+            )
+            for entry in entries
+        ],
+        ignore_conflicts=True,
+    )
+    rows = []
+    params: list = []
+    for entry in entries:
+        rows.append("(%s, %s, %s, %s, %s, %s::jsonb, %s::jsonb, now(), 1)")
+        params.extend(
+            [
+                entry["id"],
+                entry["event_name"],
+                int(entry["event_version"] or 1),
+                entry["created_at"],
+                entry["source"] or "app",
+                entry["raw"],
+                json.dumps(entry["meta_out"]),
+            ]
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            build_receipt_insert_sql(rows, columns=(*RECEIPT_COLUMNS, "processed_at", "attempt_count")),
+            params,
+        )
+
+
+def _entry_to_json(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {**entry, "created_at": entry["created_at"].isoformat()}
+
+
+def _entry_from_json(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {**data, "created_at": parse_datetime(data["created_at"])}
+
+
+class JourneyEventBuffer:
+    """
+    Buffer de journey events por worker: grava em lote (_write_batch) na
+    thread de flush, a cada `flush_interval_seconds` ou assim que o buffer
+    atinge `max_pending_events`, e no fim de cada request (fora de atomic).
+    `add` nunca grava na thread do chamador: um rollback do request não leva
+    junto eventos de outros requests. Com intervalo <= 0 vira write-through.
+
+    At-least-once: lote que falha no banco vai para um arquivo JSONL em
+    `spool_dir`, reprocessado pelo flusher (de qualquer worker) até gravar.
+    O spool precisa estar em disco persistente; sem `spool_dir` o buffer não
+    tem onde guardar falhas e perde eventos. Janela de perda restante: o que
+    está em memória (até `flush_interval_seconds`) num kill sem shutdown.
+    """
+
+    SPOOL_CLAIM_STALE_SECONDS = 600
+
+    def __init__(
+        self,
+        *,
+        flush_interval_seconds: float = 2.0,
+        max_pending_events: int = 100,
+        spool_dir: str = "",
+    ):
+        self.flush_interval_seconds = float(flush_interval_seconds)
+        self.max_pending_events = max(1, int(max_pending_events))
+        self.spool_dir = spool_dir
+        if not self.write_through and not spool_dir:
+            logger.warning("[JOURNEY] buffered writes without spool dir; failed batches will be dropped")
+        self._lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        self._wake = threading.Event()
+        self._flusher = None
+        self.flushed_events = 0
+        self.flush_count = 0
+        self.spooled_events = 0
+        self.replayed_events = 0
+        self.dropped_events = 0
+
+    @property
+    def write_through(self) -> bool:
+        return self.flush_interval_seconds <= 0
+
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.append(entry)
+            full = len(self._pending) >= self.max_pending_events
+        self._ensure_flusher()
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        with self._lock:
+            batch = self._pending
+            self._pending = []
+        if not batch:
+            return 0
+        try:
+            _write_batch(batch)
+        except DatabaseOperationForbidden:
+            # SimpleTestCase blocks DB access; ignore in tests.
+            return 0
+        except Exception:
+            logger.exception("[JOURNEY] batch flush failed events=%s; spooling", len(batch))
+            self._spool(batch)
+            return 0
+        with self._lock:
+            self.flushed_events += len(batch)
+            self.flush_count += 1
+        return len(batch)
+
+    def _spool(self, batch: List[Dict[str, Any]]) -> None:
+        if not self.spool_dir:
+            logger.error("[JOURNEY] spool disabled; dropped events=%s", len(batch))
+            with self._lock:
+                self.dropped_events += len(batch)
+            return
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            path = os.path.join(
+                self.spool_dir,
+                f"journey-{time.time_ns()}-{os.getpid()}-{threading.get_ident()}.jsonl",
+            )
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                for entry in batch:
+                    fh.write(json.dumps(_entry_to_json(entry), ensure_ascii=False) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, path)
+        except Exception:
+            logger.exception("[JOURNEY] spool write failed; dropped events=%s", len(batch))
+            with self._lock:
+                self.dropped_events += len(batch)
+            return
+        with self._lock:
+            self.spooled_events += len(batch)
+
+    def _spool_candidates(self) -> List[str]:
+        paths = sorted(glob.glob(os.path.join(self.spool_dir, "journey-*.jsonl")))
+        # Claim de um worker que morreu no meio do replay volta para a fila.
+        stale_before = time.time() - self.SPOOL_CLAIM_STALE_SECONDS
+        for claimed in glob.glob(os.path.join(self.spool_dir, "journey-*.jsonl.*.replay")):
+            try:
+                if os.path.getmtime(claimed) < stale_before:
+                    paths.append(claimed)
+            except OSError:
+                continue
+        return paths
+
+    def replay_spool(self, max_files: int = 10) -> int:
+        """Regrava lotes do spool; para no primeiro erro (banco ainda fora)."""
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return 0
+        replayed = 0
+        for path in self._spool_candidates()[:max_files]:
+            original = path.split(".jsonl", 1)[0] + ".jsonl"
+            claimed = f"{original}.{os.getpid()}.replay"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue  # outro worker pegou o arquivo
+            try:
+                with open(claimed, encoding="utf-8") as fh:
+                    entries = [_entry_from_json(json.loads(line)) for line in fh if line.strip()]
+                if entries:
+                    _write_batch(entries)
+            except Exception:
+                logger.warning("[JOURNEY] spool replay failed file=%s", os.path.basename(original))
+                try:
+                    os.rename(claimed, original)
+                except OSError:
+                    pass
+                break
+            os.unlink(claimed)
+            replayed += len(entries)
+        if replayed:
+            with self._lock:
+                self.replayed_events += replayed
+            logger.info("[JOURNEY] spool replayed events=%s", replayed)
+        return replayed
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(
+                target=self._flush_loop,
+                name="journey-events-flusher",
+                daemon=True,
+            )
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+                self.replay_spool()
+            except Exception:
+                logger.exception("[JOURNEY] background flush failed")
+            finally:
+                connection.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending_events": len(self._pending),
+                "flushed_events": self.flushed_events,
+                "flush_count": self.flush_count,
+                "spooled_events": self.spooled_events,
+                "replayed_events": self.replayed_events,
+                "dropped_events": self.dropped_events,
+            }
+
+
+journey_buffer = JourneyEventBuffer(
+    flush_interval_seconds=getattr(settings, "JOURNEY_EVENTS_FLUSH_SECONDS", 0),
+    max_pending_events=getattr(settings, "JOURNEY_EVENTS_FLUSH_MAX_EVENTS", 100),
+    spool_dir=getattr(settings, "JOURNEY_EVENTS_SPOOL_DIR", ""),
+)
+
+
+def flush_journey_events() -> int:
+    return journey_buffer.flush()
+
+
+def _flush_on_request_finished(**_kwargs) -> None:
+    # Dentro de atomic (ex.: TestCase) o lote iria junto com um rollback alheio.
+    if not journey_buffer.has_pending() or connection.in_atomic_block:
+        return
+    try:
+        journey_buffer.flush()
+    except Exception:
+        logger.exception("[JOURNEY] end-of-request flush failed")
+
+
+def _flush_on_exit() -> None:
+    try:
+        journey_buffer.flush()
+    except Exception:
+        logger.exception("[JOURNEY] shutdown flush failed")
+
+
+request_finished.connect(_flush_on_request_finished, dispatch_uid="journey_events_flush")
+atexit.register(_flush_on_exit)
@@ -0,0 +1,157 @@
+import hashlib
+import logging
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from apps.core.models import Store
+from backend.utils import shared_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _enabled() -> bool:
+    return bool(getattr(settings, "REPORT_CACHE_ENABLED", True))
+
+
+_NAMESPACE = "report"
+
+
+def _coerce_store_ids(store_ids: Optional[Iterable]) -> list[str]:
+    if not store_ids:
+        return []
+    return sorted({str(store_id) for store_id in store_ids if store_id})
+
+
+def _org_store_ids(org_id: str, store_id: Optional[str]) -> list[str]:
+    store_ids = _coerce_store_ids(Store.objects.filter(org_id=org_id).values_list("id", flat=True))
+    if store_id:
+        store_ids = [sid for sid in store_ids if sid == str(store_id)]
+    return store_ids
+
+
+def invalidate_report_cache(store_ids: Optional[Iterable]) -> None:
+    """
+    Invalida relatórios em cache das stores (inclusive janelas fechadas),
+    ex.: reprocessamento de minutos antigos ou rematerialização de KPIs.
+    """
+    for store_id in _coerce_store_ids(store_ids):
+        shared_cache.bump_version("store", store_id, namespace=_NAMESPACE)
+
+
+def _store_versions(store_ids: list[str]) -> list[str]:
+    if not store_ids:
+        return []
+    versions = shared_cache.versions(_NAMESPACE, "store", store_ids)
+    return [f"{store_id}:{versions.get(store_id, 1)}" for store_id in store_ids]
+
+
+def store_ingestion_watermark(store_ids: list[str]) -> Optional[str]:
+    """
+    Último ts_bucket gravado por store (traffic/conversion), via índice
+    (store_id, ts_bucket DESC). Muda quando chega minuto novo.
+    """
+    if not store_ids:
+        return ""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT s.id,
+                       GREATEST(
+                           (SELECT t.ts_bucket FROM public.traffic_metrics t
+                            WHERE t.store_id = s.id ORDER BY t.ts_bucket DESC LIMIT 1),
+                           (SELECT c.ts_bucket FROM public.conversion_metrics c
+                            WHERE c.store_id = s.id ORDER BY c.ts_bucket DESC LIMIT 1)
+                       ) AS last_ts_bucket
+                FROM unnest(%s::uuid[]) AS s(id)
+                ORDER BY s.id
+                """,
+                [store_ids],
+            )
+            rows = cursor.fetchall()
+    except DatabaseError:
+        logger.warning("[REPORT] ingestion watermark unavailable; skipping cache")
+        return None
+    return "|".join(f"{row[0]}:{row[1].isoformat() if row[1] else '-'}" for row in rows)
+
+
+def _window_is_closed(end, now) -> bool:
+    settle = int(getattr(settings, "REPORT_CACHE_SETTLE_SECONDS", 3600) or 0)
+    return end <= now - timezone.timedelta(seconds=settle)
+
+
+def report_cache_key(
+    kind: str,
+    *,
+    org_id: str,
+    store_id: Optional[str],
+    start,
+    end,
+    period: str,
+    store_versions: list[str],
+    watermark: Optional[str] = None,
+) -> str:
+    # Janela "ao vivo" (end ~ now) desliza a cada request: a chave usa o período
+    # e o watermark de ingestão, não o end exato.
+    if watermark is None:
+        window = f"{start.isoformat()}|{end.isoformat()}"
+    else:
+        window = f"live|{start.isoformat() if period == 'custom' else ''}|{watermark}"
+    raw = "|".join([str(org_id), str(store_id or ""), period, window, ",".join(store_versions)])
+    digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:40]
+    return f"report:{kind}:{digest}"
+
+
+def get_or_build_report_payload(
+    kind: str,
+    builder: Callable[..., dict],
+    *,
+    org_id: str,
+    store_id: Optional[str],
+    start,
+    end,
+    period: str,
+) -> dict:
+    """
+    Janelas fechadas (end anterior a REPORT_CACHE_SETTLE_SECONDS) ficam em cache
+    sem expiração; janelas que tocam "agora" são reaproveitadas enquanto o
+    watermark de ingestão não muda, por até REPORT_CACHE_LIVE_SECONDS.
+    """
+    def build() -> dict:
+        return builder(org_id=org_id, store_id=store_id, start=start, end=end)
+
+    if not _enabled():
+        return build()
+
+    store_ids = _org_store_ids(org_id, store_id)
+    if _window_is_closed(end, timezone.now()):
+        watermark = None
+        ttl = int(getattr(settings, "REPORT_CACHE_CLOSED_SECONDS", 0) or 0) or None
+    else:
+        watermark = store_ingestion_watermark(store_ids)
+        if watermark is None:
+            return build()
+        ttl = int(getattr(settings, "REPORT_CACHE_LIVE_SECONDS", 60) or 0)
+        if ttl <= 0:
+            return build()
+
+    key = report_cache_key(
+        kind,
+        org_id=org_id,
+        store_id=store_id,
+        start=start,
+        end=end,
+        period=period,
+        store_versions=_store_versions(store_ids),
+        watermark=watermark,
+    )
+    payload = shared_cache.get(_NAMESPACE, key)
+    if isinstance(payload, dict):
+        return payload
+    payload = build()
+    cache.set(key, payload, ttl)
+    return payload
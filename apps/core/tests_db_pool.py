@@ -0,0 +1,84 @@
+import threading
+import time
+
+from django.test import SimpleTestCase
+from psycopg2 import extensions as pg_extensions
+
+from backend.db.pool import ConnectionPool, PoolTimeout
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.status = pg_extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = pg_extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def _pool(self, **kwargs):
+        created = []
+
+        def connect():
+            conn = _FakeConnection()
+            created.append(conn)
+            return conn
+
+        return ConnectionPool(connect, **kwargs), created
+
+    def test_reuses_returned_connection_and_rolls_back_open_transaction(self):
+        pool, created = self._pool(max_size=2)
+
+        conn = pool.getconn()
+        conn.status = pg_extensions.TRANSACTION_STATUS_INTRANS
+        pool.putconn(conn)
+        again = pool.getconn()
+
+        self.assertIs(again, conn)
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertEqual(len(created), 1)
+        stats = pool.stats()
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["in_use"], 1)
+
+    def test_discards_closed_and_aged_connections(self):
+        pool, created = self._pool(max_size=2, max_lifetime=0.01)
+
+        conn = pool.getconn()
+        pool.putconn(conn)
+        time.sleep(0.02)
+        fresh = pool.getconn()
+        self.assertIsNot(fresh, conn)
+        self.assertTrue(conn.closed)
+
+        fresh.closed = 1
+        pool.putconn(fresh)
+        self.assertEqual(pool.stats()["discarded"], 2)
+        self.assertEqual(pool.stats()["size"], 0)
+        self.assertEqual(len(created), 2)
+
+    def test_waits_for_free_connection_then_times_out(self):
+        pool, _created = self._pool(max_size=1, timeout=1.0)
+        conn = pool.getconn()
+
+        releaser = threading.Timer(0.05, pool.putconn, args=(conn,))
+        releaser.start()
+        self.assertIs(pool.getconn(), conn)
+        releaser.join()
+        self.assertEqual(pool.stats()["waits"], 1)
+        self.assertGreater(pool.stats()["wait_seconds_max"], 0)
+
+        pool.timeout = 0.01
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()["timeouts"], 1)
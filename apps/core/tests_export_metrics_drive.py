@@ -0,0 +1,56 @@
+import gzip
+import io
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from apps.core.management.commands import export_metrics_drive as export
+
+
+class _ChunkedCursor:
+    description = [("id",), ("payload",)]
+
+    def __init__(self, rows):
+        self._rows = list(rows)
+        self.fetch_sizes = []
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        chunk, self._rows = self._rows[:size], self._rows[size:]
+        return chunk
+
+
+class ExportMetricsDriveStreamingTests(SimpleTestCase):
+    def test_write_csv_rows_streams_chunks_into_gzip(self):
+        cursor = _ChunkedCursor([(idx, f'{{"n": {idx}}}') for idx in range(5)])
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as fh:
+            total = export._write_csv_rows(cursor, fh, chunk_rows=2)
+
+        self.assertEqual(total, 5)
+        self.assertEqual(cursor.fetch_sizes, [2, 2, 2, 2])
+        lines = gzip.decompress(buffer.getvalue()).decode("utf-8").splitlines()
+        self.assertEqual(lines[0], "id,payload")
+        self.assertEqual(lines[1], '0,"{""n"": 0}"')
+        self.assertEqual(len(lines), 6)
+
+    def test_export_tables_runs_in_parallel_and_reports_failures(self):
+        def fake_export(table, start, end, **kwargs):
+            if table == "event_receipts":
+                return export.ExportResult(table=table, filename="x", error="boom")
+            return export.ExportResult(table=table, filename=f"{table}.csv.gz", rows=3, drive_id="d1")
+
+        start = datetime(2026, 10, 17, tzinfo=dt_timezone.utc)
+        with patch.object(export, "_export_and_upload", side_effect=fake_export) as export_mock:
+            results = export._export_tables(
+                ["traffic_metrics", "event_receipts", "conversion_metrics"],
+                start,
+                start,
+                workers=3,
+                fmt="csv.gz",
+            )
+
+        self.assertEqual(export_mock.call_count, 3)
+        self.assertEqual([result.table for result in results], ["traffic_metrics", "event_receipts", "conversion_metrics"])
+        self.assertEqual([result.error for result in results], [None, "boom", None])
@@ -0,0 +1,86 @@
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+from uuid import uuid4
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from apps.core.management.commands import health_alerts_tick
+from apps.core.services.email_batch import OutgoingEmail, send_batch
+from apps.edge.fleet_status import CameraStatus, StoreStatus
+
+COMMAND = "apps.core.management.commands.health_alerts_tick"
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend", EDGE_ALERT_EMAIL_TO="ops@example.com")
+class HealthAlertsTickTests(SimpleTestCase):
+    def _statuses(self):
+        now = timezone.now()
+        degraded = SimpleNamespace(id=uuid4(), org_id=uuid4(), name="Loja A")
+        cooled = SimpleNamespace(id=uuid4(), org_id=uuid4(), name="Loja B")
+        healthy = SimpleNamespace(id=uuid4(), org_id=uuid4(), name="Loja C")
+        cam = SimpleNamespace(id=uuid4(), name="Caixa 1")
+        statuses = [
+            StoreStatus(
+                degraded,
+                "degraded",
+                "partial_camera_coverage",
+                600,
+                now - timedelta(minutes=10),
+                [
+                    CameraStatus(SimpleNamespace(id=uuid4(), name="Entrada"), "online", "health_recent", 600, now),
+                    CameraStatus(cam, "offline", "health_stale", 900, None),
+                ],
+            ),
+            StoreStatus(cooled, "offline", "heartbeat_expired", 3600, None, []),
+            StoreStatus(healthy, "online", "all_cameras_online", 10, now, []),
+        ]
+        last_sent = {(str(cooled.id), "store_offline"): now - timedelta(minutes=5)}
+        return [degraded, cooled, healthy], statuses, last_sent
+
+    def test_sends_batched_alerts_respecting_preloaded_cooldowns(self):
+        stores, statuses, last_sent = self._statuses()
+        with patch(f"{COMMAND}.Store.objects.filter") as filter_mock, patch(
+            f"{COMMAND}.fleet_status.evaluate_fleet", return_value=statuses
+        ) as evaluate_mock, patch(f"{COMMAND}._load_last_sent", return_value=last_sent), patch(
+            f"{COMMAND}._notification_logs_available", return_value=True
+        ), patch(f"{COMMAND}.NotificationLog.objects.bulk_create") as bulk_create:
+            filter_mock.return_value.order_by.return_value = stores
+            call_command("health_alerts_tick", stdout=StringIO())
+
+        self.assertEqual(evaluate_mock.call_args.kwargs["stores"], stores)
+        subjects = sorted(message.subject for message in mail.outbox)
+        self.assertEqual(subjects, ["[Edge] Cameras offline - Loja A", "[Edge] Store Loja A degraded"])
+        camera_mail = next(message for message in mail.outbox if "Cameras offline" in message.subject)
+        self.assertIn("Caixa 1", camera_mail.body)
+        logs = bulk_create.call_args.args[0]
+        self.assertEqual(sorted(log.provider_message_id for log in logs), ["camera_offline", "store_degraded"])
+        self.assertTrue(all(log.status == "sent" for log in logs))
+
+    def test_cooldown_window(self):
+        now = timezone.now()
+        store_id = uuid4()
+        last_sent = {(str(store_id), "camera_offline"): now - timedelta(seconds=health_alerts_tick.ALERT_COOLDOWN_SECONDS)}
+
+        self.assertTrue(health_alerts_tick._cooldown_ok(last_sent, store_id, "camera_offline", now=now))
+        self.assertFalse(
+            health_alerts_tick._cooldown_ok(last_sent, store_id, "camera_offline", now=now - timedelta(seconds=1))
+        )
+        self.assertTrue(health_alerts_tick._cooldown_ok(last_sent, store_id, "store_offline", now=now))
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class EmailBatchTests(SimpleTestCase):
+    def test_results_keep_input_order_across_workers(self):
+        emails = [OutgoingEmail(f"s{idx}", "body", ["a@example.com"]) for idx in range(5)]
+        emails[3] = OutgoingEmail("s3", "body", [])
+
+        results = send_batch(emails, concurrency=2)
+
+        self.assertEqual(results[3], (False, "no_recipients"))
+        self.assertTrue(all(ok for idx, (ok, _err) in enumerate(results) if idx != 3))
+        self.assertEqual(sorted(message.subject for message in mail.outbox), ["s0", "s1", "s2", "s4"])
@@ -1,4 +1,5 @@
-from django.test import SimpleTestCase
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
 from unittest.mock import MagicMock, patch
 
 from apps.core.services.journey_events import log_journey_event
@@ -76,3 +77,90 @@ class JourneyEventServiceTests(SimpleTestCase):
             "JOURNEY_EVENT_PAYLOAD_REQUIRED_MISSING",
         )
         self.assertIn("roi_version", kwargs.get("meta_out", {}).get("missing_fields", []))
+
+
+class JourneyEventBufferTests(TestCase):
+    def setUp(self):
+        import tempfile
+
+        from apps.core.services import journey_events
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.buffer = journey_events.JourneyEventBuffer(
+            flush_interval_seconds=3600,
+            max_pending_events=2,
+            spool_dir=self.tmp.name,
+        )
+        buffer_patch = patch.object(journey_events, "journey_buffer", self.buffer)
+        buffer_patch.start()
+        self.addCleanup(buffer_patch.stop)
+        flusher_patch = patch.object(self.buffer, "_ensure_flusher")
+        flusher_patch.start()
+        self.addCleanup(flusher_patch.stop)
+
+    @patch("apps.core.services.journey_events._write_batch")
+    def test_size_limit_wakes_flusher_without_writing_inline(self, write_mock):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = log_journey_event(org_id="org-1", event_name="upgrade_clicked", payload={"source": "banner"})
+            log_journey_event(org_id="org-1", event_name="store_created", payload={"store_id": "store-1"})
+
+        self.assertIsNotNone(first.id)
+        write_mock.assert_not_called()
+        self.assertTrue(self.buffer._wake.is_set())
+
+        self.assertEqual(self.buffer.flush(), 2)
+        write_mock.assert_called_once()
+        batch = write_mock.call_args.args[0]
+        self.assertEqual([entry["event_name"] for entry in batch], ["upgrade_clicked", "store_created"])
+        self.assertEqual(batch[0]["id"], str(first.id))
+        self.assertEqual(batch[1]["meta_out"]["store_id"], "store-1")
+
+    @patch("apps.core.services.journey_events._write_batch")
+    def test_rolled_back_caller_drops_only_its_own_events(self, write_mock):
+        with self.captureOnCommitCallbacks(execute=True):
+            log_journey_event(org_id="org-1", event_name="upgrade_clicked", payload={"source": "banner"})
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    log_journey_event(org_id="org-1", event_name="store_created", payload={"store_id": "store-1"})
+                    raise RuntimeError("rollback")
+        except RuntimeError:
+            pass
+
+        self.buffer.flush()
+
+        batch = write_mock.call_args.args[0]
+        self.assertEqual([entry["event_name"] for entry in batch], ["upgrade_clicked"])
+
+    @patch("apps.core.services.journey_events._write_batch")
+    @patch("apps.core.services.journey_events._persist_now")
+    def test_unbuffered_event_is_persisted_synchronously(self, persist_mock, write_mock):
+        persist_mock.return_value = MagicMock(id="evt-1")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            event = log_journey_event(
+                org_id="org-1", event_name="store_created", payload={"store_id": "store-1"}, buffered=False
+            )
+
+        self.assertEqual(event.id, "evt-1")
+        persist_mock.assert_called_once()
+        self.assertFalse(self.buffer.has_pending())
+        write_mock.assert_not_called()
+
+    @patch("apps.core.services.journey_events._write_batch")
+    def test_failed_flush_is_spooled_and_replayed(self, write_mock):
+        import os
+
+        write_mock.side_effect = [Exception("db down"), None]
+        with self.captureOnCommitCallbacks(execute=True):
+            event = log_journey_event(org_id="org-1", event_name="upgrade_clicked", payload={"source": "banner"})
+        self.buffer.flush()
+
+        self.assertEqual(len(os.listdir(self.tmp.name)), 1)
+        self.assertEqual(self.buffer.replay_spool(), 1)
+
+        replayed = write_mock.call_args.args[0]
+        self.assertEqual(replayed[0]["id"], str(event.id))
+        self.assertEqual(replayed[0]["created_at"], event.created_at)
+        self.assertEqual(os.listdir(self.tmp.name), [])
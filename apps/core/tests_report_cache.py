@@ -0,0 +1,62 @@
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from apps.core.services import report_cache
+
+STORE_ID = "11111111-1111-1111-1111-111111111111"
+
+
+@patch("apps.core.services.report_cache._org_store_ids", return_value=[STORE_ID])
+class ReportCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.builder = MagicMock(side_effect=lambda **kwargs: {"kpis": {"total_visitors": 1}, "to": kwargs["end"].isoformat()})
+
+    def _get(self, start, end, period="7d", kind="summary"):
+        return report_cache.get_or_build_report_payload(
+            kind,
+            self.builder,
+            org_id="org-1",
+            store_id=None,
+            start=start,
+            end=end,
+            period=period,
+        )
+
+    def test_closed_window_is_served_from_cache_until_store_invalidated(self, _store_ids):
+        end = timezone.now() - timedelta(days=2)
+        start = end - timedelta(days=7)
+        with self.settings(REPORT_CACHE_ENABLED=True):
+            self._get(start, end, period="custom")
+            self._get(start, end, period="custom")
+            self.assertEqual(self.builder.call_count, 1)
+
+            report_cache.invalidate_report_cache([STORE_ID])
+            self._get(start, end, period="custom")
+        self.assertEqual(self.builder.call_count, 2)
+
+    @patch("apps.core.services.report_cache.store_ingestion_watermark")
+    def test_live_window_recomputes_only_when_watermark_moves(self, watermark_mock, _store_ids):
+        watermark_mock.return_value = f"{STORE_ID}:2026-03-01T10:00:00+00:00"
+        with self.settings(REPORT_CACHE_ENABLED=True, REPORT_CACHE_LIVE_SECONDS=60):
+            now = timezone.now()
+            self._get(now - timedelta(days=7), now)
+            later = now + timedelta(seconds=5)
+            self._get(later - timedelta(days=7), later)
+            self.assertEqual(self.builder.call_count, 1)
+
+            watermark_mock.return_value = f"{STORE_ID}:2026-03-01T10:01:00+00:00"
+            self._get(later - timedelta(days=7), later)
+        self.assertEqual(self.builder.call_count, 2)
+
+    def test_disabled_cache_always_builds(self, _store_ids):
+        end = timezone.now() - timedelta(days=2)
+        with self.settings(REPORT_CACHE_ENABLED=False):
+            self._get(end - timedelta(days=7), end)
+            self._get(end - timedelta(days=7), end)
+        self.assertEqual(self.builder.call_count, 2)
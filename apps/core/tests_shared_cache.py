@@ -0,0 +1,87 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from backend import views as backend_views
+from backend.utils import shared_cache
+
+
+class SharedCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        shared_cache.reset_stats()
+
+    def test_namespace_bump_only_changes_that_namespace(self):
+        before_report = shared_cache.versions("report", "store", ["s1", "s2"])
+        before_dir = shared_cache.versions("edge.camera_dir", "store", ["s1"])
+
+        shared_cache.bump_version("store", "s1", namespace="report")
+
+        after_report = shared_cache.versions("report", "store", ["s1", "s2"])
+        self.assertNotEqual(after_report["s1"], before_report["s1"])
+        self.assertEqual(after_report["s2"], before_report["s2"])
+        self.assertEqual(shared_cache.versions("edge.camera_dir", "store", ["s1"]), before_dir)
+
+    def test_scope_bump_invalidates_every_namespace(self):
+        report_key = shared_cache.versioned_key(
+            "report", "store", "s1", shared_cache.versions("report", "store", ["s1"])["s1"]
+        )
+        cache.set(report_key, {"ok": True}, 60)
+
+        shared_cache.bump_version("store", "s1")
+        shared_cache.bump_version("store", "s1")
+
+        fresh_key = shared_cache.versioned_key(
+            "report", "store", "s1", shared_cache.versions("report", "store", ["s1"])["s1"]
+        )
+        self.assertNotEqual(fresh_key, report_key)
+        self.assertIsNone(shared_cache.get("report", fresh_key))
+        self.assertTrue(fresh_key.startswith("report:store:s1:v3."))
+
+    def test_counts_hits_and_misses_per_namespace(self):
+        cache.set("a", 1, 60)
+        cache.set("b", None, 60)
+
+        self.assertEqual(shared_cache.get("ns1", "a"), 1)
+        self.assertIsNone(shared_cache.get("ns1", "b"))
+        self.assertEqual(shared_cache.get("ns1", "missing", "fallback"), "fallback")
+        shared_cache.get_many("ns2", ["a", "missing"])
+
+        stats = shared_cache.stats()
+        self.assertEqual(stats["ns1"], {"hits": 2, "misses": 1, "hit_rate": 0.6667})
+        self.assertEqual(stats["ns2"], {"hits": 1, "misses": 1, "hit_rate": 0.5})
+
+
+class HealthDetailsTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def _get(self, view, *, user=None, **headers):
+        request = self.factory.get("/api/health/", **headers)
+        request.user = user or AnonymousUser()
+        return json.loads(view(request).content)
+
+    def test_public_response_hides_backend_details(self):
+        payload = self._get(backend_views.cache_health)
+        self.assertEqual(payload, {"ok": True, "status": "ok"})
+
+        with patch("backend.views._db_reachable", return_value=False):
+            payload = self._get(backend_views.db_pool_health)
+        self.assertEqual(payload, {"ok": False, "status": "degraded"})
+
+    @override_settings(HEALTH_DETAILS_TOKEN="s3cret")
+    def test_details_require_staff_or_internal_token(self):
+        self.assertNotIn("key_prefix", self._get(backend_views.cache_health, HTTP_X_HEALTH_TOKEN="wrong"))
+        self.assertIn("key_prefix", self._get(backend_views.cache_health, HTTP_X_HEALTH_TOKEN="s3cret"))
+
+        staff = SimpleNamespace(is_staff=True, is_superuser=False)
+        with patch("backend.views._db_reachable", return_value=True):
+            payload = self._get(backend_views.db_pool_health, user=staff)
+        self.assertEqual(payload["status"], "ok")
+        self.assertIn("engine", payload)
+        self.assertIn("pools", payload)
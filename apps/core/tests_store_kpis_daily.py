@@ -0,0 +1,68 @@
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+
+from apps.core.management.commands import materialize_store_kpis_daily as kpis
+
+
+class MaterializeStoreKpisDailyTests(TestCase):
+    def _cursor(self, fetchall_side_effect):
+        cursor = MagicMock()
+        cursor.fetchall.side_effect = fetchall_side_effect
+        cursor_cm = MagicMock()
+        cursor_cm.__enter__.return_value = cursor
+        cursor_cm.__exit__.return_value = False
+        return cursor, cursor_cm
+
+    def test_build_windows_uses_store_timezone(self):
+        windows = kpis._build_windows(
+            [
+                {
+                    "store_id": "s1",
+                    "org_id": "o1",
+                    "timezone": "America/Sao_Paulo",
+                    "business_type": "Farmacia",
+                    "avg_hourly_labor_cost": 20,
+                }
+            ],
+            date(2026, 3, 1),
+            date(2026, 3, 2),
+        )
+        self.assertEqual(len(windows), 2)
+        self.assertEqual(windows[0]["start_utc"].isoformat(), "2026-03-01T03:00:00+00:00")
+        self.assertEqual(windows[0]["segment"], "farmacia")
+
+    def test_materialize_runs_one_query_per_source_and_single_upsert(self):
+        store_id = "11111111-1111-1111-1111-111111111111"
+        day = date(2026, 3, 1)
+        fetchall_results = [
+            [(store_id, day, 100)],  # flow_in
+            [(store_id, day, 90)],  # flow_out
+            [(store_id, day, 10, 240)],  # conversion
+            [(store_id, day, 7200, 3600)],  # idle
+            [(store_id, day, 4)],  # alerts
+            [(store_id, day, 2, 3)],  # actions
+        ]
+        cursor, cursor_cm = self._cursor(fetchall_results)
+        store_rows = [
+            {"store_id": store_id, "org_id": "o1", "timezone": "UTC", "business_type": None, "avg_hourly_labor_cost": 30},
+            {"store_id": "22222222-2222-2222-2222-222222222222", "org_id": "o1", "timezone": "UTC"},
+        ]
+
+        with patch.object(kpis, "_load_store_rows", return_value=store_rows), patch.object(
+            kpis.connection, "cursor", return_value=cursor_cm
+        ):
+            upserted = kpis.materialize_store_kpis(start_date=day, end_date=day)
+
+        self.assertEqual(upserted, 2)
+        self.assertEqual(cursor.execute.call_count, len(kpis._SOURCE_QUERIES) + 1)
+        upsert_sql, upsert_params = cursor.execute.call_args_list[-1].args
+        self.assertIn("INSERT INTO public.store_kpis_daily", upsert_sql)
+        columns = [name for name, _ in kpis._UPSERT_COLUMNS]
+        values = dict(zip(columns, upsert_params[1:]))
+        self.assertEqual(values["store_id"], [store_id, "22222222-2222-2222-2222-222222222222"])
+        self.assertEqual(values["flow_in_total"], [100, 0])
+        self.assertEqual(values["conversion_rate"], [0.1, None])
+        self.assertEqual(values["idle_cost_estimated"], [60.0, 0.0])
+        self.assertEqual(values["useful_alert_rate"], [0.5, None])
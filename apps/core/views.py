@@ -773,6 +773,7 @@ class AdminIngestionFunnelGapView(APIView):
                     "window_hours": window_hours,
                 },
                 source="app",
+                buffered=False,
             )
             if event:
                 inserted += 1
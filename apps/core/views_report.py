@@ -17,8 +17,16 @@ from rest_framework.views import APIView
 from django.db.models import Count, Q, Sum
 from apps.core.models import Store, DetectionEvent, Organization, PosTransactionEvent, JourneyEvent, Subscription
 from apps.edge.models import EdgeUpdateEvent
+from apps.edge.metrics_rollups import (
+    aggregate_metrics,
+    average,
+    conversion_rate_pct,
+    merge_aggregates,
+    regroup_aggregates,
+)
 from apps.copilot.models import ActionOutcome
 from apps.stores.services.user_orgs import get_user_org_ids
+from apps.core.services.report_cache import get_or_build_report_payload
 
 
 def _get_org_timezone(org_id: str | None):
@@ -94,167 +102,42 @@ def _build_report_payload(*, org_id: str, store_id: str | None, start, end):
 
     if store_ids:
         with connection.cursor() as cursor:
-            cursor.execute(
-                """
-                SELECT date_trunc('day', ts_bucket) AS bucket,
-                       COALESCE(SUM(footfall), 0) AS footfall,
-                       COALESCE(AVG(NULLIF(dwell_seconds_avg, 0)), 0) AS dwell_avg
-                FROM public.traffic_metrics
-                WHERE store_id = ANY(%s)
-                  AND ts_bucket >= %s
-                  AND ts_bucket < %s
-                  AND (camera_role = 'entrada' OR camera_role IS NULL)
-                  AND (ownership = 'primary' OR ownership IS NULL)
-                GROUP BY 1
-                ORDER BY 1 ASC
-                """,
-                [store_ids, start, end],
-            )
-            for row in cursor.fetchall():
+            # Granularidade horária atende o gráfico por hora; os dias saem do reagrupamento.
+            hourly = aggregate_metrics(cursor, store_ids=store_ids, start=start, end=end, bucket="hour")
+
+        daily = regroup_aggregates(hourly, "day")
+        for bucket_start in sorted(daily):
+            agg = daily[bucket_start]
+            if agg["traffic_rows"]:
                 traffic_series.append(
                     {
-                        "ts_bucket": row[0].isoformat(),
-                        "footfall": int(row[1] or 0),
-                        "dwell_seconds_avg": int(row[2] or 0),
+                        "ts_bucket": bucket_start.isoformat(),
+                        "footfall": int(agg["footfall"]),
+                        "dwell_seconds_avg": int(average(agg, "dwell_sum", "dwell_count")),
                     }
                 )
-
-            cursor.execute(
-                """
-                WITH traffic AS (
-                    SELECT date_trunc('day', ts_bucket) AS bucket,
-                           COALESCE(SUM(footfall), 0) AS footfall
-                    FROM public.traffic_metrics
-                    WHERE store_id = ANY(%s)
-                      AND ts_bucket >= %s
-                      AND ts_bucket < %s
-                      AND (camera_role = 'entrada' OR camera_role IS NULL)
-                      AND (ownership = 'primary' OR ownership IS NULL)
-                    GROUP BY 1
-                ),
-                conversion AS (
-                    SELECT date_trunc('day', ts_bucket) AS bucket,
-                           COALESCE(AVG(queue_avg_seconds), 0) AS queue_avg_seconds,
-                           COALESCE(SUM(checkout_events), 0) AS checkout_events
-                    FROM public.conversion_metrics
-                    WHERE store_id = ANY(%s)
-                      AND ts_bucket >= %s
-                      AND ts_bucket < %s
-                      AND (camera_role = 'balcao' OR camera_role IS NULL)
-                      AND (ownership = 'primary' OR ownership IS NULL)
-                    GROUP BY 1
-                )
-                SELECT COALESCE(conversion.bucket, traffic.bucket) AS bucket,
-                       COALESCE(conversion.queue_avg_seconds, 0) AS queue_avg_seconds,
-                       CASE
-                           WHEN COALESCE(traffic.footfall, 0) > 0
-                           THEN ROUND((COALESCE(conversion.checkout_events, 0)::numeric / traffic.footfall::numeric) * 100, 2)
-                           ELSE 0
-                       END AS conversion_rate
-                FROM conversion
-                FULL OUTER JOIN traffic ON traffic.bucket = conversion.bucket
-                ORDER BY 1 ASC
-                """,
-                [store_ids, start, end, store_ids, start, end],
-            )
-            for row in cursor.fetchall():
+            if agg["traffic_rows"] or agg["conversion_rows"]:
                 conversion_series.append(
                     {
-                        "ts_bucket": row[0].isoformat(),
-                        "queue_avg_seconds": int(row[1] or 0),
-                        "conversion_rate": float(row[2] or 0),
+                        "ts_bucket": bucket_start.isoformat(),
+                        "queue_avg_seconds": int(average(agg, "queue_sum", "queue_count")),
+                        "conversion_rate": conversion_rate_pct(agg),
                     }
                 )
 
-            cursor.execute(
-                """
-                SELECT COALESCE(SUM(footfall), 0) AS total_visitors,
-                       COALESCE(AVG(NULLIF(dwell_seconds_avg, 0)), 0) AS avg_dwell_seconds
-                FROM public.traffic_metrics
-                WHERE store_id = ANY(%s)
-                  AND ts_bucket >= %s
-                  AND ts_bucket < %s
-                  AND (camera_role = 'entrada' OR camera_role IS NULL)
-                  AND (ownership = 'primary' OR ownership IS NULL)
-                """,
-                [store_ids, start, end],
-            )
-            row = cursor.fetchone()
-            if row:
-                totals["total_visitors"] = int(row[0] or 0)
-                totals["avg_dwell_seconds"] = int(row[1] or 0)
-
-            cursor.execute(
-                """
-                WITH traffic AS (
-                    SELECT store_id, ts_bucket,
-                           COALESCE(SUM(footfall), 0) AS footfall
-                    FROM public.traffic_metrics
-                    WHERE store_id = ANY(%s)
-                      AND ts_bucket >= %s
-                      AND ts_bucket < %s
-                      AND (camera_role = 'entrada' OR camera_role IS NULL)
-                      AND (ownership = 'primary' OR ownership IS NULL)
-                    GROUP BY 1, 2
-                ),
-                conversion AS (
-                    SELECT store_id, ts_bucket,
-                           COALESCE(AVG(queue_avg_seconds), 0) AS queue_avg_seconds,
-                           COALESCE(SUM(checkout_events), 0) AS checkout_events
-                    FROM public.conversion_metrics
-                    WHERE store_id = ANY(%s)
-                      AND ts_bucket >= %s
-                      AND ts_bucket < %s
-                      AND (camera_role = 'balcao' OR camera_role IS NULL)
-                      AND (ownership = 'primary' OR ownership IS NULL)
-                    GROUP BY 1, 2
-                )
-                SELECT COALESCE(AVG(conversion.queue_avg_seconds), 0) AS avg_queue_seconds,
-                       COALESCE(
-                           AVG(
-                               CASE
-                                   WHEN COALESCE(traffic.footfall, 0) > 0
-                                   THEN (COALESCE(conversion.checkout_events, 0)::numeric / traffic.footfall::numeric) * 100
-                                   ELSE 0
-                               END
-                           ),
-                           0
-                       ) AS avg_conversion_rate
-                FROM conversion
-                LEFT JOIN traffic
-                  ON traffic.store_id = conversion.store_id
-                 AND traffic.ts_bucket = conversion.ts_bucket
-                """,
-                [store_ids, start, end, store_ids, start, end],
-            )
-            row = cursor.fetchone()
-            if row:
-                totals["avg_queue_seconds"] = int(row[0] or 0)
-                totals["avg_conversion_rate"] = float(row[1] or 0)
-
-        with connection.cursor() as cursor:
-            cursor.execute(
-                """
-                SELECT date_part('hour', ts_bucket)::int AS hour,
-                       COALESCE(SUM(footfall), 0) AS footfall
-                FROM public.traffic_metrics
-                WHERE store_id = ANY(%s)
-                  AND ts_bucket >= %s
-                  AND ts_bucket < %s
-                  AND (camera_role = 'entrada' OR camera_role IS NULL)
-                  AND (ownership = 'primary' OR ownership IS NULL)
-                GROUP BY 1
-                ORDER BY 1 ASC
-                """,
-                [store_ids, start, end],
-            )
-            for row in cursor.fetchall():
-                chart_footfall_by_hour.append(
-                    {
-                        "hour": int(row[0]),
-                        "footfall": int(row[1] or 0),
-                    }
-                )
+        totals_agg = merge_aggregates(hourly.values())
+        totals["total_visitors"] = int(totals_agg["footfall"])
+        totals["avg_dwell_seconds"] = int(average(totals_agg, "dwell_sum", "dwell_count"))
+        totals["avg_queue_seconds"] = int(average(totals_agg, "minute_queue_avg_sum", "minute_buckets"))
+        totals["avg_conversion_rate"] = float(average(totals_agg, "minute_conversion_rate_sum", "minute_buckets"))
+
+        footfall_by_hour = defaultdict(int)
+        for bucket_start, agg in hourly.items():
+            if agg["traffic_rows"]:
+                footfall_by_hour[bucket_start.hour] += int(agg["footfall"])
+        chart_footfall_by_hour = [
+            {"hour": hour, "footfall": footfall} for hour, footfall in sorted(footfall_by_hour.items())
+        ]
 
     pos_qs = PosTransactionEvent.objects.filter(occurred_at__gte=start, occurred_at__lt=end)
     if store_ids:
@@ -1462,11 +1345,14 @@ class ReportSummaryView(APIView):
         tz = _get_org_timezone(org_id)
         start, end, period = _parse_date_range(request, tz)
 
-        payload = _build_report_payload(
+        payload = get_or_build_report_payload(
+            "summary",
+            _build_report_payload,
             org_id=org_id,
             store_id=store_id,
             start=start,
             end=end,
+            period=period,
         )
         payload["period"] = period
         return Response(payload)
@@ -1543,11 +1429,14 @@ class ReportExportView(APIView):
         fmt = (request.query_params.get("format") or "csv").lower()
         tz = _get_org_timezone(org_id)
         start, end, period = _parse_date_range(request, tz)
-        payload = _build_report_payload(
+        payload = get_or_build_report_payload(
+            "summary",
+            _build_report_payload,
             org_id=org_id,
             store_id=store_id,
             start=start,
             end=end,
+            period=period,
         )
         payload["period"] = period
 
@@ -1700,11 +1589,14 @@ class ReportImpactView(APIView):
         store_id = request.query_params.get("store_id")
         tz = _get_org_timezone(org_id)
         start, end, period = _parse_date_range(request, tz)
-        payload = _build_report_impact_payload(
+        payload = get_or_build_report_payload(
+            "impact",
+            _build_report_impact_payload,
             org_id=org_id,
             store_id=store_id,
             start=start,
             end=end,
+            period=period,
         )
         payload["period"] = period
         return Response(payload)
@@ -3,11 +3,15 @@ import logging
 from typing import Optional
 from dataclasses import dataclass
 
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from rest_framework.authentication import get_authorization_header
 from apps.edge.models import EdgeToken
 from apps.core.models import Store
 from apps.accounts.auth_supabase import SupabaseJWTAuthentication
+from backend.utils import shared_cache
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +53,75 @@ def _extract_store_token(request) -> Optional[str]:
     return None
 
 
+def hash_edge_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _edge_token_cache_key(token_hash: str) -> str:
+    return f"edge:token:{token_hash}"
+
+
+def _edge_token_touch_key(token_hash: str) -> str:
+    return f"edge:token_touch:{token_hash}"
+
+
+def resolve_edge_token(token_hash: str) -> Optional[dict]:
+    """
+    Resolve um token_hash ativo para {"id", "store_id"} com cache curto.
+    Hashes inválidos também são cacheados (negative cache) para conter agentes
+    mal configurados martelando o banco.
+    """
+    cache_key = _edge_token_cache_key(token_hash)
+    cached = shared_cache.get("edge.token", cache_key)
+    if isinstance(cached, dict):
+        return cached if cached.get("store_id") else None
+
+    row = (
+        EdgeToken.objects.filter(token_hash=token_hash, active=True)
+        .values("id", "store_id")
+        .first()
+    )
+    if not row:
+        negative_ttl = int(getattr(settings, "EDGE_TOKEN_NEGATIVE_CACHE_SECONDS", 10) or 0)
+        if negative_ttl > 0:
+            cache.set(cache_key, {"store_id": None}, negative_ttl)
+        return None
+
+    resolved = {"id": row["id"], "store_id": str(row["store_id"])}
+    ttl = int(getattr(settings, "EDGE_TOKEN_CACHE_SECONDS", 30) or 0)
+    if ttl > 0:
+        cache.set(cache_key, resolved, ttl)
+    return resolved
+
+
+def invalidate_edge_token_cache(*token_hashes: str) -> None:
+    keys = [_edge_token_cache_key(token_hash) for token_hash in token_hashes if token_hash]
+    if keys:
+        cache.delete_many(keys)
+
+
+def touch_edge_token(token_hash: str, token_id) -> None:
+    # last_used_at é informativo: grava no máximo uma vez por intervalo por token.
+    interval = int(getattr(settings, "EDGE_TOKEN_LAST_USED_INTERVAL_SECONDS", 60) or 0)
+    if interval > 0 and not cache.add(_edge_token_touch_key(token_hash), True, interval):
+        return
+    try:
+        EdgeToken.objects.filter(id=token_id).update(last_used_at=timezone.now())
+    except Exception:
+        logger.exception("[EDGE-AUTH] last_used_at update failed token_id=%s", token_id)
+
+
+def validate_edge_token_for_store(store_id, provided: str) -> bool:
+    if not provided or not store_id:
+        return False
+    token_hash = hash_edge_token(provided)
+    resolved = resolve_edge_token(token_hash)
+    if not resolved or resolved["store_id"] != str(store_id):
+        return False
+    touch_edge_token(token_hash, resolved["id"])
+    return True
+
+
 @dataclass
 class EdgeTokenAuthResult:
     ok: bool
@@ -85,11 +158,8 @@ def authenticate_edge_token(request, requested_store_id: Optional[str] = None) -
             detail="Edge token inválido.",
         )
 
-    token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
-    edge_token = EdgeToken.objects.filter(
-        token_hash=token_hash,
-        active=True,
-    ).first()
+    token_hash = hash_edge_token(token)
+    edge_token = resolve_edge_token(token_hash)
     if not edge_token:
         auth_header = request.headers.get("Authorization") or ""
         is_probably_user_jwt = auth_header.lower().startswith("bearer ") and token.count(".") >= 2
@@ -102,7 +172,7 @@ def authenticate_edge_token(request, requested_store_id: Optional[str] = None) -
             detail="Edge token inválido.",
         )
 
-    token_store_id = str(edge_token.store_id)
+    token_store_id = edge_token["store_id"]
     if requested_store_id and str(requested_store_id) != token_store_id:
         logger.warning(
             "[EDGE-AUTH] store mismatch requested=%s token_store=%s token=%s",
@@ -118,9 +188,9 @@ def authenticate_edge_token(request, requested_store_id: Optional[str] = None) -
             store_id=token_store_id,
         )
 
-    EdgeToken.objects.filter(id=edge_token.id).update(last_used_at=timezone.now())
+    touch_edge_token(token_hash, edge_token["id"])
     request.edge_store_id = token_store_id
-    request.store = Store.objects.filter(id=token_store_id).first()
+    request.store = SimpleLazyObject(lambda: Store.objects.filter(id=token_store_id).first())
     return EdgeTokenAuthResult(ok=True, status_code=200, store_id=token_store_id)
 
 
@@ -0,0 +1,121 @@
+import logging
+from typing import Dict, Iterable, Optional
+from uuid import UUID
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.models import Camera
+from backend.utils import shared_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _is_uuid(value) -> bool:
+    try:
+        UUID(str(value))
+        return True
+    except Exception:
+        return False
+
+
+def _empty_directory() -> Dict[str, dict]:
+    return {"external_id": {}, "id": {}, "name": {}}
+
+
+def add_camera_to_directory(directory: Dict[str, dict], cam_id, external_id, name) -> None:
+    if external_id:
+        directory["external_id"].setdefault(str(external_id), cam_id)
+    directory["id"].setdefault(str(cam_id), cam_id)
+    if name:
+        directory["name"].setdefault(str(name), cam_id)
+
+
+def build_camera_directories(store_ids: Iterable) -> Dict[str, Dict[str, dict]]:
+    """
+    Carrega as câmeras das stores em uma única query e indexa por
+    external_id, id e name (mesma precedência do ingest unitário).
+    """
+    store_ids = [str(store_id) for store_id in store_ids if store_id]
+    directories = {store_id: _empty_directory() for store_id in store_ids}
+    if not store_ids:
+        return directories
+    rows = Camera.objects.filter(store_id__in=store_ids).values_list("id", "store_id", "external_id", "name")
+    for cam_id, cam_store_id, external_id, name in rows:
+        directory = directories.setdefault(str(cam_store_id), _empty_directory())
+        add_camera_to_directory(directory, cam_id, external_id, name)
+    return directories
+
+
+def resolve_camera_in_directory(directory: Optional[dict], camera_id) -> Optional[object]:
+    if not directory or not camera_id:
+        return None
+    camera_id = str(camera_id)
+    found = (directory.get("external_id") or {}).get(camera_id)
+    if found is None and _is_uuid(camera_id):
+        found = (directory.get("id") or {}).get(str(UUID(camera_id)))
+    if found is None:
+        found = (directory.get("name") or {}).get(camera_id)
+    return found
+
+
+def _cache_seconds() -> int:
+    return int(getattr(settings, "EDGE_CAMERA_DIRECTORY_CACHE_SECONDS", 300) or 0)
+
+
+_NAMESPACE = "edge.camera_dir"
+
+
+def _directory_keys(store_ids: Iterable) -> Dict[str, str]:
+    versions = shared_cache.versions(_NAMESPACE, "store", store_ids)
+    return {
+        store_id: shared_cache.versioned_key(_NAMESPACE, "store", store_id, version)
+        for store_id, version in versions.items()
+    }
+
+
+def invalidate_camera_directory(store_id) -> None:
+    """
+    Invalida o diretório da store trocando a versão; entradas antigas expiram pelo TTL.
+    """
+    shared_cache.bump_version("store", store_id, namespace=_NAMESPACE)
+
+
+def get_camera_directories(store_ids: Iterable) -> Dict[str, Dict[str, dict]]:
+    store_ids = {str(store_id) for store_id in store_ids if store_id}
+    ttl = _cache_seconds()
+    if ttl <= 0:
+        return build_camera_directories(store_ids)
+
+    keys = _directory_keys(store_ids)
+    cached = shared_cache.get_many(_NAMESPACE, list(keys.values()))
+    directories = {}
+    missing = []
+    for store_id, key in keys.items():
+        if key in cached:
+            directories[store_id] = cached[key]
+        else:
+            missing.append(store_id)
+    if missing:
+        loaded = build_camera_directories(missing)
+        cache.set_many({keys[store_id]: loaded[store_id] for store_id in missing}, ttl)
+        directories.update(loaded)
+    return directories
+
+
+def resolve_store_camera(store_id, camera_id) -> Optional[object]:
+    """
+    Resolve o id da câmera via diretório em cache. Em cache miss do camera_id,
+    recarrega o diretório uma vez (câmeras criadas fora dos pontos de invalidação).
+    """
+    if not store_id or not camera_id:
+        return None
+    store_id = str(store_id)
+    directory = get_camera_directories([store_id]).get(store_id)
+    found = resolve_camera_in_directory(directory, camera_id)
+    if found is not None or _cache_seconds() <= 0:
+        return found
+    fresh = build_camera_directories([store_id])[store_id]
+    if fresh != directory:
+        cache.set(_directory_keys([store_id])[store_id], fresh, _cache_seconds())
+    return resolve_camera_in_directory(fresh, camera_id)
@@ -0,0 +1,243 @@
+"""
+Status de lojas e câmeras da frota inteira em poucas consultas agrupadas.
+
+Avaliador único de saúde do edge: status_tick e health_alerts_tick usam
+evaluate_fleet; o StoreEdgeStatusView usa as mesmas regras
+(classify_camera_health / classify_store_status) e o mesmo DISTINCT ON de
+último health por câmera (_get_latest_camera_health_map). Câmeras, health,
+heartbeat do edge e último status emitido são carregados em lote, em vez de N
+consultas por loja/câmera.
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.exceptions import FieldError
+from django.db import connection
+from django.utils import timezone
+
+from apps.core.models import Camera, Store
+from apps.stores.views_edge_status import (
+    DEGRADED_SEC,
+    _get_latest_camera_health_map,
+    _health_recent_threshold,
+    classify_age,
+    classify_camera_health,
+    classify_store_status,
+)
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_EVENT_NAMES = ("edge_heartbeat", "camera_heartbeat", "edge_camera_heartbeat")
+# Heartbeat mais antigo que isso classifica como offline de qualquer forma.
+HEARTBEAT_LOOKBACK = timedelta(seconds=DEGRADED_SEC * 4)
+
+
+@dataclass
+class CameraStatus:
+    camera: Camera
+    status: str
+    reason: str
+    age_seconds: Optional[int]
+    last_ts: Optional[datetime]
+
+
+@dataclass
+class StoreStatus:
+    store: Store
+    status: str
+    reason: str
+    age_seconds: Optional[int]
+    last_comm_at: Optional[datetime]
+    cameras: List[CameraStatus] = field(default_factory=list)
+
+    @property
+    def cameras_online(self) -> int:
+        return sum(1 for cam in self.cameras if cam.status == "online")
+
+    def as_snapshot(self) -> dict:
+        """Subconjunto do payload do StoreEdgeStatusView usado pelos emissores de evento."""
+        return {
+            "store_id": str(self.store.id),
+            "store_status": self.status,
+            "store_status_reason": self.reason,
+            "store_status_age_seconds": self.age_seconds,
+            "last_heartbeat": self.last_comm_at.isoformat() if self.last_comm_at else None,
+            "cameras_total": len(self.cameras),
+            "cameras_online": self.cameras_online,
+        }
+
+
+def _load_active_cameras(store_ids: List[str]) -> Dict[str, List[Camera]]:
+    fields = ("id", "store", "name", "external_id", "last_seen_at")
+    try:
+        qs = Camera.objects.filter(store_id__in=store_ids, active=True)
+    except FieldError:
+        qs = Camera.objects.filter(store_id__in=store_ids)
+    by_store: Dict[str, List[Camera]] = {}
+    for camera in qs.only(*fields).order_by("store_id", "name"):
+        by_store.setdefault(str(camera.store_id), []).append(camera)
+    return by_store
+
+
+def load_latest_health(camera_ids: List[str]) -> Dict[str, Tuple[Optional[datetime], Optional[str]]]:
+    """Último (checked_at, status) por câmera."""
+    return {
+        camera_id: (getattr(log, "checked_at", None), getattr(log, "status", None))
+        for camera_id, log in _get_latest_camera_health_map(camera_ids).items()
+    }
+
+
+def load_edge_heartbeats(store_ids: List[str], *, since: datetime) -> Dict[str, datetime]:
+    """Último heartbeat do edge (event_receipts.ts) por loja, a partir de `since`."""
+    if not store_ids or connection.vendor != "postgresql":
+        return {}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT DISTINCT ON (sid) sid, ts
+                FROM (
+                    SELECT
+                        COALESCE(meta->>'store_id', raw->'data'->>'store_id', raw->>'store_id') AS sid,
+                        ts,
+                        received_at
+                    FROM public.event_receipts
+                    WHERE source = 'edge'
+                      AND event_name = ANY(%s)
+                      AND received_at >= %s
+                ) AS hb
+                WHERE sid = ANY(%s)
+                ORDER BY sid, ts DESC, received_at DESC NULLS LAST
+                """,
+                [list(HEARTBEAT_EVENT_NAMES), since, store_ids],
+            )
+            rows = cursor.fetchall()
+    except Exception:
+        logger.exception("[EDGE_STATUS] fleet heartbeat lookup failed")
+        return {}
+    return {row[0]: row[1] for row in rows if isinstance(row[1], datetime)}
+
+
+def load_last_emitted_statuses(store_ids: Iterable[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Último current_status emitido por loja e por câmera (store_status_changed /
+    camera_status_changed), em uma consulta. Retorna (por_loja, por_câmera).
+    """
+    ids = [str(store_id) for store_id in store_ids]
+    if not ids:
+        return {}, {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT DISTINCT ON (event_name, entity_id) event_name, entity_id, current_status
+            FROM (
+                SELECT
+                    event_name,
+                    CASE
+                        WHEN event_name = 'store_status_changed' THEN raw->'data'->>'store_id'
+                        ELSE raw->'data'->>'camera_id'
+                    END AS entity_id,
+                    raw->'data'->>'current_status' AS current_status,
+                    received_at
+                FROM public.event_receipts
+                WHERE event_name IN ('store_status_changed', 'camera_status_changed')
+                  AND raw->'data'->>'store_id' = ANY(%s)
+            ) AS emitted
+            WHERE entity_id IS NOT NULL
+            ORDER BY event_name, entity_id, received_at DESC
+            """,
+            [ids],
+        )
+        rows = cursor.fetchall()
+    stores: Dict[str, str] = {}
+    cameras: Dict[str, str] = {}
+    for event_name, entity_id, current_status in rows:
+        target = stores if event_name == "store_status_changed" else cameras
+        if current_status:
+            target[str(entity_id)] = current_status
+    return stores, cameras
+
+
+def evaluate_fleet(
+    store_ids: Optional[Iterable] = None,
+    *,
+    stores: Optional[Iterable[Store]] = None,
+    now: Optional[datetime] = None,
+) -> List[StoreStatus]:
+    """
+    Avalia as lojas informadas (instâncias em `stores`, ou por `store_ids`;
+    sem nenhum dos dois, todas). Usado por status_tick e health_alerts_tick.
+    """
+    now = now or timezone.now()
+    recent_threshold = _health_recent_threshold(now)
+
+    if stores is None:
+        stores_qs = Store.objects.only("id", "org", "name", "last_seen_at")
+        if store_ids is not None:
+            stores_qs = stores_qs.filter(id__in=list(store_ids))
+        stores = stores_qs
+    stores = list(stores)
+    ids = [str(store.id) for store in stores]
+
+    cameras_by_store = _load_active_cameras(ids)
+    camera_ids = [str(cam.id) for cams in cameras_by_store.values() for cam in cams]
+    latest_health = load_latest_health(camera_ids)
+    heartbeats = load_edge_heartbeats(ids, since=now - HEARTBEAT_LOOKBACK)
+
+    results = []
+    for store in stores:
+        camera_statuses = []
+        camera_age_seconds = []
+        comm_candidates = [store.last_seen_at, heartbeats.get(str(store.id))]
+        for camera in cameras_by_store.get(str(store.id), []):
+            log_ts, log_status = latest_health.get(str(camera.id), (None, None))
+            status, age_seconds, reason, last_ts = classify_camera_health(
+                log_ts=log_ts,
+                log_status=log_status,
+                last_seen_at=camera.last_seen_at,
+                now=now,
+                recent_threshold=recent_threshold,
+            )
+            comm_candidates.extend([camera.last_seen_at, log_ts])
+            if age_seconds is not None:
+                camera_age_seconds.append(age_seconds)
+            camera_statuses.append(CameraStatus(camera, status, reason, age_seconds, last_ts))
+
+        comm = [dt for dt in comm_candidates if isinstance(dt, datetime)]
+        last_comm_at = max(comm) if comm else None
+        comm_status, comm_age_seconds, comm_reason = classify_age(last_comm_at)
+        cameras_online = sum(1 for cam in camera_statuses if cam.status == "online")
+        store_status, reason, age_seconds, _pipeline = classify_store_status(
+            cameras_total=len(camera_statuses),
+            cameras_online=cameras_online,
+            camera_age_seconds=camera_age_seconds,
+            comm_status=comm_status,
+            comm_age_seconds=comm_age_seconds,
+            comm_reason=comm_reason,
+        )
+        results.append(StoreStatus(store, store_status, reason, age_seconds, last_comm_at, camera_statuses))
+    return results
+
+
+def detect_transitions(
+    statuses: List[StoreStatus],
+    store_prev: Dict[str, str],
+    camera_prev: Dict[str, str],
+) -> Tuple[List[Tuple[StoreStatus, str]], List[Tuple[StoreStatus, CameraStatus, str]]]:
+    """
+    Só entidades com status anterior emitido e diferente do atual (mesma regra
+    do tick original: o primeiro status observado não gera evento).
+    """
+    store_changes = []
+    camera_changes = []
+    for store_status in statuses:
+        prev = store_prev.get(str(store_status.store.id))
+        if prev and store_status.status and prev != store_status.status:
+            store_changes.append((store_status, prev))
+        for camera_status in store_status.cameras:
+            prev_cam = camera_prev.get(str(camera_status.camera.id))
+            if prev_cam and camera_status.status and prev_cam != camera_status.status:
+                camera_changes.append((store_status, camera_status, prev_cam))
+    return store_changes, camera_changes
@@ -0,0 +1,177 @@
+"""
+Pub/sub em processo para o live monitor das lojas.
+
+A ingestão publica eventos (vision_atomic_events novos, mudanças de status de
+câmera, DetectionEvents abertos) por store; cada assinante tem uma fila
+limitada. Publicar nunca bloqueia: se a fila de um assinante enche, ele é
+descartado (o cliente reconecta e recebe um snapshot novo).
+
+Escopo: um processo. Workers separados (ex.: projection_worker no modo async)
+não alcançam assinantes de outro processo. Com WEB_CONCURRENCY > 1 o cliente
+só recebe o que foi ingerido pelo mesmo worker gunicorn em que o stream caiu:
+os demais eventos se perdem até o próximo snapshot (reconexão).
+
+Cada stream SSE segura uma thread do worker (gthread) enquanto dura, por isso
+o total de assinantes no processo é limitado por LIVE_FEED_MAX_STREAMS, abaixo
+de GUNICORN_THREADS, para sobrar thread para as demais requisições.
+"""
+import itertools
+import logging
+import queue
+import threading
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class LiveFeedSubscription:
+    def __init__(self, store_id: str, maxsize: int):
+        self.id: Optional[int] = None
+        self.store_id = store_id
+        self.queue: "queue.Queue[dict]" = queue.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    def get(self, timeout: float) -> Optional[dict]:
+        """Próximo evento, ou None após `timeout` segundos sem eventos."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LiveFeedLimitError(OverflowError):
+    def __init__(self, scope: str):
+        super().__init__(f"live_feed_{scope}_limit")
+        self.scope = scope
+
+
+class LiveFeedBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Dict[int, LiveFeedSubscription]] = {}
+        self._total = 0
+        self._ids = itertools.count(1)
+        self._seq = itertools.count(1)
+
+    def _limit_error(self, store_id: str) -> Optional[LiveFeedLimitError]:
+        # Chamar com self._lock.
+        max_subscribers = int(getattr(settings, "LIVE_FEED_MAX_SUBSCRIBERS_PER_STORE", 50) or 0)
+        max_streams = int(getattr(settings, "LIVE_FEED_MAX_STREAMS", 2) or 0)
+        if max_streams and self._total >= max_streams:
+            return LiveFeedLimitError("process")
+        if max_subscribers and len(self._subscribers.get(store_id) or {}) >= max_subscribers:
+            return LiveFeedLimitError("subscriber")
+        return None
+
+    def check_capacity(self, store_id: str) -> None:
+        """Levanta LiveFeedLimitError se um subscribe agora seria recusado (não reserva vaga)."""
+        with self._lock:
+            error = self._limit_error(str(store_id))
+        if error is not None:
+            raise error
+
+    def subscribe(self, store_id: str, maxsize: Optional[int] = None) -> LiveFeedSubscription:
+        if maxsize is None:
+            maxsize = int(getattr(settings, "LIVE_FEED_QUEUE_SIZE", 256) or 256)
+        store_id = str(store_id)
+        subscription = LiveFeedSubscription(store_id, max(1, maxsize))
+        with self._lock:
+            error = self._limit_error(store_id)
+            if error is not None:
+                raise error
+            store_subs = self._subscribers.get(store_id) or {}
+            subscription.id = next(self._ids)
+            self._subscribers.setdefault(store_id, store_subs)[subscription.id] = subscription
+            self._total += 1
+        return subscription
+
+    def unsubscribe(self, subscription: LiveFeedSubscription) -> None:
+        with self._lock:
+            store_subs = self._subscribers.get(subscription.store_id)
+            if not store_subs:
+                return
+            if store_subs.pop(subscription.id, None) is not None:
+                self._total -= 1
+            if not store_subs:
+                self._subscribers.pop(subscription.store_id, None)
+
+    def subscriber_count(self, store_id: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(str(store_id)) or {})
+
+    def total_count(self) -> int:
+        with self._lock:
+            return self._total
+
+    def publish(self, store_id: str, event_type: str, data: dict) -> int:
+        """Entrega a todos os assinantes da store; retorna quantos receberam."""
+        store_id = str(store_id)
+        with self._lock:
+            subscribers = list((self._subscribers.get(store_id) or {}).values())
+        if not subscribers:
+            return 0
+        event = {
+            "id": next(self._seq),
+            "type": event_type,
+            "store_id": store_id,
+            "published_at": timezone.now().isoformat(),
+            "data": data,
+        }
+        delivered = 0
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+                delivered += 1
+            except queue.Full:
+                # Consumidor lento: descarta em vez de segurar a ingestão.
+                subscription.dropped = True
+                self.unsubscribe(subscription)
+                logger.warning("[EDGE] live feed dropped slow subscriber store_id=%s", store_id)
+        return delivered
+
+
+broker = LiveFeedBroker()
+
+
+def publish_store_event(store_id, event_type: str, data: dict) -> None:
+    """
+    Publica após o commit da transação corrente (imediato fora de atomic).
+    Falhas nunca propagam para o caminho de ingestão.
+    """
+    if not store_id or not getattr(settings, "LIVE_FEED_ENABLED", True):
+        return
+
+    def _publish():
+        try:
+            broker.publish(str(store_id), event_type, data)
+        except Exception:
+            logger.exception("[EDGE] live feed publish failed store_id=%s type=%s", store_id, event_type)
+
+    try:
+        transaction.on_commit(_publish)
+    except Exception:
+        logger.exception("[EDGE] live feed on_commit failed store_id=%s", store_id)
+
+
+def publish_detection_event(event) -> None:
+    if getattr(event, "status", "open") != "open":
+        return
+    occurred_at = getattr(event, "occurred_at", None)
+    publish_store_event(
+        getattr(event, "store_id", None),
+        "detection_event",
+        {
+            "id": str(event.id),
+            "type": event.type,
+            "severity": event.severity,
+            "status": event.status,
+            "title": event.title,
+            "camera_id": str(event.camera_id) if getattr(event, "camera_id", None) else None,
+            "zone_id": str(event.zone_id) if getattr(event, "zone_id", None) else None,
+            "occurred_at": occurred_at.isoformat() if hasattr(occurred_at, "isoformat") else occurred_at,
+        },
+    )
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connection, connections
+
+from backend.db.pool import pool_stats
+
+MODES = ("none", "persistent", "pool")
+
+# Leituras pontuais equivalentes às do caminho de ingestão (somente leitura).
+_INGEST_QUERIES = (
+    "SELECT event_id FROM public.event_receipts WHERE event_id = %s",
+    "SELECT id, org_id FROM public.stores WHERE id = %s::uuid",
+    "SELECT id FROM public.cameras WHERE store_id = %s::uuid LIMIT 1",
+)
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _simulate_request(queries_per_request: int) -> float:
+    # Mesmos sinais de um request real: close_old_connections decide entre
+    # fechar, manter (CONN_MAX_AGE) ou devolver ao pool.
+    request_started.send(sender=None)
+    started = time.perf_counter()
+    try:
+        with connection.cursor() as cursor:
+            for idx in range(queries_per_request):
+                cursor.execute(_INGEST_QUERIES[idx % len(_INGEST_QUERIES)], [str(uuid.uuid4())])
+                cursor.fetchall()
+        return (time.perf_counter() - started) * 1000
+    finally:
+        request_finished.send(sender=None)
+
+
+def _run_worker(requests: int, queries_per_request: int) -> list[float]:
+    try:
+        return [_simulate_request(queries_per_request) for _ in range(requests)]
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a latência (p50/p95/p99) de requests simulados do caminho de ingestão "
+        "no modo de conexão atual (DB_POOL_MODE) ou compara os modos com --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=300, help="Total de requests simulados (default: 300).")
+        parser.add_argument("--threads", type=int, default=4, help="Threads concorrentes (default: 4).")
+        parser.add_argument("--queries", type=int, default=3, help="Queries por request (default: 3).")
+        parser.add_argument("--warmup", type=int, default=10, help="Requests de aquecimento descartados (default: 10).")
+        parser.add_argument("--compare", action="store_true", help="Roda none/persistent/pool em subprocessos.")
+        parser.add_argument("--json", action="store_true", help="Saída em JSON (uma linha).")
+
+    def handle(self, *args, **options):
+        if options.get("compare"):
+            return self._compare(options)
+        if connection.vendor != "postgresql":
+            raise CommandError("db_pool_benchmark requer Postgres (DATABASE_URL/DB_*).")
+
+        total = max(1, int(options["requests"]))
+        threads = max(1, int(options["threads"]))
+        queries = max(1, int(options["queries"]))
+        warmup = max(0, int(options["warmup"]))
+
+        if warmup:
+            _run_worker(warmup, queries)
+
+        per_thread = [total // threads + (1 if idx < total % threads else 0) for idx in range(threads)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = [executor.submit(_run_worker, count, queries) for count in per_thread if count]
+            latencies = sorted(value for future in futures for value in future.result())
+        elapsed = time.perf_counter() - started
+
+        result = {
+            "mode": getattr(settings, "DB_POOL_MODE", "none"),
+            "requests": len(latencies),
+            "threads": threads,
+            "queries_per_request": queries,
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+            "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+            "pools": pool_stats(),
+        }
+        if options.get("json"):
+            self.stdout.write(json.dumps(result))
+            return
+        self.stdout.write(
+            f"[DB] mode={result['mode']} requests={result['requests']} threads={threads} "
+            f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms "
+            f"max={result['max_ms']}ms rps={result['throughput_rps']}"
+        )
+        for alias, stats in result["pools"].items():
+            self.stdout.write(f"[DB] pool alias={alias} {json.dumps(stats)}")
+        self.stdout.write(self.style.SUCCESS("db_pool_benchmark concluído."))
+
+    def _compare(self, options):
+        base_args = [
+            sys.executable,
+            os.path.join(str(settings.BASE_DIR), "manage.py"),
+            "db_pool_benchmark",
+            "--json",
+            f"--requests={options['requests']}",
+            f"--threads={options['threads']}",
+            f"--queries={options['queries']}",
+            f"--warmup={options['warmup']}",
+        ]
+        rows = []
+        for mode in MODES:
+            proc = subprocess.run(
+                base_args,
+                env={**os.environ, "DB_POOL_MODE": mode},
+                capture_output=True,
+                text=True,
+            )
+            if proc.returncode != 0:
+                raise CommandError(f"benchmark mode={mode} falhou: {proc.stderr.strip()[-500:]}")
+            rows.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+        self.stdout.write(f"{'mode':<11} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'max_ms':>8} {'rps':>8}")
+        for row in rows:
+            self.stdout.write(
+                f"{row['mode']:<11} {row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} "
+                f"{row['max_ms']:>8} {row['throughput_rps']:>8}"
+            )
+        self.stdout.write(self.style.SUCCESS("db_pool_benchmark --compare concluído."))
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.edge import receipt_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Mantém as partições de event_receipts: cria as próximas, desanexa/arquiva "
+        "as que saíram da retenção e poda event_receipt_keys fora do horizonte de dedupe."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            choices=receipt_partitions.INTERVALS,
+            default=getattr(settings, "EVENT_RECEIPTS_PARTITION_INTERVAL", "weekly"),
+            help="Tamanho das novas partições (default: EVENT_RECEIPTS_PARTITION_INTERVAL ou weekly).",
+        )
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=getattr(settings, "EVENT_RECEIPTS_PARTITIONS_AHEAD", 2),
+            help="Partições futuras a manter criadas (default: EVENT_RECEIPTS_PARTITIONS_AHEAD ou 2).",
+        )
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            default=getattr(settings, "EVENT_RECEIPTS_RETENTION_DAYS", 35),
+            help="Partições cujo fim é mais antigo que isso saem da tabela (default: 35).",
+        )
+        parser.add_argument(
+            "--dedupe-days",
+            type=int,
+            default=getattr(settings, "EVENT_RECEIPTS_DEDUPE_DAYS", 35),
+            help="Horizonte de dedupe em event_receipt_keys (default: 35).",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            default=getattr(settings, "EVENT_RECEIPTS_ARCHIVE_DIR", ""),
+            help="Exporta partições expiradas para <dir>/<partição>.csv.gz e remove a tabela. "
+            "Sem diretório, a partição só é desanexada (fica no banco como tabela fria).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Somente listar o plano.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("event_receipts_partitions requer Postgres.")
+        retention_days = int(options["retention_days"])
+        dedupe_days = int(options["dedupe_days"])
+        # Retry precisa do raw e dedupe precisa do event_id durante toda a janela de retry.
+        horizon = receipt_partitions.RETRY_HORIZON_DAYS
+        if retention_days < horizon or dedupe_days < horizon:
+            raise CommandError(
+                f"--retention-days e --dedupe-days devem ser >= {horizon} (janela máxima de retry)."
+            )
+        if not receipt_partitions.is_partitioned():
+            raise CommandError(
+                "public.event_receipts não é particionada; aplique "
+                "supabase/sql/20261018_partition_event_receipts.sql antes."
+            )
+
+        dry_run = bool(options["dry_run"])
+        archive_dir = (options.get("archive_dir") or "").strip()
+        now = timezone.now()
+        existing = receipt_partitions.list_partitions()
+
+        to_create = receipt_partitions.plan_missing_partitions(
+            existing, now=now, interval=options["interval"], ahead=int(options["ahead"])
+        )
+        for partition in to_create:
+            self.stdout.write(f"[EDGE] create {partition.name} [{partition.lower.isoformat()}, {partition.upper.isoformat()})")
+            if not dry_run:
+                receipt_partitions.create_partition(partition)
+
+        expired = receipt_partitions.plan_expired_partitions(existing, now=now, retention_days=retention_days)
+        for partition in expired:
+            action = "archive" if archive_dir else "detach"
+            self.stdout.write(f"[EDGE] {action} {partition.name} (fim={partition.upper.isoformat()})")
+            if dry_run:
+                continue
+            receipt_partitions.detach_partition(partition)
+            if archive_dir:
+                path = receipt_partitions.archive_partition(partition, archive_dir)
+                self.stdout.write(f"[EDGE] archived {partition.name} -> {path}")
+
+        keys_cutoff = now - timedelta(days=dedupe_days)
+        pruned = 0
+        if not dry_run:
+            pruned = receipt_partitions.prune_dedupe_keys(older_than=keys_cutoff)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"event_receipts_partitions concluído: created={len(to_create)} expired={len(expired)} "
+                f"keys_pruned={pruned} keys_cutoff={keys_cutoff.isoformat()} dry_run={dry_run}"
+            )
+        )
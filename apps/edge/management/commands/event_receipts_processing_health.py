@@ -35,12 +35,24 @@ class Command(BaseCommand):
                   ) AS pending_aged,
                   COUNT(*) FILTER (WHERE processed_at IS NOT NULL) AS processed_count,
                   COUNT(*) FILTER (WHERE last_error IS NOT NULL) AS failed_count,
-                  COUNT(*) AS total_count
+                  COUNT(*) AS total_count,
+                  EXTRACT(
+                    EPOCH FROM now() - MIN(received_at) FILTER (
+                      WHERE processed_at IS NULL AND last_error IS NULL
+                    )
+                  ) AS oldest_pending_age_seconds
                 FROM public.event_receipts
                 """,
                 [str(grace_minutes)],
             )
-            pending_all, pending_aged, processed_count, failed_count, total_count = cursor.fetchone()
+            (
+                pending_all,
+                pending_aged,
+                processed_count,
+                failed_count,
+                total_count,
+                oldest_pending_age_seconds,
+            ) = cursor.fetchone()
 
             cursor.execute(
                 """
@@ -82,6 +94,9 @@ class Command(BaseCommand):
             "processed_count": int(processed_count or 0),
             "failed_count": int(failed_count or 0),
             "total_count": int(total_count or 0),
+            "oldest_pending_age_seconds": (
+                int(oldest_pending_age_seconds) if oldest_pending_age_seconds is not None else None
+            ),
             "breached": pending_aged > max_pending,
             "status": "breached" if pending_aged > max_pending else "healthy",
             "pending_by_source": [{"source": str(s), "count": int(c or 0)} for s, c in by_source_rows],
@@ -6,6 +6,8 @@ from django.db import connection, transaction
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 
+from apps.core.services.event_receipts import build_receipt_insert_sql
+
 
 HEARTBEAT_EVENT_NAMES = ("edge_heartbeat", "camera_heartbeat", "edge_camera_heartbeat")
 
@@ -102,12 +104,7 @@ class Command(BaseCommand):
                                 }
 
                                 write_cursor.execute(
-                                    """
-                                    INSERT INTO public.event_receipts
-                                    (event_id, event_name, event_version, ts, source, raw, meta)
-                                    VALUES (%s, %s, %s, %s, %s, %s::jsonb, %s::jsonb)
-                                    ON CONFLICT (event_id) DO NOTHING
-                                    """,
+                                    build_receipt_insert_sql(["(%s, %s, %s, %s, %s, %s::jsonb, %s::jsonb)"]),
                                     [
                                         receipt_id,
                                         event_name,
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import time
+from datetime import timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.edge.metrics_rollups import floor_bucket, refresh_metrics_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Atualiza metrics_rollup_hourly/daily a partir das horas tocadas desde o último watermark "
+        "(event_receipts.processed_at). Sem watermark faz backfill dos minutos brutos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild-days",
+            type=int,
+            default=0,
+            help="Recalcula os últimos N dias a partir dos minutos brutos (ignora o watermark).",
+        )
+        parser.add_argument(
+            "--rebuild-since",
+            type=str,
+            default=None,
+            help="Recalcula a partir desta data ISO (ignora o watermark).",
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="Horas por transação (default: 500).")
+        parser.add_argument("--loop", action="store_true", help="Roda continuamente até ser interrompido.")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=60.0,
+            help="Intervalo em segundos entre ticks com --loop (default: 60).",
+        )
+
+    def handle(self, *args, **options):
+        rebuild_since = None
+        if options.get("rebuild_since"):
+            rebuild_since = parse_datetime(str(options["rebuild_since"]))
+            if rebuild_since is None:
+                raise CommandError("--rebuild-since inválido (use ISO 8601).")
+            if timezone.is_naive(rebuild_since):
+                rebuild_since = timezone.make_aware(rebuild_since, dt_timezone.utc)
+        elif int(options.get("rebuild_days") or 0) > 0:
+            rebuild_since = floor_bucket(timezone.now() - timedelta(days=int(options["rebuild_days"])), "day")
+        batch_size = max(1, int(options.get("batch_size") or 500))
+        loop = bool(options.get("loop"))
+        interval = max(1.0, float(options.get("interval") or 60.0))
+
+        try:
+            while True:
+                close_old_connections()
+                started = time.monotonic()
+                result = refresh_metrics_rollups(rebuild_since=rebuild_since, batch_size=batch_size)
+                self.stdout.write(
+                    f"[METRICS] rollup tick hours={result['hours']} rebuild={result['rebuild']} "
+                    f"watermark={result['watermark'].isoformat()} "
+                    f"duration_ms={int((time.monotonic() - started) * 1000)}"
+                )
+                rebuild_since = None
+                if not loop:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write("Interrompido.")
+
+        self.stdout.write(self.style.SUCCESS("metrics_rollup_tick concluído."))
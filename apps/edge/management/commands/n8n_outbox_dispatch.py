@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.alerts import outbox
+
+
+class Command(BaseCommand):
+    help = "Worker do outbox do n8n: envia eventos pendentes com retry/backoff e atualiza NotificationLog."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Processa um lote e sai (cron).")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=getattr(settings, "N8N_OUTBOX_CONCURRENCY", 4),
+            help="POSTs simultâneos (default: N8N_OUTBOX_CONCURRENCY ou 4).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "N8N_OUTBOX_BATCH_SIZE", 1),
+            help="Eventos por POST; >1 envia {\"batch\": true, \"events\": [...]} (default: 1).",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=getattr(settings, "N8N_OUTBOX_CLAIM_LIMIT", 100),
+            help="Eventos reivindicados por ciclo (default: 100).",
+        )
+        parser.add_argument(
+            "--idle-seconds",
+            type=float,
+            default=getattr(settings, "N8N_OUTBOX_IDLE_SECONDS", 1.0),
+            help="Espera quando não há eventos vencidos (default: 1).",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, int(options["concurrency"]))
+        batch_size = max(1, int(options["batch_size"]))
+        limit = max(1, int(options["limit"]))
+        idle_seconds = max(0.1, float(options["idle_seconds"]))
+        session = outbox.build_session(concurrency)
+
+        stopping = {"value": False}
+
+        def _stop(*_args):
+            stopping["value"] = True
+
+        if not options.get("once"):
+            signal.signal(signal.SIGTERM, _stop)
+            signal.signal(signal.SIGINT, _stop)
+
+        totals = {"claimed": 0, "delivered": 0, "retry": 0, "dead": 0}
+        while True:
+            close_old_connections()
+            stats = outbox.dispatch_once(
+                session=session,
+                limit=limit,
+                concurrency=concurrency,
+                batch_size=batch_size,
+            )
+            for key, value in stats.items():
+                totals[key] += value
+            if stats["claimed"]:
+                self.stdout.write(
+                    f"[N8N] outbox claimed={stats['claimed']} delivered={stats['delivered']} "
+                    f"retry={stats['retry']} dead={stats['dead']}"
+                )
+            if options.get("once") or stopping["value"]:
+                break
+            if not stats["claimed"]:
+                time.sleep(idle_seconds)
+            if stopping["value"]:
+                break
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"n8n_outbox_dispatch concluído: claimed={totals['claimed']} delivered={totals['delivered']} "
+                f"retry={totals['retry']} dead={totals['dead']}"
+            )
+        )
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from apps.edge.projection_worker import process_pending_receipts, projection_lag
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de projeções vision.*: drena event_receipts pendentes (EDGE_PROJECTION_MODE=async) "
+        "com FOR UPDATE SKIP LOCKED, particionado por store."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200, help="Receipts por lote (default: 200).")
+        parser.add_argument("--partition", type=int, default=0, help="Partição deste worker (0..partitions-1).")
+        parser.add_argument("--partitions", type=int, default=1, help="Total de partições por store (default: 1).")
+        parser.add_argument("--loop", action="store_true", help="Roda continuamente até ser interrompido.")
+        parser.add_argument(
+            "--idle-sleep",
+            type=float,
+            default=1.0,
+            help="Espera em segundos quando não há pendências (default: 1.0).",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=0,
+            help="Para após N lotes (0 = sem limite; sem --loop para quando a fila esvazia).",
+        )
+        parser.add_argument(
+            "--lag-every",
+            type=int,
+            default=10,
+            help="Reporta lag da partição a cada N lotes (default: 10).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, min(int(options.get("batch_size") or 200), 5000))
+        partitions = max(1, int(options.get("partitions") or 1))
+        partition = int(options.get("partition") or 0)
+        if partition < 0 or partition >= partitions:
+            raise CommandError(f"--partition deve estar entre 0 e {partitions - 1}.")
+        loop = bool(options.get("loop"))
+        idle_sleep = max(0.0, float(options.get("idle_sleep") or 0))
+        max_batches = max(0, int(options.get("max_batches") or 0))
+        lag_every = max(1, int(options.get("lag_every") or 10))
+
+        totals = {"claimed": 0, "processed": 0, "failed": 0}
+        batches = 0
+        try:
+            while True:
+                close_old_connections()
+                started = time.monotonic()
+                counts = process_pending_receipts(limit=batch_size, partition=partition, partitions=partitions)
+                batches += 1
+                for key, value in counts.items():
+                    totals[key] += value
+                if counts["claimed"]:
+                    self.stdout.write(
+                        f"[EDGE] projection batch partition={partition}/{partitions} "
+                        f"claimed={counts['claimed']} processed={counts['processed']} failed={counts['failed']} "
+                        f"duration_ms={int((time.monotonic() - started) * 1000)}"
+                    )
+                if batches % lag_every == 0 or not counts["claimed"]:
+                    self._report_lag(partition=partition, partitions=partitions)
+
+                if max_batches and batches >= max_batches:
+                    break
+                if not counts["claimed"]:
+                    if not loop:
+                        break
+                    time.sleep(idle_sleep)
+        except KeyboardInterrupt:
+            self.stdout.write("Interrompido.")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"project_edge_receipts concluído. batches={batches} claimed={totals['claimed']} "
+                f"processed={totals['processed']} failed={totals['failed']}"
+            )
+        )
+
+    def _report_lag(self, *, partition: int, partitions: int) -> None:
+        lag = projection_lag(partition=partition, partitions=partitions)
+        self.stdout.write(
+            f"[EDGE] projection lag partition={partition}/{partitions} "
+            f"pending={lag['pending']} lag_seconds={lag['lag_seconds']}"
+        )
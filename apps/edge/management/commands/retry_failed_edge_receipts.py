@@ -7,16 +7,8 @@ from django.core.management.base import BaseCommand
 from django.db import connection
 from django.utils import timezone
 
-from apps.edge.vision_metrics import (
-    apply_vision_checkout_proxy,
-    apply_vision_crossing,
-    apply_vision_metrics,
-    apply_vision_queue_state,
-    apply_vision_zone_occupancy,
-    insert_vision_atomic_event_if_new,
-    mark_event_receipt_failed,
-    mark_event_receipt_processed,
-)
+from apps.edge.projection_worker import replay_receipt_projection
+from apps.edge.vision_metrics import mark_event_receipt_failed, mark_event_receipt_processed
 
 
 class Command(BaseCommand):
@@ -104,30 +96,7 @@ class Command(BaseCommand):
 
     @staticmethod
     def _replay_event(*, event_id: str, event_name: str, payload: dict) -> bool:
-        if event_name == "vision.metrics.v1":
-            apply_vision_metrics(payload)
-            return True
-        if event_name == "vision.crossing.v1":
-            inserted = insert_vision_atomic_event_if_new(receipt_id=event_id, payload=payload)
-            if inserted:
-                apply_vision_crossing(payload)
-            return True
-        if event_name == "vision.queue_state.v1":
-            inserted = insert_vision_atomic_event_if_new(receipt_id=event_id, payload=payload)
-            if inserted:
-                apply_vision_queue_state(payload)
-            return True
-        if event_name == "vision.checkout_proxy.v1":
-            inserted = insert_vision_atomic_event_if_new(receipt_id=event_id, payload=payload)
-            if inserted:
-                apply_vision_checkout_proxy(payload)
-            return True
-        if event_name == "vision.zone_occupancy.v1":
-            inserted = insert_vision_atomic_event_if_new(receipt_id=event_id, payload=payload)
-            if inserted:
-                apply_vision_zone_occupancy(payload)
-            return True
-        return False
+        return replay_receipt_projection(event_id=event_id, event_name=event_name, payload=payload)
 
     @staticmethod
     def _load_failed_receipts(*, start, limit: int, max_attempts: int):
@@ -143,13 +112,15 @@ class Command(BaseCommand):
                 FROM public.event_receipts
                 WHERE source = 'edge'
                   AND ts >= %s
+                  AND received_at >= %s
                   AND processed_at IS NULL
                   AND COALESCE(NULLIF(TRIM(last_error), ''), NULL) IS NOT NULL
                   AND COALESCE(attempt_count, 0) < %s
                 ORDER BY ts ASC
                 LIMIT %s
                 """,
-                [start, max_attempts, limit],
+                # received_at limita as partições lidas; 1 dia de folga para clock do edge.
+                [start, start - timedelta(days=1), max_attempts, limit],
             )
             cols = [col[0] for col in cursor.description]
             return [dict(zip(cols, row)) for row in cursor.fetchall()]
@@ -0,0 +1,583 @@
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+
+from apps.core.services.report_cache import invalidate_report_cache
+
+from .projection_worker import PROJECTED_EVENT_NAMES
+
+logger = logging.getLogger(__name__)
+
+SCOPE_PRIMARY = "primary"
+SCOPE_ALL = "all"
+
+# Mesmos filtros canônicos das telas (entrada/balcão + ownership primary).
+_SCOPE_FILTERS = {
+    SCOPE_PRIMARY: (
+        "(camera_role = 'entrada' OR camera_role IS NULL) AND (ownership = 'primary' OR ownership IS NULL)",
+        "(camera_role = 'balcao' OR camera_role IS NULL) AND (ownership = 'primary' OR ownership IS NULL)",
+    ),
+    SCOPE_ALL: ("TRUE", "TRUE"),
+}
+
+# Somas/contagens guardadas por bucket (ver migração 0017). As médias são
+# derivadas na leitura, então somar buckets equivale a agregar os minutos.
+ROLLUP_FIELDS = (
+    "footfall",
+    "traffic_rows",
+    "dwell_sum",
+    "dwell_count",
+    "conversion_rows",
+    "queue_sum",
+    "queue_count",
+    "queue_nz_sum",
+    "queue_nz_count",
+    "staff_sum",
+    "staff_count",
+    "staff_nz_sum",
+    "staff_nz_count",
+    "checkout_events",
+    "conversion_rate_nz_sum",
+    "conversion_rate_nz_count",
+    "minute_buckets",
+    "minute_queue_avg_sum",
+    "minute_staff_avg_sum",
+    "minute_conversion_rate_sum",
+)
+
+_ROLLUP_TABLES = {
+    "hour": "public.metrics_rollup_hourly",
+    "day": "public.metrics_rollup_daily",
+}
+_GRAIN_DELTAS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+_STATE_NAME = "metrics_rollups"
+_WATERMARK_CACHE_KEY = "metrics:rollup_watermark"
+
+Range = Tuple[datetime, Optional[datetime]]
+
+
+def _reads_enabled() -> bool:
+    return bool(getattr(settings, "METRICS_ROLLUP_READS_ENABLED", True))
+
+
+def _settle_seconds() -> int:
+    return int(getattr(settings, "METRICS_ROLLUP_SETTLE_SECONDS", 300) or 0)
+
+
+def _to_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=dt_timezone.utc)
+    return value.astimezone(dt_timezone.utc)
+
+
+def floor_bucket(value: datetime, grain: str) -> datetime:
+    value = _to_utc(value).replace(minute=0, second=0, microsecond=0)
+    if grain == "day":
+        value = value.replace(hour=0)
+    return value
+
+
+def _ceil_bucket(value: datetime, grain: str) -> datetime:
+    floored = floor_bucket(value, grain)
+    if floored == _to_utc(value):
+        return floored
+    return floored + _GRAIN_DELTAS[grain]
+
+
+def empty_aggregate() -> Dict[str, float]:
+    return {field: 0 for field in ROLLUP_FIELDS}
+
+
+def _add_into(target: Dict[str, float], values: Sequence) -> None:
+    for field, value in zip(ROLLUP_FIELDS, values):
+        if value:
+            target[field] += float(value)
+
+
+def merge_aggregates(aggregates: Iterable[Dict[str, float]]) -> Dict[str, float]:
+    merged = empty_aggregate()
+    for aggregate in aggregates:
+        _add_into(merged, [aggregate.get(field) for field in ROLLUP_FIELDS])
+    return merged
+
+
+def average(aggregate: Optional[Dict[str, float]], sum_field: str, count_field: str, default=0.0):
+    count = (aggregate or {}).get(count_field) or 0
+    if not count:
+        return default
+    return float(aggregate.get(sum_field) or 0) / count
+
+
+def conversion_rate_pct(aggregate: Optional[Dict[str, float]]) -> float:
+    footfall = (aggregate or {}).get("footfall") or 0
+    if footfall <= 0:
+        return 0.0
+    return round(float(aggregate.get("checkout_events") or 0) / footfall * 100, 2)
+
+
+def plan_metric_segments(
+    start: datetime,
+    end: Optional[datetime],
+    *,
+    coverage_end: Optional[datetime],
+    bucket: Optional[str] = None,
+) -> Tuple[List[Range], List[Tuple[str, datetime, datetime]]]:
+    """
+    Divide [start, end) em trechos lidos dos rollups (horas/dias completos e já
+    consolidados) e trechos lidos dos minutos brutos (bordas e dados recentes).
+    Com bucket="hour" o rollup diário não é usado.
+    """
+    if coverage_end is None:
+        return [(start, end)], []
+    lo = _ceil_bucket(start, "hour")
+    hi = coverage_end if end is None else min(floor_bucket(end, "hour"), coverage_end)
+    if lo >= hi:
+        return [(start, end)], []
+
+    raw: List[Range] = []
+    rollup: List[Tuple[str, datetime, datetime]] = []
+    if _to_utc(start) < lo:
+        raw.append((start, lo))
+    day_lo = _ceil_bucket(lo, "day")
+    day_hi = floor_bucket(hi, "day")
+    if bucket != "hour" and day_lo < day_hi:
+        if lo < day_lo:
+            rollup.append(("hour", lo, day_lo))
+        rollup.append(("day", day_lo, day_hi))
+        if day_hi < hi:
+            rollup.append(("hour", day_hi, hi))
+    else:
+        rollup.append(("hour", lo, hi))
+    if end is None or hi < _to_utc(end):
+        raw.append((hi, end))
+    return raw, rollup
+
+
+def _ranges_clause(ranges: Sequence[Range]) -> Tuple[str, list]:
+    clauses = []
+    params: list = []
+    for range_start, range_end in ranges:
+        if range_end is None:
+            clauses.append("ts_bucket >= %s")
+            params.append(range_start)
+        else:
+            clauses.append("(ts_bucket >= %s AND ts_bucket < %s)")
+            params.extend([range_start, range_end])
+    return " OR ".join(clauses), params
+
+
+def _raw_aggregate_query(
+    *,
+    store_ids: Sequence[str],
+    ranges: Sequence[Range],
+    scope: str,
+    trunc: str,
+    hours: Optional[Tuple[list, list]] = None,
+) -> Tuple[str, list]:
+    """
+    Agrega os minutos brutos por (store_id, date_trunc(trunc)) nos mesmos campos
+    dos rollups. As médias por minuto (join traffic x conversion por ts_bucket)
+    replicam o cálculo dos totais de metrics_summary/relatório.
+    """
+    if trunc not in _GRAIN_DELTAS:
+        raise ValueError(f"invalid trunc: {trunc}")
+    traffic_filter, conversion_filter = _SCOPE_FILTERS[scope]
+    ranges_sql, ranges_params = _ranges_clause(ranges)
+    hours_sql = ""
+    hours_params: list = []
+    if hours is not None:
+        hours_sql = """
+          AND (store_id, date_trunc('hour', ts_bucket)) IN (
+            SELECT * FROM unnest(%s::uuid[], %s::timestamptz[])
+          )
+        """
+        hours_params = [hours[0], hours[1]]
+    where_params = [list(store_ids), *ranges_params, *hours_params]
+    sql = f"""
+        WITH traffic_minute AS (
+            SELECT store_id, ts_bucket,
+                   SUM(footfall) AS footfall,
+                   COUNT(*) AS traffic_rows,
+                   SUM(dwell_seconds_avg) FILTER (WHERE dwell_seconds_avg <> 0) AS dwell_sum,
+                   COUNT(*) FILTER (WHERE dwell_seconds_avg <> 0) AS dwell_count
+            FROM public.traffic_metrics
+            WHERE store_id = ANY(%s::uuid[])
+              AND ({ranges_sql})
+              AND {traffic_filter}
+              {hours_sql}
+            GROUP BY store_id, ts_bucket
+        ),
+        conversion_minute AS (
+            SELECT store_id, ts_bucket,
+                   COUNT(*) AS conversion_rows,
+                   SUM(queue_avg_seconds) AS queue_sum,
+                   COUNT(queue_avg_seconds) AS queue_count,
+                   SUM(queue_avg_seconds) FILTER (WHERE queue_avg_seconds <> 0) AS queue_nz_sum,
+                   COUNT(*) FILTER (WHERE queue_avg_seconds <> 0) AS queue_nz_count,
+                   SUM(staff_active_est) AS staff_sum,
+                   COUNT(staff_active_est) AS staff_count,
+                   SUM(staff_active_est) FILTER (WHERE staff_active_est <> 0) AS staff_nz_sum,
+                   COUNT(*) FILTER (WHERE staff_active_est <> 0) AS staff_nz_count,
+                   SUM(checkout_events) AS checkout_events,
+                   SUM(conversion_rate) FILTER (WHERE conversion_rate <> 0) AS conversion_rate_nz_sum,
+                   COUNT(*) FILTER (WHERE conversion_rate <> 0) AS conversion_rate_nz_count
+            FROM public.conversion_metrics
+            WHERE store_id = ANY(%s::uuid[])
+              AND ({ranges_sql})
+              AND {conversion_filter}
+              {hours_sql}
+            GROUP BY store_id, ts_bucket
+        )
+        SELECT COALESCE(t.store_id, c.store_id) AS store_id,
+               date_trunc('{trunc}', COALESCE(t.ts_bucket, c.ts_bucket)) AS bucket,
+               COALESCE(SUM(t.footfall), 0) AS footfall,
+               COALESCE(SUM(t.traffic_rows), 0) AS traffic_rows,
+               COALESCE(SUM(t.dwell_sum), 0) AS dwell_sum,
+               COALESCE(SUM(t.dwell_count), 0) AS dwell_count,
+               COALESCE(SUM(c.conversion_rows), 0) AS conversion_rows,
+               COALESCE(SUM(c.queue_sum), 0) AS queue_sum,
+               COALESCE(SUM(c.queue_count), 0) AS queue_count,
+               COALESCE(SUM(c.queue_nz_sum), 0) AS queue_nz_sum,
+               COALESCE(SUM(c.queue_nz_count), 0) AS queue_nz_count,
+               COALESCE(SUM(c.staff_sum), 0) AS staff_sum,
+               COALESCE(SUM(c.staff_count), 0) AS staff_count,
+               COALESCE(SUM(c.staff_nz_sum), 0) AS staff_nz_sum,
+               COALESCE(SUM(c.staff_nz_count), 0) AS staff_nz_count,
+               COALESCE(SUM(c.checkout_events), 0) AS checkout_events,
+               COALESCE(SUM(c.conversion_rate_nz_sum), 0) AS conversion_rate_nz_sum,
+               COALESCE(SUM(c.conversion_rate_nz_count), 0) AS conversion_rate_nz_count,
+               COUNT(c.conversion_rows) AS minute_buckets,
+               COALESCE(
+                   SUM(COALESCE(c.queue_sum::numeric / NULLIF(c.queue_count, 0), 0))
+                       FILTER (WHERE c.conversion_rows IS NOT NULL),
+                   0
+               ) AS minute_queue_avg_sum,
+               COALESCE(
+                   SUM(COALESCE(c.staff_sum::numeric / NULLIF(c.staff_count, 0), 0))
+                       FILTER (WHERE c.conversion_rows IS NOT NULL),
+                   0
+               ) AS minute_staff_avg_sum,
+               COALESCE(
+                   SUM(
+                       CASE
+                           WHEN COALESCE(t.footfall, 0) > 0
+                           THEN (COALESCE(c.checkout_events, 0)::numeric / t.footfall::numeric) * 100
+                           ELSE 0
+                       END
+                   ) FILTER (WHERE c.conversion_rows IS NOT NULL),
+                   0
+               ) AS minute_conversion_rate_sum
+        FROM traffic_minute t
+        FULL OUTER JOIN conversion_minute c
+          ON c.store_id = t.store_id
+         AND c.ts_bucket = t.ts_bucket
+        GROUP BY 1, 2
+    """
+    return sql, where_params + where_params
+
+
+def _rollup_read_query(
+    *,
+    store_ids: Sequence[str],
+    segments: Sequence[Tuple[str, datetime, datetime]],
+    scope: str,
+) -> Tuple[str, list]:
+    columns = ", ".join(ROLLUP_FIELDS)
+    parts = []
+    params: list = []
+    for grain, segment_start, segment_end in segments:
+        parts.append(
+            f"""
+            SELECT store_id, bucket, {columns}
+            FROM {_ROLLUP_TABLES[grain]}
+            WHERE store_id = ANY(%s::uuid[])
+              AND scope = %s
+              AND bucket >= %s
+              AND bucket < %s
+            """
+        )
+        params.extend([list(store_ids), scope, segment_start, segment_end])
+    return " UNION ALL ".join(parts), params
+
+
+def _read_watermark(cursor) -> Optional[datetime]:
+    cursor.execute(
+        "SELECT watermark FROM public.metrics_rollup_state WHERE name = %s",
+        [_STATE_NAME],
+    )
+    row = cursor.fetchone()
+    return row[0] if row and row[0] else None
+
+
+def rollup_coverage_end(cursor) -> Optional[datetime]:
+    """
+    Limite (exclusivo, alinhado à hora) até onde os rollups estão consolidados.
+    None quando leituras via rollup estão desligadas ou o tick nunca rodou.
+    """
+    if not _reads_enabled():
+        return None
+    cached = cache.get(_WATERMARK_CACHE_KEY)
+    if isinstance(cached, dict):
+        watermark = cached.get("watermark")
+    else:
+        try:
+            watermark = _read_watermark(cursor)
+        except DatabaseError:
+            logger.warning("[METRICS] rollup watermark unavailable; reading raw metrics")
+            watermark = None
+        ttl = int(getattr(settings, "METRICS_ROLLUP_WATERMARK_CACHE_SECONDS", 30) or 0)
+        if ttl > 0:
+            cache.set(_WATERMARK_CACHE_KEY, {"watermark": watermark}, ttl)
+    if not watermark:
+        return None
+    return floor_bucket(watermark - timedelta(seconds=_settle_seconds()), "hour")
+
+
+def _fetch_aggregate_rows(
+    cursor,
+    *,
+    store_ids: Sequence[str],
+    start: datetime,
+    end: Optional[datetime],
+    scope: str,
+    bucket: Optional[str],
+) -> list:
+    raw_ranges, rollup_segments = plan_metric_segments(
+        start,
+        end,
+        coverage_end=rollup_coverage_end(cursor),
+        bucket=bucket,
+    )
+    rows: list = []
+    if rollup_segments:
+        sql, params = _rollup_read_query(store_ids=store_ids, segments=rollup_segments, scope=scope)
+        cursor.execute(sql, params)
+        rows.extend(cursor.fetchall())
+    if raw_ranges:
+        sql, params = _raw_aggregate_query(
+            store_ids=store_ids,
+            ranges=raw_ranges,
+            scope=scope,
+            trunc=bucket or "day",
+        )
+        cursor.execute(sql, params)
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+def aggregate_metrics(
+    cursor,
+    *,
+    store_ids: Iterable,
+    start: datetime,
+    end: Optional[datetime] = None,
+    scope: str = SCOPE_PRIMARY,
+    bucket: Optional[str] = None,
+) -> Dict[Optional[datetime], Dict[str, float]]:
+    """
+    Agrega traffic/conversion de [start, end) usando o rollup mais grosso que
+    atende o bucket pedido e minutos brutos para as bordas/dados recentes.
+    Retorna {bucket_utc: campos} (ou {None: campos} quando bucket=None).
+    """
+    store_ids = [str(store_id) for store_id in store_ids if store_id]
+    if not store_ids or (end is not None and end <= start):
+        return {}
+    if bucket not in (None, "hour", "day"):
+        raise ValueError(f"invalid bucket: {bucket}")
+
+    rows = _fetch_aggregate_rows(cursor, store_ids=store_ids, start=start, end=end, scope=scope, bucket=bucket)
+    result: Dict[Optional[datetime], Dict[str, float]] = {}
+    for row in rows:
+        key = floor_bucket(row[1], bucket) if bucket else None
+        _add_into(result.setdefault(key, empty_aggregate()), row[2:])
+    return result
+
+
+def aggregate_metrics_by_store(
+    cursor,
+    *,
+    store_ids: Iterable,
+    start: datetime,
+    end: Optional[datetime] = None,
+    scope: str = SCOPE_PRIMARY,
+) -> Dict[str, Dict[str, float]]:
+    """Mesma leitura de aggregate_metrics, totalizada por store: {store_id: campos}."""
+    store_ids = [str(store_id) for store_id in store_ids if store_id]
+    if not store_ids or (end is not None and end <= start):
+        return {}
+    rows = _fetch_aggregate_rows(cursor, store_ids=store_ids, start=start, end=end, scope=scope, bucket=None)
+    result: Dict[str, Dict[str, float]] = {}
+    for row in rows:
+        _add_into(result.setdefault(str(row[0]), empty_aggregate()), row[2:])
+    return result
+
+
+def regroup_aggregates(
+    aggregates: Dict[Optional[datetime], Dict[str, float]],
+    grain: str,
+) -> Dict[datetime, Dict[str, float]]:
+    grouped: Dict[datetime, Dict[str, float]] = {}
+    for key, aggregate in aggregates.items():
+        if key is None:
+            continue
+        target = grouped.setdefault(floor_bucket(key, grain), empty_aggregate())
+        _add_into(target, [aggregate.get(field) for field in ROLLUP_FIELDS])
+    return grouped
+
+
+def _dirty_hours_from_receipts(cursor, *, since: datetime, until: datetime) -> List[Tuple[str, datetime]]:
+    # ts do receipt ~ fim do bucket; a hora anterior cobre buckets que cruzam a virada.
+    cursor.execute(
+        """
+        SELECT DISTINCT (r.meta->>'store_id')::uuid AS store_id,
+               date_trunc('hour', v.ts) AS bucket
+        FROM public.event_receipts r
+        CROSS JOIN LATERAL (VALUES (r.ts), (r.ts - interval '1 hour')) AS v(ts)
+        WHERE r.processed_at > %s
+          AND r.processed_at <= %s
+          AND r.event_name = ANY(%s)
+          AND (r.meta->>'store_id') ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+        """,
+        [since, until, list(PROJECTED_EVENT_NAMES)],
+    )
+    return [(str(row[0]), row[1]) for row in cursor.fetchall()]
+
+
+def _dirty_hours_from_metrics(cursor, *, since: datetime) -> List[Tuple[str, datetime]]:
+    cursor.execute(
+        """
+        SELECT store_id, date_trunc('hour', ts_bucket) AS bucket
+        FROM public.traffic_metrics
+        WHERE ts_bucket >= %s
+        UNION
+        SELECT store_id, date_trunc('hour', ts_bucket) AS bucket
+        FROM public.conversion_metrics
+        WHERE ts_bucket >= %s
+        """,
+        [since, since],
+    )
+    return [(str(row[0]), row[1]) for row in cursor.fetchall()]
+
+
+def refresh_rollup_hours(cursor, hours: Sequence[Tuple[str, datetime]]) -> int:
+    """
+    Recalcula as horas (store_id, bucket) a partir dos minutos brutos e depois
+    os dias que as contêm. Delete + insert para zerar horas que ficaram vazias.
+    """
+    hours = sorted({(str(store_id), floor_bucket(bucket, "hour")) for store_id, bucket in hours})
+    if not hours:
+        return 0
+    hour_stores = [store_id for store_id, _ in hours]
+    hour_buckets = [bucket for _, bucket in hours]
+    days = sorted({(store_id, floor_bucket(bucket, "day")) for store_id, bucket in hours})
+    day_stores = [store_id for store_id, _ in days]
+    day_buckets = [bucket for _, bucket in days]
+    columns = ", ".join(ROLLUP_FIELDS)
+    sums = ", ".join(f"SUM({field})" for field in ROLLUP_FIELDS)
+
+    cursor.execute(
+        """
+        DELETE FROM public.metrics_rollup_hourly h
+        USING unnest(%s::uuid[], %s::timestamptz[]) AS d(store_id, bucket)
+        WHERE h.store_id = d.store_id AND h.bucket = d.bucket
+        """,
+        [hour_stores, hour_buckets],
+    )
+    for scope in (SCOPE_PRIMARY, SCOPE_ALL):
+        raw_sql, raw_params = _raw_aggregate_query(
+            store_ids=sorted(set(hour_stores)),
+            ranges=[(min(hour_buckets), max(hour_buckets) + _GRAIN_DELTAS["hour"])],
+            scope=scope,
+            trunc="hour",
+            hours=(hour_stores, hour_buckets),
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO public.metrics_rollup_hourly (store_id, bucket, scope, {columns}, refreshed_at)
+            SELECT store_id, bucket, '{scope}', {columns}, now()
+            FROM ({raw_sql}) AS agg
+            """,
+            raw_params,
+        )
+
+    cursor.execute(
+        """
+        DELETE FROM public.metrics_rollup_daily d
+        USING unnest(%s::uuid[], %s::timestamptz[]) AS x(store_id, bucket)
+        WHERE d.store_id = x.store_id AND d.bucket = x.bucket
+        """,
+        [day_stores, day_buckets],
+    )
+    cursor.execute(
+        f"""
+        INSERT INTO public.metrics_rollup_daily (store_id, bucket, scope, {columns}, refreshed_at)
+        SELECT store_id, date_trunc('day', bucket), scope, {sums}, now()
+        FROM public.metrics_rollup_hourly
+        WHERE (store_id, date_trunc('day', bucket)) IN (
+            SELECT * FROM unnest(%s::uuid[], %s::timestamptz[])
+        )
+        GROUP BY store_id, date_trunc('day', bucket), scope
+        """,
+        [day_stores, day_buckets],
+    )
+    return len(hours)
+
+
+def _write_watermark(cursor, watermark: datetime) -> None:
+    cursor.execute(
+        """
+        INSERT INTO public.metrics_rollup_state (name, watermark, updated_at)
+        VALUES (%s, %s, now())
+        ON CONFLICT (name) DO UPDATE SET
+          watermark = EXCLUDED.watermark,
+          updated_at = EXCLUDED.updated_at
+        """,
+        [_STATE_NAME, watermark],
+    )
+
+
+def refresh_metrics_rollups(*, rebuild_since: Optional[datetime] = None, batch_size: int = 500) -> Dict[str, object]:
+    """
+    Tick incremental: horas tocadas por receipts processados desde o último
+    watermark (com sobreposição para transações longas) são recalculadas.
+    Sem watermark (ou com rebuild_since) recalcula a partir dos minutos brutos.
+    """
+    batch_size = max(1, int(batch_size))
+    overlap = timedelta(seconds=int(getattr(settings, "METRICS_ROLLUP_OVERLAP_SECONDS", 120) or 0))
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT now()")
+        tick_at = cursor.fetchone()[0]
+        previous = _read_watermark(cursor)
+        if rebuild_since is None and previous is None:
+            backfill_days = int(getattr(settings, "METRICS_ROLLUP_BACKFILL_DAYS", 90) or 0)
+            rebuild_since = floor_bucket(tick_at - timedelta(days=backfill_days), "day")
+        if rebuild_since is not None:
+            hours = _dirty_hours_from_metrics(cursor, since=rebuild_since)
+        else:
+            hours = _dirty_hours_from_receipts(cursor, since=previous - overlap, until=tick_at)
+
+    hours = sorted(set(hours))
+    refreshed = 0
+    for offset in range(0, len(hours), batch_size):
+        chunk = hours[offset : offset + batch_size]
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                refreshed += refresh_rollup_hours(cursor, chunk)
+
+    with connection.cursor() as cursor:
+        _write_watermark(cursor, tick_at)
+    cache.delete(_WATERMARK_CACHE_KEY)
+
+    # Minutos tardios em janelas já fechadas invalidam relatórios em cache dessas stores.
+    report_settle = timedelta(seconds=int(getattr(settings, "REPORT_CACHE_SETTLE_SECONDS", 3600) or 0))
+    late_stores = {store_id for store_id, bucket in hours if bucket + _GRAIN_DELTAS["hour"] <= tick_at - report_settle}
+    invalidate_report_cache(late_stores)
+    return {
+        "hours": refreshed,
+        "rebuild": rebuild_since is not None,
+        "watermark": tick_at,
+    }
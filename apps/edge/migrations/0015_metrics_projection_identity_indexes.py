@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("edge", "0014_store_kpis_daily"),
+    ]
+
+    # Projections upsert with ON CONFLICT on the full projection identity, so the
+    # unique indexes from supabase/sql/20260310_harden_metrics_projection_contract.sql
+    # become part of the app schema contract.
+    operations = [
+        migrations.RunSQL(
+            sql="""
+            CREATE UNIQUE INDEX IF NOT EXISTS conversion_metrics_projection_identity_uq
+              ON public.conversion_metrics (
+                store_id,
+                ts_bucket,
+                COALESCE(camera_id, '00000000-0000-0000-0000-000000000000'::uuid),
+                COALESCE(metric_type, ''),
+                COALESCE(roi_entity_id, '')
+              );
+
+            CREATE UNIQUE INDEX IF NOT EXISTS traffic_metrics_projection_identity_uq
+              ON public.traffic_metrics (
+                store_id,
+                ts_bucket,
+                COALESCE(zone_id, '00000000-0000-0000-0000-000000000000'::uuid),
+                COALESCE(camera_id, '00000000-0000-0000-0000-000000000000'::uuid),
+                COALESCE(metric_type, ''),
+                COALESCE(roi_entity_id, '')
+              );
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
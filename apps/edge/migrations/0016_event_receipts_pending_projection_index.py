@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("edge", "0015_metrics_projection_identity_indexes"),
+    ]
+
+    # Fila de projeções assíncronas (project_edge_receipts): receipts pendentes e sem falha.
+    operations = [
+        migrations.RunSQL(
+            sql="""
+            CREATE INDEX IF NOT EXISTS event_receipts_pending_projection_idx
+              ON public.event_receipts (received_at, event_id)
+              WHERE processed_at IS NULL AND last_error IS NULL;
+            """,
+            reverse_sql="""
+            DROP INDEX IF EXISTS public.event_receipts_pending_projection_idx;
+            """,
+        ),
+    ]
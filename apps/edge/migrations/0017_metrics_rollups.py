@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# Somas e contagens (não médias) para que buckets possam ser recombinados exatamente.
+_ROLLUP_COLUMNS = """
+  store_id uuid NOT NULL,
+  bucket timestamptz NOT NULL,
+  scope text NOT NULL,
+  footfall bigint NOT NULL DEFAULT 0,
+  traffic_rows integer NOT NULL DEFAULT 0,
+  dwell_sum double precision NOT NULL DEFAULT 0,
+  dwell_count integer NOT NULL DEFAULT 0,
+  conversion_rows integer NOT NULL DEFAULT 0,
+  queue_sum double precision NOT NULL DEFAULT 0,
+  queue_count integer NOT NULL DEFAULT 0,
+  queue_nz_sum double precision NOT NULL DEFAULT 0,
+  queue_nz_count integer NOT NULL DEFAULT 0,
+  staff_sum double precision NOT NULL DEFAULT 0,
+  staff_count integer NOT NULL DEFAULT 0,
+  staff_nz_sum double precision NOT NULL DEFAULT 0,
+  staff_nz_count integer NOT NULL DEFAULT 0,
+  checkout_events bigint NOT NULL DEFAULT 0,
+  conversion_rate_nz_sum double precision NOT NULL DEFAULT 0,
+  conversion_rate_nz_count integer NOT NULL DEFAULT 0,
+  minute_buckets integer NOT NULL DEFAULT 0,
+  minute_queue_avg_sum double precision NOT NULL DEFAULT 0,
+  minute_staff_avg_sum double precision NOT NULL DEFAULT 0,
+  minute_conversion_rate_sum double precision NOT NULL DEFAULT 0,
+  refreshed_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (store_id, scope, bucket)
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("edge", "0016_event_receipts_pending_projection_index"),
+    ]
+
+    # Rollups horário/diário de traffic_metrics + conversion_metrics (metrics_rollup_tick).
+    operations = [
+        migrations.RunSQL(
+            sql=f"""
+            CREATE TABLE IF NOT EXISTS public.metrics_rollup_hourly ({_ROLLUP_COLUMNS});
+            CREATE TABLE IF NOT EXISTS public.metrics_rollup_daily ({_ROLLUP_COLUMNS});
+
+            CREATE TABLE IF NOT EXISTS public.metrics_rollup_state (
+              name text PRIMARY KEY,
+              watermark timestamptz,
+              updated_at timestamptz NOT NULL DEFAULT now()
+            );
+
+            CREATE INDEX IF NOT EXISTS event_receipts_processed_at_idx
+              ON public.event_receipts (processed_at)
+              WHERE processed_at IS NOT NULL;
+            """,
+            reverse_sql="""
+            DROP INDEX IF EXISTS public.event_receipts_processed_at_idx;
+            DROP TABLE IF EXISTS public.metrics_rollup_state;
+            DROP TABLE IF EXISTS public.metrics_rollup_daily;
+            DROP TABLE IF EXISTS public.metrics_rollup_hourly;
+            """,
+        ),
+    ]
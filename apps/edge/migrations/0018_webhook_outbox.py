@@ -0,0 +1,41 @@
+# Generated by Django 4.2.11 on 2026-10-18 00:16
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edge', '0017_metrics_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookOutbox',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('event_name', models.CharField(max_length=128)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(default='pending', max_length=16)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('response', models.JSONField(blank=True, null=True)),
+                ('notification_log_ids', models.JSONField(blank=True, default=list)),
+                ('receipt_event_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'webhook_outbox',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='webhook_outbox_due_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='webhookoutbox',
+            constraint=models.UniqueConstraint(condition=models.Q(('event_id__isnull', False)), fields=('event_id',), name='webhook_outbox_event_id_uniq'),
+        ),
+    ]
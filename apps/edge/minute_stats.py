@@ -0,0 +1,211 @@
+import atexit
+import logging
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.test.testcases import DatabaseOperationForbidden
+from django.utils import timezone
+
+from .models import EdgeEventMinuteStats
+
+logger = logging.getLogger(__name__)
+
+# (store_id, event_name, minute_bucket) -> [count, last_event_at]
+_Key = Tuple[str, str, object]
+
+
+def _floor_minute(ts_dt):
+    if not ts_dt:
+        return None
+    return ts_dt.replace(second=0, microsecond=0)
+
+
+class EventMinuteAggregator:
+    """
+    Acumula deltas de edge_event_minute_stats em memória (por worker) e grava
+    com um único UPSERT multi-linha a cada `flush_interval_seconds` ou
+    `max_pending_events` eventos. Com intervalo <= 0 vira write-through.
+    """
+
+    def __init__(
+        self,
+        *,
+        flush_interval_seconds: float = 5.0,
+        max_pending_events: int = 500,
+        max_pending_keys: int = 5000,
+    ):
+        self.flush_interval_seconds = float(flush_interval_seconds)
+        self.max_pending_events = max(1, int(max_pending_events))
+        self.max_pending_keys = max(1, int(max_pending_keys))
+        self._lock = threading.Lock()
+        self._pending: Dict[_Key, List] = {}
+        self._pending_events = 0
+        self._last_flush_at = time.monotonic()
+        self._flusher = None
+        self.flushed_rows = 0
+        self.flush_count = 0
+        self.dropped_deltas = 0
+
+    @property
+    def write_through(self) -> bool:
+        return self.flush_interval_seconds <= 0
+
+    def add(self, store_id: str, event_name: str, ts_dt, count: int = 1) -> None:
+        minute_bucket = _floor_minute(ts_dt)
+        if not minute_bucket or not store_id or count <= 0:
+            return
+        key = (str(store_id), str(event_name or "")[:64], minute_bucket)
+        with self._lock:
+            self._merge(key, count, ts_dt)
+            should_flush = (
+                self.write_through
+                or self._pending_events >= self.max_pending_events
+                or time.monotonic() - self._last_flush_at >= self.flush_interval_seconds
+            )
+        if should_flush:
+            self.flush()
+        else:
+            self._ensure_flusher()
+
+    def _merge(self, key: _Key, count: int, last_event_at) -> bool:
+        entry = self._pending.get(key)
+        if entry is None:
+            if len(self._pending) >= self.max_pending_keys:
+                self.dropped_deltas += count
+                return False
+            self._pending[key] = [count, last_event_at]
+        else:
+            entry[0] += count
+            if last_event_at and (entry[1] is None or last_event_at > entry[1]):
+                entry[1] = last_event_at
+        self._pending_events += count
+        return True
+
+    def flush(self) -> int:
+        with self._lock:
+            batch = self._pending
+            self._pending = {}
+            self._pending_events = 0
+            self._last_flush_at = time.monotonic()
+        if not batch:
+            return 0
+        try:
+            _upsert_minute_stats(batch)
+        except DatabaseOperationForbidden:
+            # SimpleTestCase blocks DB access; ignore in tests.
+            return 0
+        except Exception:
+            logger.exception("[EDGE] event minute stats flush failed rows=%s", len(batch))
+            self._requeue(batch)
+            return 0
+        with self._lock:
+            self.flushed_rows += len(batch)
+            self.flush_count += 1
+        return len(batch)
+
+    def _requeue(self, batch: Dict[_Key, List]) -> None:
+        # Write-through não tem próximo flush: o delta é perdido e contabilizado.
+        with self._lock:
+            for key, (count, last_event_at) in batch.items():
+                if self.write_through:
+                    self.dropped_deltas += count
+                    continue
+                self._merge(key, count, last_event_at)
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(
+                target=self._flush_loop,
+                name="edge-minute-stats-flusher",
+                daemon=True,
+            )
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval_seconds)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("[EDGE] event minute stats background flush failed")
+            finally:
+                connection.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending_keys": len(self._pending),
+                "pending_events": self._pending_events,
+                "flushed_rows": self.flushed_rows,
+                "flush_count": self.flush_count,
+                "dropped_deltas": self.dropped_deltas,
+            }
+
+
+def _upsert_minute_stats(batch: Dict[_Key, List]) -> None:
+    store_field = EdgeEventMinuteStats._meta.get_field("store_id")
+    ts_field = EdgeEventMinuteStats._meta.get_field("minute_bucket")
+    now = ts_field.get_db_prep_value(timezone.now(), connection)
+    table = connection.ops.quote_name(EdgeEventMinuteStats._meta.db_table)
+    rows = []
+    params: list = []
+    for (store_id, event_name, minute_bucket), (count, last_event_at) in batch.items():
+        rows.append("(%s, %s, %s, %s, %s, %s, %s)")
+        params.extend(
+            [
+                store_field.get_db_prep_value(store_id, connection),
+                event_name,
+                ts_field.get_db_prep_value(minute_bucket, connection),
+                int(count),
+                ts_field.get_db_prep_value(last_event_at, connection),
+                now,
+                now,
+            ]
+        )
+    sql = f"""
+        INSERT INTO {table}
+          (store_id, event_name, minute_bucket, count, last_event_at, created_at, updated_at)
+        VALUES {", ".join(rows)}
+        ON CONFLICT (store_id, event_name, minute_bucket) DO UPDATE SET
+          count = {table}.count + EXCLUDED.count,
+          last_event_at = CASE
+            WHEN {table}.last_event_at IS NULL OR EXCLUDED.last_event_at > {table}.last_event_at
+              THEN EXCLUDED.last_event_at
+            ELSE {table}.last_event_at
+          END,
+          updated_at = EXCLUDED.updated_at
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+aggregator = EventMinuteAggregator(
+    flush_interval_seconds=getattr(settings, "EDGE_MINUTE_STATS_FLUSH_SECONDS", 5),
+    max_pending_events=getattr(settings, "EDGE_MINUTE_STATS_FLUSH_MAX_EVENTS", 500),
+    max_pending_keys=getattr(settings, "EDGE_MINUTE_STATS_MAX_PENDING_KEYS", 5000),
+)
+
+
+def bump_event_minute(store_id: str, event_name: str, ts_dt, count: int = 1) -> None:
+    aggregator.add(store_id, event_name, ts_dt, count=count)
+
+
+def flush_event_minute_stats() -> int:
+    return aggregator.flush()
+
+
+def _flush_on_exit() -> None:
+    try:
+        aggregator.flush()
+    except Exception:
+        logger.exception("[EDGE] event minute stats shutdown flush failed")
+
+
+atexit.register(_flush_on_exit)
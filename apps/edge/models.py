@@ -133,3 +133,47 @@ class EdgeUpdateEvent(models.Model):
     def __str__(self):
         return f"{self.store_id} {self.event} {self.status}"
 
+
+
+class WebhookOutbox(models.Model):
+    """
+    Eventos enfileirados para o webhook do n8n (apps/alerts/outbox.py).
+    Entregues pelo worker n8n_outbox_dispatch; quem enfileira não espera o HTTP.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_DELIVERED = "delivered"
+    STATUS_DEAD = "dead"
+
+    id = models.BigAutoField(primary_key=True)
+    event_id = models.CharField(max_length=255, null=True, blank=True)
+    event_name = models.CharField(max_length=128)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=16, default=STATUS_PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    # Atualizados na conclusão da entrega.
+    notification_log_ids = models.JSONField(default=list, blank=True)
+    receipt_event_id = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "webhook_outbox"
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="webhook_outbox_due_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["event_id"],
+                condition=Q(event_id__isnull=False),
+                name="webhook_outbox_event_id_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_name} {self.status} attempts={self.attempts}"
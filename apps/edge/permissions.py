@@ -1,12 +1,10 @@
 # apps/edge/permissions.py
-import hashlib
 import os
 from django.conf import settings
-from django.utils import timezone
 from rest_framework.permissions import BasePermission
 from knox.auth import TokenAuthentication
 
-from .models import EdgeToken
+from .auth import validate_edge_token_for_store
 
 def _extract_store_id(payload):
     if not isinstance(payload, dict):
@@ -28,16 +26,7 @@ def _get_payload(request):
     return {}
 
 def _validate_edge_token_for_store(store_id, provided):
-    if not provided or not store_id:
-        return False
-    token_hash = hashlib.sha256(provided.encode("utf-8")).hexdigest()
-    edge_token = EdgeToken.objects.filter(
-        store_id=store_id,
-        token_hash=token_hash,
-        active=True,
-    ).first()
-    if edge_token:
-        EdgeToken.objects.filter(id=edge_token.id).update(last_used_at=timezone.now())
+    if validate_edge_token_for_store(store_id, provided):
         print("[EDGE] request autorizado via store token")
         return True
     return False
@@ -0,0 +1,156 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .vision_metrics import (
+    apply_vision_checkout_proxy,
+    apply_vision_crossing,
+    apply_vision_metrics,
+    apply_vision_queue_state,
+    apply_vision_zone_occupancy,
+    insert_vision_atomic_event_if_new,
+    mark_event_receipt_failed,
+    mark_event_receipt_processed,
+)
+
+logger = logging.getLogger(__name__)
+
+PROJECTED_EVENT_NAMES = (
+    "vision.metrics.v1",
+    "vision.crossing.v1",
+    "vision.queue_state.v1",
+    "vision.checkout_proxy.v1",
+    "vision.zone_occupancy.v1",
+)
+
+# Pendente = ainda não processado e sem falha (falhas seguem para retry_failed_edge_receipts).
+_PENDING_FILTER = """
+    source = 'edge'
+    AND processed_at IS NULL
+    AND last_error IS NULL
+    AND event_name = ANY(%s)
+    AND mod(abs(hashtext(COALESCE(meta->>'store_id', ''))), %s) = %s
+"""
+
+
+def projection_mode() -> str:
+    return str(getattr(settings, "EDGE_PROJECTION_MODE", "sync") or "sync").strip().lower()
+
+
+def is_async_projection(event_name: str) -> bool:
+    return projection_mode() == "async" and str(event_name or "") in PROJECTED_EVENT_NAMES
+
+
+def replay_receipt_projection(*, event_id: str, event_name: str, payload: dict) -> bool:
+    """
+    Aplica a projeção vision.* de um receipt já persistido.
+    Retorna False quando o event_name não tem projeção.
+    """
+    if event_name == "vision.metrics.v1":
+        apply_vision_metrics(payload)
+        return True
+    if event_name == "vision.crossing.v1":
+        inserted = insert_vision_atomic_event_if_new(receipt_id=event_id, payload=payload)
+        if inserted:
+            apply_vision_crossing(payload)
+        return True
+    if event_name == "vision.queue_state.v1":
+        inserted = insert_vision_atomic_event_if_new(receipt_id=event_id, payload=payload)
+        if inserted:
+            apply_vision_queue_state(payload)
+        return True
+    if event_name == "vision.checkout_proxy.v1":
+        inserted = insert_vision_atomic_event_if_new(receipt_id=event_id, payload=payload)
+        if inserted:
+            apply_vision_checkout_proxy(payload)
+        return True
+    if event_name == "vision.zone_occupancy.v1":
+        inserted = insert_vision_atomic_event_if_new(receipt_id=event_id, payload=payload)
+        if inserted:
+            apply_vision_zone_occupancy(payload)
+        return True
+    return False
+
+
+def _parse_raw(raw_payload) -> Optional[dict]:
+    if raw_payload in (None, ""):
+        return None
+    if isinstance(raw_payload, dict):
+        return raw_payload
+    try:
+        parsed = json.loads(raw_payload)
+    except Exception:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def _claim_pending_receipts(cursor, *, limit: int, partition: int, partitions: int) -> List[Dict[str, Any]]:
+    cursor.execute(
+        f"""
+        SELECT event_id, event_name, raw::text AS raw_payload
+        FROM public.event_receipts
+        WHERE {_PENDING_FILTER}
+        ORDER BY received_at ASC, event_id ASC
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+        """,
+        [list(PROJECTED_EVENT_NAMES), partitions, partition, limit],
+    )
+    cols = [col[0] for col in cursor.description]
+    return [dict(zip(cols, row)) for row in cursor.fetchall()]
+
+
+def process_pending_receipts(*, limit: int = 200, partition: int = 0, partitions: int = 1) -> Dict[str, int]:
+    """
+    Reivindica um lote de receipts pendentes (FOR UPDATE SKIP LOCKED) da partição
+    de stores e aplica as projeções. Os locks valem até o commit do lote, então
+    vários workers podem rodar em paralelo sem processar o mesmo receipt.
+    """
+    counts = {"claimed": 0, "processed": 0, "failed": 0}
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            rows = _claim_pending_receipts(cursor, limit=limit, partition=partition, partitions=partitions)
+        counts["claimed"] = len(rows)
+        for row in rows:
+            event_id = str(row["event_id"])
+            event_name = str(row["event_name"] or "")
+            payload = _parse_raw(row["raw_payload"])
+            if not payload:
+                mark_event_receipt_failed(event_id=event_id, error_message="projection_invalid_raw_payload")
+                counts["failed"] += 1
+                continue
+            try:
+                with transaction.atomic():
+                    replay_receipt_projection(event_id=event_id, event_name=event_name, payload=payload)
+            except Exception as exc:
+                logger.exception("[EDGE] projection worker failed event_id=%s event=%s", event_id, event_name)
+                mark_event_receipt_failed(event_id=event_id, error_message=f"projection_failed:{str(exc)[:200]}")
+                counts["failed"] += 1
+                continue
+            mark_event_receipt_processed(event_id=event_id)
+            counts["processed"] += 1
+    return counts
+
+
+def projection_lag(*, partition: int = 0, partitions: int = 1) -> Dict[str, Any]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT
+              COUNT(*) AS pending,
+              EXTRACT(EPOCH FROM (now() - MIN(received_at))) AS oldest_age_seconds
+            FROM public.event_receipts
+            WHERE {_PENDING_FILTER}
+            """,
+            [list(PROJECTED_EVENT_NAMES), partitions, partition],
+        )
+        pending, oldest_age_seconds = cursor.fetchone()
+    return {
+        "partition": partition,
+        "partitions": partitions,
+        "pending": int(pending or 0),
+        "lag_seconds": int(oldest_age_seconds) if oldest_age_seconds is not None else 0,
+    }
@@ -0,0 +1,190 @@
+"""
+Manutenção das partições de event_receipts (particionada por received_at).
+
+Partições quentes ficam anexadas; as que saem da retenção são desanexadas e,
+com diretório de arquivo configurado, exportadas para CSV gzip e removidas.
+O dedupe não depende das partições: event_receipt_keys guarda os event_id
+pelo horizonte de dedupe (>= janela de retry) e é podada à parte.
+"""
+import gzip
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import List, Optional
+
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "event_receipts"
+KEYS_TABLE = "event_receipt_keys"
+INTERVALS = ("daily", "weekly")
+# Teto de --hours em retry_failed_edge_receipts (30 dias).
+RETRY_HORIZON_DAYS = 30
+
+_BOUND_RE = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+
+@dataclass
+class Partition:
+    name: str
+    lower: Optional[datetime]
+    upper: Optional[datetime]
+
+
+def period_start(moment: datetime, interval: str) -> datetime:
+    moment = moment.astimezone(dt_timezone.utc)
+    start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == "weekly":
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def period_step(interval: str) -> timedelta:
+    return timedelta(days=7 if interval == "weekly" else 1)
+
+
+def partition_name(lower: datetime) -> str:
+    return f"{PARENT_TABLE}_p{lower:%Y%m%d}"
+
+
+def _parse_bound(raw: str) -> Optional[datetime]:
+    raw = raw.strip()
+    if raw in ("MINVALUE", "MAXVALUE"):
+        return None
+    value = parse_datetime(raw.strip("'"))
+    if value is None:
+        raise ValueError(f"invalid partition bound: {raw}")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_timezone.utc)
+    return value.astimezone(dt_timezone.utc)
+
+
+def parse_partition_bound(name: str, bound_sql: str) -> Optional[Partition]:
+    """`FOR VALUES FROM ('2026-10-12 00:00:00+00') TO ('2026-10-19 00:00:00+00')`."""
+    match = _BOUND_RE.search(bound_sql or "")
+    if not match:
+        return None
+    return Partition(name=name, lower=_parse_bound(match.group(1)), upper=_parse_bound(match.group(2)))
+
+
+def _overlaps(lower: datetime, upper: datetime, partition: Partition) -> bool:
+    starts_before_end = partition.lower is None or partition.lower < upper
+    ends_after_start = partition.upper is None or partition.upper > lower
+    return starts_before_end and ends_after_start
+
+
+def plan_missing_partitions(
+    existing: List[Partition], *, now: datetime, interval: str, ahead: int
+) -> List[Partition]:
+    """Períodos do atual até `ahead` à frente sem partição que os cubra."""
+    step = period_step(interval)
+    lower = period_start(now, interval)
+    planned = []
+    for _ in range(max(0, ahead) + 1):
+        upper = lower + step
+        if not any(_overlaps(lower, upper, partition) for partition in existing):
+            planned.append(Partition(name=partition_name(lower), lower=lower, upper=upper))
+        lower = upper
+    return planned
+
+
+def plan_expired_partitions(existing: List[Partition], *, now: datetime, retention_days: int) -> List[Partition]:
+    cutoff = now - timedelta(days=retention_days)
+    return [partition for partition in existing if partition.upper is not None and partition.upper <= cutoff]
+
+
+def is_partitioned() -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relkind
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public' AND c.relname = %s
+            """,
+            [PARENT_TABLE],
+        )
+        row = cursor.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def list_partitions() -> List[Partition]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits i
+            JOIN pg_class child ON child.oid = i.inhrelid
+            WHERE i.inhparent = 'public.event_receipts'::regclass
+            ORDER BY child.relname
+            """
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound_sql in rows:
+        partition = parse_partition_bound(name, bound_sql)
+        if partition is None:
+            logger.warning("[EDGE] event_receipts partition with unexpected bound name=%s bound=%s", name, bound_sql)
+            continue
+        partitions.append(partition)
+    return partitions
+
+
+def create_partition(partition: Partition) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS public.{partition.name}
+            PARTITION OF public.{PARENT_TABLE}
+            FOR VALUES FROM (%s) TO (%s)
+            """,
+            [partition.lower, partition.upper],
+        )
+
+
+def detach_partition(partition: Partition) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE public.{PARENT_TABLE} DETACH PARTITION public.{partition.name}")
+
+
+def archive_partition(partition: Partition, archive_dir: str) -> str:
+    """
+    Exporta a partição (já desanexada) para CSV gzip e remove a tabela.
+    Escreve em .tmp e renomeia: um arquivo final nunca fica pela metade.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{partition.name}.csv.gz")
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as fh:
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY public.{partition.name} TO STDOUT WITH (FORMAT csv, HEADER true)", fh)
+    os.replace(tmp_path, path)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS public.{partition.name}")
+    return path
+
+
+def prune_dedupe_keys(*, older_than: datetime, batch_size: int = 50000) -> int:
+    total = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                DELETE FROM public.{KEYS_TABLE}
+                WHERE event_id IN (
+                    SELECT event_id FROM public.{KEYS_TABLE}
+                    WHERE received_at < %s
+                    LIMIT %s
+                )
+                """,
+                [older_than, batch_size],
+            )
+            deleted = cursor.rowcount or 0
+        total += deleted
+        if deleted < batch_size:
+            return total
@@ -0,0 +1,259 @@
+"""
+Offload de snapshots inline (data URLs) dos heartbeats do edge.
+
+O heartbeat pode trazer `snapshot_url`/`snapshot_data_url` como
+`data:image/jpeg;base64,...` (até 500k chars por câmera). Em vez de gravar isso
+em cameras.last_snapshot_url e no raw de event_receipts, a imagem é
+decodificada, endereçada pelo sha256 do conteúdo e enviada ao Supabase Storage
+(ou a um diretório local quando o storage não está configurado) por um pool de
+threads fora do request. No payload fica só a URL absoluta
+<EDGE_SNAPSHOT_PUBLIC_BASE_URL>/api/edge/snapshots/<sha256>.<ext>?exp=&sig=,
+servida por EdgeSnapshotView. A assinatura (HMAC com SECRET_KEY) expira em
+EDGE_SNAPSHOT_URL_TTL_SECONDS; cada heartbeat grava uma URL nova na câmera.
+
+Snapshots idênticos geram a mesma chave: o upload é pulado quando a chave já
+foi gravada (marcador no cache compartilhado / arquivo local) ou está em voo.
+"""
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import math
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from apps.core.integrations import supabase_storage
+from backend.utils import shared_cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAMESPACE = "edge.snapshot"
+STORED_MARKER_TTL_SECONDS = 7 * 24 * 3600
+SNAPSHOT_KEYS = ("snapshot_url", "snapshot_data_url")
+CAMERA_LIST_KEYS = ("cameras", "camera_heartbeats")
+REWRITTEN_KEYS = SNAPSHOT_KEYS + CAMERA_LIST_KEYS + ("data",)
+CONTENT_TYPES = {"image/jpeg": "jpg", "image/jpg": "jpg", "image/png": "png", "image/webp": "webp"}
+EXT_CONTENT_TYPES = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+_DATA_URL_RE = re.compile(r"^data:(?P<type>image/[a-z]+);base64,", re.IGNORECASE)
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_inflight: set = set()
+_inflight_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "EDGE_SNAPSHOT_OFFLOAD_ENABLED", False))
+
+
+def local_root() -> str:
+    return str(getattr(settings, "EDGE_SNAPSHOT_LOCAL_DIR", "") or os.path.join(settings.BASE_DIR, "var", "edge_snapshots"))
+
+
+def storage_path(digest: str, ext: str) -> str:
+    return f"edge-snapshots/sha256/{digest[:2]}/{digest}.{ext}"
+
+
+def _signature(digest: str, ext: str, exp: int) -> str:
+    return salted_hmac(CACHE_NAMESPACE, f"{digest}.{ext}:{exp}").hexdigest()
+
+
+def verify_signature(digest: str, ext: str, exp: str, sig: str) -> bool:
+    try:
+        exp_ts = int(exp)
+    except (TypeError, ValueError):
+        return False
+    if exp_ts < time.time():
+        return False
+    return constant_time_compare(_signature(digest, ext, exp_ts), sig or "")
+
+
+def snapshot_url(digest: str, ext: str, *, base_url: Optional[str] = None) -> str:
+    ttl = int(getattr(settings, "EDGE_SNAPSHOT_URL_TTL_SECONDS", 7 * 24 * 3600) or 3600)
+    # Expiração arredondada para a hora: heartbeats seguidos geram a mesma URL (cache do browser).
+    exp = int(math.ceil((time.time() + ttl) / 3600.0) * 3600)
+    base = (getattr(settings, "EDGE_SNAPSHOT_PUBLIC_BASE_URL", "") or base_url or "").rstrip("/")
+    return f"{base}/api/edge/snapshots/{digest}.{ext}?exp={exp}&sig={_signature(digest, ext, exp)}"
+
+
+def parse_data_url(value: str) -> Optional[Tuple[str, bytes]]:
+    """Retorna (content_type, bytes) de um data URL de imagem; None se não for um."""
+    match = _DATA_URL_RE.match(value)
+    if not match:
+        return None
+    content_type = match.group("type").lower()
+    if content_type not in CONTENT_TYPES:
+        return None
+    try:
+        content = base64.b64decode(value[match.end():], validate=False)
+    except (binascii.Error, ValueError):
+        return None
+    return (content_type, content) if content else None
+
+
+def _marker_key(digest: str) -> str:
+    return shared_cache.key(CACHE_NAMESPACE, digest)
+
+
+def _already_stored(digest: str, ext: str) -> bool:
+    if supabase_storage.get_config() is None:
+        return os.path.exists(os.path.join(local_root(), storage_path(digest, ext)))
+    return bool(shared_cache.get(CACHE_NAMESPACE, _marker_key(digest), False))
+
+
+def _write(digest: str, ext: str, content_type: str, content: bytes) -> None:
+    path = storage_path(digest, ext)
+    if supabase_storage.get_config() is None:
+        target = os.path.join(local_root(), path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(content)
+        os.replace(tmp, target)
+    else:
+        supabase_storage.upload_file(content, path, content_type)
+        try:
+            cache.set(_marker_key(digest), True, STORED_MARKER_TTL_SECONDS)
+        except Exception:
+            logger.warning("[EDGE] snapshot marker cache set failed digest=%s", digest)
+
+
+def _upload_job(digest: str, ext: str, content_type: str, content: bytes) -> None:
+    try:
+        _write(digest, ext, content_type, content)
+    except Exception:
+        logger.exception("[EDGE] snapshot offload upload failed digest=%s", digest)
+    finally:
+        with _inflight_lock:
+            _inflight.discard(digest)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = max(1, int(getattr(settings, "EDGE_SNAPSHOT_UPLOAD_WORKERS", 2) or 2))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="edge-snapshot")
+        return _executor
+
+
+def offload_data_url(value: str, *, base_url: Optional[str] = None) -> Optional[str]:
+    """
+    Agenda o upload do data URL e retorna a URL assinada. Retorna None se o
+    valor não é um data URL de imagem válido ou se a fila de upload está cheia.
+    `base_url` (origem do request) só vale sem EDGE_SNAPSHOT_PUBLIC_BASE_URL.
+    """
+    parsed = parse_data_url(value)
+    if parsed is None:
+        return None
+    content_type, content = parsed
+    digest = hashlib.sha256(content).hexdigest()
+    ext = CONTENT_TYPES[content_type]
+    url = snapshot_url(digest, ext, base_url=base_url)
+
+    with _inflight_lock:
+        if digest in _inflight:
+            return url
+        max_pending = int(getattr(settings, "EDGE_SNAPSHOT_MAX_PENDING", 64) or 64)
+        if len(_inflight) >= max_pending:
+            logger.warning("[EDGE] snapshot offload queue full; dropped digest=%s", digest)
+            return None
+        _inflight.add(digest)
+    try:
+        if _already_stored(digest, ext):
+            with _inflight_lock:
+                _inflight.discard(digest)
+            return url
+        _get_executor().submit(_upload_job, digest, ext, content_type, content)
+    except Exception:
+        with _inflight_lock:
+            _inflight.discard(digest)
+        logger.exception("[EDGE] snapshot offload schedule failed digest=%s", digest)
+        return None
+    return url
+
+
+def _rewrite_camera(cam: Dict[str, Any], base_url: Optional[str]) -> Tuple[Dict[str, Any], int]:
+    rewritten = None
+    count = 0
+    for key in SNAPSHOT_KEYS:
+        value = cam.get(key)
+        if not isinstance(value, str) or not value.startswith("data:"):
+            continue
+        if rewritten is None:
+            rewritten = dict(cam)
+        url = offload_data_url(value.strip(), base_url=base_url)
+        if url:
+            rewritten[key] = url
+        else:
+            # Data URL inválido ou fila cheia: remove a chave em vez de gravar o blob
+            # inline ou None, assim o heartbeat mantém o last_snapshot_url anterior.
+            rewritten.pop(key, None)
+        count += 1
+    return (rewritten if rewritten is not None else cam), count
+
+
+def rewrite_snapshot_payload(
+    payload: Dict[str, Any], *, base_url: Optional[str] = None
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Troca data URLs de snapshot por URLs assinadas no envelope (nível raiz,
+    `data` e listas de câmeras). Não altera o original; retorna (payload, trocados).
+    """
+    if not isinstance(payload, dict):
+        return payload, 0
+    result, total = _rewrite_camera(payload, base_url)
+    for list_key in CAMERA_LIST_KEYS:
+        cameras = result.get(list_key)
+        if not isinstance(cameras, list):
+            continue
+        new_cameras = []
+        changed = 0
+        for cam in cameras:
+            if isinstance(cam, dict):
+                cam, count = _rewrite_camera(cam, base_url)
+                changed += count
+            new_cameras.append(cam)
+        if changed:
+            result = dict(result) if result is payload else result
+            result[list_key] = new_cameras
+            total += changed
+    data = result.get("data")
+    if isinstance(data, dict):
+        new_data, count = rewrite_snapshot_payload(data, base_url=base_url)
+        if count:
+            result = dict(result) if result is payload else result
+            result["data"] = new_data
+            total += count
+    return result, total
+
+
+def rewrite_ingest_snapshots(
+    payload: Dict[str, Any], data: Dict[str, Any], *, base_url: Optional[str] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any], int]:
+    """
+    Reescreve o envelope uma vez e reaproveita o `data` já reescrito dele: o
+    `data` da view é cópia de payload["data"] (com store_id resolvido), então só
+    as chaves de snapshot são copiadas, sem decodificar/hashear de novo.
+    """
+    payload, count = rewrite_snapshot_payload(payload, base_url=base_url)
+    rewritten_data = payload.get("data")
+    if count and isinstance(rewritten_data, dict):
+        data = dict(data)
+        for key in REWRITTEN_KEYS:
+            if key in rewritten_data:
+                data[key] = rewritten_data[key]
+    return payload, data, count
+
+
+def open_local(digest: str, ext: str):
+    return open(os.path.join(local_root(), storage_path(digest, ext)), "rb")
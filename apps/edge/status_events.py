@@ -8,6 +8,9 @@ import requests
 from django.conf import settings
 from django.db import connection
 
+from apps.core.services.event_receipts import build_receipt_insert_sql, receipt_dedupe_table
+
+from .live_feed import publish_store_event
 from .vision_metrics import mark_event_receipt_failed, mark_event_receipt_processed
 
 logger = logging.getLogger(__name__)
@@ -61,9 +64,9 @@ def _should_cooldown(current_status: str) -> int:
 
 
 def _event_receipt_exists(event_id: str) -> bool:
-    # event_receipts.event_id tem UNIQUE no Supabase (você colou schema)
+    # event_id é único em event_receipts (ou em event_receipt_keys, quando particionada)
     with connection.cursor() as cursor:
-        cursor.execute("SELECT 1 FROM public.event_receipts WHERE event_id = %s LIMIT 1", [event_id])
+        cursor.execute(f"SELECT 1 FROM {receipt_dedupe_table()} WHERE event_id = %s LIMIT 1", [event_id])
         return cursor.fetchone() is not None
 
 
@@ -76,11 +79,7 @@ def _insert_event_receipt_if_new(event_id: str, event_name: str, envelope: dict)
     raw = json.dumps(envelope, ensure_ascii=False)
     with connection.cursor() as cursor:
         cursor.execute(
-            """
-            INSERT INTO public.event_receipts (event_id, event_name, event_version, ts, source, raw, meta)
-            VALUES (%s, %s, %s, now(), %s, %s::jsonb, %s::jsonb)
-            ON CONFLICT (event_id) DO NOTHING
-            """,
+            build_receipt_insert_sql(["(%s, %s, %s, now(), %s, %s::jsonb, %s::jsonb)"]),
             [event_id, event_name, 1, envelope.get("source", "backend"), raw, json.dumps(envelope.get("meta") or {})],
         )
         return cursor.rowcount == 1
@@ -186,6 +185,17 @@ def emit_enveloped_status_event(event_name: str, data: dict, meta: Optional[dict
         logger.info("[STATUS_EVENTS] dedup outgoing event_id=%s (skip)", event_id)
         return
 
+    from apps.alerts import outbox
+
+    if outbox.enabled():
+        # Receipt é marcado processed/failed pelo dispatcher quando a entrega concluir.
+        try:
+            outbox.enqueue(envelope, receipt_event_id=event_id)
+        except Exception:
+            logger.exception("[STATUS_EVENTS] outbox enqueue failed event_id=%s", event_id)
+            mark_event_receipt_failed(event_id=event_id, error_message="status_events_outbox_enqueue_failed")
+        return
+
     try:
         resp = requests.post(url, json=envelope, timeout=10)
         if resp.status_code >= 300:
@@ -271,4 +281,17 @@ def emit_camera_status_changed(
         "org_id": str(store.org_id) if store and getattr(store, "org_id", None) else None,
     }
 
+    publish_store_event(
+        data["store_id"],
+        "camera_status",
+        {
+            "camera_id": data["camera_id"],
+            "external_id": data["external_id"],
+            "previous_status": prev_status,
+            "current_status": new_status,
+            "reason": data["reason"],
+            "last_heartbeat": last_heartbeat_ts,
+            "occurred_at": occurred_at,
+        },
+    )
     emit_enveloped_status_event("camera_status_changed", data, meta=meta)
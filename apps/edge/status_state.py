@@ -0,0 +1,254 @@
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.stores.views_edge_status import (
+    CAMERA_HEALTH_RECENT_SECONDS,
+    classify_age,
+    compute_store_edge_status_snapshot,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _state_key(store_id) -> str:
+    return f"edge:status_state:{store_id}"
+
+
+def _lock_key(store_id) -> str:
+    return f"edge:status_state_lock:{store_id}"
+
+
+STATE_LOCK_SECONDS = 5
+STATE_LOCK_ATTEMPTS = 20
+STATE_LOCK_WAIT_SECONDS = 0.01
+
+
+def _state_ttl() -> int:
+    return int(getattr(settings, "EDGE_STATUS_STATE_TTL_SECONDS", 3600) or 0)
+
+
+def _parse_dt(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except Exception:
+        return None
+
+
+def _seed_state(store_id) -> Optional[dict]:
+    snapshot, reason = compute_store_edge_status_snapshot(store_id)
+    if reason:
+        return None
+    cameras = {}
+    for cam in snapshot.get("cameras") or []:
+        camera_id = cam.get("camera_id")
+        if not camera_id:
+            continue
+        recent = cam.get("reason") == "health_recent"
+        cameras[str(camera_id)] = {
+            "status": cam.get("status") or "unknown",
+            "checked_at": cam.get("camera_last_heartbeat_ts") if recent else None,
+        }
+    return {
+        "cameras": cameras,
+        "last_comm_at": snapshot.get("last_comm_at") or snapshot.get("last_heartbeat"),
+    }
+
+
+def load_store_edge_state(store_id) -> Optional[dict]:
+    """
+    Estado incremental de status da store (câmeras ativas + último contato).
+    Em cache frio é semeado uma vez a partir do snapshot completo.
+    """
+    state = cache.get(_state_key(store_id))
+    if isinstance(state, dict):
+        return state
+    try:
+        state = _seed_state(store_id)
+    except Exception:
+        logger.exception("[EDGE_STATUS] state seed failed store_id=%s", store_id)
+        return None
+    return state
+
+
+@contextmanager
+def _state_lock(store_id):
+    """Lock curto (cache.add) só para o get-merge-set; yield False se não obteve."""
+    token = uuid.uuid4().hex
+    acquired = False
+    for _ in range(STATE_LOCK_ATTEMPTS):
+        try:
+            acquired = bool(cache.add(_lock_key(store_id), token, STATE_LOCK_SECONDS))
+        except Exception:
+            logger.warning("[EDGE_STATUS] state lock unavailable store_id=%s", store_id)
+            break
+        if acquired:
+            break
+        time.sleep(STATE_LOCK_WAIT_SECONDS)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                if cache.get(_lock_key(store_id)) == token:
+                    cache.delete(_lock_key(store_id))
+            except Exception:
+                pass
+
+
+def _checked_at(entry) -> Optional[datetime]:
+    return _parse_dt((entry or {}).get("checked_at"))
+
+
+def _merge_state(current: dict, local: dict) -> dict:
+    """
+    Junta o estado local (carregado no início do request) com o que está no
+    cache agora: por câmera vence o checked_at mais novo e last_comm_at fica
+    com o maior. Assim heartbeat e camera_health concorrentes não apagam um
+    ao outro.
+    """
+    merged = {**current, "cameras": dict(current.get("cameras") or {})}
+    for key, entry in (local.get("cameras") or {}).items():
+        existing = merged["cameras"].get(key)
+        if existing is None:
+            merged["cameras"][key] = entry
+            continue
+        local_ts, current_ts = _checked_at(entry), _checked_at(existing)
+        if current_ts is None or (local_ts is not None and local_ts >= current_ts):
+            merged["cameras"][key] = entry
+    touch_store_comm(merged, local.get("last_comm_at"))
+    return merged
+
+
+def _update_state(store_id, local: Optional[dict], *, create: bool) -> None:
+    ttl = _state_ttl()
+    if ttl <= 0 or local is None:
+        return
+    try:
+        with _state_lock(store_id) as locked:
+            if not locked:
+                # Sem como serializar a escrita: descarta e o próximo load ressemeia do snapshot.
+                cache.delete(_state_key(store_id))
+                return
+            current = cache.get(_state_key(store_id))
+            if isinstance(current, dict):
+                local = _merge_state(current, local)
+            elif not create:
+                return
+            cache.set(_state_key(store_id), local, ttl)
+    except Exception:
+        logger.exception("[EDGE_STATUS] state save failed store_id=%s", store_id)
+
+
+def save_store_edge_state(store_id, state: dict) -> None:
+    _update_state(store_id, state, create=True)
+
+
+def invalidate_store_edge_state(store_id) -> None:
+    if not store_id:
+        return
+    cache.delete(_state_key(store_id))
+
+
+def apply_camera_health(
+    state: dict,
+    camera_id,
+    status: str,
+    checked_at,
+    *,
+    create: bool = False,
+) -> None:
+    # Só câmeras ativas entram no estado; câmeras novas vêm do upsert do heartbeat.
+    cameras = state.setdefault("cameras", {})
+    key = str(camera_id)
+    if key not in cameras and not create:
+        return
+    checked_at = _parse_dt(checked_at)
+    cameras[key] = {"status": status or "unknown", "checked_at": checked_at.isoformat() if checked_at else None}
+
+
+def touch_store_comm(state: dict, ts_dt) -> None:
+    ts_dt = _parse_dt(ts_dt)
+    current = _parse_dt(state.get("last_comm_at"))
+    if ts_dt and (current is None or ts_dt > current):
+        state["last_comm_at"] = ts_dt.isoformat()
+
+
+def _camera_status(entry: dict, now, recent_threshold) -> Tuple[str, Optional[int]]:
+    checked_at = _parse_dt(entry.get("checked_at"))
+    if checked_at and checked_at >= recent_threshold:
+        return entry.get("status") or "unknown", int((now - checked_at).total_seconds())
+    if checked_at:
+        return "offline", int((now - checked_at).total_seconds())
+    return entry.get("status") or "unknown", None
+
+
+def derive_store_status(state: dict, now=None) -> dict:
+    """
+    Deriva store_status do estado com as mesmas regras de
+    compute_store_edge_status_snapshot, sem consultar o banco.
+    """
+    now = now or timezone.now()
+    recent_threshold = now - timezone.timedelta(seconds=CAMERA_HEALTH_RECENT_SECONDS)
+    cameras = (state or {}).get("cameras") or {}
+    cameras_total = len(cameras)
+    cameras_online = 0
+    camera_ages = []
+    for entry in cameras.values():
+        cam_status, age = _camera_status(entry, now, recent_threshold)
+        if cam_status == "online":
+            cameras_online += 1
+        if age is not None:
+            camera_ages.append(age)
+
+    comm_status, comm_age_seconds, comm_reason = classify_age(_parse_dt((state or {}).get("last_comm_at")))
+    if cameras_total == 0:
+        store_status = "online_no_cameras" if comm_status in ("online", "degraded") else "offline"
+        reason = "no_cameras" if comm_status in ("online", "degraded") else comm_reason
+        age_seconds = comm_age_seconds
+    elif cameras_online >= 1:
+        if cameras_online < cameras_total:
+            store_status, reason = "degraded", "partial_camera_coverage"
+        else:
+            store_status, reason = "online", "all_cameras_online"
+        age_seconds = min(camera_ages) if camera_ages else None
+    else:
+        if comm_status in ("online", "degraded"):
+            store_status, reason = "offline", "camera_health_stale"
+        else:
+            store_status, reason = comm_status, comm_reason
+        age_seconds = min(camera_ages) if camera_ages else None
+
+    return {
+        "store_status": store_status,
+        "store_status_reason": reason,
+        "store_status_age_seconds": age_seconds,
+        "cameras_online": cameras_online,
+        "cameras_total": cameras_total,
+    }
+
+
+def record_camera_health(store_id, camera_id, status: str, checked_at) -> None:
+    """
+    Atualiza o estado já existente com um camera_health avulso (não semeia).
+    """
+    state = cache.get(_state_key(store_id))
+    if not isinstance(state, dict):
+        return
+    key = str(camera_id)
+    if key not in (state.get("cameras") or {}):
+        return
+    local = {"cameras": {}, "last_comm_at": None}
+    apply_camera_health(local, key, status, checked_at, create=True)
+    _update_state(store_id, local, create=False)
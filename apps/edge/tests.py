@@ -1,6 +1,7 @@
 import json
 import hashlib
 import uuid
+import time
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 from django.test import TestCase, SimpleTestCase
@@ -11,8 +12,19 @@ from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework.exceptions import PermissionDenied
 from knox.models import AuthToken
-from apps.edge.models import EdgeToken
-from apps.edge.auth import _extract_store_token
+from apps.edge.models import EdgeToken, EdgeEventMinuteStats
+from apps.edge.minute_stats import EventMinuteAggregator
+from apps.edge import (
+    camera_directory,
+    fleet_status,
+    live_feed,
+    metrics_rollups,
+    projection_worker,
+    receipt_partitions,
+    snapshot_offload,
+    status_state,
+)
+from apps.edge.auth import _extract_store_token, authenticate_edge_token, hash_edge_token, resolve_edge_token
 from apps.edge.vision_metrics import (
     apply_vision_metrics,
     apply_vision_crossing,
@@ -29,6 +41,7 @@ from apps.edge.views import (
     _normalize_ingest_event_name,
     _validate_retail_event_contract,
     EdgeEventsIngestView,
+    EdgeEventsBatchIngestView,
     EdgeCamerasView,
     EdgeStoreCamerasView,
 )
@@ -525,13 +538,7 @@ class EdgeEventsAuthTests(TestCase):
             },
         }
 
-        camera_obj = SimpleNamespace(id=uuid.uuid4())
-        camera_qs = MagicMock()
-        camera_external_qs = MagicMock()
-        camera_external_qs.first.return_value = camera_obj
-        camera_qs.filter.return_value = camera_external_qs
-
-        with patch("apps.edge.views.Camera.objects.filter", return_value=camera_qs):
+        with patch("apps.edge.views.resolve_store_camera", return_value=uuid.uuid4()):
             with patch("apps.edge.views.insert_vision_atomic_event_if_new", return_value=True) as atomic_insert:
                 with patch("apps.edge.views.apply_vision_queue_state") as apply_queue:
                     resp = self.client.post(
@@ -701,6 +708,979 @@ class EdgeRetailIngestUnitTests(SimpleTestCase):
         mark_processed.assert_called_once()
 
 
+class _FakeReceiptStore:
+    """event_receipts em memória: só o estado processado/pendente que o worker consulta."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def insert_one(self, *, event_id, event_name, payload, **_kwargs):
+        if event_id in self.rows:
+            return False
+        self.rows[event_id] = {"event_name": event_name, "payload": payload, "processed": False}
+        return True
+
+    def insert_many(self, receipts):
+        return {r["event_id"] for r in receipts if self.insert_one(**r)}
+
+    def mark_one(self, *, event_id, only_if_processed=False):
+        row = self.rows.get(event_id)
+        if row and (row["processed"] or not only_if_processed):
+            row["processed"] = True
+
+    def mark_many(self, *, event_ids, only_if_processed=False):
+        for event_id in event_ids:
+            self.mark_one(event_id=event_id, only_if_processed=only_if_processed)
+
+    def claim(self, _cursor, **_kwargs):
+        return [
+            {"event_id": event_id, "event_name": row["event_name"], "raw_payload": json.dumps(row["payload"])}
+            for event_id, row in self.rows.items()
+            if not row["processed"]
+        ]
+
+    def run_worker(self):
+        with patch("apps.edge.projection_worker._claim_pending_receipts", side_effect=self.claim), patch(
+            "apps.edge.projection_worker.connection.cursor", return_value=MagicMock()
+        ), patch("apps.edge.projection_worker.replay_receipt_projection", return_value=True) as replay, patch(
+            "apps.edge.projection_worker.mark_event_receipt_processed", side_effect=self.mark_one
+        ):
+            projection_worker.process_pending_receipts(limit=50)
+        return [c.kwargs["event_id"] for c in replay.call_args_list]
+
+
+class EdgeAsyncProjectionTests(TestCase):
+    store_id = "11111111-1111-1111-1111-111111111111"
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def _crossing_payload(self):
+        return {
+            "event_name": "vision.crossing.v1",
+            "receipt_id": "rcpt-async-1",
+            "data": {
+                "store_id": self.store_id,
+                "camera_id": "cam-entrada",
+                "ts": "2026-03-15T10:32:00Z",
+                "metric_type": "entry_exit",
+                "ownership": "primary",
+                "roi_entity_id": "line-main",
+                "direction": "entry",
+                "count_value": 1,
+            },
+        }
+
+    @patch("apps.edge.views.TokenAuthentication.authenticate", return_value=None)
+    @patch("apps.edge.views.EdgeEventsIngestView._is_edge_request")
+    @patch("apps.edge.views.resolve_store_camera", return_value=uuid.uuid4())
+    @patch("apps.edge.views.insert_event_receipt_if_new", return_value=True)
+    @patch("apps.edge.views.insert_vision_atomic_event_if_new")
+    @patch("apps.edge.views.mark_event_receipt_processed")
+    @patch("apps.edge.views._touch_store_seen")
+    def test_async_mode_only_stores_receipt_and_returns_202(
+        self,
+        _touch_store_seen,
+        mark_processed,
+        insert_atomic,
+        insert_receipt,
+        _resolve_camera,
+        is_edge_request,
+        _token_auth,
+    ):
+        is_edge_request.return_value = SimpleNamespace(ok=True, status_code=200, store_id=self.store_id, code=None, detail=None)
+        request = self.factory.post("/api/edge/events/", self._crossing_payload(), format="json")
+        with self.settings(EDGE_PROJECTION_MODE="async"):
+            response = EdgeEventsIngestView.as_view()(request)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.data.get("queued"))
+        insert_receipt.assert_called_once()
+        insert_atomic.assert_not_called()
+        mark_processed.assert_not_called()
+
+    @patch("apps.edge.views.TokenAuthentication.authenticate", return_value=None)
+    @patch("apps.edge.views.EdgeEventsIngestView._is_edge_request")
+    @patch("apps.edge.views.resolve_store_camera", return_value=uuid.uuid4())
+    @patch("apps.edge.views._touch_store_seen")
+    def test_retry_after_202_keeps_receipt_pending_for_worker(self, _touch_store_seen, _resolve_camera, is_edge_request, _token_auth):
+        is_edge_request.return_value = SimpleNamespace(ok=True, status_code=200, store_id=self.store_id, code=None, detail=None)
+        receipts = _FakeReceiptStore()
+        statuses = []
+        with patch("apps.edge.views.insert_event_receipt_if_new", side_effect=receipts.insert_one), patch(
+            "apps.edge.views.mark_event_receipt_processed", side_effect=receipts.mark_one
+        ), self.settings(EDGE_PROJECTION_MODE="async"):
+            for _attempt in range(2):
+                request = self.factory.post("/api/edge/events/", self._crossing_payload(), format="json")
+                statuses.append(EdgeEventsIngestView.as_view()(request).status_code)
+
+        self.assertEqual(statuses, [202, 200])
+        self.assertEqual(receipts.run_worker(), ["rcpt-async-1"])
+        self.assertTrue(receipts.rows["rcpt-async-1"]["processed"])
+
+    def test_worker_claims_with_skip_locked_and_marks_outcomes(self):
+        cursor = MagicMock()
+        cursor.description = [("event_id",), ("event_name",), ("raw_payload",)]
+        cursor.fetchall.return_value = [
+            ("rcpt-ok", "vision.crossing.v1", json.dumps(self._crossing_payload())),
+            ("rcpt-boom", "vision.metrics.v1", json.dumps({"data": {}})),
+            ("rcpt-bad", "vision.crossing.v1", "not-json"),
+        ]
+        cursor_cm = MagicMock()
+        cursor_cm.__enter__.return_value = cursor
+        cursor_cm.__exit__.return_value = False
+
+        with patch("apps.edge.projection_worker.connection.cursor", return_value=cursor_cm), patch(
+            "apps.edge.projection_worker.transaction.atomic"
+        ), patch(
+            "apps.edge.projection_worker.replay_receipt_projection",
+            side_effect=[True, RuntimeError("boom")],
+        ) as replay, patch(
+            "apps.edge.projection_worker.mark_event_receipt_processed"
+        ) as mark_processed, patch(
+            "apps.edge.projection_worker.mark_event_receipt_failed"
+        ) as mark_failed:
+            counts = projection_worker.process_pending_receipts(limit=50, partition=1, partitions=4)
+
+        claim_sql, claim_params = cursor.execute.call_args[0]
+        self.assertIn("FOR UPDATE SKIP LOCKED", claim_sql)
+        self.assertIn("hashtext", claim_sql)
+        self.assertEqual(claim_params[1:], [4, 1, 50])
+        self.assertEqual(counts, {"claimed": 3, "processed": 1, "failed": 2})
+        self.assertEqual(replay.call_count, 2)
+        mark_processed.assert_called_once_with(event_id="rcpt-ok")
+        self.assertEqual(
+            [c.kwargs["event_id"] for c in mark_failed.call_args_list],
+            ["rcpt-boom", "rcpt-bad"],
+        )
+
+
+class EdgeBatchIngestUnitTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.store_id = "11111111-1111-1111-1111-111111111111"
+        self.camera_uuid = "22222222-2222-2222-2222-222222222222"
+
+    def _crossing(self, receipt_id, **overrides):
+        data = {
+            "store_id": self.store_id,
+            "camera_id": "cam-entrada",
+            "ts": "2026-03-15T10:32:05Z",
+            "metric_type": "entry_exit",
+            "ownership": "primary",
+            "roi_entity_id": "line-main",
+            "direction": "entry",
+        }
+        data.update(overrides)
+        return {"event_name": "vision.crossing.v1", "receipt_id": receipt_id, "data": data}
+
+    def _post(self, body):
+        request = self.factory.post("/api/edge/events/batch/", body, format="json", HTTP_X_EDGE_TOKEN="valid")
+        return EdgeEventsBatchIngestView.as_view()(request)
+
+    @patch("apps.edge.views.TokenAuthentication.authenticate", return_value=None)
+    @patch("apps.edge.views.authenticate_edge_token")
+    @patch("apps.edge.views._load_camera_index")
+    @patch("apps.edge.views.insert_event_receipts_if_new")
+    @patch("apps.edge.views.insert_vision_atomic_event_if_new", return_value=True)
+    @patch("apps.edge.views.apply_vision_crossing")
+    @patch("apps.edge.views.mark_event_receipts_processed")
+    @patch("apps.edge.views._bump_event_minute")
+    @patch("apps.edge.views._touch_store_seen")
+    def test_batch_dedupes_in_one_insert_and_reports_per_item(
+        self,
+        touch_store_seen,
+        bump_event_minute,
+        mark_processed,
+        apply_crossing,
+        _insert_atomic,
+        insert_receipts,
+        load_camera_index,
+        auth_mock,
+        _token_auth,
+    ):
+        auth_mock.return_value = SimpleNamespace(ok=True, status_code=200, store_id=self.store_id, code=None, detail=None)
+        load_camera_index.return_value = {
+            self.store_id: {"external_id": {"cam-entrada": self.camera_uuid}, "id": {}, "name": {}}
+        }
+        insert_receipts.return_value = {"rcpt-new"}
+        body = {
+            "events": [
+                self._crossing("rcpt-new"),
+                self._crossing("rcpt-old"),
+                self._crossing("rcpt-new"),
+                self._crossing("rcpt-bad", metric_type=None),
+                self._crossing("rcpt-cam", camera_id="cam-missing"),
+            ]
+        }
+
+        response = self._post(body)
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual([r["ok"] for r in results], [True, True, True, False, False])
+        self.assertFalse(results[0]["deduped"])
+        self.assertTrue(results[1]["deduped"])
+        self.assertTrue(results[2]["deduped"])
+        self.assertEqual(results[3]["reason"], "vision_contract_invalid")
+        self.assertFalse(results[3]["retryable"])
+        self.assertEqual(results[4]["reason"], "camera_not_found")
+        insert_receipts.assert_called_once()
+        self.assertEqual([r["event_id"] for r in insert_receipts.call_args.args[0]], ["rcpt-new", "rcpt-old"])
+        apply_crossing.assert_called_once()
+        self.assertEqual(
+            [(c.kwargs["event_ids"], c.kwargs.get("only_if_processed", False)) for c in mark_processed.call_args_list],
+            [(["rcpt-new"], False), (["rcpt-old"], True)],
+        )
+        touch_store_seen.assert_called_once_with(self.store_id)
+        bump_event_minute.assert_called_once()
+        self.assertEqual(bump_event_minute.call_args.kwargs["count"], 3)
+
+    @patch("apps.edge.views.TokenAuthentication.authenticate", return_value=None)
+    @patch("apps.edge.views.authenticate_edge_token")
+    @patch("apps.edge.views._load_camera_index")
+    @patch("apps.edge.views.insert_event_receipts_if_new")
+    @patch("apps.edge.views.insert_vision_atomic_event_if_new", return_value=True)
+    @patch("apps.edge.views.apply_vision_crossing", side_effect=RuntimeError("boom"))
+    @patch("apps.edge.views.mark_event_receipt_failed")
+    @patch("apps.edge.views.mark_event_receipts_processed")
+    @patch("apps.edge.views._bump_event_minute")
+    @patch("apps.edge.views._touch_store_seen")
+    def test_batch_rejects_foreign_store_and_heartbeat_and_marks_projection_failure(
+        self,
+        _touch_store_seen,
+        _bump_event_minute,
+        _mark_processed,
+        mark_failed,
+        _apply_crossing,
+        _insert_atomic,
+        insert_receipts,
+        load_camera_index,
+        auth_mock,
+        _token_auth,
+    ):
+        auth_mock.return_value = SimpleNamespace(ok=True, status_code=200, store_id=self.store_id, code=None, detail=None)
+        load_camera_index.return_value = {
+            self.store_id: {"external_id": {"cam-entrada": self.camera_uuid}, "id": {}, "name": {}}
+        }
+        insert_receipts.return_value = {"rcpt-1"}
+        body = [
+            self._crossing("rcpt-1"),
+            self._crossing("rcpt-2", store_id="33333333-3333-3333-3333-333333333333"),
+            {"event_name": "edge_heartbeat", "data": {"store_id": self.store_id}},
+        ]
+
+        response = self._post(body)
+
+        results = response.data["results"]
+        self.assertEqual(results[0]["reason"], "vision_crossing_ingest_failed")
+        self.assertFalse(results[0]["retryable"])
+        self.assertEqual(results[1]["reason"], "edge_store_mismatch")
+        self.assertEqual(results[2]["reason"], "batch_event_not_supported")
+        mark_failed.assert_called_once_with(event_id="rcpt-1", error_message="vision_crossing_ingest_failed")
+        self.assertFalse(response.data["ok"])
+
+    @patch("apps.edge.views.TokenAuthentication.authenticate", return_value=None)
+    @patch("apps.edge.views.authenticate_edge_token")
+    @patch("apps.edge.views._load_camera_index")
+    @patch("apps.edge.views.apply_vision_crossing")
+    @patch("apps.edge.views._bump_event_minute")
+    @patch("apps.edge.views._touch_store_seen")
+    def test_async_batch_duplicate_does_not_mark_pending_receipt(
+        self,
+        _touch_store_seen,
+        _bump_event_minute,
+        apply_crossing,
+        load_camera_index,
+        auth_mock,
+        _token_auth,
+    ):
+        auth_mock.return_value = SimpleNamespace(ok=True, status_code=200, store_id=self.store_id, code=None, detail=None)
+        load_camera_index.return_value = {
+            self.store_id: {"external_id": {"cam-entrada": self.camera_uuid}, "id": {}, "name": {}}
+        }
+        receipts = _FakeReceiptStore()
+        with patch("apps.edge.views.insert_event_receipts_if_new", side_effect=receipts.insert_many), patch(
+            "apps.edge.views.mark_event_receipts_processed", side_effect=receipts.mark_many
+        ), self.settings(EDGE_PROJECTION_MODE="async"):
+            response = self._post([self._crossing("rcpt-dup"), self._crossing("rcpt-dup")])
+            retry = self._post([self._crossing("rcpt-dup")])
+
+        self.assertEqual([r["status"] for r in response.data["results"]], [202, 200])
+        self.assertTrue(retry.data["results"][0]["deduped"])
+        apply_crossing.assert_not_called()
+        self.assertEqual(receipts.run_worker(), ["rcpt-dup"])
+
+    @patch("apps.edge.views.authenticate_edge_token")
+    def test_batch_requires_non_empty_list(self, auth_mock):
+        response = self._post({"events": []})
+        self.assertEqual(response.status_code, 400)
+        auth_mock.assert_not_called()
+
+
+class EdgeTokenCacheTests(TestCase):
+    store_id = uuid.UUID("11111111-1111-1111-1111-111111111111")
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.factory = APIRequestFactory()
+
+    def _request(self, raw_token):
+        return self.factory.get("/api/edge/events/", HTTP_X_EDGE_TOKEN=raw_token)
+
+    def test_resolution_is_cached_and_last_used_written_once_per_interval(self):
+        token = EdgeToken.objects.create(store_id=self.store_id, token_hash=hash_edge_token("tok-a"), active=True)
+
+        with self.assertNumQueries(2):
+            self.assertTrue(authenticate_edge_token(self._request("tok-a")).ok)
+        with self.assertNumQueries(0):
+            result = authenticate_edge_token(self._request("tok-a"))
+        self.assertTrue(result.ok)
+        self.assertEqual(result.store_id, str(self.store_id))
+        token.refresh_from_db()
+        self.assertIsNotNone(token.last_used_at)
+
+    def test_invalid_hash_is_negative_cached(self):
+        with self.assertNumQueries(1):
+            self.assertFalse(authenticate_edge_token(self._request("tok-missing")).ok)
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolve_edge_token(hash_edge_token("tok-missing")))
+
+    def test_rotate_invalidates_cached_token(self):
+        from apps.stores.views import _rotate_edge_token
+
+        EdgeToken.objects.create(store_id=self.store_id, token_hash=hash_edge_token("tok-old"), active=True)
+        self.assertTrue(authenticate_edge_token(self._request("tok-old")).ok)
+
+        _token, raw_token = _rotate_edge_token(self.store_id)
+
+        self.assertFalse(authenticate_edge_token(self._request("tok-old")).ok)
+        self.assertTrue(authenticate_edge_token(self._request(raw_token)).ok)
+
+
+class CameraDirectoryCacheTests(SimpleTestCase):
+    store_id = "11111111-1111-1111-1111-111111111111"
+    camera_pk = uuid.UUID("22222222-2222-2222-2222-222222222222")
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def _directory(self):
+        return {
+            self.store_id: {
+                "external_id": {"cam-entrada": self.camera_pk},
+                "id": {str(self.camera_pk): self.camera_pk},
+                "name": {"Entrada": self.camera_pk},
+            }
+        }
+
+    def test_resolves_by_external_id_id_and_name_from_one_load(self):
+        with patch("apps.edge.camera_directory.build_camera_directories", return_value=self._directory()) as build:
+            self.assertEqual(camera_directory.resolve_store_camera(self.store_id, "cam-entrada"), self.camera_pk)
+            self.assertEqual(camera_directory.resolve_store_camera(self.store_id, str(self.camera_pk)), self.camera_pk)
+            self.assertEqual(camera_directory.resolve_store_camera(self.store_id, "Entrada"), self.camera_pk)
+        build.assert_called_once()
+
+    def test_invalidation_bumps_version_and_reloads(self):
+        with patch("apps.edge.camera_directory.build_camera_directories", return_value=self._directory()) as build:
+            camera_directory.get_camera_directories([self.store_id])
+            camera_directory.get_camera_directories([self.store_id])
+            camera_directory.invalidate_camera_directory(self.store_id)
+            camera_directory.get_camera_directories([self.store_id])
+        self.assertEqual(build.call_count, 2)
+
+    def test_unknown_camera_reloads_once_before_giving_up(self):
+        with patch("apps.edge.camera_directory.build_camera_directories", return_value=self._directory()) as build:
+            self.assertIsNone(camera_directory.resolve_store_camera(self.store_id, "cam-missing"))
+        self.assertEqual(build.call_count, 2)
+
+
+class StoreEdgeStatusStateTests(SimpleTestCase):
+    store_id = "11111111-1111-1111-1111-111111111111"
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_derive_matches_snapshot_rules(self):
+        from django.utils import timezone
+
+        now = timezone.now()
+        stale = now - timezone.timedelta(seconds=600)
+        state = {
+            "cameras": {
+                "cam-a": {"status": "online", "checked_at": now.isoformat()},
+                "cam-b": {"status": "online", "checked_at": stale.isoformat()},
+            },
+            "last_comm_at": now.isoformat(),
+        }
+        derived = status_state.derive_store_status(state, now=now)
+        self.assertEqual(derived["store_status"], "degraded")
+        self.assertEqual(derived["store_status_reason"], "partial_camera_coverage")
+        self.assertEqual((derived["cameras_online"], derived["cameras_total"]), (1, 2))
+
+        status_state.apply_camera_health(state, "cam-b", "online", now)
+        self.assertEqual(status_state.derive_store_status(state, now=now)["store_status"], "online")
+
+        empty = {"cameras": {}, "last_comm_at": None}
+        self.assertEqual(status_state.derive_store_status(empty, now=now)["store_status"], "offline")
+        status_state.touch_store_comm(empty, now)
+        self.assertEqual(status_state.derive_store_status(empty, now=now)["store_status"], "online_no_cameras")
+
+    def test_state_is_seeded_once_then_served_from_cache(self):
+        snapshot = {
+            "store_status": "online",
+            "last_comm_at": "2026-03-09T12:00:00+00:00",
+            "cameras": [
+                {"camera_id": "cam-a", "status": "online", "reason": "health_recent",
+                 "camera_last_heartbeat_ts": "2026-03-09T12:00:00+00:00"},
+                {"camera_id": "cam-b", "status": "unknown", "reason": "no_recent_health",
+                 "camera_last_heartbeat_ts": None},
+            ],
+        }
+        with patch(
+            "apps.edge.status_state.compute_store_edge_status_snapshot",
+            return_value=(snapshot, None),
+        ) as compute:
+            state = status_state.load_store_edge_state(self.store_id)
+            status_state.save_store_edge_state(self.store_id, state)
+            cached = status_state.load_store_edge_state(self.store_id)
+
+        compute.assert_called_once()
+        self.assertEqual(set(cached["cameras"]), {"cam-a", "cam-b"})
+        self.assertIsNone(cached["cameras"]["cam-b"]["checked_at"])
+
+        status_state.record_camera_health(self.store_id, "cam-b", "offline", "2026-03-09T12:01:00Z")
+        status_state.record_camera_health(self.store_id, "cam-inactive", "online", "2026-03-09T12:01:00Z")
+        cached = status_state.load_store_edge_state(self.store_id)
+        self.assertEqual(cached["cameras"]["cam-b"]["status"], "offline")
+        self.assertNotIn("cam-inactive", cached["cameras"])
+
+        status_state.invalidate_store_edge_state(self.store_id)
+        with patch(
+            "apps.edge.status_state.compute_store_edge_status_snapshot",
+            return_value=(snapshot, None),
+        ) as compute:
+            status_state.load_store_edge_state(self.store_id)
+        compute.assert_called_once()
+
+    def _seed(self, state):
+        from django.core.cache import cache
+
+        cache.set(status_state._state_key(self.store_id), state, 3600)
+
+    def test_concurrent_heartbeat_and_camera_health_keep_both_updates(self):
+        self._seed(
+            {
+                "cameras": {
+                    "cam-a": {"status": "online", "checked_at": "2026-03-09T12:00:00+00:00"},
+                    "cam-b": {"status": "online", "checked_at": "2026-03-09T12:00:00+00:00"},
+                },
+                "last_comm_at": "2026-03-09T12:00:00+00:00",
+            }
+        )
+        heartbeat_state = status_state.load_store_edge_state(self.store_id)
+
+        # camera_health chega enquanto o heartbeat ainda processa o estado que leu.
+        status_state.record_camera_health(self.store_id, "cam-b", "offline", "2026-03-09T12:02:00Z")
+        status_state.apply_camera_health(heartbeat_state, "cam-a", "online", "2026-03-09T12:01:00Z")
+        status_state.touch_store_comm(heartbeat_state, "2026-03-09T12:01:00Z")
+        status_state.save_store_edge_state(self.store_id, heartbeat_state)
+
+        cached = status_state.load_store_edge_state(self.store_id)
+        self.assertEqual(cached["cameras"]["cam-b"]["status"], "offline")
+        self.assertEqual(cached["cameras"]["cam-a"]["checked_at"], "2026-03-09T12:01:00+00:00")
+        self.assertEqual(cached["last_comm_at"], "2026-03-09T12:01:00+00:00")
+
+    def test_save_drops_state_when_lock_is_held(self):
+        from django.core.cache import cache
+
+        self._seed({"cameras": {}, "last_comm_at": None})
+        cache.set(status_state._lock_key(self.store_id), "other", 5)
+
+        with patch.object(status_state, "STATE_LOCK_ATTEMPTS", 2), patch.object(
+            status_state, "STATE_LOCK_WAIT_SECONDS", 0
+        ):
+            status_state.save_store_edge_state(self.store_id, {"cameras": {}, "last_comm_at": "2026-03-09T12:00:00Z"})
+
+        self.assertIsNone(cache.get(status_state._state_key(self.store_id)))
+
+
+class EventMinuteAggregatorTests(TestCase):
+    store_id = "11111111-1111-1111-1111-111111111111"
+
+    def _ts(self, second):
+        from datetime import datetime, timezone as dt_timezone
+
+        return datetime(2026, 3, 9, 12, 0, second, tzinfo=dt_timezone.utc)
+
+    def test_buffers_deltas_and_flushes_one_row_per_minute(self):
+        aggregator = EventMinuteAggregator(flush_interval_seconds=3600, max_pending_events=100)
+        with patch.object(aggregator, "_ensure_flusher"):
+            aggregator.add(self.store_id, "vision.crossing.v1", self._ts(5))
+            aggregator.add(self.store_id, "vision.crossing.v1", self._ts(40), count=2)
+            aggregator.add(self.store_id, "edge_heartbeat", self._ts(10))
+
+        self.assertEqual(EdgeEventMinuteStats.objects.count(), 0)
+        self.assertEqual(aggregator.flush(), 2)
+        row = EdgeEventMinuteStats.objects.get(event_name="vision.crossing.v1")
+        self.assertEqual(row.count, 3)
+        self.assertEqual(row.last_event_at, self._ts(40))
+
+        with patch.object(aggregator, "_ensure_flusher"):
+            aggregator.add(self.store_id, "vision.crossing.v1", self._ts(20))
+        aggregator.flush()
+        row.refresh_from_db()
+        self.assertEqual(row.count, 4)
+        self.assertEqual(row.last_event_at, self._ts(40))
+        self.assertEqual(aggregator.stats()["flushed_rows"], 3)
+
+    def test_flushes_when_pending_events_reach_threshold(self):
+        aggregator = EventMinuteAggregator(flush_interval_seconds=3600, max_pending_events=2)
+        with patch.object(aggregator, "_ensure_flusher"):
+            aggregator.add(self.store_id, "vision.crossing.v1", self._ts(1))
+            self.assertEqual(EdgeEventMinuteStats.objects.count(), 0)
+            aggregator.add(self.store_id, "vision.crossing.v1", self._ts(2))
+
+        self.assertEqual(EdgeEventMinuteStats.objects.get().count, 2)
+        self.assertEqual(aggregator.stats()["pending_events"], 0)
+
+    def test_failed_flush_requeues_and_counts_dropped_deltas(self):
+        aggregator = EventMinuteAggregator(flush_interval_seconds=3600, max_pending_keys=1)
+        with patch.object(aggregator, "_ensure_flusher"):
+            aggregator.add(self.store_id, "vision.crossing.v1", self._ts(1), count=3)
+            aggregator.add(self.store_id, "edge_heartbeat", self._ts(1))
+
+        with patch("apps.edge.minute_stats._upsert_minute_stats", side_effect=RuntimeError("db down")):
+            self.assertEqual(aggregator.flush(), 0)
+
+        stats = aggregator.stats()
+        self.assertEqual(stats["dropped_deltas"], 1)
+        self.assertEqual(stats["pending_events"], 3)
+        aggregator.flush()
+        self.assertEqual(EdgeEventMinuteStats.objects.get().count, 3)
+
+
+class MetricsRollupTests(SimpleTestCase):
+    store_id = "11111111-1111-1111-1111-111111111111"
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.delete("metrics:rollup_watermark")
+        self.addCleanup(cache.delete, "metrics:rollup_watermark")
+
+    def _dt(self, *args):
+        from datetime import datetime, timezone as dt_timezone
+
+        return datetime(*args, tzinfo=dt_timezone.utc)
+
+    def _row(self, bucket, **fields):
+        return (self.store_id, bucket, *[fields.get(name, 0) for name in metrics_rollups.ROLLUP_FIELDS])
+
+    def test_plan_uses_daily_for_full_days_and_raw_for_edges(self):
+        raw, rollup = metrics_rollups.plan_metric_segments(
+            self._dt(2026, 3, 1, 22, 30),
+            self._dt(2026, 3, 4, 1, 15),
+            coverage_end=self._dt(2026, 3, 4, 0),
+        )
+        self.assertEqual(
+            rollup,
+            [
+                ("hour", self._dt(2026, 3, 1, 23), self._dt(2026, 3, 2)),
+                ("day", self._dt(2026, 3, 2), self._dt(2026, 3, 4)),
+            ],
+        )
+        self.assertEqual(
+            raw,
+            [
+                (self._dt(2026, 3, 1, 22, 30), self._dt(2026, 3, 1, 23)),
+                (self._dt(2026, 3, 4), self._dt(2026, 3, 4, 1, 15)),
+            ],
+        )
+
+    def test_plan_hour_bucket_skips_daily_and_no_coverage_is_raw(self):
+        start, end = self._dt(2026, 3, 1, 22, 30), self._dt(2026, 3, 4, 1, 15)
+        raw, rollup = metrics_rollups.plan_metric_segments(
+            start, end, coverage_end=self._dt(2026, 3, 4, 0), bucket="hour"
+        )
+        self.assertEqual(rollup, [("hour", self._dt(2026, 3, 1, 23), self._dt(2026, 3, 4))])
+        self.assertEqual(len(raw), 2)
+
+        raw, rollup = metrics_rollups.plan_metric_segments(start, end, coverage_end=None)
+        self.assertEqual(raw, [(start, end)])
+        self.assertEqual(rollup, [])
+
+    def test_aggregate_merges_rollup_and_raw_rows_per_bucket(self):
+        cursor = MagicMock()
+        watermark = self._dt(2026, 3, 3, 12, 10)
+        cursor.fetchone.return_value = (watermark,)
+        cursor.fetchall.side_effect = [
+            [self._row(self._dt(2026, 3, 2, 10), footfall=30, traffic_rows=60, dwell_sum=600, dwell_count=10)],
+            [self._row(self._dt(2026, 3, 2), footfall=5, traffic_rows=3, dwell_sum=40, dwell_count=2)],
+        ]
+        with self.settings(METRICS_ROLLUP_READS_ENABLED=True, METRICS_ROLLUP_SETTLE_SECONDS=300):
+            result = metrics_rollups.aggregate_metrics(
+                cursor,
+                store_ids=[self.store_id],
+                start=self._dt(2026, 3, 2, 9, 45),
+                end=self._dt(2026, 3, 3, 13, 0),
+                bucket="day",
+            )
+
+        day = result[self._dt(2026, 3, 2)]
+        self.assertEqual(day["footfall"], 35)
+        self.assertEqual(metrics_rollups.average(day, "dwell_sum", "dwell_count"), 53.333333333333336)
+        executed = [call.args[0] for call in cursor.execute.call_args_list]
+        self.assertIn("metrics_rollup_state", executed[0])
+        self.assertIn("public.metrics_rollup_hourly", executed[1])
+        self.assertIn("public.traffic_metrics", executed[2])
+        self.assertIn("camera_role = 'entrada' OR camera_role IS NULL", executed[2])
+
+    def test_aggregate_reads_raw_only_when_reads_disabled(self):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = []
+        with self.settings(METRICS_ROLLUP_READS_ENABLED=False):
+            metrics_rollups.aggregate_metrics(
+                cursor,
+                store_ids=[self.store_id],
+                start=self._dt(2026, 3, 1),
+                end=self._dt(2026, 3, 8),
+                scope=metrics_rollups.SCOPE_ALL,
+            )
+        self.assertEqual(cursor.execute.call_count, 1)
+        sql = cursor.execute.call_args.args[0]
+        self.assertIn("public.conversion_metrics", sql)
+        self.assertNotIn("camera_role", sql)
+
+    def test_refresh_rebuilds_hours_for_both_scopes_and_their_days(self):
+        cursor = MagicMock()
+        hours = [
+            (self.store_id, self._dt(2026, 3, 2, 10)),
+            (self.store_id, self._dt(2026, 3, 2, 11, 30)),
+        ]
+        refreshed = metrics_rollups.refresh_rollup_hours(cursor, hours)
+
+        self.assertEqual(refreshed, 2)
+        executed = [call.args for call in cursor.execute.call_args_list]
+        self.assertEqual(len(executed), 5)
+        self.assertIn("DELETE FROM public.metrics_rollup_hourly", executed[0][0])
+        self.assertEqual(executed[0][1][1], [self._dt(2026, 3, 2, 10), self._dt(2026, 3, 2, 11)])
+        self.assertIn("'primary'", executed[1][0])
+        self.assertIn("'all'", executed[2][0])
+        self.assertIn("DELETE FROM public.metrics_rollup_daily", executed[3][0])
+        self.assertEqual(executed[3][1][1], [self._dt(2026, 3, 2)])
+        self.assertIn("INSERT INTO public.metrics_rollup_daily", executed[4][0])
+
+
+class LiveFeedBrokerTests(SimpleTestCase):
+    def test_publish_fans_out_per_store(self):
+        broker = live_feed.LiveFeedBroker()
+        sub_a = broker.subscribe("store-a", maxsize=4)
+        sub_b = broker.subscribe("store-b", maxsize=4)
+
+        delivered = broker.publish("store-a", "vision_event", {"camera_id": "cam-1"})
+
+        self.assertEqual(delivered, 1)
+        event = sub_a.get(timeout=0.1)
+        self.assertEqual(event["type"], "vision_event")
+        self.assertEqual(event["data"], {"camera_id": "cam-1"})
+        self.assertIsNone(sub_b.get(timeout=0.01))
+
+    def test_slow_subscriber_is_dropped_without_blocking_publish(self):
+        broker = live_feed.LiveFeedBroker()
+        slow = broker.subscribe("store-a", maxsize=2)
+        fast = broker.subscribe("store-a", maxsize=10)
+
+        for idx in range(3):
+            broker.publish("store-a", "camera_status", {"idx": idx})
+
+        self.assertTrue(slow.dropped)
+        self.assertFalse(fast.dropped)
+        self.assertEqual(broker.subscriber_count("store-a"), 1)
+        self.assertEqual(fast.queue.qsize(), 3)
+
+    def test_subscriber_limit_per_store(self):
+        broker = live_feed.LiveFeedBroker()
+        with self.settings(LIVE_FEED_MAX_SUBSCRIBERS_PER_STORE=1):
+            first = broker.subscribe("store-a")
+            with self.assertRaises(OverflowError):
+                broker.subscribe("store-a")
+            broker.unsubscribe(first)
+            broker.subscribe("store-a")
+
+    def test_stream_limit_per_process_across_stores(self):
+        broker = live_feed.LiveFeedBroker()
+        with self.settings(LIVE_FEED_MAX_STREAMS=2):
+            broker.subscribe("store-a")
+            second = broker.subscribe("store-b")
+            with self.assertRaises(live_feed.LiveFeedLimitError) as ctx:
+                broker.subscribe("store-c")
+            self.assertEqual(ctx.exception.scope, "process")
+            broker.unsubscribe(second)
+            broker.unsubscribe(second)
+            self.assertEqual(broker.total_count(), 1)
+            broker.subscribe("store-c")
+
+    def test_publish_store_event_is_noop_when_disabled(self):
+        with self.settings(LIVE_FEED_ENABLED=False), patch.object(live_feed.broker, "publish") as publish_mock:
+            live_feed.publish_store_event("store-a", "vision_event", {})
+        publish_mock.assert_not_called()
+
+
+class ReceiptPartitionsTests(SimpleTestCase):
+    def _ts(self, raw):
+        from datetime import datetime, timezone as dt_timezone
+
+        return datetime.fromisoformat(raw).replace(tzinfo=dt_timezone.utc)
+
+    def test_parses_bounds_including_minvalue(self):
+        legacy = receipt_partitions.parse_partition_bound(
+            "event_receipts_legacy", "FOR VALUES FROM (MINVALUE) TO ('2026-10-19 00:00:00+00')"
+        )
+        weekly = receipt_partitions.parse_partition_bound(
+            "event_receipts_p20261019",
+            "FOR VALUES FROM ('2026-10-19 00:00:00+00') TO ('2026-10-26 00:00:00+00')",
+        )
+        self.assertIsNone(legacy.lower)
+        self.assertEqual(legacy.upper, self._ts("2026-10-19T00:00:00"))
+        self.assertEqual(weekly.lower, self._ts("2026-10-19T00:00:00"))
+        self.assertIsNone(receipt_partitions.parse_partition_bound("x", "DEFAULT"))
+
+    def test_plans_missing_weekly_partitions_around_existing_ones(self):
+        existing = [
+            receipt_partitions.Partition("event_receipts_legacy", None, self._ts("2026-10-19T00:00:00")),
+            receipt_partitions.Partition(
+                "event_receipts_p20261019", self._ts("2026-10-19T00:00:00"), self._ts("2026-10-26T00:00:00")
+            ),
+        ]
+        planned = receipt_partitions.plan_missing_partitions(
+            existing, now=self._ts("2026-10-21T15:00:00"), interval="weekly", ahead=2
+        )
+        self.assertEqual([p.name for p in planned], ["event_receipts_p20261026", "event_receipts_p20261102"])
+        self.assertEqual(planned[0].upper, self._ts("2026-11-02T00:00:00"))
+
+    def test_expires_only_partitions_fully_outside_retention(self):
+        existing = [
+            receipt_partitions.Partition("event_receipts_legacy", None, self._ts("2026-09-07T00:00:00")),
+            receipt_partitions.Partition(
+                "event_receipts_p20260907", self._ts("2026-09-07T00:00:00"), self._ts("2026-09-14T00:00:00")
+            ),
+        ]
+        expired = receipt_partitions.plan_expired_partitions(
+            existing, now=self._ts("2026-10-14T12:00:00"), retention_days=35
+        )
+        self.assertEqual([p.name for p in expired], ["event_receipts_legacy"])
+
+    def test_receipt_insert_sql_claims_dedupe_key_when_partitioned(self):
+        from apps.core.services.event_receipts import build_receipt_insert_sql
+
+        with override_settings(EVENT_RECEIPTS_PARTITIONED=False):
+            plain = build_receipt_insert_sql(["(%s, %s, %s, %s, %s, %s::jsonb, %s::jsonb)"], returning=True)
+        with override_settings(EVENT_RECEIPTS_PARTITIONED=True):
+            partitioned = build_receipt_insert_sql(["(%s, %s, %s, %s, %s, %s::jsonb, %s::jsonb)"], returning=True)
+
+        self.assertIn("ON CONFLICT (event_id) DO NOTHING", plain)
+        self.assertNotIn("event_receipt_keys", plain)
+        self.assertIn("INSERT INTO public.event_receipt_keys (event_id)", partitioned)
+        self.assertIn("JOIN claimed ON claimed.event_id = incoming.event_id", partitioned)
+        self.assertTrue(partitioned.rstrip().endswith("RETURNING event_id"))
+
+
+class FleetStatusTickTests(SimpleTestCase):
+    def _fleet(self, now):
+        from datetime import timedelta
+
+        store = SimpleNamespace(id=uuid.uuid4(), org_id=uuid.uuid4(), last_seen_at=now - timedelta(seconds=30))
+        cam_ok = SimpleNamespace(id=uuid.uuid4(), store_id=store.id, external_id="cam-1", last_seen_at=None)
+        cam_stale = SimpleNamespace(id=uuid.uuid4(), store_id=store.id, external_id="cam-2", last_seen_at=None)
+        empty_store = SimpleNamespace(id=uuid.uuid4(), org_id=None, last_seen_at=None)
+        health = {
+            str(cam_ok.id): (now - timedelta(seconds=20), "online"),
+            str(cam_stale.id): (now - timedelta(minutes=30), "online"),
+        }
+        return store, empty_store, cam_ok, cam_stale, health
+
+    def test_evaluate_fleet_classifies_from_bulk_loads(self):
+        from django.utils import timezone
+
+        now = timezone.now()
+        store, empty_store, cam_ok, cam_stale, health = self._fleet(now)
+        with patch("apps.edge.fleet_status.Store.objects.only") as only_mock, patch(
+            "apps.edge.fleet_status._load_active_cameras",
+            return_value={str(store.id): [cam_ok, cam_stale]},
+        ), patch("apps.edge.fleet_status.load_latest_health", return_value=health) as health_mock, patch(
+            "apps.edge.fleet_status.load_edge_heartbeats", return_value={}
+        ):
+            only_mock.return_value = [store, empty_store]
+            statuses = fleet_status.evaluate_fleet(now=now)
+
+        health_mock.assert_called_once_with([str(cam_ok.id), str(cam_stale.id)])
+        first, second = statuses
+        self.assertEqual((first.status, first.reason), ("degraded", "partial_camera_coverage"))
+        self.assertEqual([cam.status for cam in first.cameras], ["online", "offline"])
+        self.assertEqual(first.as_snapshot()["cameras_online"], 1)
+        self.assertEqual((second.status, second.reason), ("offline", "no_heartbeat"))
+
+    def test_status_tick_emits_only_diffs(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+        from django.utils import timezone
+
+        now = timezone.now()
+        store, empty_store, cam_ok, cam_stale, _health = self._fleet(now)
+        statuses = [
+            fleet_status.StoreStatus(
+                store,
+                "degraded",
+                "partial_camera_coverage",
+                20,
+                now,
+                [
+                    fleet_status.CameraStatus(cam_ok, "online", "health_recent", 20, now),
+                    fleet_status.CameraStatus(cam_stale, "offline", "health_stale", 1800, None),
+                ],
+            ),
+            fleet_status.StoreStatus(empty_store, "offline", "no_heartbeat", None, None, []),
+        ]
+        store_prev = {str(store.id): "online", str(empty_store.id): "offline"}
+        camera_prev = {str(cam_ok.id): "online", str(cam_stale.id): "online"}
+        out = StringIO()
+        with patch("apps.edge.fleet_status.evaluate_fleet", return_value=statuses), patch(
+            "apps.edge.fleet_status.load_last_emitted_statuses", return_value=(store_prev, camera_prev)
+        ), patch("apps.edge.management.commands.status_tick.emit_store_status_changed") as store_emit, patch(
+            "apps.edge.management.commands.status_tick.emit_camera_status_changed"
+        ) as camera_emit:
+            call_command("status_tick", stdout=out)
+
+        store_emit.assert_called_once()
+        self.assertEqual(store_emit.call_args.kwargs["prev_status"], "online")
+        self.assertEqual(store_emit.call_args.kwargs["new_status"], "degraded")
+        self.assertEqual(store_emit.call_args.kwargs["snapshot"]["cameras_total"], 2)
+        camera_emit.assert_called_once()
+        self.assertIs(camera_emit.call_args.kwargs["camera"], cam_stale)
+        self.assertEqual(camera_emit.call_args.kwargs["reason"], "health_stale")
+        self.assertIn("store_transitions=1 camera_transitions=1", out.getvalue())
+
+
+class SnapshotOffloadTests(SimpleTestCase):
+    JPEG = b"\xff\xd8\xff\xe0fake-jpeg"
+
+    def setUp(self):
+        import base64
+        import tempfile
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.data_url = "data:image/jpeg;base64," + base64.b64encode(self.JPEG).decode()
+        self.digest = hashlib.sha256(self.JPEG).hexdigest()
+        settings_patch = override_settings(
+            EDGE_SNAPSHOT_LOCAL_DIR=self.tmp.name,
+            EDGE_SNAPSHOT_OFFLOAD_ENABLED=True,
+            EDGE_SNAPSHOT_PUBLIC_BASE_URL="https://api.example.com",
+        )
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+        config_patch = patch("apps.edge.snapshot_offload.supabase_storage.get_config", return_value=None)
+        config_patch.start()
+        self.addCleanup(config_patch.stop)
+
+    def _drain(self):
+        executor = snapshot_offload._executor
+        if executor is not None:
+            executor.shutdown(wait=True)
+            snapshot_offload._executor = None
+
+    def test_rewrites_inline_snapshots_to_content_addressed_url(self):
+        payload = {
+            "event_name": "edge_heartbeat",
+            "data": {"cameras": [{"external_id": "cam-1", "snapshot_data_url": self.data_url}]},
+            "cameras": [
+                {"external_id": "cam-1", "snapshot_url": self.data_url},
+                {"external_id": "cam-2", "snapshot_url": "https://cdn.example.com/a.jpg"},
+            ],
+        }
+
+        rewritten, count = snapshot_offload.rewrite_snapshot_payload(payload)
+        self._drain()
+
+        url = rewritten["cameras"][0]["snapshot_url"]
+        self.assertEqual(count, 2)
+        self.assertTrue(url.startswith(f"https://api.example.com/api/edge/snapshots/{self.digest}.jpg?exp="))
+        self.assertEqual(rewritten["cameras"][1]["snapshot_url"], "https://cdn.example.com/a.jpg")
+        self.assertEqual(rewritten["data"]["cameras"][0]["snapshot_data_url"], url)
+        self.assertEqual(payload["cameras"][0]["snapshot_url"], self.data_url)
+
+        response = APIClient().get(url.replace("https://api.example.com", ""))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.JPEG)
+
+    def test_snapshot_view_requires_valid_unexpired_signature(self):
+        url = snapshot_offload.offload_data_url(self.data_url)
+        self._drain()
+        path = url.replace("https://api.example.com", "")
+        client = APIClient()
+
+        self.assertEqual(client.get(path.split("?")[0]).status_code, 403)
+        self.assertEqual(client.get(path[:-4] + "0000").status_code, 403)
+        with patch("apps.edge.snapshot_offload.time.time", return_value=time.time() + 30 * 24 * 3600):
+            self.assertEqual(client.get(path).status_code, 403)
+        self.assertEqual(client.get(path).status_code, 200)
+
+    def test_ingest_rewrite_reuses_rewritten_data_without_decoding_twice(self):
+        payload = {
+            "event_name": "edge_heartbeat",
+            "data": {"cameras": [{"external_id": "cam-1", "snapshot_url": self.data_url}]},
+        }
+        data = {**payload["data"], "store_id": "store-1"}
+
+        with patch.object(snapshot_offload, "parse_data_url", wraps=snapshot_offload.parse_data_url) as parse_mock:
+            new_payload, new_data, count = snapshot_offload.rewrite_ingest_snapshots(
+                payload, data, base_url="https://ignored.example.com/"
+            )
+        self._drain()
+
+        self.assertEqual(count, 1)
+        self.assertEqual(parse_mock.call_count, 1)
+        self.assertEqual(new_data["store_id"], "store-1")
+        self.assertEqual(new_data["cameras"], new_payload["data"]["cameras"])
+        self.assertTrue(new_data["cameras"][0]["snapshot_url"].startswith("https://api.example.com/"))
+        self.assertEqual(data["cameras"][0]["snapshot_url"], self.data_url)
+
+    def test_skips_upload_when_content_already_stored(self):
+        snapshot_offload.offload_data_url(self.data_url)
+        self._drain()
+
+        with patch("apps.edge.snapshot_offload._get_executor") as executor_mock:
+            url = snapshot_offload.offload_data_url(self.data_url)
+
+        executor_mock.assert_not_called()
+        self.assertIn(f"{self.digest}.jpg?exp=", url)
+
+    def test_invalid_data_urls_and_full_queue_keep_previous_snapshot(self):
+        self.assertIsNone(snapshot_offload.offload_data_url("data:text/html;base64,PGI+"))
+        with override_settings(EDGE_SNAPSHOT_MAX_PENDING=1), patch.object(
+            snapshot_offload, "_inflight", {"other-digest"}
+        ):
+            self.assertIsNone(snapshot_offload.offload_data_url(self.data_url))
+            rewritten, count = snapshot_offload.rewrite_snapshot_payload(
+                {"cameras": [{"external_id": "cam-1", "snapshot_url": self.data_url, "status": "online"}]}
+            )
+        # Sem a chave o heartbeat mantém o last_snapshot_url já gravado (nem None, nem o blob inline).
+        self.assertEqual(count, 1)
+        self.assertEqual(rewritten["cameras"][0], {"external_id": "cam-1", "status": "online"})
+        self.assertEqual(APIClient().get("/api/edge/snapshots/not-a-digest.jpg").status_code, 404)
+
+
 class EdgeSetupTokenTests(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -1026,40 +2006,71 @@ class VisionMetricsContractTests(TestCase):
             }
         }
 
+        with patch("apps.edge.vision_metrics._upsert_vision_metrics_projection") as projection_upsert:
+            with patch("apps.edge.vision_metrics._emit_first_metrics_received_if_missing") as emit_first:
+                apply_vision_metrics(payload)
+
+        projection_upsert.assert_called_once()
+        emit_first.assert_called_once()
+        traffic_payload = projection_upsert.call_args.args[2]
+        conversion_payload = projection_upsert.call_args.args[3]
+        kwargs = projection_upsert.call_args.kwargs
+        self.assertEqual(traffic_payload["ownership"], "primary")
+        self.assertEqual(conversion_payload["ownership"], "primary")
+        self.assertEqual(kwargs["zone_id"], "zone-front")
+        self.assertEqual(kwargs["camera_id"], "cam-1")
+        self.assertEqual(kwargs["camera_role"], "entrada")
+
+    def test_apply_vision_metrics_upserts_traffic_and_conversion_in_one_statement(self):
+        payload = {
+            "data": {
+                "store_id": "store-1",
+                "camera_id": "cam-1",
+                "bucket": {"start": "2026-03-09T12:00:00Z"},
+                "traffic": {"footfall": 4, "metric_type": "entry_exit", "roi_entity_id": "line-main"},
+                "conversion": {"checkout_events": 1},
+            }
+        }
+
         cursor = MagicMock()
-        cursor.fetchone.side_effect = [None, None]
         cursor_cm = MagicMock()
         cursor_cm.__enter__.return_value = cursor
         cursor_cm.__exit__.return_value = False
 
         with patch("apps.edge.vision_metrics.connection.cursor", return_value=cursor_cm):
-            with patch("apps.edge.vision_metrics._upsert_traffic_metrics") as traffic_upsert:
-                with patch("apps.edge.vision_metrics._upsert_conversion_metrics") as conversion_upsert:
-                    with patch("apps.edge.vision_metrics._emit_first_metrics_received_if_missing") as emit_first:
-                        apply_vision_metrics(payload)
+            with patch("apps.edge.vision_metrics._emit_first_metrics_received_if_missing"):
+                apply_vision_metrics(payload)
 
-        traffic_upsert.assert_called_once()
-        conversion_upsert.assert_called_once()
-        emit_first.assert_called_once()
-        traffic_payload = traffic_upsert.call_args.args[2]
-        conversion_payload = conversion_upsert.call_args.args[2]
-        traffic_kwargs = traffic_upsert.call_args.kwargs
-        conversion_kwargs = conversion_upsert.call_args.kwargs
-        self.assertEqual(traffic_payload["ownership"], "primary")
-        self.assertEqual(conversion_payload["ownership"], "primary")
-        self.assertEqual(traffic_kwargs["zone_id"], "zone-front")
-        self.assertEqual(traffic_kwargs["camera_id"], "cam-1")
-        self.assertEqual(traffic_kwargs["camera_role"], "entrada")
-        self.assertEqual(conversion_kwargs["camera_id"], "cam-1")
-        self.assertEqual(conversion_kwargs["camera_role"], "entrada")
+        self.assertEqual(cursor.execute.call_count, 1)
+        sql, params = cursor.execute.call_args[0]
+        self.assertIn("WITH traffic_upsert AS", sql)
+        self.assertEqual(sql.count("ON CONFLICT"), 2)
+        self.assertEqual(len(params), 22)
+
+    def test_upsert_traffic_metrics_accumulates_on_conflict(self):
+        cursor = MagicMock()
+        cursor_cm = MagicMock()
+        cursor_cm.__enter__.return_value = cursor
+        cursor_cm.__exit__.return_value = False
+
+        with patch("apps.edge.vision_metrics.connection.cursor", return_value=cursor_cm):
+            vision_metrics._upsert_traffic_metrics(
+                "store-1",
+                vision_metrics._parse_ts("2026-03-09T12:00:00Z"),
+                {"footfall": 1, "metric_type": "entry_exit", "roi_entity_id": "line-main"},
+                camera_id="cam-1",
+                accumulate=True,
+            )
+
+        self.assertEqual(cursor.execute.call_count, 1)
+        sql, _params = cursor.execute.call_args[0]
+        self.assertIn("ON CONFLICT", sql)
+        self.assertIn("traffic_metrics.footfall, 0) + EXCLUDED.footfall", sql)
+        cursor.fetchone.assert_not_called()
 
     def test_conversion_metrics_contract_violation_raises_without_legacy_fallback(self):
         cursor = MagicMock()
-        cursor.fetchone.side_effect = [
-            None,
-        ]
         cursor.execute.side_effect = [
-            None,
             IntegrityError("duplicate key value violates unique constraint"),
         ]
         cursor_cm = MagicMock()
@@ -1082,7 +2093,7 @@ class VisionMetricsContractTests(TestCase):
                     camera_role="balcao",
                 )
 
-        self.assertEqual(cursor.execute.call_count, 2)
+        self.assertEqual(cursor.execute.call_count, 1)
 
     def test_insert_vision_atomic_event_if_new_includes_crossing_context(self):
         payload = {
@@ -1204,11 +2215,6 @@ class VisionMetricsContractTests(TestCase):
         }
 
         cursor = MagicMock()
-        cursor.fetchone.side_effect = [
-            (3.5, 2),
-            None,
-            None,
-        ]
         cursor_cm = MagicMock()
         cursor_cm.__enter__.return_value = cursor
         cursor_cm.__exit__.return_value = False
@@ -1217,18 +2223,19 @@ class VisionMetricsContractTests(TestCase):
             with patch("apps.edge.vision_metrics._emit_first_metrics_received_if_missing") as emit_first:
                 apply_vision_queue_state(payload)
 
-        self.assertEqual(cursor.execute.call_count, 4)
+        self.assertEqual(cursor.execute.call_count, 1)
         emit_first.assert_called_once()
-        insert_sql, insert_params = cursor.execute.call_args_list[3][0]
+        insert_sql, insert_params = cursor.execute.call_args[0]
         self.assertIn("INSERT INTO public.conversion_metrics", insert_sql)
+        self.assertIn("FROM public.vision_atomic_events", insert_sql)
+        self.assertIn("ON CONFLICT", insert_sql)
         self.assertEqual(insert_params[0], "store-1")
         self.assertEqual(insert_params[1], "cam-cashier-1")
         self.assertEqual(insert_params[2], "balcao")
         self.assertEqual(insert_params[3], "primary")
         self.assertEqual(insert_params[4], "queue")
         self.assertEqual(insert_params[5], "queue-zone-1")
-        self.assertEqual(insert_params[7], 105)
-        self.assertEqual(insert_params[8], 2)
+        self.assertEqual(insert_params[7], 30)
 
     def test_insert_vision_atomic_event_if_new_includes_checkout_proxy_context(self):
         payload = {
@@ -1283,11 +2290,6 @@ class VisionMetricsContractTests(TestCase):
         }
 
         cursor = MagicMock()
-        cursor.fetchone.side_effect = [
-            (2,),
-            None,
-            None,
-        ]
         cursor_cm = MagicMock()
         cursor_cm.__enter__.return_value = cursor
         cursor_cm.__exit__.return_value = False
@@ -1296,15 +2298,16 @@ class VisionMetricsContractTests(TestCase):
             with patch("apps.edge.vision_metrics._emit_first_metrics_received_if_missing") as emit_first:
                 apply_vision_checkout_proxy(payload)
 
-        self.assertEqual(cursor.execute.call_count, 4)
+        self.assertEqual(cursor.execute.call_count, 1)
         emit_first.assert_called_once()
-        insert_sql, insert_params = cursor.execute.call_args_list[3][0]
+        insert_sql, insert_params = cursor.execute.call_args[0]
         self.assertIn("INSERT INTO public.conversion_metrics", insert_sql)
+        self.assertIn("COALESCE(SUM(count_value), 0)", insert_sql)
+        self.assertIn("ON CONFLICT", insert_sql)
         self.assertEqual(insert_params[0], "store-1")
         self.assertEqual(insert_params[1], "cam-cashier-1")
         self.assertEqual(insert_params[4], "checkout_proxy")
         self.assertEqual(insert_params[5], "checkout-zone-1")
-        self.assertEqual(insert_params[7], 2)
 
     def test_insert_vision_atomic_event_if_new_includes_zone_occupancy_context(self):
         payload = {
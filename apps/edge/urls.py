@@ -1,18 +1,26 @@
 from django.urls import path
 from .views import (
     EdgeEventsIngestView,
+    EdgeEventsBatchIngestView,
     EdgeCameraTestConnectionView,
     EdgeCamerasView,
     EdgeStoreCamerasView,
 )
 from .views_update import EdgeUpdatePolicyView, EdgeUpdateReportView
+from .views_snapshots import EdgeSnapshotView
 
 urlpatterns = [
     path("events/", EdgeEventsIngestView.as_view(), name="edge-events"),
+    path("events/batch/", EdgeEventsBatchIngestView.as_view(), name="edge-events-batch"),
     path("cameras/", EdgeCamerasView.as_view(), name="edge-cameras"),
     path("stores/<uuid:store_id>/cameras/", EdgeStoreCamerasView.as_view(), name="edge-store-cameras"),
     path("update-policy/", EdgeUpdatePolicyView.as_view(), name="edge-update-policy"),
     path("update-report/", EdgeUpdateReportView.as_view(), name="edge-update-report"),
+    path(
+        "snapshots/<str:digest>.<str:ext>",
+        EdgeSnapshotView.as_view(),
+        name="edge-snapshot",
+    ),
     path(
         "cameras/<uuid:camera_id>/test_connection/",
         EdgeCameraTestConnectionView.as_view(),
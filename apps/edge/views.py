@@ -6,8 +6,7 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.db.utils import OperationalError, ProgrammingError
-from django.db import connection, models
-from django.test.testcases import DatabaseOperationForbidden
+from django.db import connection, transaction
 import logging
 
 from rest_framework.views import APIView
@@ -18,8 +17,26 @@ from rest_framework.permissions import AllowAny
 from knox.auth import TokenAuthentication
 
 from .serializers import EdgeEventSerializer
-from .models import EdgeEventMinuteStats
+from .minute_stats import bump_event_minute
+from .projection_worker import is_async_projection, projection_mode
+from .status_state import (
+    apply_camera_health,
+    derive_store_status,
+    load_store_edge_state,
+    record_camera_health,
+    save_store_edge_state,
+    touch_store_comm,
+)
+from .camera_directory import (
+    add_camera_to_directory,
+    build_camera_directories,
+    get_camera_directories,
+    invalidate_camera_directory,
+    resolve_camera_in_directory,
+    resolve_store_camera,
+)
 from .auth import authenticate_edge_token
+from . import snapshot_offload
 
 from apps.alerts.views import AlertRuleViewSet
 from apps.core.models import Camera, CameraHealthLog
@@ -27,7 +44,7 @@ from apps.core.models import Store
 from apps.stores.services.user_uuid import ensure_user_uuid
 from apps.stores.services.user_orgs import get_user_org_ids
 from apps.stores.views import _serialize_cameras_for_edge
-from apps.stores.views_edge_status import classify_age, compute_store_edge_status_snapshot
+from apps.stores.views_edge_status import classify_age
 from apps.cameras.limits import enforce_trial_camera_limit
 from apps.cameras.services import rtsp_probe_with_hard_timeout
 from apps.billing.utils import PaywallError
@@ -40,8 +57,10 @@ from .vision_metrics import (
     apply_vision_queue_state,
     apply_vision_checkout_proxy,
     apply_vision_zone_occupancy,
+    insert_event_receipts_if_new,
     mark_event_receipt_processed,
     mark_event_receipt_failed,
+    mark_event_receipts_processed,
 )
 from apps.core.services.journey_events import log_journey_event
 
@@ -294,31 +313,9 @@ def _floor_minute(ts_dt):
     return ts_dt.replace(second=0, microsecond=0)
 
 
-def _bump_event_minute(store_id: str, event_name: str, ts_dt):
-    minute_bucket = _floor_minute(ts_dt)
-    if not minute_bucket:
-        return
+def _bump_event_minute(store_id: str, event_name: str, ts_dt, count: int = 1):
     try:
-        row, created = EdgeEventMinuteStats.objects.get_or_create(
-            store_id=store_id,
-            event_name=str(event_name or "")[:64],
-            minute_bucket=minute_bucket,
-            defaults={
-                "count": 1,
-                "last_event_at": ts_dt,
-                "created_at": timezone.now(),
-                "updated_at": timezone.now(),
-            },
-        )
-        if not created:
-            EdgeEventMinuteStats.objects.filter(id=row.id).update(
-                count=models.F("count") + 1,
-                last_event_at=ts_dt,
-                updated_at=timezone.now(),
-            )
-    except DatabaseOperationForbidden:
-        # SimpleTestCase blocks DB access; ignore in tests.
-        return
+        bump_event_minute(store_id, event_name, ts_dt, count=count)
     except Exception:
         logger.exception("[EDGE] event minute stats failed store=%s event=%s", store_id, event_name)
 
@@ -465,15 +462,10 @@ class EdgeEventsIngestView(APIView):
 
         # --- validar camera para eventos que dependem dela ---
         camera_id = data.get("camera_id") or payload.get("camera_id") or data.get("external_id")
-        camera_obj = None
+        camera_pk = None
         if camera_id and normalized not in ("edge_heartbeat", "camera_heartbeat", "edge_camera_heartbeat"):
-            camera_qs = Camera.objects.filter(store_id=store_id)
-            camera_obj = camera_qs.filter(external_id=camera_id).first()
-            if camera_obj is None and _is_uuid(camera_id):
-                camera_obj = camera_qs.filter(id=camera_id).first()
-            if camera_obj is None:
-                camera_obj = camera_qs.filter(name=camera_id).first()
-            if camera_obj is None:
+            camera_pk = resolve_store_camera(store_id, camera_id)
+            if camera_pk is None:
                 return Response(
                     {"detail": "camera not found", "stored": False, "reason": "camera_not_found"},
                     status=status.HTTP_400_BAD_REQUEST,
@@ -486,6 +478,12 @@ class EdgeEventsIngestView(APIView):
             receipt_id = _compute_receipt_id(payload)
         if not trace_id:
             trace_id = str(receipt_id)
+        if snapshot_offload.enabled() and normalized in ("edge_heartbeat", "camera_heartbeat", "edge_camera_heartbeat"):
+            # Snapshots inline (data URL) viram URL assinada por hash de conteúdo;
+            # o upload roda fora do request e o blob não vai para receipt/câmera.
+            payload, data, _ = snapshot_offload.rewrite_ingest_snapshots(
+                payload, data, base_url=request.build_absolute_uri("/")
+            )
         data.setdefault("trace_id", trace_id)
         payload.setdefault("trace_id", trace_id)
         try:
@@ -535,7 +533,8 @@ class EdgeEventsIngestView(APIView):
                 )
             except Exception:
                 pass
-            mark_event_receipt_processed(event_id=receipt_id)
+            # Retry de um receipt ainda pendente (async) não pode tirá-lo da fila do worker.
+            mark_event_receipt_processed(event_id=receipt_id, only_if_processed=True)
             return Response(
                 {"ok": True, "receipt_id": receipt_id or None, "trace_id": trace_id, "stored": True, "deduped": True},
                 status=status.HTTP_200_OK,
@@ -561,6 +560,20 @@ class EdgeEventsIngestView(APIView):
         except Exception:
             pass
 
+        # --- modo async: projeção fica para o worker project_edge_receipts ---
+        if stored and is_async_projection(event_name):
+            return Response(
+                {
+                    "ok": True,
+                    "receipt_id": receipt_id or None,
+                    "trace_id": trace_id,
+                    "stored": True,
+                    "deduped": False,
+                    "queued": True,
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+
         # --- vision metrics (v1) ---
         if event_name == "vision.metrics.v1":
             try:
@@ -665,7 +678,7 @@ class EdgeEventsIngestView(APIView):
 
         # --- persistir heartbeat do edge ---
         if normalized == "camera_health":
-            if not camera_obj:
+            if not camera_pk:
                 mark_event_receipt_failed(event_id=receipt_id, error_message="camera_not_found")
                 return Response(
                     {"detail": "camera not found", "stored": False, "reason": "camera_not_found"},
@@ -681,18 +694,18 @@ class EdgeEventsIngestView(APIView):
                 error = None
 
             try:
-                Camera.objects.filter(id=camera_obj.id).update(
+                Camera.objects.filter(id=camera_pk).update(
                     status=status_value,
                     last_seen_at=checked_at,
                     last_error=None if status_value == "online" else error,
                     updated_at=timezone.now(),
                 )
             except Exception:
-                logger.exception("[EDGE] camera_health update failed camera_id=%s", str(camera_obj.id))
+                logger.exception("[EDGE] camera_health update failed camera_id=%s", str(camera_pk))
 
             try:
                 CameraHealthLog.objects.create(
-                    camera_id=camera_obj.id,
+                    camera_id=camera_pk,
                     checked_at=checked_at,
                     status=status_value,
                     latency_ms=latency_ms,
@@ -700,7 +713,8 @@ class EdgeEventsIngestView(APIView):
                     error=error,
                 )
             except Exception:
-                logger.exception("[EDGE] camera_health log failed camera_id=%s", str(camera_obj.id))
+                logger.exception("[EDGE] camera_health log failed camera_id=%s", str(camera_pk))
+            record_camera_health(store_id, camera_pk, status_value, checked_at)
 
             if status_value == "online":
                 try:
@@ -719,10 +733,8 @@ class EdgeEventsIngestView(APIView):
 
         if normalized in ("edge_heartbeat", "camera_heartbeat", "edge_camera_heartbeat"):
             store_obj = Store.objects.filter(id=store_id).first()
-            pre_snapshot = None
-            pre_reason = None
-            if store_obj:
-                pre_snapshot, pre_reason = compute_store_edge_status_snapshot(store_id)
+            edge_state = load_store_edge_state(store_id) if store_obj else None
+            pre_status = derive_store_status(edge_state) if edge_state is not None else None
             org_id = str(getattr(store_obj, "org_id", None)) if store_obj else None
 
             camera_transitions = []
@@ -767,6 +779,13 @@ class EdgeEventsIngestView(APIView):
                 except Exception:
                     pass
 
+                store_cameras = {}
+                camera_directory = None
+                if any(isinstance(cam, dict) for cam in cameras_in):
+                    store_cameras = {cam.id: cam for cam in Camera.objects.filter(store_id=store_id)}
+                    camera_directory = build_camera_directories([store_id])[str(store_id)]
+                directory_changed = False
+
                 for cam in cameras_in:
                     if not isinstance(cam, dict):
                         continue
@@ -786,13 +805,14 @@ class EdgeEventsIngestView(APIView):
                     else:
                         snapshot_url = None
 
-                    camera_obj = None
+                    camera_pk = None
                     if external_id:
-                        camera_obj = Camera.objects.filter(store_id=store_id, external_id=external_id).first()
-                        if camera_obj is None and _is_uuid(external_id):
-                            camera_obj = Camera.objects.filter(store_id=store_id, id=external_id).first()
-                    if camera_obj is None:
-                        camera_obj = Camera.objects.filter(store_id=store_id, name=name).first()
+                        camera_pk = camera_directory["external_id"].get(str(external_id))
+                        if camera_pk is None and _is_uuid(external_id):
+                            camera_pk = camera_directory["id"].get(str(UUID(str(external_id))))
+                    if camera_pk is None and incoming_name:
+                        camera_pk = camera_directory["name"].get(str(incoming_name))
+                    camera_obj = store_cameras.get(camera_pk) if camera_pk is not None else None
 
                     prev_last_seen_at = getattr(camera_obj, "last_seen_at", None) if camera_obj else None
                     prev_status, _prev_age, _prev_reason = classify_age(prev_last_seen_at)
@@ -820,6 +840,10 @@ class EdgeEventsIngestView(APIView):
                             created_at=timezone.now(),
                             updated_at=timezone.now(),
                         )
+                        store_cameras[camera_obj.id] = camera_obj
+                        directory_changed = True
+                        if edge_state is not None:
+                            apply_camera_health(edge_state, camera_obj.id, "online", ts_dt, create=True)
                     else:
                         name_for_write = _camera_name_for_write(
                             incoming_name=incoming_name,
@@ -837,8 +861,13 @@ class EdgeEventsIngestView(APIView):
                             updated_at=timezone.now(),
                         )
 
+                    if (external_id and external_id != camera_obj.external_id) or (
+                        name_for_write and name_for_write != camera_obj.name
+                    ):
+                        directory_changed = True
                     camera_obj.external_id = external_id or camera_obj.external_id
                     camera_obj.name = name_for_write or camera_obj.name
+                    add_camera_to_directory(camera_directory, camera_obj.id, camera_obj.external_id, camera_obj.name)
                     camera_obj.last_snapshot_url = snapshot_url or camera_obj.last_snapshot_url
                     camera_obj.status = "online"
                     camera_obj.last_seen_at = ts_dt
@@ -865,6 +894,8 @@ class EdgeEventsIngestView(APIView):
                         status="online",
                         error=None,
                     )
+                    if edge_state is not None:
+                        apply_camera_health(edge_state, camera_obj.id, "online", ts_dt)
 
                     new_status, new_age, new_reason = classify_age(ts_dt)
                     if prev_status != new_status:
@@ -872,26 +903,31 @@ class EdgeEventsIngestView(APIView):
                             (camera_obj, prev_status, new_status, new_reason, new_age, ts_dt)
                         )
 
+                if directory_changed:
+                    invalidate_camera_directory(store_id)
+
             except Exception:
                 heartbeat_ok = False
                 logger.exception("[WARN] heartbeat persist failed")
                 mark_event_receipt_failed(event_id=receipt_id, error_message="heartbeat_persist_failed")
 
             if heartbeat_ok and store_obj:
-                post_snapshot, post_reason = compute_store_edge_status_snapshot(store_id)
                 edge_meta = {"source": "edge_ingest"}
                 if receipt_id:
                     edge_meta["receipt_id"] = receipt_id
 
-                if not pre_reason and not post_reason:
-                    prev_store_status = pre_snapshot.get("store_status") if pre_snapshot else None
-                    new_store_status = post_snapshot.get("store_status") if post_snapshot else None
+                if edge_state is not None:
+                    touch_store_comm(edge_state, ts_dt)
+                    save_store_edge_state(store_id, edge_state)
+                    post_status = derive_store_status(edge_state)
+                    prev_store_status = pre_status.get("store_status") if pre_status else None
+                    new_store_status = post_status.get("store_status")
                     if prev_store_status and new_store_status and prev_store_status != new_store_status:
                         emit_store_status_changed(
                             store=store_obj,
                             prev_status=prev_store_status,
                             new_status=new_store_status,
-                            snapshot=post_snapshot,
+                            snapshot=post_status,
                             meta=edge_meta,
                         )
 
@@ -971,6 +1007,390 @@ class EdgeEventsIngestView(APIView):
         )
 
 
+_HEARTBEAT_EVENT_NAMES = ("edge_heartbeat", "camera_heartbeat", "edge_camera_heartbeat")
+
+
+def _vision_projection_for(event_name: str):
+    """
+    (projeção, usa vision_atomic_events, reason de falha) por event_name vision.*.
+    Resolvido em tempo de chamada para respeitar patches em testes.
+    """
+    projections = {
+        "vision.metrics.v1": (apply_vision_metrics, False, "vision_ingest_failed"),
+        "vision.crossing.v1": (apply_vision_crossing, True, "vision_crossing_ingest_failed"),
+        "vision.queue_state.v1": (apply_vision_queue_state, True, "vision_queue_state_ingest_failed"),
+        "vision.checkout_proxy.v1": (apply_vision_checkout_proxy, True, "vision_checkout_proxy_ingest_failed"),
+        "vision.zone_occupancy.v1": (apply_vision_zone_occupancy, True, "vision_zone_occupancy_ingest_failed"),
+    }
+    return projections.get(str(event_name or ""))
+
+
+def _batch_item_error(index: int, reason: str, http_status: int, *, retryable: bool = False, **extra):
+    result = {
+        "index": index,
+        "ok": False,
+        "stored": False,
+        "reason": reason,
+        "status": http_status,
+        "retryable": retryable,
+    }
+    result.update(extra)
+    return result
+
+
+def _prepare_batch_envelope(index: int, envelope, *, token_store_id=None, allowed_store_ids=None):
+    """
+    Valida um envelope do batch com as mesmas regras do ingest unitário.
+    Retorna (item, None) quando aceito ou (None, resultado_de_erro).
+    """
+    if not isinstance(envelope, dict):
+        return None, _batch_item_error(index, "payload_invalid", status.HTTP_400_BAD_REQUEST)
+    ser = EdgeEventSerializer(data=envelope)
+    if not ser.is_valid():
+        return None, _batch_item_error(
+            index, "payload_invalid", status.HTTP_400_BAD_REQUEST, errors=ser.errors
+        )
+    validated = ser.validated_data
+    payload = dict(envelope)
+    event_name = validated.get("event_name")
+    source = validated.get("source") or "edge"
+    receipt_id = validated.get("idempotency_key") or validated.get("receipt_id") or ""
+    data = dict(validated.get("data") or {})
+    trace_id = str(data.get("trace_id") or payload.get("trace_id") or "").strip() or None
+    store_id = _extract_store_id({**payload, "data": data})
+    normalized = _normalize_ingest_event_name(event_name, payload, data)
+    canonical_event_name = _canonical_ingest_event_name(event_name, payload, data)
+
+    if token_store_id:
+        if store_id and str(store_id) != token_store_id:
+            return None, _batch_item_error(
+                index, "edge_store_mismatch", status.HTTP_403_FORBIDDEN, trace_id=trace_id
+            )
+        if not store_id:
+            store_id = token_store_id
+            data["store_id"] = store_id
+            payload["store_id"] = store_id
+    if not store_id or not _is_uuid(store_id):
+        return None, _batch_item_error(index, "store_id_invalid", status.HTTP_400_BAD_REQUEST, trace_id=trace_id)
+    store_id = str(store_id)
+    if allowed_store_ids is not None and store_id not in allowed_store_ids:
+        return None, _batch_item_error(index, "store_access_denied", status.HTTP_403_FORBIDDEN, trace_id=trace_id)
+
+    # Heartbeat/health/alert têm efeitos colaterais por câmera; seguem no endpoint unitário.
+    if event_name == "alert" or normalized in _HEARTBEAT_EVENT_NAMES or normalized == "camera_health":
+        return None, _batch_item_error(
+            index, "batch_event_not_supported", status.HTTP_422_UNPROCESSABLE_ENTITY, trace_id=trace_id
+        )
+
+    contract_ok, contract_missing = _validate_vision_contract(event_name=event_name, payload=payload, data=data)
+    if not contract_ok:
+        return None, _batch_item_error(
+            index,
+            "vision_contract_invalid",
+            status.HTTP_400_BAD_REQUEST,
+            contract_version="vision_event_v1",
+            missing_fields=contract_missing,
+            trace_id=trace_id,
+        )
+    retail_ok, retail_errors = _validate_retail_event_contract(event_name=event_name, payload=payload, data=data)
+    if not retail_ok:
+        return None, _batch_item_error(
+            index,
+            "retail_event_contract_invalid",
+            status.HTTP_400_BAD_REQUEST,
+            contract_version="retail_event_v1",
+            errors=retail_errors,
+            trace_id=trace_id,
+        )
+
+    if not receipt_id:
+        receipt_id = _compute_receipt_id(payload)
+    if not trace_id:
+        trace_id = str(receipt_id)
+    data.setdefault("trace_id", trace_id)
+    payload.setdefault("trace_id", trace_id)
+    payload["data"] = data
+
+    camera_id = data.get("camera_id") or payload.get("camera_id") or data.get("external_id")
+    return {
+        "index": index,
+        "event_name": event_name,
+        "canonical_event_name": canonical_event_name,
+        "source": source,
+        "payload": payload,
+        "data": data,
+        "store_id": store_id,
+        "camera_id": str(camera_id) if camera_id else None,
+        "receipt_id": str(receipt_id),
+        "trace_id": trace_id,
+        "ts_dt": _resolve_edge_ts(data, payload),
+    }, None
+
+
+def _load_camera_index(store_ids):
+    return get_camera_directories(store_ids)
+
+
+def _resolve_camera_from_index(index: dict, store_id: str, camera_id: str):
+    return resolve_camera_in_directory(index.get(str(store_id)), camera_id)
+
+
+class EdgeEventsBatchIngestView(APIView):
+    """
+    POST /api/edge/events/batch/
+    Recebe uma lista de envelopes do Edge Agent ({"events": [...]} ou lista pura):
+      - autentica uma única vez (edge token ou usuário com acesso às stores)
+      - valida cada envelope com os mesmos contratos do ingest unitário
+      - dedupe em lote (INSERT multi-row ON CONFLICT DO NOTHING RETURNING event_id)
+      - aplica projeções vision.* em uma única transação (savepoint por item)
+    Retorna resultado por item (index, ok, stored, deduped, reason, retryable)
+    para o edge reenviar apenas as falhas retentáveis.
+    Heartbeat, camera_health e alert seguem em POST /api/edge/events/.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        body = request.data
+        envelopes = body.get("events") if isinstance(body, dict) else body
+        if not isinstance(envelopes, list) or not envelopes:
+            return Response(
+                {"detail": "events deve ser uma lista não vazia."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        max_items = int(getattr(settings, "EDGE_EVENTS_BATCH_MAX_ITEMS", 500) or 500)
+        if len(envelopes) > max_items:
+            return Response(
+                {"detail": "Batch excede o limite de eventos.", "max_items": max_items},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        token_store_id = None
+        allowed_store_ids = None
+        user_auth = TokenAuthentication().authenticate(request)
+        if user_auth:
+            user, _ = user_auth
+            try:
+                ensure_user_uuid(user)
+                org_ids = get_user_org_ids(user)
+            except Exception:
+                return Response({"detail": "Usuário não autenticado."}, status=status.HTTP_403_FORBIDDEN)
+            requested_store_ids = {
+                str(sid)
+                for sid in (_extract_store_id(envelope) for envelope in envelopes)
+                if sid and _is_uuid(sid)
+            }
+            allowed_store_ids = {
+                str(sid)
+                for sid in Store.objects.filter(id__in=requested_store_ids, org_id__in=org_ids).values_list(
+                    "id", flat=True
+                )
+            }
+        else:
+            auth_result = authenticate_edge_token(request)
+            if not auth_result.ok or not auth_result.store_id:
+                return Response(
+                    {
+                        "code": auth_result.code or "edge_token_invalid",
+                        "detail": auth_result.detail or "Edge token inválido.",
+                    },
+                    status=auth_result.status_code or status.HTTP_401_UNAUTHORIZED,
+                )
+            token_store_id = str(auth_result.store_id)
+
+        results = [None] * len(envelopes)
+        items = []
+        for index, envelope in enumerate(envelopes):
+            item, error = _prepare_batch_envelope(
+                index,
+                envelope,
+                token_store_id=token_store_id,
+                allowed_store_ids=allowed_store_ids,
+            )
+            if error is not None:
+                results[index] = error
+            else:
+                items.append(item)
+
+        # --- câmeras: uma query para todas as stores do batch ---
+        camera_store_ids = {item["store_id"] for item in items if item["camera_id"]}
+        if camera_store_ids:
+            camera_index = _load_camera_index(camera_store_ids)
+            accepted = []
+            for item in items:
+                if item["camera_id"] and _resolve_camera_from_index(
+                    camera_index, item["store_id"], item["camera_id"]
+                ) is None:
+                    results[item["index"]] = _batch_item_error(
+                        item["index"],
+                        "camera_not_found",
+                        status.HTTP_400_BAD_REQUEST,
+                        trace_id=item["trace_id"],
+                    )
+                    continue
+                accepted.append(item)
+            items = accepted
+
+        # --- dedupe em lote (inclusive repetições dentro do próprio batch) ---
+        unique_items = []
+        seen_receipts = set()
+        for item in items:
+            if item["receipt_id"] in seen_receipts:
+                item["duplicate_in_batch"] = True
+                continue
+            seen_receipts.add(item["receipt_id"])
+            unique_items.append(item)
+
+        processed_ids = []
+        dedupe_ids = []
+        failed = []
+        async_projection = projection_mode() == "async"
+        try:
+            with transaction.atomic():
+                inserted_ids = insert_event_receipts_if_new(
+                    [
+                        {
+                            "event_id": item["receipt_id"],
+                            "event_name": item["canonical_event_name"],
+                            "payload": item["payload"],
+                            "source": item["source"],
+                            "meta": {
+                                "trace_id": item["trace_id"],
+                                "store_id": item["store_id"],
+                                "camera_id": item["camera_id"],
+                                "event_name": str(item["event_name"]),
+                                "canonical_event_name": str(item["canonical_event_name"]),
+                                "ingest_mode": "batch",
+                            },
+                        }
+                        for item in unique_items
+                    ]
+                )
+                for item in items:
+                    created = item["receipt_id"] in inserted_ids and not item.get("duplicate_in_batch")
+                    if not created:
+                        # Repetição no próprio batch fica com a 1ª ocorrência; dedupe contra
+                        # receipt antigo só é remarcado se ele já foi processado.
+                        if not item.get("duplicate_in_batch"):
+                            dedupe_ids.append(item["receipt_id"])
+                        results[item["index"]] = self._item_ok(item, inserted=False)
+                        continue
+                    if async_projection and is_async_projection(item["event_name"]):
+                        # receipt fica pendente para o worker project_edge_receipts.
+                        results[item["index"]] = self._item_ok(item, inserted=True, queued=True)
+                        continue
+                    projection = _vision_projection_for(item["event_name"])
+                    if projection is None:
+                        processed_ids.append(item["receipt_id"])
+                        results[item["index"]] = self._item_ok(item, inserted=True)
+                        continue
+                    apply_projection, uses_atomic_events, failure_reason = projection
+                    try:
+                        with transaction.atomic():
+                            inserted = True
+                            if uses_atomic_events:
+                                inserted = insert_vision_atomic_event_if_new(
+                                    receipt_id=item["receipt_id"],
+                                    payload=item["payload"],
+                                )
+                            if inserted:
+                                apply_projection(item["payload"])
+                    except Exception:
+                        logger.exception(
+                            "[EDGE] batch projection failed store=%s event=%s receipt=%s",
+                            item["store_id"],
+                            item["event_name"],
+                            item["receipt_id"],
+                        )
+                        failed.append((item["receipt_id"], failure_reason))
+                        # receipt persistido e marcado com falha: retry_failed_edge_receipts reprocessa.
+                        results[item["index"]] = _batch_item_error(
+                            item["index"],
+                            failure_reason,
+                            status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            receipt_id=item["receipt_id"],
+                            trace_id=item["trace_id"],
+                        )
+                        continue
+                    processed_ids.append(item["receipt_id"])
+                    results[item["index"]] = self._item_ok(item, inserted=inserted)
+        except Exception as exc:
+            logger.exception("[EDGE] batch receipt write failed items=%s", len(items))
+            http_status = (
+                status.HTTP_503_SERVICE_UNAVAILABLE
+                if isinstance(exc, (OperationalError, ProgrammingError))
+                else status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+            for item in items:
+                results[item["index"]] = _batch_item_error(
+                    item["index"],
+                    "db_write_failed",
+                    http_status,
+                    retryable=True,
+                    receipt_id=item["receipt_id"],
+                    trace_id=item["trace_id"],
+                )
+            return self._batch_response(results, http_status=http_status)
+
+        mark_event_receipts_processed(event_ids=processed_ids)
+        mark_event_receipts_processed(event_ids=dedupe_ids, only_if_processed=True)
+        for receipt_id, failure_reason in failed:
+            mark_event_receipt_failed(event_id=receipt_id, error_message=failure_reason)
+
+        minute_counts = {}
+        for item in items:
+            key = (item["store_id"], str(item["event_name"]), _floor_minute(item["ts_dt"]))
+            count, last_ts = minute_counts.get(key, (0, None))
+            minute_counts[key] = (count + 1, max(last_ts, item["ts_dt"]) if last_ts else item["ts_dt"])
+        for store_id in {item["store_id"] for item in items}:
+            _touch_store_seen(store_id)
+        for (store_id, event_name, _minute), (count, last_ts) in minute_counts.items():
+            try:
+                _bump_event_minute(store_id, event_name, last_ts, count=count)
+            except Exception:
+                pass
+
+        logger.info(
+            "[EDGE] batch ingest items=%s accepted=%s stored=%s failed=%s",
+            len(envelopes),
+            len(items),
+            len(inserted_ids) - len(failed),
+            len(envelopes) - len(items) + len(failed),
+        )
+        return self._batch_response(results)
+
+    @staticmethod
+    def _item_ok(item: dict, *, inserted: bool, queued: bool = False) -> dict:
+        result = {
+            "index": item["index"],
+            "ok": True,
+            "stored": True,
+            "deduped": not inserted,
+            "status": status.HTTP_201_CREATED if inserted else status.HTTP_200_OK,
+            "receipt_id": item["receipt_id"],
+            "trace_id": item["trace_id"],
+        }
+        if queued:
+            result["status"] = status.HTTP_202_ACCEPTED
+            result["queued"] = True
+        return result
+
+    @staticmethod
+    def _batch_response(results: list, http_status: int = status.HTTP_200_OK) -> Response:
+        accepted = sum(1 for result in results if result and result.get("ok"))
+        return Response(
+            {
+                "ok": accepted == len(results),
+                "total": len(results),
+                "accepted": accepted,
+                "failed": len(results) - accepted,
+                "results": results,
+            },
+            status=http_status,
+        )
+
+
 class EdgeCameraTestConnectionView(APIView):
     """
     POST /api/edge/cameras/{id}/test_connection/
@@ -0,0 +1,64 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, Http404, HttpResponseRedirect
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import snapshot_offload
+from apps.core.integrations import supabase_storage
+from backend.utils import shared_cache
+
+
+logger = logging.getLogger(__name__)
+
+
+class EdgeSnapshotView(APIView):
+    """
+    GET /api/edge/snapshots/<sha256>.<ext>?exp=<unix>&sig=<hmac>
+    Serve o snapshot offloadado pelo heartbeat. O frontend usa a URL como
+    <img src> (sem header de auth), então o acesso é pela assinatura gerada em
+    snapshot_offload.snapshot_url: sem ela ou expirada, 403. Com Supabase,
+    redireciona para uma URL assinada do storage (cacheada); sem storage
+    configurado, serve do disco local.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, digest: str, ext: str):
+        digest = (digest or "").lower()
+        if not snapshot_offload.DIGEST_RE.match(digest) or ext not in snapshot_offload.EXT_CONTENT_TYPES:
+            raise Http404()
+        if not snapshot_offload.verify_signature(
+            digest, ext, request.query_params.get("exp"), request.query_params.get("sig")
+        ):
+            return Response({"detail": "Assinatura inválida ou expirada."}, status=status.HTTP_403_FORBIDDEN)
+
+        if supabase_storage.get_config() is None:
+            try:
+                handle = snapshot_offload.open_local(digest, ext)
+            except FileNotFoundError:
+                raise Http404()
+            response = FileResponse(handle, content_type=snapshot_offload.EXT_CONTENT_TYPES[ext])
+            response["Cache-Control"] = "private, max-age=86400, immutable"
+            return response
+
+        ttl = int(getattr(settings, "EDGE_SNAPSHOT_CACHE_SECONDS", 300) or 300)
+        cache_key = shared_cache.key("edge.snapshot.signed", digest, ext)
+        signed_url = shared_cache.get("edge.snapshot.signed", cache_key)
+        if not signed_url:
+            try:
+                # Assinatura vale o dobro do cache: a URL cacheada nunca sai expirada.
+                signed_url = supabase_storage.create_signed_url(
+                    snapshot_offload.storage_path(digest, ext), expires_seconds=ttl * 2
+                )
+            except Exception:
+                logger.warning("[EDGE] snapshot sign failed digest=%s", digest)
+                raise Http404()
+            cache.set(cache_key, signed_url, ttl)
+        response = HttpResponseRedirect(signed_url)
+        response["Cache-Control"] = f"private, max-age={ttl}"
+        return response
@@ -10,6 +10,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from .auth import authenticate_edge_token
+from .live_feed import publish_detection_event
 from .models import EdgeUpdateEvent, EdgeUpdatePolicy
 from .serializers import EdgeUpdateReportSerializer
 from apps.core.models import DetectionEvent, Store
@@ -72,7 +73,7 @@ def _emit_edge_update_detection_event(*, store_id: str, update_event: EdgeUpdate
     if reason_detail:
         description = f"{description} detalhe={reason_detail}"
 
-    DetectionEvent.objects.create(
+    event = DetectionEvent.objects.create(
         org_id=store.org_id,
         store_id=store.id,
         camera_id=None,
@@ -100,6 +101,7 @@ def _emit_edge_update_detection_event(*, store_id: str, update_event: EdgeUpdate
         },
         created_at=timezone.now(),
     )
+    publish_detection_event(event)
 
 
 def _build_policy_fingerprint(policy: EdgeUpdatePolicy | None) -> str | None:
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import json
 from datetime import datetime, timezone as dt_timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Set
 
 import logging
 
@@ -11,7 +11,9 @@ from django.test.testcases import DatabaseOperationForbidden
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 from apps.core.models import JourneyEvent, Store
+from apps.core.services.event_receipts import build_receipt_insert_sql
 from apps.core.services.journey_events import log_journey_event
+from apps.edge.live_feed import publish_store_event
 
 logger = logging.getLogger(__name__)
 
@@ -60,14 +62,14 @@ def _normalize_camera_role(
     return None
 
 
-def insert_event_receipt_if_new(
+def _event_receipt_params(
     *,
     event_id: str,
     event_name: str,
     payload: dict,
     source: str = "edge",
     meta: Optional[Dict[str, Any]] = None,
-) -> bool:
+) -> list:
     raw = json.dumps(payload, ensure_ascii=False)
     data = (payload.get("data") or {}) if isinstance(payload, dict) else {}
     traffic = data.get("traffic") or {}
@@ -85,31 +87,68 @@ def insert_event_receipt_if_new(
     }
     merged_meta = {**derived_meta, **(meta or {})}
     event_ts = _parse_ts(data.get("ts") or payload.get("ts"))
+    return [event_id, event_name, 1, event_ts, source, raw, json.dumps(merged_meta)]
+
+
+def insert_event_receipt_if_new(
+    *,
+    event_id: str,
+    event_name: str,
+    payload: dict,
+    source: str = "edge",
+    meta: Optional[Dict[str, Any]] = None,
+) -> bool:
+    params = _event_receipt_params(
+        event_id=event_id,
+        event_name=event_name,
+        payload=payload,
+        source=source,
+        meta=meta,
+    )
     with connection.cursor() as cursor:
         cursor.execute(
-            """
-            INSERT INTO public.event_receipts (event_id, event_name, event_version, ts, source, raw, meta)
-            VALUES (%s, %s, %s, %s, %s, %s::jsonb, %s::jsonb)
-            ON CONFLICT (event_id) DO NOTHING
-            """,
-            [event_id, event_name, 1, event_ts, source, raw, json.dumps(merged_meta)],
+            build_receipt_insert_sql(["(%s, %s, %s, %s, %s, %s::jsonb, %s::jsonb)"]),
+            params,
         )
         return cursor.rowcount == 1
 
 
-def mark_event_receipt_processed(*, event_id: Optional[str]) -> None:
+def insert_event_receipts_if_new(receipts: List[Dict[str, Any]]) -> Set[str]:
+    """
+    Multi-row variant of insert_event_receipt_if_new.
+    Each item carries the same kwargs (event_id, event_name, payload, source, meta).
+    Returns the set of event_ids that were actually inserted (new receipts).
+    """
+    if not receipts:
+        return set()
+    values_sql = []
+    params: list = []
+    for receipt in receipts:
+        values_sql.append("(%s, %s, %s, %s, %s, %s::jsonb, %s::jsonb)")
+        params.extend(_event_receipt_params(**receipt))
+    with connection.cursor() as cursor:
+        cursor.execute(build_receipt_insert_sql(values_sql, returning=True), params)
+        return {str(row[0]) for row in cursor.fetchall()}
+
+
+def _only_processed_sql(only_if_processed: bool) -> str:
+    # Dedupe hit: um receipt ainda pendente (modo async) fica para o project_edge_receipts.
+    return "\n                  AND processed_at IS NOT NULL" if only_if_processed else ""
+
+
+def mark_event_receipt_processed(*, event_id: Optional[str], only_if_processed: bool = False) -> None:
     if not event_id:
         return
     try:
         with connection.cursor() as cursor:
             cursor.execute(
-                """
+                f"""
                 UPDATE public.event_receipts
                 SET processed_at = now(),
                     last_error = NULL,
                     attempt_count = COALESCE(attempt_count, 0) + 1,
                     updated_at = now()
-                WHERE event_id = %s
+                WHERE event_id = %s{_only_processed_sql(only_if_processed)}
                 """,
                 [str(event_id)],
             )
@@ -140,6 +179,29 @@ def mark_event_receipt_failed(*, event_id: Optional[str], error_message: str) ->
         logger.exception("[EDGE] mark_event_receipt_failed failed event_id=%s", event_id)
 
 
+def mark_event_receipts_processed(*, event_ids: List[str], only_if_processed: bool = False) -> None:
+    event_ids = [str(event_id) for event_id in event_ids if event_id]
+    if not event_ids:
+        return
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE public.event_receipts
+                SET processed_at = now(),
+                    last_error = NULL,
+                    attempt_count = COALESCE(attempt_count, 0) + 1,
+                    updated_at = now()
+                WHERE event_id = ANY(%s){_only_processed_sql(only_if_processed)}
+                """,
+                [event_ids],
+            )
+    except DatabaseOperationForbidden:
+        return
+    except Exception:
+        logger.exception("[EDGE] mark_event_receipts_processed failed count=%s", len(event_ids))
+
+
 def insert_vision_atomic_event_if_new(*, receipt_id: str, payload: dict) -> bool:
     data = (payload.get("data") or {}) if isinstance(payload, dict) else {}
     raw = json.dumps(payload, ensure_ascii=False)
@@ -192,10 +254,53 @@ def insert_vision_atomic_event_if_new(*, receipt_id: str, payload: dict) -> bool
                 raw,
             ],
         )
-        return cursor.rowcount == 1
+        inserted = cursor.rowcount == 1
+    if inserted:
+        publish_store_event(
+            data.get("store_id"),
+            "vision_event",
+            {
+                "receipt_id": receipt_id,
+                "event_type": data.get("event_type") or payload.get("event_name"),
+                "camera_id": data.get("camera_id"),
+                "camera_role": data.get("camera_role"),
+                "zone_id": data.get("zone_id"),
+                "metric_type": data.get("metric_type"),
+                "direction": data.get("direction"),
+                "count_value": int(data.get("count_value") or 1),
+                "confidence": data.get("confidence"),
+                "ts": data.get("ts") or payload.get("ts"),
+            },
+        )
+    return inserted
 
 
-def _upsert_traffic_metrics(
+_NIL_UUID = "00000000-0000-0000-0000-000000000000"
+
+# Projection identity: must match the unique indexes
+# traffic_metrics_projection_identity_uq / conversion_metrics_projection_identity_uq
+# so ON CONFLICT can infer them (see migration 0015).
+_TRAFFIC_PROJECTION_KEY = f"""(
+    store_id,
+    ts_bucket,
+    COALESCE(zone_id, '{_NIL_UUID}'::uuid),
+    COALESCE(camera_id, '{_NIL_UUID}'::uuid),
+    COALESCE(metric_type, ''),
+    COALESCE(roi_entity_id, '')
+)"""
+_CONVERSION_PROJECTION_KEY = f"""(
+    store_id,
+    ts_bucket,
+    COALESCE(camera_id, '{_NIL_UUID}'::uuid),
+    COALESCE(metric_type, ''),
+    COALESCE(roi_entity_id, '')
+)"""
+
+# Stores already known to have first_metrics_received (per worker process).
+_first_metrics_emitted_stores: Set[str] = set()
+
+
+def _traffic_upsert_statement(
     store_id: str,
     ts_bucket,
     traffic: dict,
@@ -213,85 +318,56 @@ def _upsert_traffic_metrics(
     if not metric_type:
         raise ProjectionContractError("traffic_metrics requires metric_type")
     roi_entity_id = str(traffic.get("roi_entity_id") or "").strip() or None
-    with connection.cursor() as cursor:
-        cursor.execute(
-            """
-            SELECT id
-            FROM public.traffic_metrics
-            WHERE store_id = %s
-              AND ts_bucket = %s
-              AND zone_id IS NOT DISTINCT FROM %s
-              AND camera_id IS NOT DISTINCT FROM %s
-            """,
-            [store_id, ts_bucket, zone_id, camera_id],
+    if accumulate:
+        counters_sql = """
+            footfall = COALESCE(traffic_metrics.footfall, 0) + EXCLUDED.footfall,
+            engaged = COALESCE(traffic_metrics.engaged, 0) + EXCLUDED.engaged,
+            dwell_seconds_avg = COALESCE(traffic_metrics.dwell_seconds_avg, 0),
+        """
+    else:
+        counters_sql = """
+            footfall = EXCLUDED.footfall,
+            engaged = EXCLUDED.engaged,
+            dwell_seconds_avg = EXCLUDED.dwell_seconds_avg,
+        """
+    sql = f"""
+        INSERT INTO public.traffic_metrics (
+            store_id,
+            zone_id,
+            camera_id,
+            camera_role,
+            ownership,
+            metric_type,
+            roi_entity_id,
+            ts_bucket,
+            footfall,
+            engaged,
+            dwell_seconds_avg
         )
-        row = cursor.fetchone()
-        if row:
-            next_footfall = footfall
-            next_engaged = engaged
-            next_dwell = dwell
-            if accumulate:
-                cursor.execute(
-                    """
-                    SELECT COALESCE(footfall, 0), COALESCE(engaged, 0), COALESCE(dwell_seconds_avg, 0)
-                    FROM public.traffic_metrics
-                    WHERE id = %s
-                    """,
-                    [row[0]],
-                )
-                current = cursor.fetchone() or (0, 0, 0)
-                next_footfall = int(current[0] or 0) + footfall
-                next_engaged = int(current[1] or 0) + engaged
-                next_dwell = int(current[2] or 0)
-            cursor.execute(
-                """
-                UPDATE public.traffic_metrics
-                SET footfall = %s,
-                    engaged = %s,
-                    dwell_seconds_avg = %s,
-                    camera_role = %s,
-                    ownership = %s,
-                    metric_type = %s,
-                    roi_entity_id = %s
-                WHERE id = %s
-                """,
-                [next_footfall, next_engaged, next_dwell, camera_role, ownership, metric_type, roi_entity_id, row[0]],
-            )
-        else:
-            cursor.execute(
-                """
-                INSERT INTO public.traffic_metrics (
-                    store_id,
-                    zone_id,
-                    camera_id,
-                    camera_role,
-                    ownership,
-                    metric_type,
-                    roi_entity_id,
-                    ts_bucket,
-                    footfall,
-                    engaged,
-                    dwell_seconds_avg
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                [
-                    store_id,
-                    zone_id,
-                    camera_id,
-                    camera_role,
-                    ownership,
-                    metric_type,
-                    roi_entity_id,
-                    ts_bucket,
-                    footfall,
-                    engaged,
-                    dwell,
-                ],
-            )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT {_TRAFFIC_PROJECTION_KEY}
+        DO UPDATE SET
+            {counters_sql.strip()}
+            camera_role = EXCLUDED.camera_role,
+            ownership = EXCLUDED.ownership
+    """
+    params = [
+        store_id,
+        zone_id,
+        camera_id,
+        camera_role,
+        ownership,
+        metric_type,
+        roi_entity_id,
+        ts_bucket,
+        footfall,
+        engaged,
+        dwell,
+    ]
+    return sql, params
 
 
-def _upsert_conversion_metrics(
+def _conversion_upsert_statement(
     store_id: str,
     ts_bucket,
     conversion: dict,
@@ -308,101 +384,152 @@ def _upsert_conversion_metrics(
     if not metric_type:
         raise ProjectionContractError("conversion_metrics requires metric_type")
     roi_entity_id = str(conversion.get("roi_entity_id") or conversion.get("zone_id") or "").strip() or None
-    with connection.cursor() as cursor:
-        cursor.execute(
-            """
-            SELECT id
-            FROM public.conversion_metrics
-            WHERE store_id = %s
-              AND ts_bucket = %s
-              AND camera_id IS NOT DISTINCT FROM %s
-              AND metric_type IS NOT DISTINCT FROM %s
-              AND roi_entity_id IS NOT DISTINCT FROM %s
-            """,
-            [store_id, ts_bucket, camera_id, metric_type, roi_entity_id],
+    sql = f"""
+        INSERT INTO public.conversion_metrics (
+            store_id,
+            camera_id,
+            camera_role,
+            ownership,
+            metric_type,
+            roi_entity_id,
+            ts_bucket,
+            conversion_rate,
+            queue_avg_seconds,
+            staff_active_est,
+            checkout_events
         )
-        row = cursor.fetchone()
-        if row:
-            cursor.execute(
-                """
-                UPDATE public.conversion_metrics
-                SET camera_role = %s,
-                    ownership = %s,
-                    metric_type = %s,
-                    roi_entity_id = %s,
-                    conversion_rate = %s,
-                    queue_avg_seconds = %s,
-                    staff_active_est = %s,
-                    checkout_events = %s
-                WHERE id = %s
-                """,
-                [
-                    camera_role,
-                    ownership,
-                    metric_type,
-                    roi_entity_id,
-                    conversion_rate,
-                    queue_avg,
-                    staff_active,
-                    checkout_events,
-                    row[0],
-                ],
-            )
-        else:
-            insert_params = [
-                store_id,
-                camera_id,
-                camera_role,
-                ownership,
-                metric_type,
-                roi_entity_id,
-                ts_bucket,
-                conversion_rate,
-                queue_avg,
-                staff_active,
-                checkout_events,
-            ]
-            try:
-                cursor.execute(
-                    """
-                    INSERT INTO public.conversion_metrics (
-                        store_id,
-                        camera_id,
-                        camera_role,
-                        ownership,
-                        metric_type,
-                        roi_entity_id,
-                        ts_bucket,
-                        conversion_rate,
-                        queue_avg_seconds,
-                        staff_active_est,
-                        checkout_events
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """,
-                    insert_params,
-                )
-            except IntegrityError as exc:
-                logger.error(
-                    "[EDGE] projection_contract_violation conversion_metrics uniqueness store_id=%s ts_bucket=%s camera_id=%s metric_type=%s roi_entity_id=%s",
-                    store_id,
-                    ts_bucket,
-                    camera_id,
-                    metric_type,
-                    roi_entity_id,
-                )
-                raise ProjectionContractError("conversion_metrics uniqueness contract violation") from exc
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT {_CONVERSION_PROJECTION_KEY}
+        DO UPDATE SET
+            camera_role = EXCLUDED.camera_role,
+            ownership = EXCLUDED.ownership,
+            conversion_rate = EXCLUDED.conversion_rate,
+            queue_avg_seconds = EXCLUDED.queue_avg_seconds,
+            staff_active_est = EXCLUDED.staff_active_est,
+            checkout_events = EXCLUDED.checkout_events
+    """
+    params = [
+        store_id,
+        camera_id,
+        camera_role,
+        ownership,
+        metric_type,
+        roi_entity_id,
+        ts_bucket,
+        conversion_rate,
+        queue_avg,
+        staff_active,
+        checkout_events,
+    ]
+    return sql, params
+
+
+def _raise_projection_contract_violation(table: str, store_id: str, ts_bucket, params: list, exc: Exception):
+    logger.error(
+        "[EDGE] projection_contract_violation %s uniqueness store_id=%s ts_bucket=%s params=%s",
+        table,
+        store_id,
+        ts_bucket,
+        params,
+    )
+    raise ProjectionContractError(f"{table} uniqueness contract violation") from exc
+
+
+def _upsert_traffic_metrics(
+    store_id: str,
+    ts_bucket,
+    traffic: dict,
+    *,
+    zone_id: Optional[str] = None,
+    camera_id: Optional[str] = None,
+    camera_role: Optional[str] = None,
+    accumulate: bool = False,
+):
+    sql, params = _traffic_upsert_statement(
+        store_id,
+        ts_bucket,
+        traffic,
+        zone_id=zone_id,
+        camera_id=camera_id,
+        camera_role=camera_role,
+        accumulate=accumulate,
+    )
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(sql, params)
+        except IntegrityError as exc:
+            _raise_projection_contract_violation("traffic_metrics", store_id, ts_bucket, params, exc)
+
+
+def _upsert_conversion_metrics(
+    store_id: str,
+    ts_bucket,
+    conversion: dict,
+    *,
+    camera_id: Optional[str] = None,
+    camera_role: Optional[str] = None,
+):
+    sql, params = _conversion_upsert_statement(
+        store_id,
+        ts_bucket,
+        conversion,
+        camera_id=camera_id,
+        camera_role=camera_role,
+    )
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(sql, params)
+        except IntegrityError as exc:
+            _raise_projection_contract_violation("conversion_metrics", store_id, ts_bucket, params, exc)
+
+
+def _upsert_vision_metrics_projection(
+    store_id: str,
+    ts_bucket,
+    traffic: dict,
+    conversion: dict,
+    *,
+    zone_id: Optional[str] = None,
+    camera_id: Optional[str] = None,
+    camera_role: Optional[str] = None,
+):
+    # traffic + conversion in one round trip via a data-modifying CTE.
+    traffic_sql, traffic_params = _traffic_upsert_statement(
+        store_id,
+        ts_bucket,
+        traffic,
+        zone_id=zone_id,
+        camera_id=camera_id,
+        camera_role=camera_role,
+    )
+    conversion_sql, conversion_params = _conversion_upsert_statement(
+        store_id,
+        ts_bucket,
+        conversion,
+        camera_id=camera_id,
+        camera_role=camera_role,
+    )
+    sql = f"WITH traffic_upsert AS ({traffic_sql} RETURNING 1) {conversion_sql}"
+    params = traffic_params + conversion_params
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(sql, params)
+        except IntegrityError as exc:
+            _raise_projection_contract_violation("vision_metrics", store_id, ts_bucket, params, exc)
 
 
 def _emit_first_metrics_received_if_missing(*, store_id: str, ts_bucket) -> None:
     if not store_id:
         return
+    if str(store_id) in _first_metrics_emitted_stores:
+        return
     try:
         already_emitted = JourneyEvent.objects.filter(
             event_name="first_metrics_received",
             payload__store_id=str(store_id),
         ).exists()
         if already_emitted:
+            _first_metrics_emitted_stores.add(str(store_id))
             return
         org_id = Store.objects.filter(id=store_id).values_list("org_id", flat=True).first()
         log_journey_event(
@@ -414,6 +541,7 @@ def _emit_first_metrics_received_if_missing(*, store_id: str, ts_bucket) -> None
             },
             source="app",
         )
+        _first_metrics_emitted_stores.add(str(store_id))
     except Exception:
         logger.exception(
             "[EDGE] failed to emit first_metrics_received store_id=%s ts_bucket=%s",
@@ -460,18 +588,12 @@ def apply_vision_metrics(payload: Dict[str, Any]) -> None:
         traffic=traffic,
         conversion=conversion,
     )
-    _upsert_traffic_metrics(
+    _upsert_vision_metrics_projection(
         store_id,
         ts_bucket,
         traffic,
-        zone_id=str(traffic_zone_id).strip() if traffic_zone_id else None,
-        camera_id=str(camera_id).strip() if camera_id else None,
-        camera_role=camera_role,
-    )
-    _upsert_conversion_metrics(
-        store_id,
-        ts_bucket,
         conversion,
+        zone_id=str(traffic_zone_id).strip() if traffic_zone_id else None,
         camera_id=str(camera_id).strip() if camera_id else None,
         camera_role=camera_role,
     )
@@ -535,12 +657,35 @@ def apply_vision_queue_state(payload: Dict[str, Any]) -> None:
     if not metric_type:
         raise ProjectionContractError("vision.queue_state.v1 requires metric_type")
 
+    # Aggregate the 30s window from atomic samples and upsert in one statement.
     with connection.cursor() as cursor:
         cursor.execute(
-            """
+            f"""
+            INSERT INTO public.conversion_metrics (
+                store_id,
+                camera_id,
+                camera_role,
+                ownership,
+                metric_type,
+                roi_entity_id,
+                ts_bucket,
+                conversion_rate,
+                queue_avg_seconds,
+                staff_active_est,
+                checkout_events
+            )
             SELECT
-                COALESCE(AVG(count_value), 0),
-                COALESCE(MAX(staff_active_est), 0)
+                %s::uuid,
+                %s::uuid,
+                %s,
+                %s,
+                %s,
+                %s,
+                %s::timestamptz,
+                0,
+                ROUND(COALESCE(AVG(count_value), 0) * %s)::integer,
+                COALESCE(MAX(staff_active_est), 0),
+                0
             FROM public.vision_atomic_events
             WHERE store_id = %s
               AND event_type = 'vision.queue_state.v1'
@@ -549,95 +694,33 @@ def apply_vision_queue_state(payload: Dict[str, Any]) -> None:
               AND camera_id IS NOT DISTINCT FROM %s
               AND zone_id IS NOT DISTINCT FROM %s
               AND roi_entity_id IS NOT DISTINCT FROM %s
+            ON CONFLICT {_CONVERSION_PROJECTION_KEY}
+            DO UPDATE SET
+                camera_role = EXCLUDED.camera_role,
+                ownership = EXCLUDED.ownership,
+                queue_avg_seconds = EXCLUDED.queue_avg_seconds,
+                staff_active_est = GREATEST(
+                    COALESCE(conversion_metrics.staff_active_est, 0),
+                    EXCLUDED.staff_active_est
+                )
             """,
-            [store_id, ts_bucket, ts_bucket, camera_id, zone_id, roi_entity_id],
-        )
-        row = cursor.fetchone() or (0, 0)
-        queue_length_avg = float(row[0] or 0)
-        staff_active_est = int(row[1] or 0)
-
-        cursor.execute(
-            """
-            SELECT id
-            FROM public.conversion_metrics
-            WHERE store_id = %s
-              AND ts_bucket = %s
-              AND camera_id IS NOT DISTINCT FROM %s
-              AND metric_type IS NOT DISTINCT FROM %s
-              AND roi_entity_id IS NOT DISTINCT FROM %s
-            LIMIT 1
-            """,
-            [store_id, ts_bucket, camera_id, metric_type, roi_entity_id],
+            [
+                store_id,
+                camera_id,
+                camera_role,
+                ownership,
+                metric_type,
+                roi_entity_id,
+                ts_bucket,
+                bucket_seconds,
+                store_id,
+                ts_bucket,
+                ts_bucket,
+                camera_id,
+                zone_id,
+                roi_entity_id,
+            ],
         )
-        existing = cursor.fetchone()
-        if not existing:
-            cursor.execute(
-                """
-                SELECT id
-                FROM public.conversion_metrics
-                WHERE store_id = %s
-                  AND ts_bucket = %s
-                  AND camera_id IS NOT DISTINCT FROM %s
-                  AND (metric_type IS NULL OR metric_type = '' OR roi_entity_id IS NULL OR roi_entity_id = '')
-                ORDER BY id DESC
-                LIMIT 1
-                """,
-                [store_id, ts_bucket, camera_id],
-            )
-            existing = cursor.fetchone()
-        queue_avg_seconds = int(round(queue_length_avg * bucket_seconds))
-        if existing:
-            cursor.execute(
-                """
-                UPDATE public.conversion_metrics
-                SET camera_role = %s,
-                    ownership = %s,
-                    metric_type = %s,
-                    roi_entity_id = %s,
-                    queue_avg_seconds = %s,
-                    staff_active_est = GREATEST(COALESCE(staff_active_est, 0), %s)
-                WHERE id = %s
-                """,
-                [
-                    camera_role,
-                    ownership,
-                    metric_type,
-                    roi_entity_id,
-                    queue_avg_seconds,
-                    staff_active_est,
-                    existing[0],
-                ],
-            )
-        else:
-            cursor.execute(
-                """
-                INSERT INTO public.conversion_metrics (
-                    store_id,
-                    camera_id,
-                    camera_role,
-                    ownership,
-                    metric_type,
-                    roi_entity_id,
-                    ts_bucket,
-                    conversion_rate,
-                    queue_avg_seconds,
-                    staff_active_est,
-                    checkout_events
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, 0, %s, %s, 0)
-                """,
-                [
-                    store_id,
-                    camera_id,
-                    camera_role,
-                    ownership,
-                    metric_type,
-                    roi_entity_id,
-                    ts_bucket,
-                    queue_avg_seconds,
-                    staff_active_est,
-                ],
-            )
     _emit_first_metrics_received_if_missing(store_id=str(store_id), ts_bucket=ts_bucket)
 
 
@@ -660,10 +743,35 @@ def apply_vision_checkout_proxy(payload: Dict[str, Any]) -> None:
     if not metric_type:
         raise ProjectionContractError("vision.checkout_proxy.v1 requires metric_type")
 
+    # Recount the 30s window from atomic events and upsert in one statement.
     with connection.cursor() as cursor:
         cursor.execute(
-            """
-            SELECT COALESCE(SUM(count_value), 0)
+            f"""
+            INSERT INTO public.conversion_metrics (
+                store_id,
+                camera_id,
+                camera_role,
+                ownership,
+                metric_type,
+                roi_entity_id,
+                ts_bucket,
+                conversion_rate,
+                queue_avg_seconds,
+                staff_active_est,
+                checkout_events
+            )
+            SELECT
+                %s::uuid,
+                %s::uuid,
+                %s,
+                %s,
+                %s,
+                %s,
+                %s::timestamptz,
+                0,
+                0,
+                0,
+                COALESCE(SUM(count_value), 0)
             FROM public.vision_atomic_events
             WHERE store_id = %s
               AND event_type = 'vision.checkout_proxy.v1'
@@ -672,90 +780,28 @@ def apply_vision_checkout_proxy(payload: Dict[str, Any]) -> None:
               AND camera_id IS NOT DISTINCT FROM %s
               AND zone_id IS NOT DISTINCT FROM %s
               AND roi_entity_id IS NOT DISTINCT FROM %s
+            ON CONFLICT {_CONVERSION_PROJECTION_KEY}
+            DO UPDATE SET
+                camera_role = EXCLUDED.camera_role,
+                ownership = EXCLUDED.ownership,
+                checkout_events = EXCLUDED.checkout_events
             """,
-            [store_id, ts_bucket, ts_bucket, camera_id, zone_id, roi_entity_id],
-        )
-        row = cursor.fetchone() or (0,)
-        checkout_events = int(row[0] or 0)
-
-        cursor.execute(
-            """
-            SELECT id
-            FROM public.conversion_metrics
-            WHERE store_id = %s
-              AND ts_bucket = %s
-              AND camera_id IS NOT DISTINCT FROM %s
-              AND metric_type IS NOT DISTINCT FROM %s
-              AND roi_entity_id IS NOT DISTINCT FROM %s
-            LIMIT 1
-            """,
-            [store_id, ts_bucket, camera_id, metric_type, roi_entity_id],
+            [
+                store_id,
+                camera_id,
+                camera_role,
+                ownership,
+                metric_type,
+                roi_entity_id,
+                ts_bucket,
+                store_id,
+                ts_bucket,
+                ts_bucket,
+                camera_id,
+                zone_id,
+                roi_entity_id,
+            ],
         )
-        existing = cursor.fetchone()
-        if not existing:
-            cursor.execute(
-                """
-                SELECT id
-                FROM public.conversion_metrics
-                WHERE store_id = %s
-                  AND ts_bucket = %s
-                  AND camera_id IS NOT DISTINCT FROM %s
-                  AND (metric_type IS NULL OR metric_type = '' OR roi_entity_id IS NULL OR roi_entity_id = '')
-                ORDER BY id DESC
-                LIMIT 1
-                """,
-                [store_id, ts_bucket, camera_id],
-            )
-            existing = cursor.fetchone()
-        if existing:
-            cursor.execute(
-                """
-                UPDATE public.conversion_metrics
-                SET camera_role = %s,
-                    ownership = %s,
-                    metric_type = %s,
-                    roi_entity_id = %s,
-                    checkout_events = %s
-                WHERE id = %s
-                """,
-                [
-                    camera_role,
-                    ownership,
-                    metric_type,
-                    roi_entity_id,
-                    checkout_events,
-                    existing[0],
-                ],
-            )
-        else:
-            cursor.execute(
-                """
-                INSERT INTO public.conversion_metrics (
-                    store_id,
-                    camera_id,
-                    camera_role,
-                    ownership,
-                    metric_type,
-                    roi_entity_id,
-                    ts_bucket,
-                    conversion_rate,
-                    queue_avg_seconds,
-                    staff_active_est,
-                    checkout_events
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, 0, 0, 0, %s)
-                """,
-                [
-                    store_id,
-                    camera_id,
-                    camera_role,
-                    ownership,
-                    metric_type,
-                    roi_entity_id,
-                    ts_bucket,
-                    checkout_events,
-                ],
-            )
     _emit_first_metrics_received_if_missing(store_id=str(store_id), ts_bucket=ts_bucket)
 
 
@@ -1,10 +1,46 @@
 # apps/stores/services/user_orgs.py
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
 from apps.core.models import OrgMember
 from apps.stores.services.user_uuid import ensure_user_uuid
+from backend.utils import shared_cache
+from backend.utils.request_scope import discard, scoped
+
+logger = logging.getLogger(__name__)
+
+
+def _org_ids_cache_key(user_uuid) -> str:
+    return f"entitlements:user_orgs:{user_uuid}"
 
 
 def get_user_org_ids(user):
     user_uuid = ensure_user_uuid(user)
-    return list(
-        OrgMember.objects.filter(user_id=user_uuid).values_list("org_id", flat=True)
-    )
+
+    def load():
+        ttl = int(getattr(settings, "ENTITLEMENTS_CACHE_SECONDS", 60) or 0)
+        if ttl > 0:
+            cached = shared_cache.get("stores.user_org_ids", _org_ids_cache_key(user_uuid))
+            if isinstance(cached, list):
+                return cached
+        org_ids = list(
+            OrgMember.objects.filter(user_id=user_uuid).values_list("org_id", flat=True)
+        )
+        if ttl > 0:
+            try:
+                cache.set(_org_ids_cache_key(user_uuid), org_ids, ttl)
+            except Exception:
+                logger.warning("[ORG] user org ids cache write failed user_uuid=%s", user_uuid)
+        return org_ids
+
+    return list(scoped(("user_org_ids", str(user_uuid)), load))
+
+
+def invalidate_user_org_ids(user_uuid) -> None:
+    """Chamar após criar/remover OrgMember do usuário."""
+    if not user_uuid:
+        return
+    cache.delete(_org_ids_cache_key(user_uuid))
+    discard(("user_org_ids", str(user_uuid)))
@@ -1,8 +1,13 @@
 import logging
 from typing import Optional
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.db import connection
 
+from backend.utils import shared_cache
+from backend.utils.request_scope import discard, scoped
+
 logger = logging.getLogger(__name__)
 _USER_ID_MAP_UUID_COLUMN = None
 
@@ -69,6 +74,7 @@ def upsert_user_id_map(
                     f"UPDATE public.user_id_map SET {uuid_col} = %s WHERE django_user_id = %s",
                     [desired_uuid, user.id],
                 )
+                invalidate_user_uuid(user.id)
                 return desired_uuid
 
             return existing_uuid
@@ -88,9 +94,36 @@ def upsert_user_id_map(
         return str(cursor.fetchone()[0])
 
 
+def _user_uuid_cache_key(django_user_id) -> str:
+    return f"entitlements:user_uuid:{django_user_id}"
+
+
+def invalidate_user_uuid(django_user_id) -> None:
+    cache.delete(_user_uuid_cache_key(django_user_id))
+    discard(("user_uuid", django_user_id))
+
+
 def ensure_user_uuid(user):
     """
     Map Django auth_user.id -> public.user_id_map.(user_uuid|user_id), creating if missing.
-    Sem dependências de DRF.
+    Sem dependências de DRF. O mapeamento é estável: memo por request + cache.
     """
-    return upsert_user_id_map(user)
+    django_user_id = getattr(user, "id", None) if user else None
+    if not django_user_id:
+        return upsert_user_id_map(user)
+
+    def load():
+        ttl = int(getattr(settings, "USER_UUID_CACHE_SECONDS", 3600) or 0)
+        if ttl > 0:
+            cached = shared_cache.get("stores.user_uuid", _user_uuid_cache_key(django_user_id))
+            if cached:
+                return cached
+        user_uuid = upsert_user_id_map(user)
+        if ttl > 0:
+            try:
+                cache.set(_user_uuid_cache_key(django_user_id), str(user_uuid), ttl)
+            except Exception:
+                logger.warning("[USER_ID_MAP] cache write failed django_user_id=%s", django_user_id)
+        return user_uuid
+
+    return scoped(("user_uuid", django_user_id), load)
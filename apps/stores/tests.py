@@ -1176,3 +1176,135 @@ class EmployeeSerializerTests(SimpleTestCase):
                 serializer.create(validated_data)
 
         self.assertIn("email", ctx.exception.detail)
+
+
+class LiveMonitorStreamTests(SimpleTestCase):
+    def test_stream_sends_snapshot_then_published_events_and_unsubscribes(self):
+        from apps.edge.live_feed import LiveFeedBroker
+        from apps.stores import views as store_views
+
+        broker = LiveFeedBroker()
+
+        with patch.object(store_views.live_feed, "broker", broker), self.settings(
+            LIVE_FEED_KEEPALIVE_SECONDS=0.01, LIVE_FEED_MAX_STREAM_SECONDS=0.05
+        ):
+            stream = store_views._live_monitor_event_stream("store-1", {"store_id": "store-1"})
+            chunks = [next(stream)]
+            self.assertEqual(broker.subscriber_count("store-1"), 1)
+            broker.publish("store-1", "camera_status", {"camera_id": "cam-1", "current_status": "offline"})
+            chunks.extend(stream)
+
+        body = "".join(chunks)
+        self.assertIn("event: snapshot", body)
+        self.assertIn("event: camera_status", body)
+        self.assertIn('"current_status": "offline"', body)
+        self.assertEqual(broker.subscriber_count("store-1"), 0)
+
+    def test_unstarted_stream_does_not_hold_a_slot(self):
+        from apps.edge.live_feed import LiveFeedBroker
+        from apps.stores import views as store_views
+
+        broker = LiveFeedBroker()
+        with patch.object(store_views.live_feed, "broker", broker), self.settings(LIVE_FEED_MAX_STREAMS=1):
+            stream = store_views._live_monitor_event_stream("store-1", {"store_id": "store-1"})
+            stream.close()
+            self.assertEqual(broker.total_count(), 0)
+            broker.subscribe("store-2")
+            body = "".join(store_views._live_monitor_event_stream("store-1", {"store_id": "store-1"}))
+
+        self.assertIn("event: unavailable", body)
+        self.assertIn("live_feed_process_limit", body)
+        self.assertEqual(broker.total_count(), 1)
+
+    @patch("apps.stores.views.require_store_role")
+    def test_stream_returns_503_with_polling_fallback_when_process_limit_reached(self, _role_mock):
+        from apps.edge.live_feed import LiveFeedBroker
+        from apps.stores import views as store_views
+
+        broker = LiveFeedBroker()
+        store = MagicMock(id="store-1")
+        view = StoreViewSet.as_view({"get": "live_monitor_stream"}, **StoreViewSet.live_monitor_stream.kwargs)
+        request = APIRequestFactory().get("/api/v1/stores/store-1/live_monitor/stream/")
+        force_authenticate(request, user=MagicMock(is_authenticated=True))
+
+        with patch.object(store_views.live_feed, "broker", broker), patch.object(
+            StoreViewSet, "get_object", return_value=store
+        ), self.settings(LIVE_FEED_MAX_STREAMS=1, LIVE_FEED_RETRY_AFTER_SECONDS=7):
+            broker.subscribe("store-2")
+            response = view(request, pk="store-1")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "7")
+        self.assertEqual(response.data["code"], "live_feed_process_limit")
+        self.assertTrue(response.data["poll_url"].endswith("/api/v1/stores/store-1/live_monitor/"))
+        self.assertEqual(broker.subscriber_count("store-1"), 0)
+
+
+class EntitlementCacheTests(SimpleTestCase):
+    ORG_ID = "11111111-1111-1111-1111-111111111111"
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    @patch("apps.stores.services.user_orgs.OrgMember")
+    @patch("apps.stores.services.user_orgs.ensure_user_uuid", return_value="user-uuid-1")
+    def test_user_org_ids_cached_across_requests_until_invalidated(self, _uuid_mock, org_member_mock):
+        from apps.stores.services.user_orgs import get_user_org_ids, invalidate_user_org_ids
+
+        org_member_mock.objects.filter.return_value.values_list.return_value = ["org-1"]
+        user = MagicMock(id=1)
+        with self.settings(ENTITLEMENTS_CACHE_SECONDS=60):
+            self.assertEqual(get_user_org_ids(user), ["org-1"])
+            self.assertEqual(get_user_org_ids(user), ["org-1"])
+            self.assertEqual(org_member_mock.objects.filter.call_count, 1)
+
+            invalidate_user_org_ids("user-uuid-1")
+            get_user_org_ids(user)
+        self.assertEqual(org_member_mock.objects.filter.call_count, 2)
+
+    @patch("apps.stores.services.user_orgs.OrgMember")
+    @patch("apps.stores.services.user_orgs.ensure_user_uuid", return_value="user-uuid-1")
+    def test_user_org_ids_resolved_once_per_request_without_shared_cache(self, _uuid_mock, org_member_mock):
+        from apps.stores.services.user_orgs import get_user_org_ids
+        from backend.utils.request_scope import RequestScopeMiddleware
+
+        org_member_mock.objects.filter.return_value.values_list.return_value = ["org-1"]
+        user = MagicMock(id=1)
+
+        def view(_request):
+            get_user_org_ids(user)
+            get_user_org_ids(user)
+            return "ok"
+
+        with self.settings(ENTITLEMENTS_CACHE_SECONDS=0):
+            middleware = RequestScopeMiddleware(view)
+            middleware(MagicMock())
+            middleware(MagicMock())
+        self.assertEqual(org_member_mock.objects.filter.call_count, 2)
+
+    @patch("backend.utils.entitlements._compute_trial_expired", return_value=(True, None))
+    def test_trial_expired_cached_per_org_and_invalidated(self, compute_mock):
+        from backend.utils.entitlements import invalidate_org_entitlements, is_trial_expired
+
+        with self.settings(ENTITLEMENTS_CACHE_SECONDS=60):
+            self.assertTrue(is_trial_expired(self.ORG_ID))
+            self.assertTrue(is_trial_expired(self.ORG_ID))
+            self.assertEqual(compute_mock.call_count, 1)
+
+            compute_mock.return_value = (False, None)
+            invalidate_org_entitlements(self.ORG_ID)
+            self.assertFalse(is_trial_expired(self.ORG_ID))
+        self.assertEqual(compute_mock.call_count, 2)
+
+    @patch("backend.utils.entitlements._compute_trial_expired")
+    def test_trial_not_expired_is_not_cached_past_trial_end(self, compute_mock):
+        from backend.utils.entitlements import is_trial_expired
+
+        compute_mock.return_value = (False, timezone.now())
+        with self.settings(ENTITLEMENTS_CACHE_SECONDS=60):
+            is_trial_expired(self.ORG_ID)
+            is_trial_expired(self.ORG_ID)
+        self.assertEqual(compute_mock.call_count, 2)
@@ -1,13 +1,18 @@
-from datetime import datetime
+from datetime import datetime, timezone as dt_timezone
 from unittest.mock import MagicMock, patch
 
 from django.test import SimpleTestCase
 from django.utils import timezone
 from rest_framework.test import APIRequestFactory, force_authenticate
 
+from apps.edge.metrics_rollups import ROLLUP_FIELDS
 from apps.stores.views import StoreViewSet
 
 
+def _rollup_row(bucket, **fields):
+    return ("11111111-1111-1111-1111-111111111111", bucket, *[fields.get(name, 0) for name in ROLLUP_FIELDS])
+
+
 class _Cursor:
     def __init__(self, fetchall_returns=None, fetchone_returns=None):
         self._fetchall_returns = fetchall_returns or []
@@ -70,14 +75,25 @@ class StoreMetricsSummaryTests(SimpleTestCase):
         get_object_mock.return_value = self.store
         cursor = _Cursor(
             fetchall_returns=[
-                [(datetime(2026, 3, 1, 0, 0, 0), 25, 0)],
-                [(datetime(2026, 3, 1, 0, 0, 0), 40, 2, 12.5)],
+                [
+                    _rollup_row(
+                        datetime(2026, 3, 1, 0, 0, 0, tzinfo=dt_timezone.utc),
+                        footfall=40,
+                        traffic_rows=2,
+                        conversion_rows=2,
+                        queue_sum=80,
+                        queue_count=2,
+                        staff_sum=4,
+                        staff_count=2,
+                        checkout_events=5,
+                        minute_buckets=2,
+                        minute_queue_avg_sum=80,
+                        minute_staff_avg_sum=4,
+                        minute_conversion_rate_sum=25,
+                    )
+                ],
                 [("zone-1", "Fila", 10, 0)],
             ],
-            fetchone_returns=[
-                (25, 0),
-                (40, 2, 12.5),
-            ],
         )
         connection_mock.cursor.return_value = cursor
 
@@ -92,6 +108,11 @@ class StoreMetricsSummaryTests(SimpleTestCase):
             response.data["meta"]["metric_governance"]["totals"]["total_visitors"]["metric_status"],
             "official",
         )
+        self.assertEqual(response.data["totals"]["total_visitors"], 40)
+        self.assertEqual(response.data["totals"]["avg_queue_seconds"], 40)
+        self.assertEqual(response.data["totals"]["avg_conversion_rate"], 12.5)
+        self.assertEqual(response.data["series"]["conversion"][0]["conversion_rate"], 12.5)
+        self.assertEqual(response.data["series"]["traffic"][0]["ts_bucket"], "2026-03-01T00:00:00+00:00")
         executed_sql = "\n".join(sql for sql, _params in cursor.executed)
         self.assertIn("camera_role = 'entrada' OR camera_role IS NULL", executed_sql)
         self.assertIn("ownership = 'primary' OR ownership IS NULL", executed_sql)
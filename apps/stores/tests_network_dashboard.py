@@ -0,0 +1,122 @@
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.edge.metrics_rollups import empty_aggregate
+from apps.stores.views import StoreViewSet
+
+STORE_A = "11111111-1111-1111-1111-111111111111"
+STORE_B = "22222222-2222-2222-2222-222222222222"
+STORE_C = "33333333-3333-3333-3333-333333333333"
+
+
+def _store(store_id, name, status="active", last_seen_at=None):
+    store = MagicMock()
+    store.id = store_id
+    store.name = name
+    store.city = "São Paulo"
+    store.status = status
+    store.last_seen_at = last_seen_at
+    return store
+
+
+def _agg(footfall, checkout_events, queue_avg_sum=0, minute_buckets=0):
+    agg = empty_aggregate()
+    agg.update(
+        {
+            "footfall": footfall,
+            "traffic_rows": 1,
+            "conversion_rows": 1,
+            "checkout_events": checkout_events,
+            "minute_queue_avg_sum": queue_avg_sum,
+            "minute_buckets": minute_buckets,
+        }
+    )
+    return agg
+
+
+@patch("apps.stores.views.StoreViewSet._require_subscription_for_org_ids")
+@patch("apps.stores.views.get_user_org_ids", return_value=["org-1"])
+@patch("apps.stores.views.StoreViewSet.get_queryset")
+@patch("apps.stores.views.connection")
+@patch("apps.stores.views.aggregate_metrics_by_store")
+class StoreNetworkDashboardTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.factory = APIRequestFactory()
+        self.user = MagicMock(is_authenticated=True, is_staff=False, is_superuser=False)
+        self.view = StoreViewSet.as_view({"get": "network_dashboard"})
+
+    def _get(self, params):
+        request = self.factory.get("/api/v1/stores/network_dashboard/", params)
+        force_authenticate(request, user=self.user)
+        return self.view(request)
+
+    def _setup(self, aggregate_mock, get_queryset_mock):
+        get_queryset_mock.return_value = [
+            _store(STORE_A, "Loja A", last_seen_at=timezone.now()),
+            _store(STORE_B, "Loja B", status="trial"),
+            _store(STORE_C, "Loja C", status="blocked"),
+        ]
+        aggregate_mock.return_value = {
+            STORE_A: _agg(100, 10, queue_avg_sum=600, minute_buckets=10),
+            STORE_B: _agg(300, 15),
+        }
+
+    def test_returns_per_store_kpis_and_network_totals_from_one_aggregate(
+        self, aggregate_mock, _connection, get_queryset_mock, _org_ids, _require_subscription
+    ):
+        self._setup(aggregate_mock, get_queryset_mock)
+
+        response = self._get({"period": "7d"})
+
+        self.assertEqual(response.status_code, 200)
+        aggregate_mock.assert_called_once()
+        self.assertEqual(
+            aggregate_mock.call_args.kwargs["store_ids"], [STORE_A, STORE_B, STORE_C]
+        )
+        network = response.data["network"]
+        self.assertEqual(network["total_stores"], 3)
+        self.assertEqual(network["active_stores"], 2)
+        self.assertEqual(network["total_visitors"], 400)
+        self.assertEqual(network["avg_conversion"], 6.25)
+        self.assertEqual(network["stores_with_data"], 2)
+        self.assertEqual(network["stores_online"], 1)
+        by_id = {row["id"]: row for row in response.data["stores"]}
+        self.assertEqual(by_id[STORE_A]["conversion_rate"], 10.0)
+        self.assertEqual(by_id[STORE_A]["avg_queue_seconds"], 60)
+        self.assertEqual(by_id[STORE_A]["edge_status"], "online")
+        self.assertEqual(by_id[STORE_C]["footfall"], 0)
+        self.assertFalse(by_id[STORE_C]["has_data"])
+
+    def test_sorts_by_kpi_and_paginates_with_cursor(
+        self, aggregate_mock, _connection, get_queryset_mock, _org_ids, _require_subscription
+    ):
+        self._setup(aggregate_mock, get_queryset_mock)
+
+        first = self._get({"sort": "footfall", "limit": 2})
+        self.assertEqual([row["id"] for row in first.data["stores"]], [STORE_B, STORE_A])
+        next_cursor = first.data["pagination"]["next_cursor"]
+        self.assertTrue(next_cursor)
+
+        second = self._get({"sort": "footfall", "limit": 2, "cursor": next_cursor})
+        self.assertEqual([row["id"] for row in second.data["stores"]], [STORE_C])
+        self.assertIsNone(second.data["pagination"]["next_cursor"])
+        # Segunda página reaproveita o agregado em cache.
+        aggregate_mock.assert_called_once()
+
+        ascending = self._get({"sort": "conversion_rate", "order": "asc"})
+        self.assertEqual([row["id"] for row in ascending.data["stores"]], [STORE_C, STORE_B, STORE_A])
+
+    def test_rejects_unknown_sort_and_mismatched_cursor(
+        self, aggregate_mock, _connection, get_queryset_mock, _org_ids, _require_subscription
+    ):
+        self._setup(aggregate_mock, get_queryset_mock)
+
+        self.assertEqual(self._get({"sort": "password"}).status_code, 400)
+        cursor_value = self._get({"sort": "footfall", "limit": 1}).data["pagination"]["next_cursor"]
+        self.assertEqual(self._get({"sort": "name", "cursor": cursor_value}).status_code, 400)
@@ -22,7 +22,7 @@ class StoreVisionCalibrationPlanTests(SimpleTestCase):
         self.store.org_id = "org-1"
         self.store.name = "Loja Teste"
 
-    @patch("apps.stores.views.get_latest_published_roi_config")
+    @patch("apps.stores.views.get_latest_published_roi_configs")
     @patch("apps.stores.views.StoreCalibrationRun.objects.filter")
     @patch("apps.stores.views.Camera.objects.filter")
     @patch("apps.stores.views.StoreViewSet._require_subscription_for_store")
@@ -55,9 +55,11 @@ class StoreVisionCalibrationPlanTests(SimpleTestCase):
         calibration_qs = MagicMock()
         calibration_qs.order_by.return_value.values.return_value = []
         calibration_filter_mock.return_value = calibration_qs
-        roi_mock.return_value = _PublishedRoi(
-            {"roi_version": "9", "zones": [{"id": "zona-fila", "name": "fila"}], "lines": []}
-        )
+        roi_mock.return_value = {
+            "cam-caixa": _PublishedRoi(
+                {"roi_version": "9", "zones": [{"id": "zona-fila", "name": "fila"}], "lines": []}
+            )
+        }
 
         cursor = MagicMock()
         cursor.fetchall.return_value = [
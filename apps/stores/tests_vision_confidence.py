@@ -22,7 +22,7 @@ class StoreVisionConfidenceTests(SimpleTestCase):
         self.store.org_id = "org-1"
         self.store.name = "Loja Teste"
 
-    @patch("apps.stores.views.get_latest_published_roi_config")
+    @patch("apps.stores.views.get_latest_published_roi_configs")
     @patch("apps.stores.views.StoreCalibrationRun.objects.filter")
     @patch("apps.stores.views.Camera.objects.filter")
     @patch("apps.stores.views.StoreViewSet._require_subscription_for_store")
@@ -63,10 +63,12 @@ class StoreVisionConfidenceTests(SimpleTestCase):
         calibration_qs.order_by.return_value.values.return_value = []
         calibration_filter_mock.return_value = calibration_qs
 
-        roi_mock.side_effect = [
-            _PublishedRoi({"roi_version": "7", "lines": [{"id": "line-main", "name": "Entrada"}], "zones": []}),
-            None,
-        ]
+        roi_mock.return_value = {
+            "cam-entrada": _PublishedRoi(
+                {"roi_version": "7", "lines": [{"id": "line-main", "name": "Entrada"}], "zones": []}
+            ),
+            "cam-caixa": None,
+        }
 
         cursor = MagicMock()
         cursor.fetchall.return_value = [
@@ -86,6 +88,7 @@ class StoreVisionConfidenceTests(SimpleTestCase):
         response = view(request, pk=self.store.id)
 
         self.assertEqual(response.status_code, 200)
+        roi_mock.assert_called_once_with(["cam-entrada", "cam-caixa"])
         self.assertEqual(response.data["store_id"], str(self.store.id))
         self.assertEqual(response.data["store_status"], "parcial")
         self.assertEqual(response.data["summary"]["cameras_total"], 2)
@@ -1,4 +1,6 @@
 # apps/stores/views.py 
+import base64
+import json
 import logging
 import os
 from datetime import datetime, timedelta
@@ -9,8 +11,9 @@ from rest_framework import viewsets, status, permissions
 from knox.auth import TokenAuthentication
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied, ValidationError, NotFound
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied as DjangoPermissionDenied, ValidationError as DjangoValidationError
 from django.db.utils import ProgrammingError, OperationalError
 from django.db import connection, DatabaseError
@@ -18,9 +21,26 @@ from django.utils import timezone
 from django.conf import settings
 from django.utils.dateparse import parse_datetime
 from apps.core.models import Store, OrgMember, Organization, Camera, Employee, DetectionEvent, Subscription
-from apps.edge.models import EdgeToken, StoreCalibrationRun, EdgeEventMinuteStats
+from apps.edge.models import EdgeToken, StoreCalibrationRun
+from apps.edge.minute_stats import bump_event_minute
+from apps.edge import live_feed
+from apps.edge.camera_directory import invalidate_camera_directory
+from apps.edge.status_state import invalidate_store_edge_state
+from apps.edge.metrics_rollups import (
+    aggregate_metrics,
+    aggregate_metrics_by_store,
+    average,
+    conversion_rate_pct,
+    merge_aggregates,
+)
 from apps.copilot.models import OperationalWindowHourly
-from apps.edge.auth import validate_store_token, authenticate_edge_token, EdgeAwareJWTAuthentication
+from apps.edge.auth import (
+    validate_store_token,
+    validate_edge_token_for_store,
+    authenticate_edge_token,
+    invalidate_edge_token_cache,
+    EdgeAwareJWTAuthentication,
+)
 from apps.cameras.limits import (
     enforce_trial_camera_limit,
     count_active_cameras,
@@ -37,19 +57,21 @@ from apps.cameras.permissions import (
     ALLOWED_READ_ROLES,
 )
 from apps.cameras.serializers import CameraSerializer
-from apps.cameras.roi import get_latest_published_roi_config
+from apps.cameras.roi import get_latest_published_roi_config, get_latest_published_roi_configs
 from apps.billing.utils import (
     PaywallError,
     enforce_trial_store_limit,
 )
-from backend.utils.entitlements import enforce_can_use_product, require_trial_active
+from backend.utils import shared_cache
+from backend.utils.entitlements import enforce_can_use_product, invalidate_org_entitlements, require_trial_active
 import hashlib
 import secrets
 import uuid
 from urllib.parse import quote, urlparse, urlunparse
 from .serializers import StoreSerializer, EmployeeSerializer
+from .views_edge_status import EDGE_ONLINE_THRESHOLD_SECONDS
 from apps.stores.services.user_uuid import ensure_user_uuid
-from apps.stores.services.user_orgs import get_user_org_ids
+from apps.stores.services.user_orgs import get_user_org_ids, invalidate_user_org_ids
 
 logger = logging.getLogger(__name__)
 
@@ -275,19 +297,22 @@ def _expire_trial_stores(qs, user=None):
         if user and (getattr(user, "is_superuser", False) or getattr(user, "is_staff", False)):
             return
         now = timezone.now()
-        expired_ids = list(
+        expired = list(
             qs.filter(
                 status="trial",
                 trial_ends_at__isnull=False,
                 trial_ends_at__lt=now,
-            ).values_list("id", flat=True)
+            ).values_list("id", "org_id")
         )
-        if expired_ids:
-            Store.objects.filter(id__in=expired_ids).update(
+        if expired:
+            Store.objects.filter(id__in=[store_id for store_id, _ in expired]).update(
                 status="blocked",
                 blocked_reason="trial_expired",
                 updated_at=now,
             )
+            for org_id in {str(org_id) for _, org_id in expired if org_id}:
+                invalidate_org_entitlements(org_id)
+                invalidate_store_list_cache(org_id)
     except Exception:
         logger.exception("[STORE] failed to expire trial stores")
 
@@ -334,16 +359,7 @@ def _hash_edge_token(raw_token: str) -> str:
 def _validate_edge_token_for_store(store_id: str, provided: str) -> bool:
     if not provided or not store_id:
         return False
-    token_hash = _hash_edge_token(provided)
-    edge_token = EdgeToken.objects.filter(
-        store_id=store_id,
-        token_hash=token_hash,
-        active=True,
-    ).first()
-    if edge_token:
-        EdgeToken.objects.filter(id=edge_token.id).update(last_used_at=timezone.now())
-        return True
-    return False
+    return validate_edge_token_for_store(store_id, provided)
 
 
 def _has_explicit_edge_token(request) -> bool:
@@ -381,10 +397,14 @@ def _issue_edge_token(store_id):
         active=True,
         created_at=timezone.now(),
     )
+    invalidate_edge_token_cache(token_hash)
     return token, raw_token
 
 def _rotate_edge_token(store_id):
-    EdgeToken.objects.filter(store_id=store_id, active=True).update(active=False)
+    active_tokens = EdgeToken.objects.filter(store_id=store_id, active=True)
+    revoked_hashes = list(active_tokens.values_list("token_hash", flat=True))
+    active_tokens.update(active=False)
+    invalidate_edge_token_cache(*revoked_hashes)
     return _issue_edge_token(store_id)
 
 def _edge_token_meta(token_obj):
@@ -402,24 +422,8 @@ def _edge_token_meta(token_obj):
 
 
 def _bump_edge_camera_sync_pull(store_id: str):
-    minute_bucket = timezone.now().replace(second=0, microsecond=0)
     try:
-        row, created = EdgeEventMinuteStats.objects.get_or_create(
-            store_id=store_id,
-            event_name="edge_camera_sync_pull",
-            minute_bucket=minute_bucket,
-            defaults={
-                "count": 1,
-                "last_event_at": timezone.now(),
-                "created_at": timezone.now(),
-                "updated_at": timezone.now(),
-            },
-        )
-        if not created:
-            row.count = int(row.count or 0) + 1
-            row.last_event_at = timezone.now()
-            row.updated_at = timezone.now()
-            row.save(update_fields=["count", "last_event_at", "updated_at"])
+        bump_event_minute(store_id, "edge_camera_sync_pull", timezone.now())
     except Exception:
         logger.exception("[STORE] failed to bump edge_camera_sync_pull store_id=%s", store_id)
 
@@ -720,8 +724,9 @@ def _build_vision_confidence_snapshot(store: Store, window_hours: int = 24) -> d
     metrics_partial = 0
     metrics_recalibrate = 0
     cameras_with_roi = 0
+    published_by_camera = get_latest_published_roi_configs(camera_ids)
     for camera in cameras:
-        published = get_latest_published_roi_config(str(camera.id))
+        published = published_by_camera.get(str(camera.id))
         roi_config = published.config_json if published and isinstance(published.config_json, dict) else {}
         roi_version = roi_config.get("roi_version") if isinstance(roi_config, dict) else None
         camera_role = _infer_camera_role_from_roi_or_name(camera, roi_config)
@@ -838,6 +843,227 @@ def _serialize_calibration_run(row: StoreCalibrationRun) -> dict:
         "updated_at": row.updated_at.isoformat() if row.updated_at else None,
     }
 
+class _EventStreamRenderer(BaseRenderer):
+    # Só para a negociação aceitar "Accept: text/event-stream" (EventSource);
+    # o corpo do stream sai direto do StreamingHttpResponse.
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, default=str).encode("utf-8")
+
+
+def _build_live_monitor_snapshot(store) -> dict:
+    now = timezone.now()
+    cameras = list(
+        Camera.objects.filter(store_id=store.id, active=True)
+        .order_by("name")
+        .values("id", "name", "external_id", "status", "last_seen_at")
+    )
+    events_by_camera = {}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT camera_id, COALESCE(SUM(count_value), 0)
+                FROM public.vision_atomic_events
+                WHERE store_id = %s
+                  AND ts >= %s
+                GROUP BY camera_id
+                """,
+                [str(store.id), now - timedelta(hours=1)],
+            )
+            events_by_camera = {str(row[0]): int(row[1] or 0) for row in cursor.fetchall() if row[0]}
+    except DatabaseError:
+        logger.warning("[STORE] live monitor events_last_hour unavailable store_id=%s", store.id)
+
+    open_events = (
+        DetectionEvent.objects.filter(store_id=store.id, status="open")
+        .select_related("camera")
+        .order_by("-occurred_at")[: int(getattr(settings, "LIVE_FEED_SNAPSHOT_EVENTS", 20) or 20)]
+    )
+    return {
+        "store": store.name,
+        "store_id": str(store.id),
+        "timestamp": now.isoformat(),
+        "cameras": [
+            {
+                "id": str(camera["id"]),
+                "name": camera["name"],
+                "external_id": camera["external_id"],
+                "status": camera["status"],
+                "last_seen_at": camera["last_seen_at"].isoformat() if camera["last_seen_at"] else None,
+                "events_last_hour": events_by_camera.get(str(camera["id"]), 0),
+            }
+            for camera in cameras
+        ],
+        "current_events": [
+            {
+                "id": str(event.id),
+                "type": event.type,
+                "severity": event.severity,
+                "title": event.title,
+                "camera_id": str(event.camera_id) if event.camera_id else None,
+                "camera": event.camera.name if event.camera_id and event.camera else None,
+                "timestamp": event.occurred_at.isoformat() if event.occurred_at else None,
+            }
+            for event in open_events
+        ],
+    }
+
+
+def _format_sse(event_type: str, data: dict, event_id=None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, default=str, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _live_monitor_event_stream(store_id: str, snapshot: dict):
+    keepalive = float(getattr(settings, "LIVE_FEED_KEEPALIVE_SECONDS", 15) or 15)
+    # Limita a duração para não prender workers síncronos; o EventSource reconecta.
+    max_seconds = float(getattr(settings, "LIVE_FEED_MAX_STREAM_SECONDS", 300) or 300)
+    deadline = time.monotonic() + max_seconds
+    # A vaga só é tomada quando o stream começa a ser servido: resposta nunca
+    # iterada (middleware falhou, cliente caiu antes) não reserva nada.
+    try:
+        subscription = live_feed.broker.subscribe(store_id)
+    except live_feed.LiveFeedLimitError as exc:
+        yield "retry: 15000\n\n"
+        yield _format_sse("unavailable", {"code": str(exc), "fallback": "poll"})
+        return
+    try:
+        yield "retry: 3000\n\n"
+        yield _format_sse("snapshot", snapshot)
+        while time.monotonic() < deadline:
+            event = subscription.get(timeout=min(keepalive, max(0.1, deadline - time.monotonic())))
+            if event is None:
+                if subscription.dropped:
+                    yield _format_sse("dropped", {"reason": "slow_consumer"})
+                    return
+                yield ": keepalive\n\n"
+                continue
+            yield _format_sse(event["type"], event, event_id=event["id"])
+    finally:
+        live_feed.broker.unsubscribe(subscription)
+
+
+_NETWORK_PERIOD_DAYS = {"1d": 1, "7d": 7, "30d": 30, "90d": 90}
+_NETWORK_SORT_FIELDS = {
+    "name",
+    "status",
+    "edge_status",
+    "footfall",
+    "conversion_rate",
+    "avg_queue_seconds",
+    "avg_dwell_seconds",
+    "avg_staff_active",
+    "last_seen_at",
+}
+
+
+def _build_network_store_rows(stores, start, end, now) -> tuple[list, dict]:
+    """
+    KPIs por store numa única leitura agrupada (rollups + minutos brutos das
+    bordas) e totais da rede a partir dos mesmos agregados.
+    """
+    store_ids = [str(store.id) for store in stores]
+    with connection.cursor() as cursor:
+        by_store = aggregate_metrics_by_store(cursor, store_ids=store_ids, start=start, end=end)
+
+    rows = []
+    for store in stores:
+        agg = by_store.get(str(store.id))
+        last_seen_at = getattr(store, "last_seen_at", None)
+        if last_seen_at:
+            edge_age = (now - last_seen_at).total_seconds()
+            edge_status = "online" if edge_age <= EDGE_ONLINE_THRESHOLD_SECONDS else "offline"
+        else:
+            edge_status = "unknown"
+        rows.append(
+            {
+                "id": str(store.id),
+                "name": getattr(store, "name", None),
+                "city": getattr(store, "city", None),
+                "status": getattr(store, "status", None),
+                "edge_status": edge_status,
+                "last_seen_at": last_seen_at.isoformat() if last_seen_at else None,
+                "has_data": bool(agg and (agg["traffic_rows"] or agg["conversion_rows"])),
+                "footfall": int(agg["footfall"]) if agg else 0,
+                "conversion_rate": conversion_rate_pct(agg) if agg else 0,
+                "avg_queue_seconds": int(average(agg, "minute_queue_avg_sum", "minute_buckets")) if agg else 0,
+                "avg_dwell_seconds": int(average(agg, "dwell_sum", "dwell_count")) if agg else 0,
+                "avg_staff_active": round(float(average(agg, "minute_staff_avg_sum", "minute_buckets")), 1)
+                if agg
+                else 0,
+            }
+        )
+
+    totals = merge_aggregates(by_store.values())
+    network = {
+        "total_visitors": int(totals["footfall"]),
+        "avg_conversion": conversion_rate_pct(totals),
+        "avg_queue_seconds": int(average(totals, "minute_queue_avg_sum", "minute_buckets")),
+        "stores_with_data": sum(1 for row in rows if row["has_data"]),
+        "stores_online": sum(1 for row in rows if row["edge_status"] == "online"),
+    }
+    return rows, network
+
+
+def _network_sort_key(row: dict, sort: str, descending: bool):
+    value = row.get(sort)
+    if isinstance(value, str):
+        value = value.lower()
+    # Nulos sempre no fim, nas duas direções.
+    missing = value is None
+    null_rank = (0 if missing else 1) if descending else (1 if missing else 0)
+    return (null_rank, value if not missing else 0, row["id"])
+
+
+def _encode_network_cursor(sort: str, order: str, key) -> str:
+    raw = json.dumps({"s": sort, "o": order, "k": list(key)}, default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_network_cursor(raw: str, sort: str, order: str):
+    try:
+        padded = raw + "=" * (-len(raw) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        if data.get("s") != sort or data.get("o") != order:
+            raise ValueError("cursor_sort_mismatch")
+        return tuple(data["k"])
+    except Exception:
+        raise ValidationError({"cursor": "Cursor inválido para esta ordenação."})
+
+
+def _paginate_network_rows(rows: list, *, sort: str, order: str, limit: int, cursor_raw: str | None):
+    descending = order == "desc"
+    keyed = sorted(
+        ((_network_sort_key(row, sort, descending), row) for row in rows),
+        key=lambda item: item[0],
+        reverse=descending,
+    )
+    if cursor_raw:
+        after = _decode_network_cursor(cursor_raw, sort, order)
+        try:
+            keyed = [item for item in keyed if (item[0] < after if descending else item[0] > after)]
+        except TypeError:
+            raise ValidationError({"cursor": "Cursor inválido para esta ordenação."})
+    page = keyed[:limit]
+    next_cursor = _encode_network_cursor(sort, order, page[-1][0]) if len(keyed) > limit else None
+    return [row for _, row in page], next_cursor
+
+
+_STORE_LIST_CACHE_NAMESPACE = "stores.list"
+
+
+def invalidate_store_list_cache(org_id) -> None:
+    shared_cache.bump_version("org", org_id, namespace=_STORE_LIST_CACHE_NAMESPACE)
+
+
 class StoreViewSet(viewsets.ModelViewSet):
     queryset = Store.objects.all()
     serializer_class = StoreSerializer
@@ -889,9 +1115,12 @@ class StoreViewSet(viewsets.ModelViewSet):
                 if user:
                     user_key = str(getattr(user, "id", "unknown"))
                 org_ids = get_user_org_ids(user) if user else []
-                org_key = ",".join(sorted({str(o) for o in org_ids if o}))[:200]
-                cache_key = f"stores:list:{view}:u={user_key}:orgs={org_key}"
-                cached = cache.get(cache_key)
+                org_versions = shared_cache.versions(_STORE_LIST_CACHE_NAMESPACE, "org", org_ids)
+                org_key = hashlib.sha256(
+                    ",".join(f"{org_id}:{version}" for org_id, version in sorted(org_versions.items())).encode("utf-8")
+                ).hexdigest()[:32]
+                cache_key = shared_cache.key(_STORE_LIST_CACHE_NAMESPACE, view, f"u={user_key}", f"orgs={org_key}")
+                cached = shared_cache.get(_STORE_LIST_CACHE_NAMESPACE, cache_key)
                 if cached:
                     return Response(cached)
             except Exception:
@@ -1021,7 +1250,9 @@ class StoreViewSet(viewsets.ModelViewSet):
             endpoint=request.path,
             user=request.user,
         )
-        return super().destroy(request, *args, **kwargs)
+        response = super().destroy(request, *args, **kwargs)
+        invalidate_store_list_cache(store.org_id)
+        return response
 
     def retrieve(self, request, *args, **kwargs):
         store = self.get_object()
@@ -1050,7 +1281,9 @@ class StoreViewSet(viewsets.ModelViewSet):
                 deprecated_detail=str(exc) or "Sem permissão.",
             )
         kwargs["partial"] = True
-        return super().update(request, *args, **kwargs)
+        response = super().update(request, *args, **kwargs)
+        invalidate_store_list_cache(store.org_id)
+        return response
 
     def partial_update(self, request, *args, **kwargs):
         store = self.get_object()
@@ -1063,7 +1296,9 @@ class StoreViewSet(viewsets.ModelViewSet):
                 status.HTTP_403_FORBIDDEN,
                 deprecated_detail=str(exc) or "Sem permissão.",
             )
-        return super().partial_update(request, *args, **kwargs)
+        response = super().partial_update(request, *args, **kwargs)
+        invalidate_store_list_cache(store.org_id)
+        return response
 
     @action(detail=True, methods=['get'])
     def edge_token(self, request, pk=None):
@@ -1392,6 +1627,7 @@ class StoreViewSet(viewsets.ModelViewSet):
             camera.active = active
             camera.updated_at = timezone.now()
             camera.save(update_fields=["active", "updated_at"])
+            invalidate_store_edge_state(camera.store_id)
         except (ProgrammingError, OperationalError):
             return Response(
                 {"detail": "Falha ao atualizar camera.active."},
@@ -1578,6 +1814,8 @@ class StoreViewSet(viewsets.ModelViewSet):
                 details={"reason": str(exc)[:200]},
                 deprecated_detail="Não foi possível cadastrar a câmera.",
             )
+        invalidate_camera_directory(store.id)
+        invalidate_store_edge_state(store.id)
         try:
             OnboardingProgressService(
                 str(store.org_id),
@@ -1673,6 +1911,7 @@ class StoreViewSet(viewsets.ModelViewSet):
                 **_trial_defaults(),
             )
             logger.info("[STORE] created store_id=%s org_id=%s user_id=%s", str(store.id), str(requested_org_id), getattr(user, "id", None))
+            invalidate_store_list_cache(store.org_id)
             _log_store_created(store)
             return
 
@@ -1702,6 +1941,7 @@ class StoreViewSet(viewsets.ModelViewSet):
                 **_trial_defaults(),
             )
             logger.info("[STORE] created store_id=%s org_id=%s user_id=%s", str(store.id), str(org_ids[0]), getattr(user, "id", None))
+            invalidate_store_list_cache(store.org_id)
             _log_store_created(store)
             return
         if len(org_ids) > 1:
@@ -1739,6 +1979,7 @@ class StoreViewSet(viewsets.ModelViewSet):
                 role="owner",
                 created_at=timezone.now(),
             )
+            invalidate_user_org_ids(user_uuid)
             logger.info("[ORG] created org_id=%s user_uuid=%s", str(org.id), str(user_uuid))
             enforce_can_use_product(
                 org_id=org.id,
@@ -1759,6 +2000,7 @@ class StoreViewSet(viewsets.ModelViewSet):
                 **_trial_defaults(),
             )
             logger.info("[STORE] created store_id=%s org_id=%s user_id=%s", str(store.id), str(org.id), getattr(user, "id", None))
+            invalidate_store_list_cache(store.org_id)
             _log_store_created(store)
         except (ProgrammingError, OperationalError) as exc:
             print(f"[RBAC] falha ao criar org padrão: {exc}")
@@ -1797,66 +2039,18 @@ class StoreViewSet(viewsets.ModelViewSet):
             critical_alerts_open = 0
 
             with connection.cursor() as cursor:
-                cursor.execute(
-                    """
-                    SELECT
-                        COALESCE(SUM(footfall), 0) AS total_visitors,
-                        COALESCE(AVG(NULLIF(dwell_seconds_avg, 0)), 0) AS avg_dwell_seconds
-                    FROM public.traffic_metrics
-                    WHERE store_id = %s
-                      AND ts_bucket >= %s
-                      AND ts_bucket < %s
-                      AND (camera_role = 'entrada' OR camera_role IS NULL)
-                      AND (ownership = 'primary' OR ownership IS NULL)
-                    """,
-                    [str(store.id), start, end],
-                )
-                row = cursor.fetchone()
-                if row:
-                    total_visitors = int(row[0] or 0)
-                    avg_dwell_seconds = float(row[1] or 0)
-
-                cursor.execute(
-                    """
-                    SELECT
-                        COALESCE(AVG(NULLIF(conversion_rate, 0)), 0) AS avg_conversion_rate,
-                        COALESCE(AVG(queue_avg_seconds), 0) AS avg_queue_seconds,
-                        COALESCE(AVG(staff_active_est), 0) AS avg_staff_active
-                    FROM public.conversion_metrics
-                    WHERE store_id = %s
-                      AND ts_bucket >= %s
-                      AND ts_bucket < %s
-                      AND (camera_role = 'balcao' OR camera_role IS NULL)
-                      AND (ownership = 'primary' OR ownership IS NULL)
-                    """,
-                    [str(store.id), start, end],
-                )
-                row = cursor.fetchone()
-                if row:
-                    avg_conversion_rate = float(row[0] or 0)
-                    avg_queue_seconds = float(row[1] or 0)
-                    avg_staff_active = float(row[2] or 0)
-
-                cursor.execute(
-                    """
-                    SELECT
-                        date_trunc('hour', ts_bucket) AS bucket,
-                        COALESCE(SUM(footfall), 0) AS flow
-                    FROM public.traffic_metrics
-                    WHERE store_id = %s
-                      AND ts_bucket >= %s
-                      AND ts_bucket < %s
-                      AND (camera_role = 'entrada' OR camera_role IS NULL)
-                      AND (ownership = 'primary' OR ownership IS NULL)
-                    GROUP BY 1
-                    ORDER BY flow DESC
-                    LIMIT 1
-                    """,
-                    [str(store.id), start, end],
-                )
-                row = cursor.fetchone()
-                if row and row[0]:
-                    peak_hour = timezone.localtime(row[0]).strftime("%H:%M")
+                hourly = aggregate_metrics(cursor, store_ids=[store.id], start=start, end=end, bucket="hour")
+                totals_agg = merge_aggregates(hourly.values())
+                total_visitors = int(totals_agg["footfall"])
+                avg_dwell_seconds = average(totals_agg, "dwell_sum", "dwell_count")
+                avg_conversion_rate = average(totals_agg, "conversion_rate_nz_sum", "conversion_rate_nz_count")
+                avg_queue_seconds = average(totals_agg, "queue_sum", "queue_count")
+                avg_staff_active = average(totals_agg, "staff_sum", "staff_count")
+
+                traffic_hours = [(bucket, agg) for bucket, agg in hourly.items() if agg["traffic_rows"]]
+                if traffic_hours:
+                    peak_bucket, _ = max(traffic_hours, key=lambda item: item[1]["footfall"])
+                    peak_hour = timezone.localtime(peak_bucket).strftime("%H:%M")
 
                 cursor.execute(
                     """
@@ -2032,50 +2226,53 @@ class StoreViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def live_monitor(self, request, pk=None):
-        """Dados para monitoramento em tempo real"""
+        """Dados para monitoramento em tempo real (snapshot; stream em live_monitor/stream)"""
         store = self.get_object()
         require_store_role(request.user, str(store.id), ALLOWED_READ_ROLES)
-        
-        # ⭐ MOCK - depois vem do processamento de vídeo
-        monitor_data = {
-            'store': store.name,
-            'timestamp': timezone.now().isoformat(),
-            'cameras': [
-                {
-                    'id': 'cam_001',
-                    'name': 'Caixa Principal',
-                    'status': 'online',
-                    'current_viewers': 0,
-                    'events_last_hour': 12,
-                    'stream_url': f'/api/cameras/{store.id}/stream/cam_001'
-                },
+        return Response(_build_live_monitor_snapshot(store))
+
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path="live_monitor/stream",
+        renderer_classes=[JSONRenderer, _EventStreamRenderer],
+    )
+    def live_monitor_stream(self, request, pk=None):
+        """
+        Server-Sent Events: snapshot inicial seguido de vision_event,
+        camera_status e detection_event publicados pela ingestão.
+        Sem vaga de stream (loja ou processo) responde 503 com Retry-After e
+        indica o polling em live_monitor/ como fallback.
+        """
+        store = self.get_object()
+        require_store_role(request.user, str(store.id), ALLOWED_READ_ROLES)
+        try:
+            live_feed.broker.check_capacity(str(store.id))
+        except live_feed.LiveFeedLimitError as exc:
+            detail = (
+                "Limite de conexões ao vivo atingido para esta loja."
+                if exc.scope == "subscriber"
+                else "Servidor sem vaga para conexões ao vivo; use o polling."
+            )
+            response = Response(
                 {
-                    'id': 'cam_002',
-                    'name': 'Entrada Loja',
-                    'status': 'online',
-                    'current_viewers': 1,
-                    'events_last_hour': 47,
-                    'stream_url': f'/api/cameras/{store.id}/stream/cam_002'
-                }
-            ],
-            'current_events': [
-                {
-                    'type': 'person_detected',
-                    'camera': 'Entrada Loja',
-                    'confidence': 0.92,
-                    'timestamp': timezone.now().isoformat(),
+                    "detail": detail,
+                    "code": str(exc),
+                    "fallback": "poll",
+                    "poll_url": request.build_absolute_uri("../"),
                 },
-                {
-                    'type': 'queue_forming',
-                    'camera': 'Caixa Principal',
-                    'confidence': 0.78,
-                    'timestamp': timezone.now().isoformat(),
-                    'details': '3 pessoas na fila'
-                }
-            ]
-        }
-        
-        return Response(monitor_data)
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+            response["Retry-After"] = str(int(getattr(settings, "LIVE_FEED_RETRY_AFTER_SECONDS", 15) or 15))
+            return response
+        snapshot = _build_live_monitor_snapshot(store)
+        response = StreamingHttpResponse(
+            _live_monitor_event_stream(str(store.id), snapshot),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
 
     @action(detail=True, methods=["get"], url_path="limits")
     def limits(self, request, pk=None):
@@ -2149,147 +2346,36 @@ class StoreViewSet(viewsets.ModelViewSet):
         zones_breakdown = []
 
         with connection.cursor() as cursor:
-            cursor.execute(
-                """
-                SELECT date_trunc(%s, ts_bucket) AS bucket,
-                       COALESCE(SUM(footfall), 0) AS footfall,
-                       COALESCE(AVG(NULLIF(dwell_seconds_avg, 0)), 0) AS dwell_avg
-                FROM public.traffic_metrics
-                WHERE store_id = %s
-                  AND ts_bucket >= %s
-                  AND ts_bucket < %s
-                  AND (camera_role = 'entrada' OR camera_role IS NULL)
-                  AND (ownership = 'primary' OR ownership IS NULL)
-                GROUP BY 1
-                ORDER BY 1 ASC
-                """,
-                [bucket, str(store.id), start, end],
-            )
-            for row in cursor.fetchall():
-                traffic_series.append(
-                    {
-                        "ts_bucket": row[0].isoformat(),
-                        "footfall": int(row[1] or 0),
-                        "dwell_seconds_avg": int(row[2] or 0),
-                    }
-                )
-
-            cursor.execute(
-                """
-                WITH traffic AS (
-                    SELECT date_trunc(%s, ts_bucket) AS bucket,
-                           COALESCE(SUM(footfall), 0) AS footfall
-                    FROM public.traffic_metrics
-                    WHERE store_id = %s
-                      AND ts_bucket >= %s
-                      AND ts_bucket < %s
-                      AND (camera_role = 'entrada' OR camera_role IS NULL)
-                      AND (ownership = 'primary' OR ownership IS NULL)
-                    GROUP BY 1
-                ),
-                conversion AS (
-                    SELECT date_trunc(%s, ts_bucket) AS bucket,
-                           COALESCE(AVG(queue_avg_seconds), 0) AS queue_avg_seconds,
-                           COALESCE(AVG(staff_active_est), 0) AS staff_active_est,
-                           COALESCE(SUM(checkout_events), 0) AS checkout_events
-                    FROM public.conversion_metrics
-                    WHERE store_id = %s
-                      AND ts_bucket >= %s
-                      AND ts_bucket < %s
-                      AND (camera_role = 'balcao' OR camera_role IS NULL)
-                      AND (ownership = 'primary' OR ownership IS NULL)
-                    GROUP BY 1
-                )
-                SELECT COALESCE(conversion.bucket, traffic.bucket) AS bucket,
-                       COALESCE(conversion.queue_avg_seconds, 0) AS queue_avg_seconds,
-                       COALESCE(conversion.staff_active_est, 0) AS staff_active_est,
-                       CASE
-                           WHEN COALESCE(traffic.footfall, 0) > 0
-                           THEN ROUND((COALESCE(conversion.checkout_events, 0)::numeric / traffic.footfall::numeric) * 100, 2)
-                           ELSE 0
-                       END AS conversion_rate
-                FROM conversion
-                FULL OUTER JOIN traffic ON traffic.bucket = conversion.bucket
-                ORDER BY 1 ASC
-                """,
-                [bucket, str(store.id), start, end, bucket, str(store.id), start, end],
-            )
-            for row in cursor.fetchall():
-                conversion_series.append(
-                    {
-                        "ts_bucket": row[0].isoformat(),
-                        "queue_avg_seconds": int(row[1] or 0),
-                        "staff_active_est": int(row[2] or 0),
-                        "conversion_rate": float(row[3] or 0),
-                    }
-                )
-
-            cursor.execute(
-                """
-                SELECT COALESCE(SUM(footfall), 0) AS total_visitors,
-                       COALESCE(AVG(NULLIF(dwell_seconds_avg, 0)), 0) AS avg_dwell_seconds
-                FROM public.traffic_metrics
-                WHERE store_id = %s
-                  AND ts_bucket >= %s
-                  AND ts_bucket < %s
-                  AND (camera_role = 'entrada' OR camera_role IS NULL)
-                  AND (ownership = 'primary' OR ownership IS NULL)
-                """,
-                [str(store.id), start, end],
-            )
-            row = cursor.fetchone()
-            if row:
-                totals["total_visitors"] = int(row[0] or 0)
-                totals["avg_dwell_seconds"] = int(row[1] or 0)
+            series = aggregate_metrics(cursor, store_ids=[store.id], start=start, end=end, bucket=bucket)
+            for bucket_start in sorted(series):
+                agg = series[bucket_start]
+                if agg["traffic_rows"]:
+                    traffic_series.append(
+                        {
+                            "ts_bucket": bucket_start.isoformat(),
+                            "footfall": int(agg["footfall"]),
+                            "dwell_seconds_avg": int(average(agg, "dwell_sum", "dwell_count")),
+                        }
+                    )
+                if agg["traffic_rows"] or agg["conversion_rows"]:
+                    conversion_series.append(
+                        {
+                            "ts_bucket": bucket_start.isoformat(),
+                            "queue_avg_seconds": int(average(agg, "queue_sum", "queue_count")),
+                            "staff_active_est": int(average(agg, "staff_sum", "staff_count")),
+                            "conversion_rate": conversion_rate_pct(agg),
+                        }
+                    )
 
-            cursor.execute(
-                """
-                WITH traffic AS (
-                    SELECT ts_bucket,
-                           COALESCE(SUM(footfall), 0) AS footfall
-                    FROM public.traffic_metrics
-                    WHERE store_id = %s
-                      AND ts_bucket >= %s
-                      AND ts_bucket < %s
-                      AND (camera_role = 'entrada' OR camera_role IS NULL)
-                      AND (ownership = 'primary' OR ownership IS NULL)
-                    GROUP BY 1
-                ),
-                conversion AS (
-                    SELECT ts_bucket,
-                           COALESCE(AVG(queue_avg_seconds), 0) AS queue_avg_seconds,
-                           COALESCE(AVG(staff_active_est), 0) AS avg_staff_active,
-                           COALESCE(SUM(checkout_events), 0) AS checkout_events
-                    FROM public.conversion_metrics
-                    WHERE store_id = %s
-                      AND ts_bucket >= %s
-                      AND ts_bucket < %s
-                      AND (camera_role = 'balcao' OR camera_role IS NULL)
-                      AND (ownership = 'primary' OR ownership IS NULL)
-                    GROUP BY 1
-                )
-                SELECT COALESCE(AVG(conversion.queue_avg_seconds), 0) AS avg_queue_seconds,
-                       COALESCE(AVG(conversion.avg_staff_active), 0) AS avg_staff_active,
-                       COALESCE(
-                           AVG(
-                               CASE
-                                   WHEN COALESCE(traffic.footfall, 0) > 0
-                                   THEN (COALESCE(conversion.checkout_events, 0)::numeric / traffic.footfall::numeric) * 100
-                                   ELSE 0
-                               END
-                           ),
-                           0
-                       ) AS avg_conversion_rate
-                FROM conversion
-                LEFT JOIN traffic ON traffic.ts_bucket = conversion.ts_bucket
-                """,
-                [str(store.id), start, end, str(store.id), start, end],
+            # Totais por minuto (média das médias por ts_bucket) somados dos mesmos buckets.
+            totals_agg = merge_aggregates(series.values())
+            totals["total_visitors"] = int(totals_agg["footfall"])
+            totals["avg_dwell_seconds"] = int(average(totals_agg, "dwell_sum", "dwell_count"))
+            totals["avg_queue_seconds"] = int(average(totals_agg, "minute_queue_avg_sum", "minute_buckets"))
+            totals["avg_staff_active"] = int(average(totals_agg, "minute_staff_avg_sum", "minute_buckets"))
+            totals["avg_conversion_rate"] = float(
+                average(totals_agg, "minute_conversion_rate_sum", "minute_buckets")
             )
-            row = cursor.fetchone()
-            if row:
-                totals["avg_queue_seconds"] = int(row[0] or 0)
-                totals["avg_staff_active"] = int(row[1] or 0)
-                totals["avg_conversion_rate"] = float(row[2] or 0)
 
             cursor.execute(
                 """
@@ -3441,24 +3527,73 @@ class StoreViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def network_dashboard(self, request):
-        """Dashboard para redes com múltiplas lojas (seu segundo design)"""
+        """
+        Dashboard para redes com múltiplas lojas: KPIs por loja + totais da rede.
+        Query params: period (1d|7d|30d|90d), sort (KPI), order (asc|desc),
+        limit (1..200) e cursor (next_cursor da página anterior).
+        """
+        period = (request.query_params.get("period") or "7d").lower()
+        if period not in _NETWORK_PERIOD_DAYS:
+            period = "7d"
+        sort = (request.query_params.get("sort") or "footfall").strip().lower()
+        if sort not in _NETWORK_SORT_FIELDS:
+            raise ValidationError({"sort": f"Use um de: {', '.join(sorted(_NETWORK_SORT_FIELDS))}."})
+        order = (request.query_params.get("order") or ("asc" if sort == "name" else "desc")).lower()
+        if order not in {"asc", "desc"}:
+            order = "desc"
+        try:
+            limit = max(1, min(200, int(request.query_params.get("limit") or 50)))
+        except (TypeError, ValueError):
+            limit = 50
+        cursor_raw = (request.query_params.get("cursor") or "").strip() or None
+
         try:
             self._require_subscription_for_org_ids(get_user_org_ids(request.user), "network_dashboard")
             stores = list(self.get_queryset())
             total_stores = len(stores)
             active_stores = len([s for s in stores if getattr(s, "status", None) in ("active", "trial")])
 
+            now = timezone.now()
+            end = now
+            start = end - timedelta(days=_NETWORK_PERIOD_DAYS[period])
+            store_key = hashlib.sha256(",".join(sorted(str(s.id) for s in stores)).encode("utf-8")).hexdigest()[:32]
+            cache_key = f"stores:network_dashboard:{period}:{store_key}"
+            cached = shared_cache.get("stores.network_dashboard", cache_key) if stores else None
+            if cached:
+                rows, network_kpis, start_iso, end_iso = cached
+            else:
+                rows, network_kpis = _build_network_store_rows(stores, start, end, now) if stores else ([], {})
+                start_iso, end_iso = start.isoformat(), end.isoformat()
+                cache_ttl = int(getattr(settings, "NETWORK_DASHBOARD_CACHE_SECONDS", 60) or 0)
+                if stores and cache_ttl > 0:
+                    cache.set(cache_key, (rows, network_kpis, start_iso, end_iso), cache_ttl)
+
+            page, next_cursor = _paginate_network_rows(
+                rows, sort=sort, order=order, limit=limit, cursor_raw=cursor_raw
+            )
             network_data = {
                 'network': {
                     'total_stores': total_stores,
                     'active_stores': active_stores,
-                    'total_visitors': 0,
-                    'avg_conversion': 0,
+                    'total_visitors': network_kpis.get("total_visitors", 0),
+                    'avg_conversion': network_kpis.get("avg_conversion", 0),
+                    'avg_queue_seconds': network_kpis.get("avg_queue_seconds", 0),
+                    'stores_with_data': network_kpis.get("stores_with_data", 0),
+                    'stores_online': network_kpis.get("stores_online", 0),
+                },
+                'period': period,
+                'from': start_iso,
+                'to': end_iso,
+                'stores': page,
+                'pagination': {
+                    'sort': sort,
+                    'order': order,
+                    'limit': limit,
+                    'next_cursor': next_cursor,
                 },
-                'stores': []
             }
             return Response(network_data)
-        except (ProgrammingError, ObjectDoesNotExist) as exc:
+        except (ProgrammingError, OperationalError, ObjectDoesNotExist) as exc:
             print(f"[WARN] network_dashboard fallback: {exc}")
             return Response({
                 'network': {
@@ -2,6 +2,7 @@ from datetime import datetime
 import json
 import logging
 import uuid
+from types import SimpleNamespace
 from django.core.exceptions import FieldDoesNotExist, FieldError
 from django.test.testcases import DatabaseOperationForbidden
 from django.db.utils import ProgrammingError, OperationalError
@@ -45,6 +46,36 @@ def classify_age(dt):
     return ("offline", int(age), "heartbeat_expired")
 
 
+def classify_camera_health(*, log_ts, log_status, last_seen_at, now, recent_threshold):
+    """
+    Status da câmera pelo último health log. Retorna
+    (status, age_seconds, reason, last_ts); last_ts vira o log quando recente.
+    """
+    if log_ts and log_ts >= recent_threshold:
+        return (log_status or "unknown", int((now - log_ts).total_seconds()), "health_recent", log_ts)
+    if log_ts:
+        return ("offline", int((now - log_ts).total_seconds()), "health_stale", last_seen_at)
+    age_seconds = int((now - last_seen_at).total_seconds()) if last_seen_at else None
+    return ("unknown", age_seconds, "no_recent_health", last_seen_at)
+
+
+def classify_store_status(*, cameras_total, cameras_online, camera_age_seconds, comm_status, comm_age_seconds, comm_reason):
+    """Retorna (store_status, reason, age_seconds, pipeline_status)."""
+    if cameras_total == 0:
+        if comm_status in ("online", "degraded"):
+            return ("online_no_cameras", "no_cameras", comm_age_seconds, "no_data")
+        return ("offline", comm_reason, comm_age_seconds, "no_data")
+
+    age_seconds = min(camera_age_seconds) if camera_age_seconds else None
+    if cameras_online >= 1:
+        if cameras_online < cameras_total:
+            return ("degraded", "partial_camera_coverage", age_seconds, "healthy")
+        return ("online", "all_cameras_online", age_seconds, "healthy")
+    if comm_status in ("online", "degraded"):
+        return ("offline", "camera_health_stale", age_seconds, "stale")
+    return (comm_status, comm_reason, age_seconds, "no_data")
+
+
 def _health_recent_threshold(now=None):
     now = now or timezone.now()
     return now - timezone.timedelta(seconds=CAMERA_HEALTH_RECENT_SECONDS)
@@ -233,23 +264,13 @@ def compute_store_edge_status_snapshot(store_id):
                 if log_ts and (max_health_ts is None or log_ts > max_health_ts):
                     max_health_ts = log_ts
 
-            if log_ts and log_ts >= recent_threshold:
-                cam_age_seconds = int((now - log_ts).total_seconds())
-                cam_status = getattr(last_log, "status", None) or "unknown"
-                cam_reason = "health_recent"
-                last_ts = log_ts
-            else:
-                if log_ts:
-                    cam_age_seconds = int((now - log_ts).total_seconds())
-                    cam_status = "offline"
-                    cam_reason = "health_stale"
-                else:
-                    cam_status = "unknown"
-                    cam_reason = "no_recent_health"
-                    if last_ts:
-                        cam_age_seconds = int((now - last_ts).total_seconds())
-                    else:
-                        cam_age_seconds = None
+            cam_status, cam_age_seconds, cam_reason, last_ts = classify_camera_health(
+                log_ts=log_ts,
+                log_status=getattr(last_log, "status", None),
+                last_seen_at=last_ts,
+                now=now,
+                recent_threshold=recent_threshold,
+            )
 
             if cam_status == "online":
                 cameras_online += 1
@@ -310,35 +331,14 @@ def compute_store_edge_status_snapshot(store_id):
         else:
             camera_source_mode_detected = "local_only_or_unknown"
 
-        if cameras_total == 0:
-            store_status = "online_no_cameras" if comm_status in ("online", "degraded") else "offline"
-            if comm_status in ("online", "degraded"):
-                store_status_reason = "no_cameras"
-            else:
-                store_status_reason = comm_reason
-            store_status_age_seconds = comm_age_seconds
-            pipeline_status = "no_data"
-        elif cameras_online >= 1:
-            if cameras_online < cameras_total:
-                store_status = "degraded"
-                store_status_reason = "partial_camera_coverage"
-                pipeline_status = "healthy"
-            else:
-                store_status = "online"
-                store_status_reason = "all_cameras_online"
-                pipeline_status = "healthy"
-        else:
-            if comm_status in ("online", "degraded"):
-                store_status = "offline"
-                store_status_reason = "camera_health_stale"
-                pipeline_status = "stale"
-            else:
-                store_status = comm_status
-                store_status_reason = comm_reason
-                pipeline_status = "no_data"
-
-        if cameras_total != 0:
-            store_status_age_seconds = min(camera_age_seconds) if camera_age_seconds else None
+        store_status, store_status_reason, store_status_age_seconds, pipeline_status = classify_store_status(
+            cameras_total=cameras_total,
+            cameras_online=cameras_online,
+            camera_age_seconds=camera_age_seconds,
+            comm_status=comm_status,
+            comm_age_seconds=comm_age_seconds,
+            comm_reason=comm_reason,
+        )
         last_error = None
         if store_status_reason != "all_cameras_online":
             last_error = _get_latest_error(store_id, recent_threshold=recent_threshold)
@@ -536,8 +536,28 @@ def _get_latest_camera_health(camera_id):
 
 
 def _get_latest_camera_health_map(camera_ids):
+    """
+    Último camera_health_logs por câmera. No Postgres é um DISTINCT ON (uma
+    linha por câmera via idx_chl_camera_checked_at); usado por câmera única,
+    por loja e pela frota inteira (apps/edge/fleet_status.py).
+    """
     if not camera_ids:
         return {}
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT DISTINCT ON (camera_id) camera_id::text, checked_at, status, error
+                FROM public.camera_health_logs
+                WHERE camera_id = ANY(%s::uuid[])
+                ORDER BY camera_id, checked_at DESC
+                """,
+                [[str(camera_id) for camera_id in camera_ids]],
+            )
+            return {
+                row[0]: SimpleNamespace(camera_id=row[0], checked_at=row[1], status=row[2], error=row[3])
+                for row in cursor.fetchall()
+            }
     try:
         qs = (
             CameraHealthLog.objects
@@ -0,0 +1,212 @@
+"""
+Pool de conexões em processo para workers com threads (DB_POOL_MODE=pool).
+
+Cada thread do Django continua com a sua conexão durante o request; no
+close() a conexão volta para o pool em vez de fechar o TLS com o Postgres.
+Um pool por (alias, destino, pid): após fork (gunicorn --preload) o processo
+filho cria o seu.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+
+import psycopg2
+from psycopg2 import extensions as pg_extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+class _PooledConnection:
+    __slots__ = ("connection", "created_at", "returned_at")
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.returned_at = self.created_at
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        connect: Callable[[], object],
+        *,
+        max_size: int = 10,
+        timeout: float = 5.0,
+        max_lifetime: float = 1800.0,
+        max_idle: float = 300.0,
+    ):
+        self._connect = connect
+        self.max_size = max(1, int(max_size))
+        self.timeout = max(0.0, float(timeout))
+        self.max_lifetime = float(max_lifetime or 0)
+        self.max_idle = float(max_idle or 0)
+        self._cond = threading.Condition()
+        self._idle: deque = deque()
+        self._in_use: Dict[int, _PooledConnection] = {}
+        self._size = 0
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+        }
+
+    def _expired(self, entry: _PooledConnection, now: float) -> bool:
+        if getattr(entry.connection, "closed", 0):
+            return True
+        if self.max_lifetime and now - entry.created_at > self.max_lifetime:
+            return True
+        if self.max_idle and now - entry.returned_at > self.max_idle:
+            return True
+        return False
+
+    def _close_quietly(self, connection) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._idle:
+                    entry = self._idle.pop()
+                    if self._expired(entry, now):
+                        self._size -= 1
+                        self._stats["discarded"] += 1
+                        self._close_quietly(entry.connection)
+                        continue
+                    return self._checkout(entry, started, waited)
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"connection pool exhausted (max_size={self.max_size}, timeout={self.timeout}s)"
+                    )
+                if not waited:
+                    waited = True
+                    self._stats["waits"] += 1
+                self._cond.wait(remaining)
+
+        # Abre fora do lock: TLS com o Supabase leva dezenas de ms.
+        try:
+            connection = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["created"] += 1
+            return self._checkout(_PooledConnection(connection), started, waited)
+
+    def _checkout(self, entry: _PooledConnection, started: float, waited: bool):
+        self._in_use[id(entry.connection)] = entry
+        self._stats["checkouts"] += 1
+        if waited:
+            wait = time.monotonic() - started
+            self._stats["wait_seconds_total"] += wait
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+        return entry.connection
+
+    def _reset(self, connection) -> bool:
+        if getattr(connection, "closed", 0):
+            return False
+        try:
+            if connection.get_transaction_status() != pg_extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            return connection.get_transaction_status() == pg_extensions.TRANSACTION_STATUS_IDLE
+        except Exception:
+            return False
+
+    def putconn(self, connection, *, discard: bool = False) -> None:
+        keep = not discard and self._reset(connection)
+        with self._cond:
+            entry = self._in_use.pop(id(connection), None)
+            if entry is None:
+                # Não é do pool (ou já devolvida): só fecha.
+                keep = False
+            elif keep:
+                entry.returned_at = time.monotonic()
+                self._idle.append(entry)
+            else:
+                self._size -= 1
+                self._stats["discarded"] += 1
+            self._cond.notify()
+        if not keep:
+            self._close_quietly(connection)
+
+    def closeall(self) -> None:
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_quietly(entry.connection)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._cond:
+            entries = list(self._idle) + list(self._in_use.values())
+            ages = [now - entry.created_at for entry in entries]
+            data = dict(self._stats)
+            data.update(
+                {
+                    "max_size": self.max_size,
+                    "size": self._size,
+                    "idle": len(self._idle),
+                    "in_use": len(self._in_use),
+                    "connection_age_seconds_max": round(max(ages), 3) if ages else 0.0,
+                    "connection_age_seconds_avg": round(sum(ages) / len(ages), 3) if ages else 0.0,
+                }
+            )
+        data["wait_seconds_total"] = round(data["wait_seconds_total"], 6)
+        data["wait_seconds_max"] = round(data["wait_seconds_max"], 6)
+        return data
+
+
+_pools: Dict[Tuple, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key: Tuple, factory: Callable[[], ConnectionPool]) -> ConnectionPool:
+    full_key = (os.getpid(),) + tuple(key)
+    pool = _pools.get(full_key)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(full_key)
+        if pool is None:
+            pool = factory()
+            _pools[full_key] = pool
+            logger.info("[DB] connection pool created alias=%s max_size=%s", key[0], pool.max_size)
+        return pool
+
+
+def pool_stats(alias: Optional[str] = None) -> Dict[str, dict]:
+    pid = os.getpid()
+    result: Dict[str, dict] = {}
+    for key, pool in list(_pools.items()):
+        if key[0] != pid or (alias is not None and key[1] != alias):
+            continue
+        label = key[1] if key[1] not in result else f"{key[1]}:{key[2]}"
+        result[label] = pool.stats()
+    return result
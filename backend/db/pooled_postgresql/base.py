@@ -0,0 +1,56 @@
+"""
+Backend postgresql do Django com conexões vindas de backend.db.pool.
+
+Configurado em settings via DB_POOL_MODE=pool; parâmetros do pool em
+DATABASES["default"]["POOL"] (max_size, timeout, max_lifetime, max_idle).
+"""
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from django.utils.asyncio import async_unsafe
+
+from backend.db.pool import ConnectionPool, get_pool
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+    def _pool(self, conn_params):
+        options = self.settings_dict.get("POOL") or {}
+        key = (
+            self.alias,
+            conn_params.get("dbname"),
+            conn_params.get("host"),
+            conn_params.get("port"),
+            conn_params.get("user"),
+        )
+
+        def connect():
+            return super(DatabaseWrapper, self).get_new_connection(conn_params)
+
+        return get_pool(
+            key,
+            lambda: ConnectionPool(
+                connect,
+                max_size=options.get("max_size", 10),
+                timeout=options.get("timeout", 5.0),
+                max_lifetime=options.get("max_lifetime", 1800),
+                max_idle=options.get("max_idle", 300),
+            ),
+        )
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        connection = self._pool(conn_params).getconn()
+        # Conexão reaproveitada não passa pelo connect() do pai, que define isso.
+        isolation_level = self.settings_dict["OPTIONS"].get("isolation_level")
+        self.isolation_level = (
+            IsolationLevel(isolation_level) if isolation_level is not None else IsolationLevel.READ_COMMITTED
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = self._pool(self.get_connection_params())
+        # Fechada dentro de atomic(): o wrapper ainda referencia a conexão,
+        # então ela não pode voltar para o pool.
+        with self.wrap_database_errors:
+            pool.putconn(self.connection, discard=self.in_atomic_block)
@@ -1,6 +1,7 @@
 import re
 from typing import Optional
 
+from django.conf import settings
 from django.http import JsonResponse
 from django.core.cache import cache
 from apps.core.models import Store, Camera
@@ -11,6 +12,8 @@ from backend.utils.entitlements import (
     is_subscription_active,
 )
 from apps.core.services.journey_events import log_journey_event
+from backend.utils import shared_cache
+from backend.utils.request_scope import scoped
 
 
 STORE_PATH_RE = re.compile(r"/stores/(?P<store_id>[0-9a-fA-F-]+)/")
@@ -51,7 +54,7 @@ class TrialEnforcementMiddleware:
         }
         try:
             cache_key = f"trial-expired-shown:{org_id}"
-            if not cache.get(cache_key):
+            if not shared_cache.get("trial.expired_shown", cache_key):
                 log_journey_event(
                     org_id=str(org_id),
                     event_name="trial_expired_shown",
@@ -84,31 +87,57 @@ class TrialEnforcementMiddleware:
         )
         return any(path.startswith(prefix) for prefix in whitelist)
 
+    def _cached_org_lookup(self, kind: str, object_id: str, loader) -> Optional[str]:
+        # store/câmera nunca trocam de org: memo por request + cache curto.
+        def load():
+            ttl = int(getattr(settings, "ENTITLEMENTS_CACHE_SECONDS", 60) or 0)
+            key = f"entitlements:{kind}_org:{object_id}"
+            if ttl > 0:
+                cached = shared_cache.get("entitlements.org_lookup", key)
+                if cached:
+                    return cached
+            org_id = loader()
+            if org_id and ttl > 0:
+                cache.set(key, org_id, ttl)
+            return org_id
+
+        return scoped((f"{kind}_org", object_id), load)
+
+    def _store_org_id(self, store_id: str) -> Optional[str]:
+        def load():
+            row = Store.objects.filter(id=store_id).values("org_id").first()
+            return str(row["org_id"]) if row else None
+
+        return self._cached_org_lookup("store", str(store_id), load)
+
+    def _camera_org_id(self, camera_id: str) -> Optional[str]:
+        def load():
+            row = Camera.objects.filter(id=camera_id).values("store__org_id").first()
+            return str(row["store__org_id"]) if row and row.get("store__org_id") else None
+
+        return self._cached_org_lookup("camera", str(camera_id), load)
+
     def _resolve_org_id(self, request) -> Optional[str]:
         store_id = request.GET.get("store_id") or request.GET.get("store")
         org_id = request.GET.get("org_id") or request.GET.get("org")
         if store_id:
-            row = Store.objects.filter(id=store_id).values("org_id").first()
-            if row:
-                return str(row["org_id"])
+            resolved = self._store_org_id(store_id)
+            if resolved:
+                return resolved
         if org_id:
             return str(org_id)
 
         match = STORE_PATH_RE.search(request.path or "")
         if match:
-            row = Store.objects.filter(id=match.group("store_id")).values("org_id").first()
-            if row:
-                return str(row["org_id"])
+            resolved = self._store_org_id(match.group("store_id"))
+            if resolved:
+                return resolved
 
         match = CAMERA_PATH_RE.search(request.path or "")
         if match:
-            row = (
-                Camera.objects.filter(id=match.group("camera_id"))
-                .values("store__org_id")
-                .first()
-            )
-            if row and row.get("store__org_id"):
-                return str(row["store__org_id"])
+            resolved = self._camera_org_id(match.group("camera_id"))
+            if resolved:
+                return resolved
 
         org_ids = get_user_org_ids(request.user)
         if len(org_ids) == 1:
@@ -67,6 +67,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'backend.utils.request_scope.RequestScopeMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -197,12 +198,72 @@ if DATABASES is None:
             }
         }
 
+# Conexões com o Postgres: none (abre/fecha por request), persistent
+# (CONN_MAX_AGE + health checks) ou pool (pool em processo, p/ workers com threads).
+DB_POOL_MODE = (os.getenv("DB_POOL_MODE") or "persistent").strip().lower()
+if DB_POOL_MODE not in {"none", "persistent", "pool"}:
+    DB_POOL_MODE = "persistent"
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    if DB_POOL_MODE == "persistent":
+        DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+        DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+    elif DB_POOL_MODE == "pool" and not _running_tests:
+        DATABASES["default"]["ENGINE"] = "backend.db.pooled_postgresql"
+        # Devolve ao pool no fim de cada request.
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["POOL"] = {
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", "5")),
+            "max_lifetime": int(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+            "max_idle": int(os.getenv("DB_POOL_MAX_IDLE", "300")),
+        }
+
 if _running_tests and DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
     base_test_name = os.getenv("TEST_DB_NAME")
     if not base_test_name:
         base_test_name = f"test_{DATABASES['default']['NAME']}"
     suffix = os.getenv("TEST_DB_SUFFIX") or str(os.getpid())
     DATABASES["default"]["TEST"] = {"NAME": f"{base_test_name}_{suffix}"}
+
+# Cache compartilhado entre workers (Redis) quando REDIS_URL existe; senão LocMem por processo.
+# Chaves com namespace/versão e contadores de hit/miss em backend/utils/shared_cache.py.
+REDIS_URL = os.getenv("REDIS_URL", "").strip()
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "dalevision")
+if REDIS_URL and not _use_sqlite_for_tests:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": CACHE_KEY_PREFIX,
+            "TIMEOUT": int(os.getenv("CACHE_DEFAULT_TIMEOUT", "300")),
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "SOCKET_CONNECT_TIMEOUT": float(os.getenv("REDIS_CONNECT_TIMEOUT", "2")),
+                "SOCKET_TIMEOUT": float(os.getenv("REDIS_SOCKET_TIMEOUT", "1")),
+                "CONNECTION_POOL_KWARGS": {
+                    "max_connections": int(os.getenv("REDIS_MAX_CONNECTIONS", "50")),
+                    "retry_on_timeout": True,
+                },
+                # Redis fora do ar vira cache miss (o banco continua respondendo).
+                "IGNORE_EXCEPTIONS": True,
+            },
+        }
+    }
+    DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "dalevision-default",
+            "KEY_PREFIX": CACHE_KEY_PREFIX,
+            "TIMEOUT": int(os.getenv("CACHE_DEFAULT_TIMEOUT", "300")),
+            "OPTIONS": {"MAX_ENTRIES": int(os.getenv("LOCMEM_CACHE_MAX_ENTRIES", "10000"))},
+        }
+    }
+
+# /api/health/db/ e /api/health/cache/ respondem só ok/degraded em público; o detalhe
+# (engine, pool, backend, prefixo) exige staff ou o header X-Health-Token com este valor.
+HEALTH_DETAILS_TOKEN = os.getenv("HEALTH_DETAILS_TOKEN", "").strip()
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -320,3 +381,97 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 EDGE_SERVICE_USERNAME = os.getenv("EDGE_SERVICE_USERNAME", "edge-agent")
 EDGE_AGENT_TOKEN = os.getenv("EDGE_AGENT_TOKEN", "")
 EDGE_SHARED_TOKEN = os.getenv("EDGE_SHARED_TOKEN", "")
+EDGE_EVENTS_BATCH_MAX_ITEMS = int(os.getenv("EDGE_EVENTS_BATCH_MAX_ITEMS", "500"))
+# Write-behind de edge_event_minute_stats (0 = write-through)
+EDGE_MINUTE_STATS_FLUSH_SECONDS = float(
+    os.getenv("EDGE_MINUTE_STATS_FLUSH_SECONDS", "0" if _use_sqlite_for_tests else "5")
+)
+EDGE_MINUTE_STATS_FLUSH_MAX_EVENTS = int(os.getenv("EDGE_MINUTE_STATS_FLUSH_MAX_EVENTS", "500"))
+EDGE_MINUTE_STATS_MAX_PENDING_KEYS = int(os.getenv("EDGE_MINUTE_STATS_MAX_PENDING_KEYS", "5000"))
+EDGE_TOKEN_CACHE_SECONDS = int(os.getenv("EDGE_TOKEN_CACHE_SECONDS", "30"))
+EDGE_TOKEN_NEGATIVE_CACHE_SECONDS = int(os.getenv("EDGE_TOKEN_NEGATIVE_CACHE_SECONDS", "10"))
+EDGE_TOKEN_LAST_USED_INTERVAL_SECONDS = int(os.getenv("EDGE_TOKEN_LAST_USED_INTERVAL_SECONDS", "60"))
+EDGE_CAMERA_DIRECTORY_CACHE_SECONDS = int(os.getenv("EDGE_CAMERA_DIRECTORY_CACHE_SECONDS", "300"))
+EDGE_STATUS_STATE_TTL_SECONDS = int(os.getenv("EDGE_STATUS_STATE_TTL_SECONDS", "3600"))
+EDGE_PROJECTION_MODE = os.getenv("EDGE_PROJECTION_MODE", "sync")
+# Rollups horário/diário de métricas (metrics_rollup_tick)
+METRICS_ROLLUP_READS_ENABLED = os.getenv(
+    "METRICS_ROLLUP_READS_ENABLED", "0" if _use_sqlite_for_tests else "1"
+) in ("1", "true", "True")
+METRICS_ROLLUP_SETTLE_SECONDS = int(os.getenv("METRICS_ROLLUP_SETTLE_SECONDS", "300"))
+METRICS_ROLLUP_OVERLAP_SECONDS = int(os.getenv("METRICS_ROLLUP_OVERLAP_SECONDS", "120"))
+METRICS_ROLLUP_BACKFILL_DAYS = int(os.getenv("METRICS_ROLLUP_BACKFILL_DAYS", "90"))
+METRICS_ROLLUP_WATERMARK_CACHE_SECONDS = int(os.getenv("METRICS_ROLLUP_WATERMARK_CACHE_SECONDS", "30"))
+# Cache de payloads de relatório (summary/impact/export)
+REPORT_CACHE_ENABLED = os.getenv("REPORT_CACHE_ENABLED", "0" if _use_sqlite_for_tests else "1") in ("1", "true", "True")
+REPORT_CACHE_SETTLE_SECONDS = int(os.getenv("REPORT_CACHE_SETTLE_SECONDS", "3600"))
+REPORT_CACHE_LIVE_SECONDS = int(os.getenv("REPORT_CACHE_LIVE_SECONDS", "60"))
+REPORT_CACHE_CLOSED_SECONDS = int(os.getenv("REPORT_CACHE_CLOSED_SECONDS", "0"))
+# Live monitor (SSE por store, pub/sub em processo)
+LIVE_FEED_ENABLED = os.getenv("LIVE_FEED_ENABLED", "1") in ("1", "true", "True")
+LIVE_FEED_QUEUE_SIZE = int(os.getenv("LIVE_FEED_QUEUE_SIZE", "256"))
+LIVE_FEED_MAX_SUBSCRIBERS_PER_STORE = int(os.getenv("LIVE_FEED_MAX_SUBSCRIBERS_PER_STORE", "50"))
+LIVE_FEED_KEEPALIVE_SECONDS = float(os.getenv("LIVE_FEED_KEEPALIVE_SECONDS", "15"))
+LIVE_FEED_MAX_STREAM_SECONDS = float(os.getenv("LIVE_FEED_MAX_STREAM_SECONDS", "300"))
+LIVE_FEED_SNAPSHOT_EVENTS = int(os.getenv("LIVE_FEED_SNAPSHOT_EVENTS", "20"))
+# Streams SSE simultâneos por processo (cada um prende uma thread gthread): fica abaixo de GUNICORN_THREADS.
+LIVE_FEED_MAX_STREAMS = int(
+    os.getenv("LIVE_FEED_MAX_STREAMS", str(max(1, int(os.getenv("GUNICORN_THREADS", "4")) // 2)))
+)
+LIVE_FEED_RETRY_AFTER_SECONDS = int(os.getenv("LIVE_FEED_RETRY_AFTER_SECONDS", "15"))
+# Network dashboard (KPIs por loja; cache curto por conjunto de lojas)
+NETWORK_DASHBOARD_CACHE_SECONDS = int(os.getenv("NETWORK_DASHBOARD_CACHE_SECONDS", "60"))
+# Cache do último ROI publicado por câmera (invalidado em create_roi_config)
+ROI_PUBLISHED_CACHE_SECONDS = int(os.getenv("ROI_PUBLISHED_CACHE_SECONDS", "300"))
+# Cache de membership/entitlements (0 = só memo por request)
+ENTITLEMENTS_CACHE_SECONDS = int(os.getenv("ENTITLEMENTS_CACHE_SECONDS", "0" if _use_sqlite_for_tests else "60"))
+USER_UUID_CACHE_SECONDS = int(os.getenv("USER_UUID_CACHE_SECONDS", "0" if _use_sqlite_for_tests else "3600"))
+# event_receipts particionada (supabase/sql/20261018_*): dedupe em event_receipt_keys
+EVENT_RECEIPTS_PARTITIONED = os.getenv("EVENT_RECEIPTS_PARTITIONED", "0") in ("1", "true", "True")
+EVENT_RECEIPTS_PARTITION_INTERVAL = os.getenv("EVENT_RECEIPTS_PARTITION_INTERVAL", "weekly")
+EVENT_RECEIPTS_PARTITIONS_AHEAD = int(os.getenv("EVENT_RECEIPTS_PARTITIONS_AHEAD", "2"))
+EVENT_RECEIPTS_RETENTION_DAYS = int(os.getenv("EVENT_RECEIPTS_RETENTION_DAYS", "35"))
+EVENT_RECEIPTS_DEDUPE_DAYS = int(os.getenv("EVENT_RECEIPTS_DEDUPE_DAYS", "35"))
+EVENT_RECEIPTS_ARCHIVE_DIR = os.getenv("EVENT_RECEIPTS_ARCHIVE_DIR", "")
+# Outbox do n8n: handlers só enfileiram; envio pelo worker n8n_outbox_dispatch
+# Opt-in: ligar só depois de subir o worker (bin/render_worker_n8n_outbox.sh); sem ele nada é entregue.
+N8N_OUTBOX_ENABLED = os.getenv("N8N_OUTBOX_ENABLED", "0") in ("1", "true", "True")
+N8N_OUTBOX_CONCURRENCY = int(os.getenv("N8N_OUTBOX_CONCURRENCY", "4"))
+N8N_OUTBOX_BATCH_SIZE = int(os.getenv("N8N_OUTBOX_BATCH_SIZE", "1"))
+N8N_OUTBOX_CLAIM_LIMIT = int(os.getenv("N8N_OUTBOX_CLAIM_LIMIT", "100"))
+N8N_OUTBOX_TIMEOUT_SECONDS = float(os.getenv("N8N_OUTBOX_TIMEOUT_SECONDS", "8"))
+N8N_OUTBOX_MAX_ATTEMPTS = int(os.getenv("N8N_OUTBOX_MAX_ATTEMPTS", "8"))
+N8N_OUTBOX_BACKOFF_BASE_SECONDS = float(os.getenv("N8N_OUTBOX_BACKOFF_BASE_SECONDS", "5"))
+N8N_OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("N8N_OUTBOX_BACKOFF_MAX_SECONDS", "1800"))
+N8N_OUTBOX_IDLE_SECONDS = float(os.getenv("N8N_OUTBOX_IDLE_SECONDS", "1"))
+# Envio de e-mail em lote (health_alerts_tick): conexões SMTP em paralelo
+EMAIL_BATCH_CONCURRENCY = int(os.getenv("EMAIL_BATCH_CONCURRENCY", "4"))
+# Snapshots inline dos heartbeats: upload por hash de conteúdo fora do request.
+# Ligado por padrão só com Supabase Storage configurado (o fallback local é disco efêmero).
+_snapshot_storage_configured = bool(SUPABASE_URL and (SUPABASE_SERVICE_ROLE_KEY or SUPABASE_KEY))
+EDGE_SNAPSHOT_OFFLOAD_ENABLED = os.getenv(
+    "EDGE_SNAPSHOT_OFFLOAD_ENABLED", "1" if _snapshot_storage_configured and not _use_sqlite_for_tests else "0"
+) in ("1", "true", "True")
+# Origem pública da API para montar a URL absoluta do snapshot (frontend em outro domínio).
+# Vazio: usa o host do request do heartbeat.
+EDGE_SNAPSHOT_PUBLIC_BASE_URL = os.getenv("EDGE_SNAPSHOT_PUBLIC_BASE_URL", "")
+EDGE_SNAPSHOT_URL_TTL_SECONDS = int(os.getenv("EDGE_SNAPSHOT_URL_TTL_SECONDS", str(7 * 24 * 3600)))
+EDGE_SNAPSHOT_LOCAL_DIR = os.getenv("EDGE_SNAPSHOT_LOCAL_DIR", str(BASE_DIR / "var" / "edge_snapshots"))
+EDGE_SNAPSHOT_UPLOAD_WORKERS = int(os.getenv("EDGE_SNAPSHOT_UPLOAD_WORKERS", "2"))
+EDGE_SNAPSHOT_MAX_PENDING = int(os.getenv("EDGE_SNAPSHOT_MAX_PENDING", "64"))
+EDGE_SNAPSHOT_CACHE_SECONDS = int(os.getenv("EDGE_SNAPSHOT_CACHE_SECONDS", "300"))
+# Probe RTSP: pool de workers pré-aquecidos (0 = um processo por probe) e cache curto por URL
+CAMERA_RTSP_PROBE_POOL_SIZE = int(os.getenv("CAMERA_RTSP_PROBE_POOL_SIZE", "2"))
+CAMERA_RTSP_PROBE_POOL_MAX_QUEUE = int(os.getenv("CAMERA_RTSP_PROBE_POOL_MAX_QUEUE", "16"))
+CAMERA_RTSP_PROBE_WORKER_MAX_TASKS = int(os.getenv("CAMERA_RTSP_PROBE_WORKER_MAX_TASKS", "200"))
+CAMERA_RTSP_PROBE_CACHE_SECONDS = int(os.getenv("CAMERA_RTSP_PROBE_CACHE_SECONDS", "0" if _use_sqlite_for_tests else "15"))
+# test_connection_bulk é síncrono (~ceil(N/pool)x6s): limite de câmeras por request abaixo do timeout de 120s
+CAMERA_RTSP_PROBE_BULK_MAX = int(os.getenv("CAMERA_RTSP_PROBE_BULK_MAX", "16"))
+CAMERA_RTSP_PROBE_BUSY_RETRY_AFTER_SECONDS = int(os.getenv("CAMERA_RTSP_PROBE_BUSY_RETRY_AFTER_SECONDS", "5"))
+# Journey events em lote (0 = write-through). O lote só vira default com spool em disco persistente
+# (Persistent Disk no Render); sem JOURNEY_EVENTS_SPOOL_DIR a gravação segue síncrona.
+JOURNEY_EVENTS_SPOOL_DIR = os.getenv("JOURNEY_EVENTS_SPOOL_DIR", "")
+JOURNEY_EVENTS_FLUSH_SECONDS = float(
+    os.getenv("JOURNEY_EVENTS_FLUSH_SECONDS", "2" if JOURNEY_EVENTS_SPOOL_DIR and not _use_sqlite_for_tests else "0")
+)
+JOURNEY_EVENTS_FLUSH_MAX_EVENTS = int(os.getenv("JOURNEY_EVENTS_FLUSH_MAX_EVENTS", "100"))
@@ -2,7 +2,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
-from backend.views import health, auth_health, schema_health
+from backend.views import health, auth_health, schema_health, db_pool_health, cache_health
 from apps.alerts.views import DemoLeadCreateView
 from apps.accounts.views import SetupStateView
 from rest_framework import permissions
@@ -68,5 +68,7 @@ urlpatterns = [
     path("health", health),
     path("api/health/auth/", auth_health),
     path("api/health/schema/", schema_health),
+    path("api/health/db/", db_pool_health),
+    path("api/health/cache/", cache_health),
     path("api/edge/", include("apps.edge.urls")),
 ]
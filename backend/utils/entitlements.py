@@ -4,6 +4,8 @@ import logging
 from typing import Optional
 import uuid
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import connection
 from django.db.models import Max
 from django.utils import timezone
@@ -11,11 +13,14 @@ from rest_framework import status
 from rest_framework.exceptions import APIException
 
 from apps.core.models import AuditLog, Organization, Store, Subscription
+from backend.utils import shared_cache
+from backend.utils.request_scope import discard, scoped
 
 logger = logging.getLogger(__name__)
 
 TRIAL_EXPIRED_CODE = "TRIAL_EXPIRED"
 _ORG_TRIAL_COLUMN_EXISTS: Optional[bool] = None
+_ORG_ENTITLEMENT_NAMES = ("trial_ends_at", "subscription_active", "trial_expired")
 
 
 def _is_uuid(value: Optional[str]) -> bool:
@@ -72,8 +77,59 @@ def _get_org_trial_ends_at(org_id: Optional[str]):
     return derived
 
 
+def _org_entitlement_key(org_id, name: str) -> str:
+    return f"entitlements:org:{org_id}:{name}"
+
+
+def _cached_org_entitlement(org_id, name: str, loader):
+    """
+    Memo por request + cache curto (ENTITLEMENTS_CACHE_SECONDS) por org.
+    `loader` retorna (valor, expira_em|None); expira_em encurta o TTL para o
+    cache não atravessar o fim do trial.
+    """
+    def load():
+        ttl = int(getattr(settings, "ENTITLEMENTS_CACHE_SECONDS", 60) or 0)
+        key = _org_entitlement_key(org_id, name)
+        if ttl > 0:
+            cached = shared_cache.get("entitlements.org", key)
+            if isinstance(cached, dict) and "value" in cached:
+                return cached["value"]
+        value, expires_at = loader()
+        if ttl > 0:
+            if expires_at is not None:
+                ttl = min(ttl, int((expires_at - timezone.now()).total_seconds()))
+            if ttl > 0:
+                try:
+                    cache.set(key, {"value": value}, ttl)
+                except Exception:
+                    logger.warning("[ENTITLEMENTS] cache write failed org_id=%s name=%s", org_id, name)
+        return value
+
+    return scoped(("org_entitlement", str(org_id), name), load)
+
+
+def invalidate_org_entitlements(org_id: Optional[str]) -> None:
+    """Chamar após mudança de assinatura, trial ou bloqueio de stores da org."""
+    if not org_id:
+        return
+    cache.delete_many([_org_entitlement_key(org_id, name) for name in _ORG_ENTITLEMENT_NAMES])
+    for name in _ORG_ENTITLEMENT_NAMES:
+        discard(("org_entitlement", str(org_id), name))
+
+
+def _future_or_none(value):
+    return value if value and value > timezone.now() else None
+
+
 def get_org_trial_ends_at(org_id: Optional[str]):
-    return _get_org_trial_ends_at(org_id)
+    if not org_id or not _is_uuid(org_id):
+        return _get_org_trial_ends_at(org_id)
+
+    def load():
+        trial_ends_at = _get_org_trial_ends_at(org_id)
+        return trial_ends_at, None
+
+    return _cached_org_entitlement(org_id, "trial_ends_at", load)
 
 
 def _org_trial_column_exists() -> bool:
@@ -93,7 +149,7 @@ def _org_trial_column_exists() -> bool:
 def is_trial_active(org_id: Optional[str]) -> bool:
     if not org_id:
         return False
-    trial_ends_at = _get_org_trial_ends_at(org_id)
+    trial_ends_at = get_org_trial_ends_at(org_id)
     if not trial_ends_at:
         return False
     return timezone.now() < trial_ends_at
@@ -102,6 +158,12 @@ def is_trial_active(org_id: Optional[str]) -> bool:
 def is_subscription_active(org_id: Optional[str]) -> bool:
     if not org_id:
         return False
+    if not _is_uuid(org_id):
+        return _is_subscription_active(org_id)
+    return _cached_org_entitlement(org_id, "subscription_active", lambda: (_is_subscription_active(org_id), None))
+
+
+def _is_subscription_active(org_id: Optional[str]) -> bool:
     try:
         sub = Subscription.objects.filter(org_id=org_id).order_by("-created_at").first()
     except Exception:
@@ -119,10 +181,14 @@ def is_trial_expired(org_id: Optional[str]) -> bool:
     if not _is_uuid(org_id):
         logger.warning("[ENTITLEMENTS] invalid org_id for trial check org_id=%s", org_id)
         return False
+    return _cached_org_entitlement(org_id, "trial_expired", lambda: _compute_trial_expired(org_id))
+
+
+def _compute_trial_expired(org_id: str):
     if not Organization.objects.filter(id=org_id).exists():
-        return False
+        return False, None
     if is_subscription_active(org_id):
-        return False
+        return False, None
 
     blocked_exists = Store.objects.filter(
         org_id=org_id,
@@ -130,18 +196,22 @@ def is_trial_expired(org_id: Optional[str]) -> bool:
         blocked_reason="trial_expired",
     ).exists()
     if blocked_exists:
-        return True
+        return True, None
 
-    trial_ends_at = _get_org_trial_ends_at(org_id)
+    trial_ends_at = get_org_trial_ends_at(org_id)
     if trial_ends_at and timezone.now() > trial_ends_at:
-        return True
+        return True, None
 
     latest_trial = (
         Store.objects.filter(org_id=org_id, trial_ends_at__isnull=False)
         .aggregate(latest=Max("trial_ends_at"))
         .get("latest")
     )
-    return bool(latest_trial and timezone.now() > latest_trial)
+    if latest_trial and timezone.now() > latest_trial:
+        return True, None
+    # Ainda no trial: o cache não pode passar do primeiro vencimento conhecido.
+    deadlines = [d for d in (_future_or_none(trial_ends_at), _future_or_none(latest_trial)) if d]
+    return False, min(deadlines) if deadlines else None
 
 
 def can_use_product(org_id: Optional[str]) -> bool:
@@ -0,0 +1,38 @@
+"""
+Memo por request (contextvar) para lookups repetidos no mesmo request:
+middleware, permissões e views resolvem org/usuário uma vez só.
+Fora de um request (commands, testes sem middleware) o loader roda sempre.
+"""
+from contextvars import ContextVar
+from typing import Any, Callable, Hashable, Optional
+
+_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+
+class RequestScopeMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _scope.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _scope.reset(token)
+
+
+def scoped(key: Hashable, loader: Callable[[], Any]) -> Any:
+    scope = _scope.get()
+    if scope is None:
+        return loader()
+    if key in scope:
+        return scope[key]
+    value = loader()
+    scope[key] = value
+    return value
+
+
+def discard(key: Hashable) -> None:
+    scope = _scope.get()
+    if scope is not None:
+        scope.pop(key, None)
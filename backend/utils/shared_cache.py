@@ -0,0 +1,108 @@
+"""
+Helpers sobre o cache padrão (Redis com REDIS_URL, LocMem sem):
+
+- chaves com namespace: `key("stores.list", user_id, view)`;
+- versões por escopo (store/org) para invalidar em bloco sem varrer chaves:
+  `versioned_key(ns, "store", store_id, versions(ns, "store", ids)[store_id])`;
+  `bump_version("store", store_id, namespace=ns)` invalida só o namespace,
+  `bump_version("store", store_id)` invalida todos os namespaces da store;
+- contadores de hit/miss por namespace (por processo) em `stats()`.
+"""
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+def key(namespace: str, *parts) -> str:
+    return ":".join([namespace, *(str(part) for part in parts)])
+
+
+def _version_key(scope: str, scope_id, namespace: Optional[str] = None) -> str:
+    if namespace:
+        return f"ver:{scope}:{scope_id}:{namespace}"
+    return f"ver:{scope}:{scope_id}"
+
+
+def versions(namespace: str, scope: str, scope_ids: Iterable) -> Dict[str, str]:
+    """
+    Versão efetiva ("<escopo>.<namespace>") de cada id numa única leitura.
+    Contador ausente vale 1 (nunca invalidado).
+    """
+    ids = [str(scope_id) for scope_id in scope_ids if scope_id]
+    if not ids:
+        return {}
+    lookup = []
+    for scope_id in ids:
+        lookup.append(_version_key(scope, scope_id))
+        lookup.append(_version_key(scope, scope_id, namespace))
+    try:
+        found = cache.get_many(lookup)
+    except Exception:
+        logger.warning("[CACHE] version lookup failed namespace=%s scope=%s", namespace, scope)
+        found = {}
+    return {
+        scope_id: f"{found.get(_version_key(scope, scope_id), 1)}.{found.get(_version_key(scope, scope_id, namespace), 1)}"
+        for scope_id in ids
+    }
+
+
+def versioned_key(namespace: str, scope: str, scope_id, version: str, *parts) -> str:
+    return key(namespace, scope, scope_id, f"v{version}", *parts)
+
+
+def bump_version(scope: str, scope_id, *, namespace: Optional[str] = None) -> None:
+    """Invalida as chaves versionadas do escopo; entradas antigas expiram pelo TTL."""
+    if not scope_id:
+        return
+    version_key = _version_key(scope, scope_id, namespace)
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, 2, None)
+    except Exception:
+        logger.exception("[CACHE] version bump failed scope=%s id=%s namespace=%s", scope, scope_id, namespace)
+
+
+def record(namespace: str, *, hits: int = 0, misses: int = 0) -> None:
+    with _stats_lock:
+        entry = _stats[namespace]
+        entry["hits"] += hits
+        entry["misses"] += misses
+
+
+def get(namespace: str, cache_key: str, default=None):
+    value = cache.get(cache_key, _MISSING)
+    if value is _MISSING:
+        record(namespace, misses=1)
+        return default
+    record(namespace, hits=1)
+    return value
+
+
+def get_many(namespace: str, cache_keys: List[str]) -> dict:
+    found = cache.get_many(cache_keys) if cache_keys else {}
+    record(namespace, hits=len(found), misses=len(cache_keys) - len(found))
+    return found
+
+
+def stats() -> Dict[str, dict]:
+    with _stats_lock:
+        snapshot = {namespace: dict(values) for namespace, values in _stats.items()}
+    for values in snapshot.values():
+        total = values["hits"] + values["misses"]
+        values["hit_rate"] = round(values["hits"] / total, 4) if total else None
+    return snapshot
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
@@ -1,6 +1,13 @@
+import hmac
+
+from django.conf import settings
+from django.core.cache import cache
 from django.http import JsonResponse
 from django.db import connection
 
+from backend.db.pool import pool_stats
+from backend.utils import shared_cache
+
 from apps.accounts.auth_supabase import _get_supabase_config
 
 
@@ -39,3 +46,64 @@ def schema_health(request):
             "schema_outdated": not org_trial_ends_at,
         }
     )
+
+
+def _health_details_allowed(request) -> bool:
+    user = getattr(request, "user", None)
+    if user is not None and (getattr(user, "is_staff", False) or getattr(user, "is_superuser", False)):
+        return True
+    expected = getattr(settings, "HEALTH_DETAILS_TOKEN", "") or ""
+    provided = request.headers.get("X-Health-Token") or ""
+    return bool(expected and provided) and hmac.compare_digest(provided, expected)
+
+
+def _db_reachable() -> bool:
+    try:
+        connection.ensure_connection()
+        return True
+    except Exception:
+        return False
+
+
+def _cache_reachable() -> bool:
+    key = "health:cache_probe"
+    try:
+        cache.set(key, 1, 10)
+        return cache.get(key) == 1
+    except Exception:
+        return False
+
+
+def db_pool_health(request):
+    status = "ok" if _db_reachable() else "degraded"
+    if not _health_details_allowed(request):
+        return JsonResponse({"ok": status == "ok", "status": status})
+    database = settings.DATABASES.get("default", {})
+    return JsonResponse(
+        {
+            "ok": status == "ok",
+            "status": status,
+            "mode": getattr(settings, "DB_POOL_MODE", "none"),
+            "engine": database.get("ENGINE"),
+            "conn_max_age": database.get("CONN_MAX_AGE", 0),
+            "conn_health_checks": bool(database.get("CONN_HEALTH_CHECKS", False)),
+            "pools": pool_stats(),
+        }
+    )
+
+
+def cache_health(request):
+    status = "ok" if _cache_reachable() else "degraded"
+    if not _health_details_allowed(request):
+        return JsonResponse({"ok": status == "ok", "status": status})
+    cache_settings = settings.CACHES.get("default", {})
+    return JsonResponse(
+        {
+            "ok": status == "ok",
+            "status": status,
+            "backend": cache_settings.get("BACKEND"),
+            "shared": "redis" in str(cache_settings.get("BACKEND", "")).lower(),
+            "key_prefix": cache_settings.get("KEY_PREFIX"),
+            "namespaces": shared_cache.stats(),
+        }
+    )
@@ -0,0 +1,5 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+echo "[render-job] event_receipts_partitions interval=${EVENT_RECEIPTS_PARTITION_INTERVAL:-weekly} retention=${EVENT_RECEIPTS_RETENTION_DAYS:-35}d"
+python manage.py event_receipts_partitions
@@ -0,0 +1,8 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+BATCH_SIZE="${METRICS_ROLLUP_BATCH_SIZE:-500}"
+REBUILD_DAYS="${METRICS_ROLLUP_REBUILD_DAYS:-0}"
+
+echo "[render-job] metrics rollup tick batch_size=${BATCH_SIZE} rebuild_days=${REBUILD_DAYS}"
+python manage.py metrics_rollup_tick --batch-size "${BATCH_SIZE}" --rebuild-days "${REBUILD_DAYS}"
@@ -0,0 +1,11 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Render Background Worker do outbox n8n (só entrega com N8N_OUTBOX_ENABLED=1 no backend).
+CONCURRENCY="${N8N_OUTBOX_CONCURRENCY:-4}"
+BATCH_SIZE="${N8N_OUTBOX_BATCH_SIZE:-1}"
+
+echo "[render-worker] n8n_outbox_dispatch concurrency=${CONCURRENCY} batch_size=${BATCH_SIZE}"
+exec python manage.py n8n_outbox_dispatch \
+  --concurrency "${CONCURRENCY}" \
+  --batch-size "${BATCH_SIZE}"
@@ -0,0 +1,16 @@
+-- Dedupe de event_receipts fora da tabela principal (pré-requisito do particionamento).
+--
+-- Com EVENT_RECEIPTS_PARTITIONED=1 o backend reserva o event_id aqui no mesmo
+-- INSERT do receipt. Funciona com event_receipts ainda não particionada, então a
+-- ordem de deploy é: este script -> EVENT_RECEIPTS_PARTITIONED=1 ->
+-- 20261018_partition_event_receipts.sql.
+--
+-- Podada por `python manage.py event_receipts_partitions` (EVENT_RECEIPTS_DEDUPE_DAYS).
+
+CREATE TABLE IF NOT EXISTS public.event_receipt_keys (
+  event_id text PRIMARY KEY,
+  received_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS event_receipt_keys_received_at_idx
+  ON public.event_receipt_keys (received_at);
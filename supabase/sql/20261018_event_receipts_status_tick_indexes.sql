@@ -0,0 +1,13 @@
+-- Índices das consultas agrupadas do status_tick (apps/edge/fleet_status.py).
+-- Idempotente. Em event_receipts particionada o índice do pai é criado em
+-- todas as partições (sem CONCURRENTLY); rodar fora do horário de pico.
+
+-- Último status emitido por loja/câmera (DISTINCT ON em load_last_emitted_statuses).
+CREATE INDEX IF NOT EXISTS event_receipts_status_changed_store_idx
+  ON public.event_receipts ((raw->'data'->>'store_id'), event_name, received_at DESC)
+  WHERE event_name IN ('store_status_changed', 'camera_status_changed');
+
+-- Último heartbeat do edge por loja (janela curta de received_at em load_edge_heartbeats).
+CREATE INDEX IF NOT EXISTS event_receipts_edge_heartbeat_received_idx
+  ON public.event_receipts (received_at DESC)
+  WHERE source = 'edge' AND event_name IN ('edge_heartbeat', 'camera_heartbeat', 'edge_camera_heartbeat');
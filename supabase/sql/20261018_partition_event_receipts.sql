@@ -0,0 +1,90 @@
+-- Particiona public.event_receipts por received_at (semanal).
+--
+-- Em tabela particionada o UNIQUE precisa conter a chave de partição, então o
+-- dedupe por event_id fica em public.event_receipt_keys
+-- (20261018_event_receipt_keys.sql), reservada no mesmo INSERT pelo backend.
+--
+-- Ordem:
+--   1. 20261018_event_receipt_keys.sql e EVENT_RECEIPTS_PARTITIONED=1 no backend.
+--   2. Este script (janela de manutenção: renomeia a tabela atual e a anexa como
+--      partição event_receipts_legacy, que cobre tudo até o fim da semana).
+--   3. Agendar `python manage.py event_receipts_partitions` (diário).
+--
+-- Idempotente: não faz nada se event_receipts já é particionada.
+
+DO $$
+DECLARE
+  v_cutoff timestamptz := date_trunc('week', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' + interval '1 week';
+BEGIN
+  IF EXISTS (
+    SELECT 1
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = 'public' AND c.relname = 'event_receipts' AND c.relkind = 'p'
+  ) THEN
+    RAISE NOTICE 'event_receipts já é particionada';
+    RETURN;
+  END IF;
+
+  -- Bloqueia escrita durante a troca; receipts anteriores à etapa 1 entram nas keys.
+  LOCK TABLE public.event_receipts IN SHARE ROW EXCLUSIVE MODE;
+
+  INSERT INTO public.event_receipt_keys (event_id, received_at)
+  SELECT event_id, received_at
+  FROM public.event_receipts
+  WHERE received_at >= now() - interval '35 days'
+  ON CONFLICT (event_id) DO NOTHING;
+
+  ALTER TABLE public.event_receipts RENAME TO event_receipts_legacy;
+  ALTER INDEX IF EXISTS public.event_receipts_pending_projection_idx
+    RENAME TO event_receipts_legacy_pending_projection_idx;
+  ALTER INDEX IF EXISTS public.event_receipts_processed_at_idx
+    RENAME TO event_receipts_legacy_processed_at_idx;
+
+  -- A PK da partição precisa bater com a do pai (id, received_at).
+  ALTER TABLE public.event_receipts_legacy DROP CONSTRAINT IF EXISTS event_receipts_pkey;
+  ALTER TABLE public.event_receipts_legacy
+    ADD CONSTRAINT event_receipts_legacy_pkey PRIMARY KEY (id, received_at);
+  -- CHECK igual ao limite da partição: o ATTACH o reaproveita em vez de varrer a tabela de novo.
+  EXECUTE format(
+    'ALTER TABLE public.event_receipts_legacy ADD CONSTRAINT event_receipts_legacy_bound_chk CHECK (received_at < %L::timestamptz)',
+    v_cutoff
+  );
+
+  CREATE TABLE public.event_receipts (
+    LIKE public.event_receipts_legacy INCLUDING DEFAULTS
+  ) PARTITION BY RANGE (received_at);
+
+  ALTER TABLE public.event_receipts
+    ADD CONSTRAINT event_receipts_pkey PRIMARY KEY (id, received_at);
+  ALTER TABLE public.event_receipts
+    ADD CONSTRAINT event_receipts_lead_id_fkey FOREIGN KEY (lead_id) REFERENCES public.demo_leads(id);
+  ALTER TABLE public.event_receipts
+    ADD CONSTRAINT event_receipts_org_id_fkey FOREIGN KEY (org_id) REFERENCES public.organizations(id);
+
+  CREATE INDEX event_receipts_event_id_idx ON public.event_receipts (event_id);
+  CREATE INDEX event_receipts_pending_projection_idx
+    ON public.event_receipts (received_at, event_id)
+    WHERE processed_at IS NULL AND last_error IS NULL;
+  CREATE INDEX event_receipts_processed_at_idx
+    ON public.event_receipts (processed_at)
+    WHERE processed_at IS NOT NULL;
+
+  EXECUTE format(
+    'ALTER TABLE public.event_receipts ATTACH PARTITION public.event_receipts_legacy FOR VALUES FROM (MINVALUE) TO (%L)',
+    v_cutoff
+  );
+  ALTER TABLE public.event_receipts_legacy DROP CONSTRAINT event_receipts_legacy_bound_chk;
+
+  -- Próximas duas semanas; daqui em diante, event_receipts_partitions.
+  EXECUTE format(
+    'CREATE TABLE public.event_receipts_p%s PARTITION OF public.event_receipts FOR VALUES FROM (%L) TO (%L)',
+    to_char(v_cutoff AT TIME ZONE 'UTC', 'YYYYMMDD'), v_cutoff, v_cutoff + interval '1 week'
+  );
+  EXECUTE format(
+    'CREATE TABLE public.event_receipts_p%s PARTITION OF public.event_receipts FOR VALUES FROM (%L) TO (%L)',
+    to_char((v_cutoff + interval '1 week') AT TIME ZONE 'UTC', 'YYYYMMDD'),
+    v_cutoff + interval '1 week', v_cutoff + interval '2 weeks'
+  );
+END
+$$;